@@ -1,5 +1,5 @@
 # backend/api/app.py
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 import sys
 import os
@@ -14,10 +14,95 @@ from src.statistics import TrafficStatistics
 from src.detector import IssueDetector
 from src.filters import PacketFilter
 from src.storage import PacketStorage
+from src.reporting import configure
+from src.sessions import SessionManager, SessionNotFound
+from src.capture_index import query_packets
+from src.streaming import format_sse, stream_capture
+from src.jobs import CaptureJobManager, JobLimitReached, JobNotFound
+
+# Serve requests quietly: only warnings and errors reach the console
+configure('quiet')
 
 app = Flask(__name__)
 CORS(app)
 
+# Captures live server-side; clients pass a sessionId instead of the packets
+sessions = SessionManager()
+
+# Captures submitted as jobs run on their own threads, at most 4 at a time
+jobs = CaptureJobManager(max_concurrent=4, max_queued=16)
+
+# One storage for the process, so its capture catalog is opened and synced once
+storage = PacketStorage()
+
+# Fields of a packet in responses, unless a request asks for others (?fields=a,b)
+PACKET_FIELDS = ('number', 'timestamp', 'protocol', 'summary', 'length', 'src_ip', 'dst_ip', 'real_packet')
+
+def serialize_packet(packet):
+    """The JSON fields the frontend shows for a packet"""
+    return {
+        'number': packet.get('number'),
+        'timestamp': packet.get('timestamp'),
+        'protocol': packet.get('protocol'),
+        'summary': packet.get('summary'),
+        'length': packet.get('length'),
+        'src_ip': packet.get('src_ip'),
+        'dst_ip': packet.get('dst_ip'),
+        'real_packet': packet.get('real_packet', False)
+    }
+
+def session_not_found(e):
+    return jsonify({
+        'success': False,
+        'error': f'Unknown or expired session: {e.args[0]}'
+    }), 404
+
+app.register_error_handler(SessionNotFound, session_not_found)
+
+def job_not_found(e):
+    return jsonify({
+        'success': False,
+        'error': f'Unknown capture job: {e.args[0]}'
+    }), 404
+
+def job_limit_reached(e):
+    return jsonify({
+        'success': False,
+        'error': f'Too many captures in progress ({e}), try again later'
+    }), 429
+
+app.register_error_handler(JobNotFound, job_not_found)
+app.register_error_handler(JobLimitReached, job_limit_reached)
+
+def page_query(args):
+    """
+    Paging and range arguments of a packet query from request parameters:
+    offset & limit or cursor, startTime/endTime (epoch seconds),
+    firstNumber/lastNumber (packet numbers) and fields (comma separated)
+    """
+    def number(name, kind):
+        value = args.get(name)
+        return kind(value) if value not in (None, '') else None
+    
+    fields = args.get('fields')
+    return {
+        'offset': number('offset', int) or 0,
+        'limit': number('limit', int),
+        'cursor': args.get('cursor') or None,
+        'start_time': number('startTime', float),
+        'end_time': number('endTime', float),
+        'first_number': number('firstNumber', int),
+        'last_number': number('lastNumber', int),
+        'fields': fields.split(',') if fields else list(PACKET_FIELDS),
+    }
+
+def first_page(packets, data):
+    """The packets of a capture/load response: all of them, or the first page when 'limit' is given"""
+    if data.get('limit') is None:
+        return {'packets': [serialize_packet(packet) for packet in packets], 'nextCursor': None}
+    page = query_packets(packets, limit=data['limit'], fields=PACKET_FIELDS)
+    return {'packets': page['packets'], 'nextCursor': page['nextCursor']}
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({
@@ -28,60 +113,122 @@ def health_check():
 
 @app.route('/api/capture', methods=['POST'])
 def capture_packets():
-    """Capture packets using your existing PacketCapturer"""
+    """Capture packets into a new session, or append to sessionId's"""
     try:
         data = request.get_json()
         count = data.get('count', 10)
         use_real = data.get('realCapture', False)
+        session_id = data.get('sessionId')
         
-        # Use your EXISTING PacketCapturer
-        capturer = PacketCapturer(use_real_capture=use_real)
-        capturer.start_capture(count)
-        
-        # Convert to JSON-serializable format
-        serializable_packets = []
-        for packet in capturer.captured_packets:
-            serializable_packet = {
-                'number': packet.get('number'),
-                'timestamp': packet.get('timestamp'),
-                'protocol': packet.get('protocol'),
-                'summary': packet.get('summary'),
-                'length': packet.get('length'),
-                'src_ip': packet.get('src_ip'),
-                'dst_ip': packet.get('dst_ip'),
-                'real_packet': packet.get('real_packet', False)
-            }
-            serializable_packets.append(serializable_packet)
+        session = sessions.get(session_id) if session_id else sessions.create()
+        session.capture(count, use_real_capture=use_real)
         
         return jsonify({
             'success': True,
-            'packets': serializable_packets,
-            'total': len(serializable_packets),
+            'sessionId': session.id,
+            **first_page(session.packets, data),
+            'total': len(session),
             'mode': 'real' if use_real else 'simulation'
         })
         
+    except SessionNotFound:
+        raise
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+@app.route('/api/capture/stream', methods=['GET'])
+def stream_capture_events():
+    """
+    Capture as server-sent events: packets (throttled), statistics and
+    issues per second while it runs, then done. Query parameters: count
+    (default: until timeout), timeout (default 30s), realCapture,
+    interval (seconds between packet events), maxPackets (per event) and
+    sessionId (append to an existing session)
+    """
+    args = request.args
+    try:
+        count = int(args['count']) if args.get('count') else None
+        timeout = float(args.get('timeout', 30))
+        interval = max(0.05, float(args.get('interval', 0.25)))
+        max_packets = max(1, int(args.get('maxPackets', 500)))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    use_real = args.get('realCapture', 'false').lower() in ('1', 'true', 'yes')
+    session = sessions.get(args['sessionId']) if args.get('sessionId') else sessions.create()
+    capturer = PacketCapturer(use_real_capture=use_real)
+    
+    def events():
+        yield format_sse('session', session.info())
+        for event, data in stream_capture(capturer, count, timeout, interval, max_packets, session=session,
+                                          serialize=serialize_packet):
+            yield format_sse(event, data)
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/capture/jobs', methods=['POST'])
+def start_capture_job():
+    """Start a capture in the background; poll its status with the returned jobId"""
+    data = request.get_json(silent=True) or {}
+    session_id = data.get('sessionId')
+    session = sessions.get(session_id) if session_id else sessions.create()
+    job = jobs.submit(count=data.get('count', 10), timeout=data.get('timeout', 30),
+                      use_real_capture=data.get('realCapture', False), session=session)
+    return jsonify({'success': True, **job.info()}), 202
+
+@app.route('/api/capture/jobs', methods=['GET'])
+def list_capture_jobs():
+    """Status of the running, queued and recently finished capture jobs"""
+    return jsonify({'success': True, 'jobs': [job.info() for job in jobs.jobs()]})
+
+@app.route('/api/capture/jobs/<job_id>', methods=['GET'])
+def capture_job_status(job_id):
+    """State of a capture job and how many packets it has captured so far"""
+    return jsonify({'success': True, **jobs.get(job_id).info()})
+
+@app.route('/api/capture/jobs/<job_id>/stop', methods=['POST'])
+def stop_capture_job(job_id):
+    """Stop a capture job; packets captured until then are kept"""
+    job = jobs.cancel(job_id)
+    job.wait(5)
+    return jsonify({'success': True, **job.info()})
+
+@app.route('/api/capture/jobs/<job_id>/result', methods=['GET'])
+def capture_job_result(job_id):
+    """The packets of a finished capture job (see page_query for the parameters)"""
+    job = jobs.get(job_id)
+    if not job.done:
+        return jsonify({'success': False, 'error': f'Capture job is {job.state}', **job.info()}), 409
+    if job.state == 'failed':
+        return jsonify({'success': False, **job.info()}), 500
+    try:
+        page = query_packets(job.packets, **page_query(request.args))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, **job.info(), **page,
+                    'mode': 'real' if job.capturer.use_real_capture else 'simulation'})
+
 @app.route('/api/analyze', methods=['POST'])
 def analyze_packets():
     """Analyze packets using your existing ProtocolParser"""
     try:
         data = request.get_json()
-        packets = data.get('packets', [])
-        
-        # Use your EXISTING ProtocolParser
-        parser = ProtocolParser()
-        analyses = [parser.parse_packet(packet) for packet in packets]
+        if data.get('sessionId'):
+            analyses = sessions.get(data['sessionId']).analyses()
+        else:
+            parser = ProtocolParser()
+            analyses = [parser.parse_packet(packet) for packet in data.get('packets', [])]
         
         return jsonify({
             'success': True,
             'analyses': analyses
         })
         
+    except SessionNotFound:
+        raise
     except Exception as e:
         return jsonify({
             'success': False,
@@ -93,17 +240,18 @@ def get_statistics():
     """Generate statistics using your existing TrafficStatistics"""
     try:
         data = request.get_json()
-        packets = data.get('packets', [])
-        
-        # Use your EXISTING TrafficStatistics
-        stats = TrafficStatistics()
-        statistics = stats.generate_statistics(packets)
+        if data.get('sessionId'):
+            statistics = sessions.get(data['sessionId']).statistics()
+        else:
+            statistics = TrafficStatistics().generate_statistics(data.get('packets', []))
         
         return jsonify({
             'success': True,
             'statistics': statistics
         })
         
+    except SessionNotFound:
+        raise
     except Exception as e:
         return jsonify({
             'success': False,
@@ -115,17 +263,18 @@ def detect_issues():
     """Detect issues using your existing IssueDetector"""
     try:
         data = request.get_json()
-        packets = data.get('packets', [])
-        
-        # Use your EXISTING IssueDetector
-        detector = IssueDetector()
-        issues = detector.analyze_packets(packets)
+        if data.get('sessionId'):
+            issues = sessions.get(data['sessionId']).issues()
+        else:
+            issues = IssueDetector().analyze_packets(data.get('packets', []))
         
         return jsonify({
             'success': True,
             'issues': issues
         })
         
+    except SessionNotFound:
+        raise
     except Exception as e:
         return jsonify({
             'success': False,
@@ -135,14 +284,16 @@ def detect_issues():
        
 @app.route('/api/storage/save', methods=['POST'])
 def save_capture():
-    """Save capture to file"""
+    """Save capture to file (a session's packets, or the packets posted)"""
     try:
         data = request.get_json()
-        packets = data.get('packets', [])
+        if data.get('sessionId'):
+            packets = sessions.get(data['sessionId']).packets
+        else:
+            packets = data.get('packets', [])
         filename = data.get('filename')
         format = data.get('format', 'json')
         
-        storage = PacketStorage()
         success = storage.save_capture(packets, filename, format)
         
         return jsonify({
@@ -150,6 +301,8 @@ def save_capture():
             'message': 'Capture saved successfully' if success else 'Failed to save capture'
         })
         
+    except SessionNotFound:
+        raise
     except Exception as e:
         return jsonify({
             'success': False,
@@ -158,15 +311,34 @@ def save_capture():
 
 @app.route('/api/storage/load/<filename>', methods=['GET'])
 def load_capture_file(filename):
-    """Load capture from file"""
+    """
+    Load capture from file into a new session
+    With host, port and/or protocol only the matching packets are loaded
+    (read through the capture's secondary index when it has one).
+    """
+    args = request.args
+    try:
+        port = int(args['port']) if args.get('port') else None
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     try:
-        storage = PacketStorage()
-        packets = storage.load_capture(filename)
+        filters = {'ip': args.get('host') or None,
+                   'port': port,
+                   'protocol': args.get('protocol') or None}
+        filtered = any(value is not None for value in filters.values())
+        if filtered:
+            packets = storage.find_packets(filename, **filters)
+        else:
+            packets = storage.load_capture(filename)
         
-        if packets:
+        # A filter may rightly match nothing; an empty unfiltered load is a failure
+        if packets or (filtered and packets is not None):
+            session = sessions.create(packets)
             return jsonify({
                 'success': True,
-                'packets': packets
+                'sessionId': session.id,
+                **first_page(session.packets, request.args),
+                'total': len(session)
             })
         else:
             return jsonify({
@@ -180,18 +352,59 @@ def load_capture_file(filename):
             'error': str(e)
         }), 500
 
+@app.route('/api/storage/packets/<filename>', methods=['GET'])
+def query_capture_file(filename):
+    """One page of a saved capture, read through its index (see page_query for the parameters)"""
+    try:
+        page = storage.query_capture(filename, **page_query(request.args))
+        if page is None:
+            return jsonify({
+                'success': False,
+                'error': 'Capture file not found'
+            }), 404
+        return jsonify({'success': True, **page})
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/storage/captures', methods=['GET'])
 def list_saved_captures():
-    """List all saved captures"""
+    """
+    List saved captures from the capture catalog, newest first
+    Optional filters: host (an IP address the capture contains), startTime/
+    endTime (epoch seconds the capture overlaps) and protocol; refresh=true
+    rescans the storage directory for captures written elsewhere.
+    """
     try:
-        storage = PacketStorage()
-        captures = storage.list_captures()
+        args = request.args
+        host = args.get('host') or None
+        start_time = float(args['startTime']) if args.get('startTime') else None
+        end_time = float(args['endTime']) if args.get('endTime') else None
+        protocol = args.get('protocol') or None
+        refresh = args.get('refresh', '').lower() in ('1', 'true', 'yes')
+        if host or protocol or start_time is not None or end_time is not None:
+            captures = storage.find_captures(host, start_time, end_time, protocol, refresh=refresh)
+        else:
+            captures = storage.list_captures(refresh=refresh)
         
         return jsonify({
             'success': True,
             'captures': captures
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -202,7 +415,6 @@ def list_saved_captures():
 def delete_capture_file(filename):
     """Delete a capture file"""
     try:
-        storage = PacketStorage()
         success = storage.delete_capture(filename)
         
         return jsonify({
@@ -215,7 +427,58 @@ def delete_capture_file(filename):
             'success': False,
             'error': str(e)
         }), 500
-        
+
+
+@app.route('/api/sessions', methods=['POST'])
+def create_session():
+    """Start a session, optionally with posted packets"""
+    data = request.get_json(silent=True) or {}
+    session = sessions.create(data.get('packets'))
+    return jsonify({'success': True, **session.info()})
+
+@app.route('/api/sessions/<session_id>', methods=['GET'])
+def session_info(session_id):
+    """Packet count and version of a session"""
+    return jsonify({'success': True, **sessions.get(session_id).info()})
+
+@app.route('/api/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    """Drop a session and its packets"""
+    sessions.delete(session_id)
+    return jsonify({'success': True, 'message': 'Session deleted'})
+
+@app.route('/api/sessions/<session_id>/packets', methods=['POST'])
+def append_packets(session_id):
+    """Append posted packets to a session (cached results are recomputed)"""
+    session = sessions.get(session_id)
+    added = session.append((request.get_json() or {}).get('packets', []))
+    return jsonify({'success': True, 'added': added, **session.info()})
+
+@app.route('/api/sessions/<session_id>/packets', methods=['GET'])
+def session_packets(session_id):
+    """One page of a session's packets (see page_query for the parameters)"""
+    session = sessions.get(session_id)
+    try:
+        page = query_packets(session.packets, **page_query(request.args))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, **page})
+
+@app.route('/api/sessions/<session_id>/statistics', methods=['GET'])
+def session_statistics(session_id):
+    """Statistics of a session's packets (cached)"""
+    return jsonify({'success': True, 'statistics': sessions.get(session_id).statistics()})
+
+@app.route('/api/sessions/<session_id>/issues', methods=['GET'])
+def session_issues(session_id):
+    """Issues detected in a session's packets (cached)"""
+    return jsonify({'success': True, 'issues': sessions.get(session_id).issues()})
+
+@app.route('/api/sessions/<session_id>/analyses', methods=['GET'])
+def session_analyses(session_id):
+    """Per-packet protocol analyses of a session (cached)"""
+    return jsonify({'success': True, 'analyses': sessions.get(session_id).analyses()})
+
 
 if __name__ == '__main__':
     print("🚀 Packet Analyzer API Starting...")
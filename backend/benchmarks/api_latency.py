@@ -0,0 +1,96 @@
+# benchmarks/api_latency.py
+import sys
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.capture_index import query_packets
+from src.capturer import PacketCapturer
+from src.jobs import CaptureJobManager
+from src.sessions import SessionManager
+
+FIELDS = ['number', 'timestamp', 'protocol', 'summary', 'length', 'src_ip', 'dst_ip']
+
+
+def load_test(mode, captures, duration, workers, rate, capture_seconds):
+    """
+    Latency of page/statistics requests while `captures` capture requests
+    are served, by a server with `workers` request threads (like a
+    threaded WSGI server). mode 'sync' captures inside the request, as
+    /api/capture does; 'jobs' submits them like /api/capture/jobs.
+    """
+    sessions = SessionManager()
+    browsed = sessions.create()
+    browsed.capture(10_000)
+    browsed.statistics()
+    jobs = CaptureJobManager(max_concurrent=max(captures, 1), max_queued=0)
+    server = ThreadPoolExecutor(max_workers=workers)
+
+    def capture_request():
+        session = sessions.create()
+        if mode == 'sync':
+            session.capture(None, capturer=TimedCapturer(capture_seconds))
+        else:
+            jobs.submit(count=None, timeout=capture_seconds, session=session)
+
+    def page_request():
+        session = sessions.get(browsed.id)
+        query_packets(session.packets, offset=5_000, limit=100, fields=FIELDS)
+        session.statistics()
+
+    latencies = []
+    lock = threading.Lock()
+
+    def timed_request(sent):
+        page_request()
+        with lock:
+            latencies.append(time.perf_counter() - sent)
+
+    for _ in range(captures):
+        server.submit(capture_request)
+    started = time.perf_counter()
+    futures = []
+    while time.perf_counter() - started < duration:
+        futures.append(server.submit(timed_request, time.perf_counter()))
+        time.sleep(1 / rate)
+    for future in futures:
+        future.result()
+    server.shutdown(wait=True)
+    jobs.shutdown()
+    latencies.sort()
+    return {
+        'p50': statistics.median(latencies) * 1e3,
+        'p99': latencies[int(len(latencies) * 0.99)] * 1e3,
+        'max': latencies[-1] * 1e3,
+    }
+
+
+class TimedCapturer(PacketCapturer):
+    """Simulated capture that runs for a fixed time, like a real sniff until its timeout"""
+
+    def __init__(self, seconds):
+        super().__init__()
+        self.seconds = seconds
+
+    def start_capture(self, count=5, timeout=30):
+        super().start_capture(None, self.seconds)
+
+
+def api_latency_benchmark(capture_seconds=2, workers=4, rate=50):
+    print(f"🧪 API LATENCY UNDER CAPTURES ({workers} request workers, {rate} page+statistics requests/s, "
+          f"{capture_seconds}s captures)")
+    print(f"   {'captures':>8}  {'in request p50/p99/max':>26}  {'as jobs p50/p99/max':>26}")
+    for captures in (0, 1, 2, 4, 8):
+        row = []
+        for mode in ('sync', 'jobs'):
+            result = load_test(mode, captures, capture_seconds, workers, rate, capture_seconds)
+            row.append(f"{result['p50']:7.1f} {result['p99']:7.1f} {result['max']:7.1f} ms")
+        print(f"   {captures:>8}  {row[0]:>26}  {row[1]:>26}")
+
+
+if __name__ == "__main__":
+    api_latency_benchmark(float(sys.argv[1]) if len(sys.argv) > 1 else 2)
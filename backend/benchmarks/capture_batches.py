@@ -0,0 +1,74 @@
+# benchmarks/capture_batches.py
+import sys
+import os
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from benchmarks.synthetic import write_synthetic_pcap
+from src.capturer import PacketCapturer
+from src.expression import CompiledFilter, parse_filter
+from src.pcap import PcapReader
+from src.statistics import StreamingStatistics
+
+EXPRESSION = 'tcp and dst port 443'
+
+
+def per_packet(path, work=True):
+    """Baseline: statistics and filter called once per packet from the capture listener"""
+    capturer = PacketCapturer(backpressure='block')
+    capturer.show_packets = False
+    stats = StreamingStatistics()
+    wanted = CompiledFilter(parse_filter(EXPRESSION))
+    matched = []
+
+    def listener(packet):
+        stats.update(packet)
+        if wanted(packet):
+            matched.append(packet)
+
+    if work:
+        capturer.add_listener(listener)
+    capturer._retain = False
+    started = time.perf_counter()
+    with PcapReader(path) as reader:
+        capturer.replay(reader)
+    return time.perf_counter() - started, None, len(matched)
+
+
+def batched(path, batch_size):
+    """iter_batches(): statistics and filter run once per batch"""
+    capturer = PacketCapturer(backpressure='block')
+    capturer.show_packets = False
+    stats = StreamingStatistics()
+    wanted = CompiledFilter(parse_filter(EXPRESSION))
+    matched = batches = 0
+    started = time.perf_counter()
+    with PcapReader(path) as reader:
+        for batch in capturer.iter_batches(batch_size, max_latency_ms=100, frames=reader):
+            stats.update_batch(batch)
+            matched += len(wanted.filter(batch))
+            batches += 1
+    return time.perf_counter() - started, batches, matched
+
+
+def capture_batches_benchmark(count=200_000):
+    print(f"🧪 BATCHED CAPTURE API ({count:,} replayed frames; statistics + '{EXPRESSION}' per batch)")
+    path = os.path.join(tempfile.mkdtemp(), 'replay.pcap')
+    write_synthetic_pcap(path, count)
+
+    decode, _, _ = per_packet(path, work=False)
+    print(f"   replay + decode only: {decode / count * 1e6:.2f} µs/packet")
+    elapsed, _, matched = per_packet(path)
+    print(f"   per-packet listener: {elapsed / count * 1e6:.2f} µs/packet, "
+          f"{(elapsed - decode) / count * 1e6:.2f} µs above decoding ({matched:,} matched)")
+    for batch_size in (1, 64, 1024, 8192):
+        elapsed, batches, matched = batched(path, batch_size)
+        print(f"   batch size {batch_size:>5}: {elapsed / count * 1e6:.2f} µs/packet, "
+              f"{(elapsed - decode) / count * 1e6:.2f} µs above decoding ({batches:,} batches, {matched:,} matched)")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    capture_batches_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,82 @@
+# benchmarks/capture_catalog.py
+import gc
+import sys
+import os
+import shutil
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from benchmarks.synthetic import synthetic_packets
+from src.catalog import CATALOG_FILE
+from src.reporting import configure
+from src.storage import CAPTURE_EXTENSIONS, PacketStorage
+from src.table import PacketTable, encode_address
+
+
+def timed(function, repeat=1):
+    gc.collect()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def capture_catalog_benchmark(captures=100, count=10_000):
+    print(f"🧪 CAPTURE CATALOG ({captures} captures x {count:,} packets: listing and host search)")
+    configure('quiet')
+    storage_dir = tempfile.mkdtemp()
+    storage = PacketStorage(storage_dir)
+    for i in range(captures):
+        packets = list(synthetic_packets(count, seed=i + 1))
+        # One host only this capture talks to
+        for packet in packets[::100]:
+            packet['src_ip'] = f"192.168.{i // 256}.{i % 256}"
+        storage.save_capture(PacketTable(packets), f"capture_{i:04d}", 'pkb')
+    target = f"192.168.0.{captures // 2}"
+    window = storage.catalog.find()[captures // 2]
+
+    def scan_directory():
+        return [(filename, os.path.getsize(os.path.join(storage_dir, filename)),
+                 os.path.getmtime(os.path.join(storage_dir, filename)))
+                for filename in os.listdir(storage_dir) if filename.endswith(CAPTURE_EXTENSIONS)]
+
+    def contains(packets, name):
+        family, high, low = packets.column(name)
+        key = encode_address(target)
+        return bool(((family == key[0]) & (high == key[1]) & (low == key[2]) & packets.present(name)).any())
+
+    def search_files():
+        matches = []
+        for filename in os.listdir(storage_dir):
+            if filename.endswith(CAPTURE_EXTENSIONS):
+                packets = storage.load_capture(filename)
+                if any(contains(packets, name) for name in ('src_ip', 'dst_ip')):
+                    matches.append(filename)
+        return matches
+
+    def catalog_from_scratch():
+        os.remove(os.path.join(storage_dir, CATALOG_FILE))
+        return PacketStorage(storage_dir).sync_catalog()
+
+    steps = [
+        ('listdir + stat (before)', scan_directory, 20),
+        ('list_captures (catalog)', storage.list_captures, 20),
+        (f'host {target}: load every file', search_files, 1),
+        (f'host {target}: catalog', lambda: storage.find_captures(host=target), 20),
+        ('host + time range: catalog', lambda: storage.find_captures(
+            host=target, start_time=window['first_time'], end_time=window['last_time']), 20),
+        ('protocol ICMP: catalog', lambda: storage.find_captures(protocol='ICMP'), 20),
+        ('cataloging from scratch (once)', catalog_from_scratch, 1),
+    ]
+    print(f"   {'step':<36} {'time':>10} {'results':>8}")
+    for label, function, repeat in steps:
+        elapsed, result = timed(function, repeat)
+        results = result if isinstance(result, int) else len(result)
+        print(f"   {label:<36} {elapsed * 1000:8.2f}ms {results:>8}")
+    shutil.rmtree(storage_dir)
+
+
+if __name__ == "__main__":
+    capture_catalog_benchmark(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,57 @@
+# benchmarks/capture_formats.py
+import gc
+import sys
+import os
+import shutil
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from benchmarks.synthetic import synthetic_packets
+from src.storage import PacketStorage
+from src.table import PacketTable
+
+FIELDS = ['number', 'timestamp', 'protocol', 'src_ip', 'dst_ip', 'length']
+
+
+def timed(function):
+    gc.collect()
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+def capture_formats_benchmark(count=1_000_000):
+    print(f"🧪 CAPTURE FORMATS ({count:,} packets: save, load, 1% time-range page)")
+    packets = list(synthetic_packets(count))
+    table = PacketTable(packets)
+    first, last = packets[0]['timestamp'], packets[-1]['timestamp']
+    window = {'start_time': first + (last - first) * 0.5, 'end_time': first + (last - first) * 0.51,
+              'limit': 100, 'fields': FIELDS}
+    storage_dir = tempfile.mkdtemp()
+    storage = PacketStorage(storage_dir)
+
+    runs = [
+        ('json', 'json', packets),
+        ('pkl', 'pkl', packets),
+        ('pkb', 'pkb (from dicts)', packets),
+        ('pkb', 'pkb (from PacketTable)', table),
+    ]
+    print(f"   {'format':<23} {'size':>8} {'save':>8} {'load':>8} {'range page':>11}")
+    for format, label, source in runs:
+        filename = f"capture.{format}"
+        save, _ = timed(lambda: storage.save_capture(source, filename, format))
+        size = os.path.getsize(os.path.join(storage_dir, filename))
+        load, loaded = timed(lambda: storage.load_capture(filename))
+        assert len(loaded) == count
+        del loaded
+        seek, page = timed(lambda: storage.query_capture(filename, **window))
+        print(f"   {label:<23} {size / 2**20:6.0f}MB {save:7.2f}s {load:7.2f}s {seek * 1e3:8.1f} ms"
+              f"  ({page['total']:,} matches)")
+        os.remove(os.path.join(storage_dir, filename))
+    shutil.rmtree(storage_dir)
+
+
+if __name__ == "__main__":
+    capture_formats_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
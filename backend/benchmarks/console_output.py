@@ -0,0 +1,55 @@
+# benchmarks/console_output.py
+import io
+import subprocess
+import sys
+import os
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from benchmarks.synthetic import write_synthetic_pcap
+from src.capturer import PacketCapturer
+from src.pcap import PcapReader
+from src.reporting import ProgressReporter, configure
+
+
+def replay(path, level, progress):
+    """Replay a pcap with the analyzer's messages going to a line-buffered pipe, like a terminal"""
+    reader_process = subprocess.Popen(['cat'], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL)
+    console = io.TextIOWrapper(reader_process.stdin, encoding='utf-8', line_buffering=True)
+    configure(level, console)
+    capturer = PacketCapturer(backpressure='block')
+    if progress:
+        capturer.progress = ProgressReporter()
+    started = time.perf_counter()
+    with PcapReader(path) as reader:
+        capturer.replay(reader)
+    elapsed = time.perf_counter() - started
+    configure('quiet', sys.stdout)
+    console.close()
+    reader_process.wait()
+    return elapsed, capturer.packet_count
+
+
+def console_output_benchmark(count=100_000):
+    print(f"🧪 CONSOLE OUTPUT COST ({count:,} replayed frames, messages to a line-buffered pipe)")
+    path = os.path.join(tempfile.mkdtemp(), 'replay.pcap')
+    write_synthetic_pcap(path, count)
+
+    runs = [
+        ('verbose', False, 'one line per packet'),
+        ('info', True, 'progress once per second'),
+        ('quiet', False, 'quiet'),
+    ]
+    baseline = None
+    for level, progress, label in runs:
+        elapsed, packets = min(replay(path, level, progress) for _ in range(2))
+        baseline = baseline or elapsed
+        print(f"   {label:<25}: {packets / elapsed / 1e3:.0f}k packets/s, {elapsed / packets * 1e6:.1f} µs/packet"
+              f" ({baseline / elapsed:.1f}x the per-packet lines)")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    console_output_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,53 @@
+# benchmarks/continuous_memory.py
+import sys
+import os
+import random
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from benchmarks.synthetic import build_frame
+from src.capturer import PacketCapturer
+
+
+def virtual_link(hours, pps, flows=2000, seed=1):
+    """(timestamp, wire length, linktype, frame) records of `hours` of traffic at pps, in virtual time"""
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(flows):
+        src_ip = f"10.0.{rng.randrange(8)}.{rng.randrange(1, 255)}"
+        dst_ip = f"10.1.{rng.randrange(8)}.{rng.randrange(1, 255)}"
+        frame = build_frame(src_ip, dst_ip, rng.choice(('TCP', 'UDP')), rng.randint(1024, 65535), 443,
+                            seq=rng.randrange(1 << 32))
+        pool.append(frame)
+    start = 1_700_000_000
+    for i in range(int(hours * 3600 * pps)):
+        frame = pool[rng.randrange(flows)]
+        yield start + i / pps, len(frame), 1, frame
+
+
+def continuous_memory_benchmark(hours=6, pps=50):
+    print(f"🧪 CONTINUOUS CAPTURE MEMORY ({hours}h of virtual traffic at {pps} pps, windows 1s/10s/60s)")
+    capturer = PacketCapturer(backpressure='block')
+    capturer.show_packets = False
+    samples = []
+
+    def on_window(result):
+        if result['window'] == 60 and result['start'] % 3600 == 3600 - 60:
+            current, peak = tracemalloc.get_traced_memory()
+            samples.append((len(samples) + 1, current, peak))
+            print(f"   hour {len(samples)}: {current / 2**20:.1f} MB held, peak {peak / 2**20:.1f} MB")
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    analyzer = capturer.capture_continuous((1, 10, 60), on_window=on_window, frames=virtual_link(hours, pps))
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+    print(f"   {analyzer.windows_emitted:,} windows from {int(hours * 3600 * pps):,} packets in {elapsed:.1f}s"
+          f" ({elapsed / (hours * 3600) * 1e3:.1f} ms per second of traffic, under tracemalloc);"
+          f" held memory first hour {samples[0][1] / 2**20:.1f} MB, last hour {samples[-1][1] / 2**20:.1f} MB")
+
+
+if __name__ == "__main__":
+    continuous_memory_benchmark(*(float(arg) for arg in sys.argv[1:3]))
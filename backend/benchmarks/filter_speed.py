@@ -0,0 +1,74 @@
+# benchmarks/filter_speed.py
+import sys
+import os
+import re
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.expression import compile_filter
+from src.filters import PacketFilter
+from src.table import PacketTable
+from benchmarks.synthetic import synthetic_packets
+
+
+def closure_filters(packets, protocol, src_ip, dst_port):
+    """The previous apply_filters: one closure per filter, one pass per filter"""
+    def ip_filter(packet_info):
+        packet_src_ip = packet_info.get('src_ip')
+        if not packet_src_ip:
+            ips_in_summary = re.findall(r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}', packet_info.get('summary', ''))
+            packet_src_ip = ips_in_summary[0] if ips_in_summary else None
+        return packet_src_ip == src_ip
+
+    def port_filter(packet_info):
+        summary = packet_info.get('summary', '').lower()
+        return f":{dst_port}" in summary.split('>')[-1]
+
+    filtered_packets = [p for p in packets if p.get('protocol', '').upper() in [protocol]]
+    for filter_func in (ip_filter, port_filter):
+        filtered_packets = [p for p in filtered_packets if filter_func(p)]
+    return filtered_packets
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def filter_speed_benchmark(count=1_000_000):
+    print(f"🧪 PACKET FILTER BENCHMARK ({count:,} packets)")
+    packets = list(synthetic_packets(count))
+    table = PacketTable(packets)
+    # Filter on the flow of the first packet so something matches
+    first = packets[0]
+    protocol, src_ip, dst_port = first['protocol'], first['src_ip'], first['dst_port']
+    expression = f"proto {protocol} and src host {src_ip} and dst port {dst_port}"
+
+    baseline, baseline_time = timed(closure_filters, packets, protocol, src_ip, dst_port)
+    print(f"   closures, one pass per filter:    {baseline_time:7.3f}s  ({len(baseline)} matches)")
+
+    compiled, compile_time = timed(compile_filter, expression)
+    print(f"   parse + optimize + compile:       {compile_time * 1000:7.3f}ms -> {compiled}")
+
+    matched, predicate_time = timed(compiled.filter, packets)
+    print(f"   compiled single pass, list:       {predicate_time:7.3f}s  ({len(matched)} matches)")
+
+    matched_table, mask_time = timed(compiled.filter, table)
+    print(f"   vectorized mask, PacketTable:     {mask_time:7.3f}s  ({len(matched_table)} matches)")
+
+    wide = compile_filter("(tcp or udp) and (src 10.0.0.0/16 or dst port 443) and len > 1000")
+    wide_matches, wide_time = timed(wide.filter, table)
+    print(f"   {wide}:")
+    print(f"     vectorized mask, PacketTable:   {wide_time:7.3f}s  ({len(wide_matches)} matches)")
+
+    packet_filter = PacketFilter()
+    packet_filter.add_expression(expression)
+    _, apply_time = timed(packet_filter.apply_filters, table)
+    print(f"   PacketFilter.apply_filters(table): {apply_time:7.3f}s")
+    print(f"   Speedup: {baseline_time / predicate_time:.1f}x (predicate), {baseline_time / mask_time:.1f}x (mask)")
+
+
+if __name__ == "__main__":
+    filter_speed_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
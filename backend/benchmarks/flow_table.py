@@ -0,0 +1,82 @@
+# benchmarks/flow_table.py
+import sys
+import os
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.flows import FlowTable
+from src.table import PacketTable
+
+# Per-packet update() runs are slow - time them on a sample
+PER_PACKET_SAMPLE = 200_000
+
+
+def synthetic_flow_table(flows, packets_per_flow=2, seed=1):
+    """
+    PacketTable where `flows` distinct TCP/UDP flows are all open at once
+    Every flow sends packets_per_flow packets, alternating direction, and
+    all traffic fits in 10 seconds so nothing expires.
+    """
+    rng = np.random.default_rng(seed)
+    count = flows * packets_per_flow
+    flow = np.tile(np.arange(flows, dtype=np.uint64), packets_per_flow)
+    reply = np.repeat(np.arange(packets_per_flow) % 2 == 1, flows)
+    client = np.uint64(0x0A000000) + flow // np.uint64(50)     # 10.x.x.x, 50 flows per client
+    server = np.uint64(0xC0A80000) + flow % np.uint64(251)     # 192.168.0.x
+    client_port = np.uint64(1024) + flow % np.uint64(50) * np.uint64(1000)
+    server_port = np.where(flow % np.uint64(3) == 0, 53, 443).astype(np.uint64)
+    protocol = (flow % np.uint64(3) == 0).astype(np.int64)      # 0 = TCP, 1 = UDP
+    zeros = np.zeros(count, dtype=np.uint64)
+    families = np.full(count, 4, dtype=np.uint8)
+
+    table = PacketTable()
+    table.extend_columns(count, {
+        'number': np.arange(1, count + 1),
+        'timestamp': np.linspace(0.0, 10.0, count),
+        'length': rng.integers(60, 1500, count),
+        'src_ip': (families, zeros, np.where(reply, server, client)),
+        'dst_ip': (families, zeros, np.where(reply, client, server)),
+        'src_port': np.where(reply, server_port, client_port),
+        'dst_port': np.where(reply, client_port, server_port),
+        'l4_protocol': (protocol, ['TCP', 'UDP']),
+        'tcp_flags': np.where(reply, 0x12, 0x02),
+    }, present={'tcp_flags': protocol == 0})
+    return table
+
+
+def flow_table_benchmark(flows=1_000_000):
+    print(f"🧪 FLOW TABLE BENCHMARK ({flows:,} concurrent flows)")
+    table = synthetic_flow_table(flows)
+    count = len(table)
+
+    tracker = FlowTable(max_flows=flows)
+    started = time.perf_counter()
+    tracker.update_batch(table)
+    batch_time = time.perf_counter() - started
+    print(f"   update_batch: {count:,} packets in {batch_time:.2f}s ({count / batch_time / 1e6:.2f}M packets/s)")
+    print(f"   Active flows: {len(tracker):,}, evicted: {sum(tracker.evictions.values())}")
+    del tracker
+
+    sample = table.take(np.arange(min(count, PER_PACKET_SAMPLE)))
+    tracker = FlowTable(max_flows=flows)
+    started = time.perf_counter()
+    for packet in sample:
+        tracker.update(packet)
+    packet_time = time.perf_counter() - started
+    print(f"   update():     {len(sample):,} packets in {packet_time:.2f}s ({len(sample) / packet_time / 1e3:.0f}k packets/s)")
+    del tracker, sample
+
+    tracemalloc.start()
+    tracker = FlowTable(max_flows=flows)
+    tracker.update_batch(table)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"   Memory: {held / 1e6:.1f} MB ({held / flows:.0f} B/flow), nbytes() estimate {tracker.nbytes() / flows:.0f} B/flow")
+
+
+if __name__ == "__main__":
+    flow_table_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
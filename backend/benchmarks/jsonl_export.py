@@ -0,0 +1,66 @@
+# benchmarks/jsonl_export.py
+import gc
+import sys
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from benchmarks.synthetic import synthetic_packets
+from src.jsonl import JsonlWriter, iter_jsonl, read_jsonl
+from src.storage import PacketStorage
+from src.table import PacketTable
+
+
+def measure(function):
+    """(seconds, peak MB allocated while it ran) - timed and traced in separate runs"""
+    gc.collect()
+    started = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def jsonl_export_benchmark(count=200_000):
+    print(f"🧪 JSON vs JSON LINES ({count:,} packets; peak = Python memory allocated during the step)")
+    storage_dir = tempfile.mkdtemp()
+    storage = PacketStorage(storage_dir)
+    packets = PacketTable(synthetic_packets(count))
+
+    def stream_write(filename):
+        with JsonlWriter(os.path.join(storage_dir, filename)) as writer:
+            writer.write_many(packets)
+
+    def stream_read(filename):
+        for _ in iter_jsonl(os.path.join(storage_dir, filename)):
+            pass
+
+    steps = [
+        ('save_capture json', 'capture.json', lambda: storage.save_capture(packets, 'capture.json', 'json')),
+        ('write jsonl', 'capture.jsonl', lambda: stream_write('capture.jsonl')),
+        ('write jsonl.gz', 'capture.jsonl.gz', lambda: stream_write('capture.jsonl.gz')),
+        ('load_capture json', 'capture.json', lambda: storage.load_capture('capture.json')),
+        ('iter_jsonl (stream)', 'capture.jsonl', lambda: stream_read('capture.jsonl')),
+        ('iter_jsonl .gz (stream)', 'capture.jsonl.gz', lambda: stream_read('capture.jsonl.gz')),
+        ('read_jsonl to PacketTable', 'capture.jsonl.gz',
+         lambda: read_jsonl(os.path.join(storage_dir, 'capture.jsonl.gz'))),
+    ]
+    print(f"   {'step':<27} {'file':>8} {'time':>8} {'peak':>9}")
+    for label, filename, function in steps:
+        elapsed, peak = measure(function)
+        size = os.path.getsize(os.path.join(storage_dir, filename)) / 2**20
+        print(f"   {label:<27} {size:6.0f}MB {elapsed:7.2f}s {peak:7.0f}MB")
+    print(f"   (read_jsonl decodes on {os.cpu_count()} process(es) for files over 32 MB)")
+    shutil.rmtree(storage_dir)
+
+
+if __name__ == "__main__":
+    jsonl_export_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
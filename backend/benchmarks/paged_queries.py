@@ -0,0 +1,64 @@
+# benchmarks/paged_queries.py
+import sys
+import os
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from benchmarks.synthetic import write_synthetic_pcap
+from src.capture_index import CaptureIndex
+from src.pcap import PcapReader
+
+FIELDS = ['number', 'timestamp', 'protocol', 'src_ip', 'dst_ip', 'length']
+
+
+def timed(function, repeat=5):
+    """Best wall time of function() in seconds, and its last result"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def paged_queries_benchmark(count=1_000_000, page_size=100):
+    print(f"🧪 PAGED QUERIES ({count:,}-packet pcap, pages of {page_size})")
+    path = os.path.join(tempfile.mkdtemp(), 'capture.pcap')
+    write_synthetic_pcap(path, count)
+
+    started = time.perf_counter()
+    CaptureIndex.open(path)
+    print(f"   build index: {time.perf_counter() - started:.2f}s, "
+          f"{os.path.getsize(path + '.idx') / 1024:.0f} KB index for {os.path.getsize(path) / 2**20:.0f} MB of capture")
+    elapsed, index = timed(lambda: CaptureIndex.open(path))
+    print(f"   open saved index: {elapsed * 1e3:.2f} ms")
+
+    with PcapReader(path) as reader:
+        first = next(reader.records())[0]
+    span = index.max_times[-1] - first
+    queries = [
+        ('first page', {}),
+        ('middle page (offset)', {'offset': count // 2}),
+        ('last page (offset)', {'offset': count - page_size}),
+        ('number range', {'first_number': count // 3, 'last_number': count // 3 + 10_000}),
+        ('time range, 10% of the capture', {'start_time': first + span * 0.45, 'end_time': first + span * 0.55}),
+    ]
+    for label, query in queries:
+        elapsed, page = timed(lambda: CaptureIndex.open(path).query(limit=page_size, fields=FIELDS, **query))
+        print(f"   {label:<31}: {elapsed * 1e3:7.2f} ms ({page['total']:,} matches)")
+
+    def load_whole():
+        with PcapReader(path) as reader:
+            table = reader.read_table()
+        return [dict(table[i]) for i in range(count - page_size, count)]
+
+    elapsed, _ = timed(load_whole, repeat=1)
+    print(f"   last page by loading the whole capture: {elapsed * 1e3:7.0f} ms")
+    os.remove(path + '.idx')
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    paged_queries_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
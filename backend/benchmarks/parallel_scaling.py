@@ -0,0 +1,35 @@
+# benchmarks/parallel_scaling.py
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from benchmarks.tcp_analysis import synthetic_tcp_table
+from src.parallel import ParallelAnalyzer
+
+
+def parallel_scaling_benchmark(count=10_000_000, max_workers=None):
+    """Time statistics + issue detection + parsing of one capture on 1..max_workers processes"""
+    max_workers = max_workers or os.cpu_count() or 1
+    print(f"🧪 PARALLEL ANALYSIS SCALING ({count:,} packets, 1-{max_workers} workers)")
+    table, _ = synthetic_tcp_table(count, flows=100_000)
+
+    baseline = None
+    issues = None
+    for workers in range(1, max_workers + 1):
+        analyzer = ParallelAnalyzer(workers)
+        started = time.perf_counter()
+        results = analyzer.analyze(table)
+        elapsed = time.perf_counter() - started
+        baseline = baseline or elapsed
+        if issues is None:
+            issues = results['issues']
+        same = "same issues" if results['issues'] == issues else "DIFFERENT issues"
+        print(f"   {workers} worker(s): {elapsed:.2f}s ({count / elapsed / 1e3:.0f}k packets/s,"
+              f" speedup {baseline / elapsed:.2f}x, {same})")
+
+
+if __name__ == "__main__":
+    parallel_scaling_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000,
+                               int(sys.argv[2]) if len(sys.argv) > 2 else None)
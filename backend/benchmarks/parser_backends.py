@@ -0,0 +1,62 @@
+# benchmarks/parser_backends.py
+import sys
+import os
+import random
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.parser import ProtocolParser
+from benchmarks.synthetic import build_frame
+
+
+def synthetic_real_packets(count, seed=1):
+    """packet_info dicts carrying raw Ethernet frames, like real captures"""
+    rng = random.Random(seed)
+    frames = [
+        build_frame(f"10.0.0.{rng.randrange(1, 255)}", f"10.1.0.{rng.randrange(1, 255)}",
+                    rng.choice(('TCP', 'TCP', 'UDP')), rng.randint(1024, 65535), rng.choice((53, 80, 443)))
+        for _ in range(256)
+    ]
+    return [
+        {'number': i + 1, 'protocol': 'TCP', 'length': 60, 'real_packet': True, 'raw_packet': frames[i % 256]}
+        for i in range(count)
+    ]
+
+
+def parse_all(parser, packets):
+    started = time.perf_counter()
+    for packet in packets:
+        parser.parse_packet(packet)
+    return time.perf_counter() - started
+
+
+def parser_backends_benchmark(count=100_000):
+    print(f"🧪 PROTOCOL PARSER BENCHMARK ({count:,} packets)")
+    packets = synthetic_real_packets(count)
+    fast = ProtocolParser(backend='fast')
+
+    fast_time = parse_all(fast, packets)
+    print(f"   fast backend, raw bytes:      {fast_time:7.3f}s  {count / fast_time:10,.0f} packets/s")
+
+    try:
+        import scapy.all as scapy
+    except ImportError:
+        print("   scapy backend: skipped (Scapy not installed)")
+        return
+
+    scapy_count = min(count, 20_000)
+    scapy_parser = ProtocolParser(backend='scapy')
+    scapy_time = parse_all(scapy_parser, packets[:scapy_count])
+    print(f"   scapy backend, raw bytes:     {scapy_time:7.3f}s  {scapy_count / scapy_time:10,.0f} packets/s")
+
+    # Sniffed packets arrive already dissected by Scapy
+    dissected = [dict(packet, raw_packet=scapy.Ether(packet['raw_packet'])) for packet in packets[:scapy_count]]
+    fast_dissected = parse_all(fast, dissected)
+    scapy_dissected = parse_all(scapy_parser, dissected)
+    print(f"   fast backend, sniffed:        {fast_dissected:7.3f}s  {scapy_count / fast_dissected:10,.0f} packets/s")
+    print(f"   scapy backend, sniffed:       {scapy_dissected:7.3f}s  {scapy_count / scapy_dissected:10,.0f} packets/s")
+
+
+if __name__ == "__main__":
+    parser_backends_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,53 @@
+# benchmarks/pcap_reader.py
+import sys
+import os
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.pcap import PcapReader
+from benchmarks.synthetic import write_synthetic_pcap
+
+
+def rate(count, seconds):
+    return f"{seconds:7.2f}s  {count / seconds / 1e6:5.2f}M packets/s"
+
+
+def pcap_reader_benchmark(count=1_000_000):
+    print(f"🧪 PCAP READER BENCHMARK ({count:,} packets)")
+    path = os.path.join(tempfile.mkdtemp(), 'synthetic.pcap')
+    write_synthetic_pcap(path, count)
+    print(f"   File: {os.path.getsize(path) / 1e6:.1f} MB")
+
+    with PcapReader(path) as reader:
+        started = time.perf_counter()
+        records = sum(1 for _ in reader)
+        print(f"   records (memoryview slices): {rate(records, time.perf_counter() - started)}")
+
+        started = time.perf_counter()
+        decoded = sum(1 for _ in reader.iter_packets())
+        print(f"   decoded packet_info dicts:   {rate(decoded, time.perf_counter() - started)}")
+
+        started = time.perf_counter()
+        table = reader.read_table()
+        print(f"   decoded into PacketTable:    {rate(len(table), time.perf_counter() - started)}")
+        del table
+
+    try:
+        from scapy.utils import rdpcap
+    except ImportError:
+        print("   scapy.rdpcap: skipped (Scapy not installed)")
+    else:
+        scapy_count = min(count, 200_000)
+        scapy_path = os.path.join(os.path.dirname(path), 'scapy.pcap')
+        write_synthetic_pcap(scapy_path, scapy_count)
+        started = time.perf_counter()
+        packets = rdpcap(scapy_path)
+        print(f"   scapy.rdpcap ({scapy_count:,}):     {rate(len(packets), time.perf_counter() - started)}")
+
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    pcap_reader_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,88 @@
+# benchmarks/rolling_storage.py
+import gc
+import sys
+import os
+import shutil
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from benchmarks.synthetic import synthetic_packets
+from src.blockstore import BlockReader
+from src.reporting import configure
+from src.storage import PacketStorage
+
+BATCH = 1024   # Capturer batch size
+
+
+def timed(function):
+    gc.collect()
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+def rolling_storage_benchmark(count=2_000_000, hours=6):
+    print(f"🧪 ROLLING STORAGE ({count:,} packets over {hours}h of capture time, one-minute segments)")
+    configure('quiet')
+    storage_dir = tempfile.mkdtemp()
+    storage = PacketStorage(storage_dir)
+    step = hours * 3600 / count
+    packets = list(synthetic_packets(count))
+    start = packets[0]['timestamp']
+    for i, packet in enumerate(packets):
+        packet['timestamp'] = start + i * step
+    window = (start + hours * 3600 * 0.5, start + hours * 3600 * 0.5 + 300)   # Five minutes mid-capture
+
+    rolling = storage.open_rolling('rolling', maintenance_interval=None)
+
+    def write_batches():
+        for offset in range(0, count, BATCH):
+            rolling.write_many(packets[offset:offset + BATCH])
+        rolling.close()
+
+    elapsed, _ = timed(write_batches)
+    segments = rolling.segments()
+    print(f"   write: {count / elapsed:,.0f} packets/s in batches of {BATCH}, {len(segments)} segments, "
+          f"{sum(segment.size for segment in segments) / 2**20:.0f}MB")
+    elapsed, _ = timed(lambda: storage.save_capture(packets, 'single', 'pkb'))
+    print(f"   (one .pkb file: {count / elapsed:,.0f} packets/s, saved at the end)")
+
+    def single_file():
+        loaded = storage.load_capture('single.pkb')
+        return [packet for packet in loaded if window[0] <= packet['timestamp'] < window[1]]
+
+    def single_file_blocks():
+        with BlockReader(os.path.join(storage_dir, 'single.pkb')) as reader:
+            return reader.read_table(*window)
+
+    rows = [
+        ('one file: load, then filter', single_file, None),
+        ('one file: block index read', single_file_blocks, None),
+        ('rolling: read_table(5 min)', lambda: rolling.read_table(*window), len(rolling.segments(*window))),
+    ]
+    print(f"   {'5-minute range query':<30} {'time':>8} {'packets':>9} {'segments':>9}")
+    for label, function, opened in rows:
+        elapsed, found = timed(function)
+        print(f"   {label:<30} {elapsed * 1000:6.0f}ms {len(found):>9,} {opened if opened else '-':>9}")
+
+    rolling = storage.open_rolling('rolling', maintenance_interval=None, max_segment_bytes=8 << 20)
+    elapsed, merged = timed(rolling.compact)
+    segments = rolling.segments()
+    print(f"   compaction to 8MB segments: {elapsed:.1f}s, {merged} merges -> {len(segments)} segments")
+    elapsed, found = timed(lambda: rolling.read_table(*window))
+    print(f"   rolling after compaction     {elapsed * 1000:6.0f}ms {len(found):>9,} {len(rolling.segments(*window)):>9}")
+
+    # Crash mid-write: the newest segment loses its tail and index
+    newest = segments[-1].path
+    with open(newest, 'r+b') as f:
+        f.truncate(segments[-1].size // 2)
+    elapsed, rolling = timed(lambda: storage.open_rolling('rolling', maintenance_interval=None))
+    print(f"   recovery of a segment cut in half: {elapsed * 1000:.0f}ms, "
+          f"{len(rolling.read_table()):,} of {count:,} packets kept")
+    shutil.rmtree(storage_dir)
+
+
+if __name__ == "__main__":
+    rolling_storage_benchmark(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,96 @@
+# benchmarks/secondary_index.py
+import gc
+import itertools
+import random
+import sys
+import os
+import shutil
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from benchmarks.synthetic import synthetic_packets
+from src.blockstore import BlockWriter
+from src.reporting import configure
+from src.secondary_index import SecondaryIndex
+from src.storage import PacketStorage
+from src.table import PacketTable
+
+CHUNK = 1_000_000
+BURSTS = 20
+SCANNER = '172.16.0.99'
+
+
+def timed(function):
+    gc.collect()
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+def bursty_packets(count):
+    """Synthetic traffic plus a scanner sending 0.5% of the packets in 20 short bursts to port 4444"""
+    burst = max(1, count // 200 // BURSTS)
+    starts = sorted(random.Random(2).sample(range(0, count - burst, burst), BURSTS))
+    in_burst = {start + i for start in starts for i in range(burst)}
+    for packet in synthetic_packets(count):
+        if packet['number'] - 1 in in_burst:
+            packet.update(src_ip=SCANNER, src_port=4444, dst_port=4444, protocol='TCP')
+        yield packet
+
+
+def secondary_index_benchmark(count=10_000_000):
+    print(f"🧪 SECONDARY INDEXES ({count:,}-packet .pkb capture; selective filtered loads)")
+    configure('quiet')
+    storage_dir = tempfile.mkdtemp()
+    storage = PacketStorage(storage_dir)
+    path = os.path.join(storage_dir, 'capture.pkb')
+
+    # Written the way save_capture(..., 'pkb', index=True) does, a million packets at a time
+    write = index_time = 0.0
+    index = SecondaryIndex(path)
+    packets = bursty_packets(count)
+    with BlockWriter(path) as writer:
+        while True:
+            table = PacketTable(itertools.islice(packets, CHUNK))
+            if not len(table):
+                break
+            elapsed, _ = timed(lambda: writer.write_many(table))
+            write += elapsed
+            elapsed, _ = timed(lambda: index.add(table, index.count))
+            index_time += elapsed
+            del table
+    elapsed, _ = timed(index.save)
+    index_time += elapsed
+    size = os.path.getsize(path) / 2**20
+    index_size = os.path.getsize(index.index_path) / 2**20
+    print(f"   save: {write:.1f}s, {size:.0f}MB   index: +{index_time:.1f}s, +{index_size:.0f}MB")
+
+    queries = [
+        (f'host {SCANNER} (bursty)', {'ip': SCANNER}),
+        ('port 4444 and tcp', {'port': 4444, 'protocol': 'TCP'}),
+        ('host 10.0.3.7 (spread out)', {'ip': '10.0.3.7'}),
+        ('host 10.0.3.7 and port 53', {'ip': '10.0.3.7', 'port': 53}),
+    ]
+    indexed = {}
+    print(f"   {'query':<28} {'matches':>9} {'selectivity':>11} {'indexed':>9}")
+    for label, query in queries:
+        elapsed, found = timed(lambda: storage.find_packets('capture.pkb', **query))
+        indexed[label] = (elapsed, len(found))
+        print(f"   {label:<28} {len(found):>9,} {len(found) / count:>10.3%} {elapsed:8.2f}s")
+
+    # Without the index: load the whole capture, then PacketFilter over it
+    os.rename(index.index_path, index.index_path + '.off')
+    load, loaded = timed(lambda: storage.load_capture('capture.pkb'))
+    del loaded
+    print(f"   without the index: load_capture {load:.1f}s, then per query:")
+    for label, query in queries:
+        elapsed, found = timed(lambda: storage.find_packets('capture.pkb', **query))
+        assert len(found) == indexed[label][1]
+        print(f"   {label:<28} {elapsed:8.2f}s  ({elapsed / indexed[label][0]:.0f}x the indexed load)")
+    shutil.rmtree(storage_dir)
+
+
+if __name__ == "__main__":
+    secondary_index_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
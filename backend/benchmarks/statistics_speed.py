@@ -0,0 +1,57 @@
+# benchmarks/statistics_speed.py
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import src.statistics as statistics_module
+from src.statistics import TrafficStatistics
+from src.table import PacketTable
+from benchmarks.synthetic import synthetic_packets
+
+# Lists of dicts need ~500 B/packet - skip them above this size
+MAX_LIST_PACKETS = 2_000_000
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def statistics_speed_benchmark(sizes):
+    if statistics_module.np is None:
+        print("❌ NumPy is not installed - nothing to compare")
+        return
+
+    stats = TrafficStatistics()
+    numpy_module = statistics_module.np
+
+    for count in sizes:
+        print(f"\n🧪 TRAFFIC STATISTICS BENCHMARK ({count:,} packets)")
+        table = PacketTable(synthetic_packets(count))
+        vectorized, table_time = timed(stats.generate_statistics, table)
+        print(f"   vectorized, PacketTable:   {table_time:8.3f}s")
+
+        if count > MAX_LIST_PACKETS:
+            print("   (list-of-dicts runs skipped - too large for memory)")
+            continue
+
+        packets = table.to_dicts()
+        _, list_time = timed(stats.generate_statistics, packets)
+        print(f"   vectorized, list of dicts: {list_time:8.3f}s")
+
+        statistics_module.np = None
+        try:
+            python_result, python_time = timed(stats.generate_statistics, packets)
+        finally:
+            statistics_module.np = numpy_module
+        print(f"   pure Python passes:        {python_time:8.3f}s")
+        print(f"   Speedup: {python_time / table_time:.1f}x (table), {python_time / list_time:.1f}x (list)")
+        print(f"   Identical output: {python_result == vectorized}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000, 10_000_000]
+    statistics_speed_benchmark(sizes)
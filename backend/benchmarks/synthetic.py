@@ -0,0 +1,75 @@
+# benchmarks/synthetic.py
+import random
+import socket
+import struct
+import time
+
+from src.pcap import PcapWriter
+
+
+def synthetic_packets(count, flows=5000, seed=1):
+    """
+    Generate packet dicts shaped like the capturer output
+    Packets are spread over a fixed pool of flows, like real traffic
+    """
+    rng = random.Random(seed)
+    protocols = ['TCP', 'UDP', 'DNS', 'ICMP', 'HTTP']
+    hosts = [f"10.0.{i // 256}.{i % 256}" for i in range(2048)]
+    pool = []
+    for _ in range(flows):
+        protocol = rng.choice(protocols)
+        src_ip = rng.choice(hosts)
+        dst_ip = rng.choice(hosts)
+        src_port = rng.randint(1024, 65535)
+        dst_port = rng.choice((53, 80, 443, 8080))
+        summary = f"{protocol} {src_ip}:{src_port} > {dst_ip}:{dst_port}"
+        pool.append((protocol, src_ip, dst_ip, src_port, dst_port, summary))
+
+    start = time.time()
+    for i in range(count):
+        protocol, src_ip, dst_ip, src_port, dst_port, summary = pool[rng.randrange(flows)]
+        yield {
+            'number': i + 1,
+            'timestamp': start + i * 0.0001,
+            'length': rng.randint(60, 1500),
+            'protocol': protocol,
+            'src_ip': src_ip,
+            'dst_ip': dst_ip,
+            'src_port': src_port,
+            'dst_port': dst_port,
+            'summary': summary,
+            'real_packet': False
+        }
+
+
+def build_frame(src_ip, dst_ip, protocol='TCP', src_port=1234, dst_port=80,
+                flags=0x18, seq=1, ack=1, window=65535, payload=b''):
+    """Build an Ethernet/IPv4 frame with a TCP or UDP header"""
+    src = socket.inet_aton(src_ip)
+    dst = socket.inet_aton(dst_ip)
+    if protocol == 'TCP':
+        transport = struct.pack('!HHIIBBHHH', src_port, dst_port, seq, ack, 5 << 4, flags, window, 0, 0)
+        proto = 6
+    else:
+        transport = struct.pack('!HHHH', src_port, dst_port, 8 + len(payload), 0)
+        proto = 17
+    ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(transport) + len(payload), 0, 0, 64, proto, 0, src, dst)
+    ether = b'\x02\x00\x00\x00\x00\x01\x02\x00\x00\x00\x00\x02\x08\x00'
+    return ether + ip + transport + payload
+
+
+def write_synthetic_pcap(path, count, flows=5000, seed=1):
+    """Write a pcap file of synthetic TCP/UDP traffic"""
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(flows):
+        protocol = rng.choice(('TCP', 'TCP', 'UDP'))
+        src_ip = f"10.0.{rng.randrange(8)}.{rng.randrange(1, 255)}"
+        dst_ip = f"10.1.{rng.randrange(8)}.{rng.randrange(1, 255)}"
+        pool.append((src_ip, dst_ip, protocol, rng.randint(1024, 65535), rng.choice((53, 80, 443))))
+    frames = [build_frame(*flow, payload=bytes(rng.randrange(0, 1400))) for flow in pool]
+
+    start = time.time()
+    with PcapWriter(path) as writer:
+        for i in range(count):
+            writer.write(frames[rng.randrange(flows)], start + i * 0.00001)
@@ -0,0 +1,38 @@
+# benchmarks/table_memory.py
+import sys
+import os
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.table import PacketTable
+from benchmarks.synthetic import synthetic_packets
+
+
+def measure(build):
+    """Return (bytes held, seconds) for the structure built by build()"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    packets = build()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del packets
+    return current, elapsed
+
+
+def table_memory_benchmark(count=1_000_000):
+    print(f"🧪 PACKET STORE MEMORY BENCHMARK ({count:,} packets)")
+
+    list_bytes, list_time = measure(lambda: list(synthetic_packets(count)))
+    table_bytes, table_time = measure(lambda: PacketTable(synthetic_packets(count)))
+
+    print(f"   list of dicts: {list_bytes / 1e6:8.1f} MB ({list_bytes / count:6.1f} B/packet) built in {list_time:.1f}s")
+    print(f"   PacketTable:   {table_bytes / 1e6:8.1f} MB ({table_bytes / count:6.1f} B/packet) built in {table_time:.1f}s")
+    print(f"   Saving: {(1 - table_bytes / list_bytes) * 100:.1f}%")
+    print("   (summary strings are unique per packet and dominate what is left)")
+
+
+if __name__ == "__main__":
+    table_memory_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
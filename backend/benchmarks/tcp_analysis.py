@@ -0,0 +1,77 @@
+# benchmarks/tcp_analysis.py
+import sys
+import os
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.table import PacketTable
+from src.tcp_analysis import TcpAnalyzer
+
+
+def synthetic_tcp_table(count, flows=10_000, retransmit_rate=0.01, seed=1):
+    """
+    PacketTable of interleaved one-way TCP transfers (1000-byte segments)
+    A retransmit_rate share of segments repeats the flow's previous segment.
+    """
+    rng = np.random.default_rng(seed)
+    flow = rng.integers(0, flows, count).astype(np.uint64)
+    # Segment number within its flow: running count of the flow's packets
+    order = np.argsort(flow, kind='stable')
+    sorted_flow = flow[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(sorted_flow)) + 1]
+    run = np.arange(count) - np.repeat(starts, np.diff(np.r_[starts, count]))
+    number = np.empty(count, dtype=np.int64)
+    number[order] = run
+    retransmit = (rng.random(count) < retransmit_rate) & (number > 0)
+    number = np.where(retransmit, number - 1, number)
+    seq = (1 + number * 1000) % 2 ** 32
+
+    families = np.full(count, 4, dtype=np.uint8)
+    zeros = np.zeros(count, dtype=np.uint64)
+    table = PacketTable()
+    table.extend_columns(count, {
+        'number': np.arange(1, count + 1),
+        'timestamp': np.linspace(0.0, 30.0, count),
+        'length': np.full(count, 1054),
+        'src_ip': (families, zeros, np.uint64(0x0A000000) + flow // np.uint64(100)),
+        'dst_ip': (families, zeros, np.uint64(0xC0A80000) + flow % np.uint64(100)),
+        'src_port': (1024 + flow % np.uint64(100)).astype(np.int64),
+        'dst_port': np.full(count, 443),
+        'l4_protocol': (np.zeros(count, dtype=np.int64), ['TCP']),
+        'tcp_flags': np.full(count, 0x18),
+        'tcp_seq': seq,
+        'tcp_ack': np.ones(count, dtype=np.int64),
+        'tcp_len': np.full(count, 1000),
+        'tcp_window': np.full(count, 65535),
+    })
+    return table, int(retransmit.sum())
+
+
+def tcp_analysis_benchmark(count=1_000_000):
+    print(f"🧪 TCP SEQUENCE ANALYSIS BENCHMARK ({count:,} packets)")
+    table, injected = synthetic_tcp_table(count)
+
+    analyzer = TcpAnalyzer()
+    started = time.perf_counter()
+    summary = analyzer.analyze(table)
+    elapsed = time.perf_counter() - started
+    print(f"   analyze(): {elapsed:.2f}s ({count / elapsed / 1e3:.0f}k packets/s)")
+    print(f"   Retransmissions found: {summary['retransmission'] + summary['spurious_retransmission']:,}"
+          f" (injected {injected:,})")
+    del analyzer
+
+    tracemalloc.start()
+    analyzer = TcpAnalyzer()
+    analyzer.analyze(table)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"   State held: {held / 1e6:.1f} MB for {len(analyzer.flows):,} flows"
+          f" ({held / len(analyzer.flows):.0f} B/flow, independent of packet count)")
+
+
+if __name__ == "__main__":
+    tcp_analysis_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -9,6 +9,10 @@ setup(
     install_requires=[
         "scapy>=2.4.5",
     ],
+    extras_require={
+        "fast": ["numpy>=1.20"],
+        "zstd": ["zstandard>=0.18"],
+    },
     entry_points={
         'console_scripts': [
             'packetanalyzer=cli:main',
@@ -0,0 +1,187 @@
+# src/afpacket.py
+"""
+Linux AF_PACKET capture through a PACKET_MMAP TPACKET_V3 ring
+
+The kernel writes frames straight into a ring of blocks shared with this
+process (mmap). A block is handed over when it fills up or after
+block_timeout_ms; we walk its frames as memoryview slices of the mapping -
+no recvfrom() per packet, no Scapy objects - and give the block back.
+"""
+import mmap
+import select
+import socket
+import struct
+import sys
+
+from src import bpf
+from src.decoder import LINKTYPE_ETHERNET, LINKTYPE_RAW
+
+SOL_PACKET = 263
+PACKET_RX_RING = 5
+PACKET_STATISTICS = 6
+PACKET_VERSION = 10
+TPACKET_V3 = 2
+ETH_P_ALL = 0x0003
+
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1
+PACKET_OUTGOING = 4
+
+ARPHRD_ETHER = 1
+ARPHRD_LOOPBACK = 772
+ARPHRD_NONE = 0xFFFE
+
+# Link type of a frame by the device's hardware type (loopback frames have an Ethernet header)
+HARDWARE_LINKTYPES = {ARPHRD_ETHER: LINKTYPE_ETHERNET, ARPHRD_LOOPBACK: LINKTYPE_ETHERNET, ARPHRD_NONE: LINKTYPE_RAW}
+LINKTYPE_UNKNOWN = 0xFFFF
+
+# struct tpacket_req3
+_REQUEST = struct.Struct('IIIIIII')
+# struct tpacket_block_desc: version, offset_to_priv, then tpacket_hdr_v1
+# (block_status, num_pkts, offset_to_first_pkt, blk_len, ...)
+_BLOCK = struct.Struct('IIIIII')
+# struct tpacket3_hdr: tp_next_offset, tp_sec, tp_nsec, tp_snaplen, tp_len, tp_status, tp_mac, tp_net
+_FRAME = struct.Struct('IIIIIIHH')
+# struct sockaddr_ll after the aligned tpacket3_hdr: family, protocol, ifindex, hatype, pkttype
+_LINK_ADDRESS = struct.Struct('HHiHB')
+_LINK_ADDRESS_OFFSET = 48
+_STATISTICS = struct.Struct('III')  # struct tpacket_stats_v3
+
+
+def available():
+    """True when this platform has AF_PACKET sockets (Linux)"""
+    return sys.platform.startswith('linux') and hasattr(socket, 'AF_PACKET')
+
+
+def block_frames(view, block, skip_outgoing=False):
+    """
+    Yield (timestamp, wire length, linktype, frame memoryview) for every
+    frame of the TPACKET_V3 block starting at offset `block` of view
+    skip_outgoing drops the copy of sent packets (on loopback every packet
+    shows up twice: once going out, once coming in).
+    """
+    _, _, _, count, offset, _ = _BLOCK.unpack_from(view, block)
+    position = block + offset
+    for _ in range(count):
+        next_offset, seconds, nanoseconds, captured, wire_length, _, mac, _ = _FRAME.unpack_from(view, position)
+        _, _, _, hatype, pkttype = _LINK_ADDRESS.unpack_from(view, position + _LINK_ADDRESS_OFFSET)
+        if not (skip_outgoing and pkttype == PACKET_OUTGOING):
+            start = position + mac
+            yield (seconds + nanoseconds * 1e-9, wire_length, HARDWARE_LINKTYPES.get(hatype, LINKTYPE_UNKNOWN),
+                   view[start:start + captured])
+        position += next_offset
+
+
+def interface_packets(interface=None):
+    """
+    Packets received plus sent on an interface (every interface for None),
+    from /proc/net/dev - what an unfiltered capture socket would see
+    """
+    total = 0
+    with open('/proc/net/dev') as counters:
+        for line in counters.readlines()[2:]:
+            name, _, fields = line.partition(':')
+            if interface is None or name.strip() == interface:
+                fields = fields.split()
+                total += int(fields[1]) + int(fields[9])
+    return total
+
+
+class AfPacketSocket:
+    """
+    Raw capture socket with a TPACKET_V3 block ring
+
+    interface=None captures on every interface. The ring holds
+    block_count blocks of block_size bytes; frames bigger than frame_size
+    are truncated (the wire length is still reported). Needs root or
+    CAP_NET_RAW.
+
+    bpf_program (see src/bpf.py) is attached as a socket filter, so the
+    kernel discards frames it rejects before they reach the ring.
+    """
+
+    def __init__(self, interface=None, block_size=1 << 20, block_count=64, frame_size=2048, block_timeout_ms=50,
+                 bpf_program=None):
+        if not available():
+            raise OSError("AF_PACKET capture is only available on Linux")
+        self.interface = interface
+        self.block_size = block_size
+        self.block_count = block_count
+        self.packets = 0
+        self.drops = 0
+        self.filtered = bpf_program is not None
+        self._next_block = 0
+        self._sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+        try:
+            if bpf_program is not None:
+                bpf.attach_filter(self._sock, bpf_program)
+                self._interface_start = interface_packets(interface)
+            self._sock.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V3)
+            self._sock.setsockopt(SOL_PACKET, PACKET_RX_RING, _REQUEST.pack(
+                block_size, block_count, frame_size, block_size // frame_size * block_count, block_timeout_ms, 0, 0))
+            self._mmap = mmap.mmap(self._sock.fileno(), block_size * block_count,
+                                   mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+            if interface:
+                self._sock.bind((interface, ETH_P_ALL))
+            self._skip_outgoing = interface == 'lo'
+        except OSError:
+            self._sock.close()
+            raise
+        self._view = memoryview(self._mmap)
+        self._poll = select.poll()
+        self._poll.register(self._sock.fileno(), select.POLLIN | select.POLLERR)
+
+    def fileno(self):
+        return self._sock.fileno()
+
+    def read(self, timeout=0.1):
+        """
+        Yield the frames of every block the kernel has filled, oldest block
+        first, waiting up to timeout seconds for the first block
+        Each block goes back to the kernel once its frames were consumed (or
+        the generator is closed), so use (or copy) every frame before asking
+        for the next one. Under sustained traffic this never runs dry: stop
+        iterating to get control back.
+        """
+        if not self._ready(self._next_block):
+            self._poll.poll(int(timeout * 1000))
+        while self._ready(self._next_block):
+            block = self._next_block * self.block_size
+            try:
+                yield from block_frames(self._view, block, self._skip_outgoing)
+            finally:
+                struct.pack_into('I', self._view, block + 8, TP_STATUS_KERNEL)
+                self._next_block = (self._next_block + 1) % self.block_count
+
+    def _ready(self, index):
+        return struct.unpack_from('I', self._view, index * self.block_size + 8)[0] & TP_STATUS_USER
+
+    def statistics(self):
+        """
+        Kernel counters since the socket opened: {'packets': passed the
+        filter, 'drops': lost for lack of ring space}, plus 'filtered':
+        rejected by the BPF program, when one is attached
+        """
+        packets, drops, _ = _STATISTICS.unpack(self._sock.getsockopt(SOL_PACKET, PACKET_STATISTICS, _STATISTICS.size))
+        # Reading the counters resets them in the kernel
+        self.packets += packets
+        self.drops += drops
+        stats = {'packets': self.packets, 'drops': self.drops}
+        if self.filtered:
+            # The socket does not count what its filter rejects: compare with the interface counters
+            seen = interface_packets(self.interface) - self._interface_start
+            stats['filtered'] = max(0, seen - self.packets)
+        return stats
+
+    def close(self):
+        if self._sock.fileno() < 0:
+            return
+        self._view.release()
+        self._mmap.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,489 @@
+# src/blockstore.py
+"""
+Native capture format: compressed blocks of packets with a footer index
+
+A .pkb file is
+  file header   magic, format version, block size
+  blocks        each a fixed header (packet count, payload size, time
+                span, protocol bitmap, bytes, CRC) and a zlib payload
+                holding block_size packets column by column
+  index         one entry per block (offset plus the header fields),
+                capture metadata as JSON and a trailer pointing at it
+
+Readers load the index from the end of the file and then decode only
+the blocks a query needs. Appending writes new blocks over the old index
+and a new index after them, so earlier blocks are never rewritten. When
+the trailer is missing or damaged (a writer died mid-append) the blocks
+are found again by walking their headers, up to the last complete one.
+"""
+import array
+import json
+import os
+import struct
+import zlib
+from collections import namedtuple
+from datetime import datetime
+
+from src.capture_index import Pager, _project
+from src.reporting import get_logger
+from src.table import ADDRESS, SCHEMA, STRING, TEXT, PacketTable
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional - columns are decoded into plain arrays without it
+    np = None
+
+log = get_logger('blockstore')
+
+EXTENSION = '.pkb'
+FORMAT_VERSION = 1
+DEFAULT_BLOCK_SIZE = 4096
+
+_FILE_HEADER = struct.Struct('<4sHxxI')        # magic, version, block size
+_BLOCK_HEADER = struct.Struct('<4sIIddQQI')    # magic, packets, payload size, min/max time, protocols, bytes, crc32
+_INDEX_ENTRY = struct.Struct('<QIIddQQ')       # offset, packets, payload size, min/max time, protocols, bytes
+_TRAILER = struct.Struct('<QIII4s')            # index offset, blocks, metadata size, crc32, magic
+_FILE_MAGIC = b'PKB\x01'
+_BLOCK_MAGIC = b'BLK\x01'
+_INDEX_MAGIC = b'PKBI'
+
+# Records stored outside the columns that are never written (live Scapy objects)
+_UNSAVED = ('raw_packet',)
+
+BlockInfo = namedtuple('BlockInfo', 'offset count size min_time max_time protocols bytes')
+
+
+def protocol_bits(protocols):
+    """Bitmap of protocol names: one of 64 bits per name, chosen by hash (collisions only cost a wasted read)"""
+    bits = 0
+    for protocol in protocols:
+        bits |= 1 << (zlib.crc32(protocol.encode('utf-8')) & 63)
+    return bits
+
+
+def _rows(mask):
+    """Indices of the true entries of a mask"""
+    if np is not None:
+        return np.flatnonzero(mask)
+    return [index for index, present in enumerate(mask) if present]
+
+
+def _used_strings(table, name, rows):
+    """Distinct values of an interned column on the given rows"""
+    codes = table.column(name)
+    strings = table.strings(name)
+    if np is not None:
+        return [strings[code] for code in np.unique(codes[rows])]
+    return sorted({strings[codes[row]] for row in rows})
+
+
+def _encode_block(table):
+    """Serialize a PacketTable column by column (JSON header, then the raw arrays)"""
+    count = len(table)
+    masks = np.zeros(count, dtype=np.uint64) if np is not None else array.array('Q', [0]) * count
+    header = {'fields': [], 'strings': {}, 'text': {}, 'extras': {}, 'protocols': []}
+    sections = []
+    for bit, (name, kind, typecode) in enumerate(SCHEMA):
+        present = table.present(name)
+        rows = _rows(present)
+        if not len(rows):
+            continue
+        if np is not None:
+            masks[present] |= np.uint64(1 << bit)
+        else:
+            for row in rows:
+                masks[row] |= 1 << bit
+        header['fields'].append(name)
+        if kind == TEXT:
+            header['text'][name] = table.column(name)
+        elif kind == ADDRESS:
+            sections.extend(table.column(name))
+        else:
+            sections.append(table.column(name))
+            if kind == STRING:
+                header['strings'][name] = table.strings(name)
+        if name == 'protocol':
+            header['protocols'] = _used_strings(table, name, rows)
+    for name in table.extra_names():
+        if name not in _UNSAVED and table.extras(name):
+            header['extras'][name] = sorted(table.extras(name).items())
+    encoded = json.dumps(header, default=str, ensure_ascii=False).encode('utf-8')
+    return b''.join([struct.pack('<I', len(encoded)), encoded, masks.tobytes()]
+                    + [section.tobytes() for section in sections])
+
+
+def _decode_block(data, count, table):
+    """Append the packets of a decompressed block payload to table"""
+    (length,) = struct.unpack_from('<I', data)
+    header = json.loads(data[4:4 + length])
+    position = 4 + length
+
+    def section(typecode):
+        nonlocal position
+        size = array.array(typecode).itemsize * count
+        if np is not None:
+            values = np.frombuffer(data, dtype=typecode, count=count, offset=position)
+        else:
+            values = array.array(typecode)
+            values.frombytes(data[position:position + size])
+        position += size
+        return values
+
+    base = len(table)
+    masks = section('Q')
+    fields = set(header['fields'])
+    values = {}
+    present = {}
+    for bit, (name, kind, typecode) in enumerate(SCHEMA):
+        if name not in fields:
+            continue
+        if kind == TEXT:
+            values[name] = header['text'][name]
+        elif kind == ADDRESS:
+            values[name] = (section('B'), section('Q'), section('Q'))
+        elif kind == STRING:
+            values[name] = (section(typecode), header['strings'][name])
+        else:
+            values[name] = section(typecode)
+        if np is not None:
+            present[name] = (masks & np.uint64(1 << bit)) != 0
+        else:
+            present[name] = [bool(mask & (1 << bit)) for mask in masks]
+    table.extend_columns(count, values, present)
+    for name, items in header['extras'].items():
+        for index, value in items:
+            table[base + index][name] = value
+    return header
+
+
+class BlockWriter:
+    """
+    Write packets to a .pkb file, block_size packets per block
+
+    Opening an existing file appends to it (through `reader`, a
+    BlockReader of it the writer takes over, when the caller has one open).
+    Packets are buffered until a block is full; close() writes the last
+    (partial) block and the index.
+    """
+
+    def __init__(self, path, block_size=DEFAULT_BLOCK_SIZE, level=1, reader=None):
+        self.path = path
+        self.level = level
+        self._pending = PacketTable()
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with reader or BlockReader(path) as reader:
+                self.block_size = reader.block_size
+                self.blocks = list(reader.blocks)
+                self.metadata = reader.metadata
+                data_end = reader.data_end
+            self._file = open(path, 'r+b')
+            self._file.seek(data_end)
+            self._file.truncate()
+        else:
+            self.block_size = block_size
+            self.blocks = []
+            self.metadata = {'version': FORMAT_VERSION, 'capture_date': datetime.now().isoformat(), 'protocols': []}
+            self._file = open(path, 'wb')
+            self._file.write(_FILE_HEADER.pack(_FILE_MAGIC, FORMAT_VERSION, block_size))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def size(self):
+        """Bytes written to the file so far (buffered packets not included)"""
+        return self._file.tell()
+
+    def write(self, packet):
+        """Add one packet dict (or PacketRow)"""
+        self._pending.append(packet)
+        if len(self._pending) >= self.block_size:
+            self._write_block(self._pending)
+            self._pending = PacketTable()
+
+    def write_many(self, packets):
+        """Add many packets; a PacketTable is cut into blocks without going through dicts"""
+        if not isinstance(packets, PacketTable) or np is None:
+            for packet in packets:
+                self.write(packet)
+            return
+        start = 0
+        if self._pending:
+            # Top up the partial block left by the previous batch first
+            start = min(len(packets), self.block_size - len(self._pending))
+            self._pending.extend_table(packets.take(np.arange(start)))
+            if len(self._pending) < self.block_size:
+                return
+            self._write_block(self._pending)
+            self._pending = PacketTable()
+        for start in range(start, len(packets), self.block_size):
+            block = packets.take(np.arange(start, min(start + self.block_size, len(packets))))
+            if len(block) < self.block_size:
+                self._pending = block
+            else:
+                self._write_block(block)
+
+    def _write_block(self, table):
+        count = len(table)
+        present = table.present('timestamp')
+        rows = _rows(present)
+        if len(rows):
+            timestamps = table.column('timestamp')
+            times = timestamps[rows] if np is not None else [timestamps[row] for row in rows]
+            min_time, max_time = float(min(times)), float(max(times))
+        else:
+            min_time, max_time = float('inf'), float('-inf')
+        lengths = table.column('length')
+        length_rows = _rows(table.present('length'))
+        total_bytes = int(lengths[length_rows].sum()) if np is not None else sum(lengths[row] for row in length_rows)
+        protocol_rows = _rows(table.present('protocol'))
+        protocols = _used_strings(table, 'protocol', protocol_rows) if len(protocol_rows) else []
+
+        payload = zlib.compress(_encode_block(table), self.level)
+        offset = self._file.tell()
+        block = BlockInfo(offset, count, len(payload), min_time, max_time, protocol_bits(protocols), total_bytes)
+        self._file.write(_BLOCK_HEADER.pack(_BLOCK_MAGIC, count, len(payload), min_time, max_time,
+                                            block.protocols, total_bytes, zlib.crc32(payload)))
+        self._file.write(payload)
+        self.blocks.append(block)
+        known = self.metadata['protocols']
+        known.extend(protocol for protocol in protocols if protocol not in known)
+
+    def flush(self):
+        """
+        Write the buffered packets as a (short) block and push the file to
+        disk, so a crash loses nothing written so far; the index is still
+        only written by close()
+        """
+        if self._pending:
+            self._write_block(self._pending)
+            self._pending = PacketTable()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        """Write the last block and the index"""
+        if self._file is None:
+            return
+        if self._pending:
+            self._write_block(self._pending)
+            self._pending = PacketTable()
+        index_offset = self._file.tell()
+        index = b''.join(_INDEX_ENTRY.pack(*block) for block in self.blocks)
+        metadata = json.dumps(self.metadata).encode('utf-8')
+        self._file.write(index)
+        self._file.write(metadata)
+        self._file.write(_TRAILER.pack(index_offset, len(self.blocks), len(metadata),
+                                       zlib.crc32(index + metadata), _INDEX_MAGIC))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+
+
+class BlockReader:
+    """
+    Random access to the blocks of a .pkb file
+
+    blocks lists a BlockInfo per block; read_table() and iter_packets()
+    decode only the blocks whose time span and protocols can match, and
+    query() pages through the capture like CaptureIndex.query().
+    recovered is True when the index had to be rebuilt from the blocks.
+    A file still being written is read by passing its writer's blocks
+    (after BlockWriter.flush()) in place of the index.
+    """
+
+    def __init__(self, path, blocks=None):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            magic, version, self.block_size = _FILE_HEADER.unpack(self._file.read(_FILE_HEADER.size))
+        except struct.error:
+            magic = version = None
+        if magic != _FILE_MAGIC or version != FORMAT_VERSION:
+            self._file.close()
+            raise ValueError(f"Not a packet block file (version {FORMAT_VERSION}): {path}")
+        self.recovered = False
+        if blocks is not None:
+            self.blocks = list(blocks)
+            self.metadata = {'version': FORMAT_VERSION, 'protocols': []}
+            self.data_end = None
+        elif not self._read_index():
+            self._recover()
+            self.recovered = True
+        self.starts = [0]
+        for block in self.blocks:
+            self.starts.append(self.starts[-1] + block.count)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def __len__(self):
+        return self.starts[-1]
+
+    @property
+    def total_bytes(self):
+        return sum(block.bytes for block in self.blocks)
+
+    def _read_index(self):
+        """Load the footer index; False when it is missing or damaged"""
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _FILE_HEADER.size + _TRAILER.size:
+            return False
+        self._file.seek(size - _TRAILER.size)
+        index_offset, count, metadata_size, crc, magic = _TRAILER.unpack(self._file.read(_TRAILER.size))
+        index_size = count * _INDEX_ENTRY.size
+        if magic != _INDEX_MAGIC or index_offset + index_size + metadata_size + _TRAILER.size != size:
+            return False
+        self._file.seek(index_offset)
+        data = self._file.read(index_size + metadata_size)
+        if zlib.crc32(data) != crc:
+            return False
+        self.blocks = [BlockInfo(*_INDEX_ENTRY.unpack_from(data, i * _INDEX_ENTRY.size)) for i in range(count)]
+        self.metadata = json.loads(data[index_size:])
+        self.data_end = index_offset
+        return True
+
+    def _recover(self):
+        """Rebuild the index by walking the block headers, stopping at the first incomplete block"""
+        self.blocks = []
+        self.metadata = {'version': FORMAT_VERSION, 'protocols': []}
+        position = _FILE_HEADER.size
+        self._file.seek(position)
+        while True:
+            header = self._file.read(_BLOCK_HEADER.size)
+            if len(header) < _BLOCK_HEADER.size:
+                break
+            magic, count, payload_size, min_time, max_time, protocols, total_bytes, crc = _BLOCK_HEADER.unpack(header)
+            if magic != _BLOCK_MAGIC:
+                break
+            payload = self._file.read(payload_size)
+            if len(payload) < payload_size or zlib.crc32(payload) != crc:
+                break
+            self.blocks.append(BlockInfo(position, count, payload_size, min_time, max_time, protocols, total_bytes))
+            block_protocols = _decode_block(zlib.decompress(payload), count, PacketTable())['protocols']
+            known = self.metadata['protocols']
+            known.extend(protocol for protocol in block_protocols if protocol not in known)
+            position += _BLOCK_HEADER.size + payload_size
+        self.data_end = position
+        log.warning(f"⚠️  {os.path.basename(self.path)}: index missing or damaged, "
+                    f"recovered {len(self.blocks)} complete blocks")
+
+    def _payload(self, block):
+        info = self.blocks[block]
+        self._file.seek(info.offset + _BLOCK_HEADER.size)
+        return zlib.decompress(self._file.read(info.size))
+
+    def read_block(self, block, table=None):
+        """Decode one block, appending to table (a new PacketTable by default)"""
+        table = table if table is not None else PacketTable()
+        _decode_block(self._payload(block), self.blocks[block].count, table)
+        return table
+
+    def select(self, start_time=None, end_time=None, protocols=None):
+        """Blocks that may hold packets with start_time <= timestamp < end_time of the given protocols"""
+        bits = protocol_bits(protocols) if protocols else None
+        return [i for i, block in enumerate(self.blocks)
+                if (start_time is None or block.max_time >= start_time)
+                and (end_time is None or block.min_time < end_time)
+                and (bits is None or block.protocols & bits)]
+
+    def read_table(self, start_time=None, end_time=None, protocols=None):
+        """Decode the matching packets into one PacketTable, reading only blocks that can hold them"""
+        table = PacketTable()
+        for block in self.select(start_time, end_time, protocols):
+            self.read_block(block, table)
+        if start_time is None and end_time is None and not protocols:
+            return table
+        keep = _matching(table, start_time, end_time, protocols)
+        return table if len(keep) == len(table) else table.take(keep)
+
+    def read_rows(self, rows):
+        """Decode the packets at the given sorted positions, reading only the blocks that hold them (NumPy only)"""
+        table = PacketTable()
+        rows = np.asarray(rows, dtype=np.int64)
+        blocks = np.searchsorted(self.starts, rows, side='right') - 1
+        cuts = np.flatnonzero(np.diff(blocks)) + 1
+        for wanted in np.split(rows, cuts) if len(rows) else []:
+            block = int(blocks[np.searchsorted(rows, wanted[0])])
+            decoded = self.read_block(block)
+            local = wanted - self.starts[block]
+            table.extend_table(decoded if len(local) == len(decoded) else decoded.take(local))
+        return table
+
+    def iter_packets(self, start_time=None, end_time=None, protocols=None):
+        """Yield the matching packets block by block - memory stays at one block"""
+        for block in self.select(start_time, end_time, protocols):
+            table = self.read_block(block)
+            for index in _matching(table, start_time, end_time, protocols):
+                yield table[int(index)]
+
+    def query(self, offset=0, limit=None, cursor=None, start_time=None, end_time=None,
+              first_number=None, last_number=None, fields=None):
+        """
+        One page of packets matching the ranges
+
+        Same arguments and result as query_packets(). Blocks whose time
+        span misses the range are not read; blocks entirely inside it are
+        counted from the index; only blocks on its edges are decoded to
+        count their matches, plus the blocks the page comes from.
+        """
+        pager = Pager(offset, limit, cursor)
+        low = max(0, (first_number or 1) - 1)
+        high = min(len(self), last_number if last_number is not None else len(self))
+        timed = start_time is not None or end_time is not None
+        for block in self.select(start_time, end_time):
+            base = self.starts[block]
+            first, last = max(base, low), min(self.starts[block + 1], high)
+            if first >= last:
+                continue
+            info = self.blocks[block]
+            table = None
+            if not timed or ((start_time is None or info.min_time >= start_time)
+                             and (end_time is None or info.max_time < end_time)):
+                # Every packet of the block matches: counted from the index alone
+                wanted = pager.take(range(first, last))
+            else:
+                table = self.read_block(block)
+                wanted = pager.take([base + int(index) for index in _matching(table, start_time, end_time)
+                                     if first <= base + index < last])
+            if not len(wanted):
+                continue
+            if table is None:
+                table = self.read_block(block)
+            for index in wanted:
+                packet = table[index - base].copy()
+                packet['number'] = index + 1
+                pager.add(index, _project(packet, fields))
+        return pager.result()
+
+
+def _matching(table, start_time=None, end_time=None, protocols=None):
+    """Row indices of table with start_time <= timestamp < end_time and one of the protocols"""
+    if np is not None:
+        mask = np.ones(len(table), dtype=bool)
+        if start_time is not None or end_time is not None:
+            timestamps = table.column('timestamp')
+            mask &= table.present('timestamp')
+            if start_time is not None:
+                mask &= timestamps >= start_time
+            if end_time is not None:
+                mask &= timestamps < end_time
+        if protocols:
+            names = table.strings('protocol')
+            wanted = np.array([name in protocols for name in names] or [False], dtype=bool)
+            mask &= table.present('protocol') & wanted[table.column('protocol')]
+        return np.flatnonzero(mask)
+    return [index for index, packet in enumerate(table)
+            if (start_time is None or (packet.get('timestamp') is not None and packet['timestamp'] >= start_time))
+            and (end_time is None or (packet.get('timestamp') is not None and packet['timestamp'] < end_time))
+            and (not protocols or packet.get('protocol') in protocols)]
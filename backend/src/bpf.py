@@ -0,0 +1,344 @@
+# src/bpf.py
+"""
+Filter expressions compiled to classic BPF for the kernel
+
+The tree of a filter expression (see src/expression.py) becomes a
+socket filter program that runs on every frame before it is copied to
+user space. The program is a superset of the expression: wherever a
+primitive cannot be decided from fixed header offsets (VLAN tags, IPv6
+extension headers, protocols known only by name such as 'dns', non-Ethernet
+devices) it lets the frame through, and the exact filter still runs on the
+decoded packet. So the kernel never drops a packet the filter would keep.
+"""
+import ctypes
+import socket
+import struct
+
+from src.decoder import IPV6_EXTENSION_HEADERS
+from src.expression import optimize, parse_filter
+
+# Instruction classes, sizes, modes and operations (linux/filter.h)
+BPF_LD, BPF_LDX, BPF_ALU, BPF_JMP, BPF_RET = 0x00, 0x01, 0x04, 0x05, 0x06
+BPF_W, BPF_H, BPF_B = 0x00, 0x08, 0x10
+BPF_ABS, BPF_IND, BPF_LEN, BPF_MSH = 0x20, 0x40, 0x80, 0xA0
+BPF_AND = 0x50
+BPF_JA, BPF_JEQ, BPF_JGT, BPF_JGE = 0x00, 0x10, 0x20, 0x30
+BPF_K = 0x00
+
+SO_ATTACH_FILTER = 26
+SO_DETACH_FILTER = 27
+SKF_AD_HATYPE = 28
+SKF_AD_OFF = -0x1000
+BPF_MAXINSNS = 4096
+ACCEPT_BYTES = 0x40000  # Return value: keep (up to) this many bytes of the frame
+
+ARPHRD_ETHER = 1
+ARPHRD_LOOPBACK = 772
+
+ETHERTYPE_IP, ETHERTYPE_ARP, ETHERTYPE_IPV6 = 0x0800, 0x0806, 0x86DD
+VLAN_ETHERTYPES = (0x8100, 0x88A8, 0x9100)
+
+# Protocol names the decoder gives -> (IPv4 protocol numbers, IPv6 next headers, whole ethertypes)
+_PROTOCOL_MATCHES = {
+    'TCP': ((6,), (6,), ()),
+    'UDP': ((17,), (17,), ()),
+    'ICMP': ((1,), (), ()),
+    'ICMPV6': ((), (58,), ()),
+    'IP': ((), (), (ETHERTYPE_IP,)),
+    'IPV6': ((), (), (ETHERTYPE_IPV6,)),
+    'ARP': ((), (), (ETHERTYPE_ARP,)),
+}
+
+_SOCK_FILTER = struct.Struct('HBBI')
+
+
+class BpfCompileError(ValueError):
+    """Raised when a filter does not fit in a kernel BPF program"""
+
+
+class _Assembler:
+    """Emits instructions with symbolic jump targets and resolves them"""
+
+    def __init__(self):
+        self.code = []   # [op, jt, jf, k] with jt/jf as labels (None = fall through)
+        self.labels = {}
+        self._next_label = 0
+
+    def label(self):
+        self._next_label += 1
+        return self._next_label
+
+    def place(self, label):
+        self.labels[label] = len(self.code)
+
+    def emit(self, op, k=0, jt=None, jf=None):
+        self.code.append([op, jt, jf, k & 0xFFFFFFFF])
+
+    def jump(self, label):
+        self.emit(BPF_JMP | BPF_JA, jt=label)
+
+    def compare(self, op, k, true, false):
+        """Conditional jump; the target on the following instruction falls through"""
+        self.emit(BPF_JMP | op | BPF_K, k, true, false)
+
+    def assemble(self):
+        program = []
+        for index, (op, jt, jf, k) in enumerate(self.code):
+            if op == BPF_JMP | BPF_JA:
+                program.append((op, 0, 0, self.labels[jt] - index - 1))
+                continue
+            if op & 0x07 == BPF_JMP:
+                jt = self.labels[jt] - index - 1 if jt is not None else 0
+                jf = self.labels[jf] - index - 1 if jf is not None else 0
+                if jt > 255 or jf > 255:
+                    raise BpfCompileError("Filter too large for BPF conditional jumps")
+            program.append((op, jt or 0, jf or 0, k))
+        if len(program) > BPF_MAXINSNS:
+            raise BpfCompileError(f"Filter needs {len(program)} BPF instructions (limit {BPF_MAXINSNS})")
+        return program
+
+
+class _Compiler:
+    def __init__(self):
+        self.asm = _Assembler()
+
+    def program(self, tree):
+        asm = self.asm
+        accept, reject, body = asm.label(), asm.label(), asm.label()
+        # Header offsets below are for Ethernet framing; let other devices through
+        asm.emit(BPF_LD | BPF_W | BPF_ABS, SKF_AD_OFF + SKF_AD_HATYPE)
+        asm.compare(BPF_JEQ, ARPHRD_ETHER, body, None)
+        asm.compare(BPF_JEQ, ARPHRD_LOOPBACK, body, accept)
+        asm.place(body)
+        self.node(tree, accept, reject, True)
+        asm.place(accept)
+        asm.emit(BPF_RET | BPF_K, ACCEPT_BYTES)
+        asm.place(reject)
+        asm.emit(BPF_RET | BPF_K, 0)
+        return asm.assemble()
+
+    def node(self, node, true, false, positive):
+        """Emit code that jumps to true or false; undecidable frames go to the accepting side"""
+        asm = self.asm
+        unsure = true if positive else false
+        kind = node[0]
+        if kind == 'const':
+            asm.jump(true if node[1] else false)
+        elif kind in ('and', 'or'):
+            children = node[1]
+            for child in children[:-1]:
+                following = asm.label()
+                if kind == 'and':
+                    self.node(child, following, false, positive)
+                else:
+                    self.node(child, true, following, positive)
+                asm.place(following)
+            self.node(children[-1], true, false, positive)
+        elif kind == 'not':
+            self.node(node[1], false, true, not positive)
+        elif kind == 'len':
+            asm.emit(BPF_LD | BPF_W | BPF_LEN)
+            comparison, value = node[1], node[2]
+            op, swap = {'>': (BPF_JGT, False), '>=': (BPF_JGE, False), '==': (BPF_JEQ, False),
+                        '<': (BPF_JGE, True), '<=': (BPF_JGT, True), '!=': (BPF_JEQ, True)}[comparison]
+            asm.compare(op, value, false if swap else true, true if swap else false)
+        elif kind in ('protocol', 'transport'):
+            self.protocol(node[1], true, false, unsure)
+        elif kind == 'family':
+            self.protocol({'IP' if version == 4 else 'IPV6' for version in node[1]}, true, false, unsure)
+        elif kind == 'net':
+            self.net(node, true, false, unsure)
+        elif kind in ('port', 'portrange'):
+            self.ports(node, true, false, unsure)
+        elif kind == 'flags':
+            self.flags(node[1], true, false, unsure)
+        else:
+            asm.jump(unsure)
+
+    def ethertype(self, branches, false, unsure):
+        """Dispatch on the ethertype: {ethertype: label}; VLAN-tagged frames are undecidable"""
+        asm = self.asm
+        asm.emit(BPF_LD | BPF_H | BPF_ABS, 12)
+        for ethertype, label in branches.items():
+            asm.compare(BPF_JEQ, ethertype, label, None)
+        for ethertype in VLAN_ETHERTYPES:
+            asm.compare(BPF_JEQ, ethertype, unsure, None)
+        asm.jump(false)
+
+    def next_header(self, numbers, true, false, unsure):
+        """IPv6 next header in numbers; extension headers hide the real one"""
+        asm = self.asm
+        asm.emit(BPF_LD | BPF_B | BPF_ABS, 20)
+        for number in numbers:
+            asm.compare(BPF_JEQ, number, true, None)
+        for number in IPV6_EXTENSION_HEADERS:
+            asm.compare(BPF_JEQ, number, unsure, None)
+        asm.jump(false)
+
+    def protocol(self, names, true, false, unsure):
+        asm = self.asm
+        ipv4, ipv6, whole = set(), set(), set()
+        for name in names:
+            if name not in _PROTOCOL_MATCHES:
+                asm.jump(unsure)  # Only known from the payload (dns, http, ...)
+                return
+            numbers4, numbers6, ethertypes = _PROTOCOL_MATCHES[name]
+            ipv4.update(numbers4)
+            ipv6.update(numbers6)
+            whole.update(ethertypes)
+        branches = {ethertype: true for ethertype in whole}
+        check4, check6 = asm.label(), asm.label()
+        if ipv4 and ETHERTYPE_IP not in whole:
+            branches[ETHERTYPE_IP] = check4
+        if ipv6 and ETHERTYPE_IPV6 not in whole:
+            branches[ETHERTYPE_IPV6] = check6
+        self.ethertype(branches, false, unsure)
+        if branches.get(ETHERTYPE_IP) == check4:
+            asm.place(check4)
+            asm.emit(BPF_LD | BPF_B | BPF_ABS, 23)
+            for number in sorted(ipv4):
+                asm.compare(BPF_JEQ, number, true, None)
+            asm.jump(false)
+        if branches.get(ETHERTYPE_IPV6) == check6:
+            asm.place(check6)
+            self.next_header(sorted(ipv6), true, false, unsure)
+
+    def net(self, node, true, false, unsure):
+        asm = self.asm
+        _, side, version, value, prefix = node
+        if version == 4:
+            ip, arp = asm.label(), asm.label()
+            self.ethertype({ETHERTYPE_IP: ip, ETHERTYPE_ARP: arp}, false, unsure)
+            # ARP packets carry their sender/target addresses as src_ip/dst_ip
+            for label, offset in ((ip, 26 if side == 'src' else 30), (arp, 28 if side == 'src' else 38)):
+                asm.place(label)
+                self.masked_word(offset, value, prefix, true, false)
+            return
+        ipv6 = asm.label()
+        self.ethertype({ETHERTYPE_IPV6: ipv6}, false, unsure)
+        asm.place(ipv6)
+        offset = 22 if side == 'src' else 38
+        for word in range(4):
+            bits = min(32, max(0, prefix - 32 * word))
+            if not bits:
+                break
+            following = asm.label()
+            part = value >> (96 - 32 * word) & 0xFFFFFFFF
+            last = word == 3 or prefix <= 32 * (word + 1)
+            self.masked_word(offset + 4 * word, part, bits, true if last else following, false)
+            if last:
+                break
+            asm.place(following)
+
+    def masked_word(self, offset, value, bits, true, false):
+        asm = self.asm
+        mask = (0xFFFFFFFF << (32 - bits)) & 0xFFFFFFFF if bits else 0
+        asm.emit(BPF_LD | BPF_W | BPF_ABS, offset)
+        if mask != 0xFFFFFFFF:
+            asm.emit(BPF_ALU | BPF_AND | BPF_K, mask)
+        asm.compare(BPF_JEQ, value & mask, true, false)
+
+    def transport(self, numbers, ipv4_field, ipv6_field, size, false, unsure):
+        """
+        Load a transport header field of TCP/UDP (numbers) packets into A
+        ipv4_field is relative to the IPv4 options end, ipv6_field absolute.
+        Returns the label where A holds the field.
+        """
+        asm = self.asm
+        ip, ipv6, loaded, matched = asm.label(), asm.label(), asm.label(), asm.label()
+        self.ethertype({ETHERTYPE_IP: ip, ETHERTYPE_IPV6: ipv6}, false, unsure)
+        asm.place(ip)
+        asm.emit(BPF_LD | BPF_B | BPF_ABS, 23)
+        for number in numbers:
+            asm.compare(BPF_JEQ, number, matched, None)
+        asm.jump(false)
+        asm.place(matched)
+        asm.emit(BPF_LDX | BPF_B | BPF_MSH, 14)
+        asm.emit(BPF_LD | size | BPF_IND, 14 + ipv4_field)
+        asm.jump(loaded)
+        asm.place(ipv6)
+        headers = asm.label()
+        self.next_header(numbers, headers, false, unsure)
+        asm.place(headers)
+        asm.emit(BPF_LD | size | BPF_ABS, ipv6_field)
+        asm.place(loaded)
+
+    def ports(self, node, true, false, unsure):
+        asm = self.asm
+        offset = 0 if node[1] == 'src' else 2
+        self.transport((6, 17), offset, 54 + offset, BPF_H, false, unsure)
+        if node[0] == 'port':
+            for port in sorted(node[2]):
+                asm.compare(BPF_JEQ, port, true, None)
+            asm.jump(false)
+        else:
+            asm.compare(BPF_JGE, node[2], None, false)
+            asm.compare(BPF_JGT, node[3], false, true)
+
+    def flags(self, mask, true, false, unsure):
+        asm = self.asm
+        if not mask:
+            asm.jump(true)
+            return
+        self.transport((6,), 13, 67, BPF_B, false, unsure)
+        asm.emit(BPF_ALU | BPF_AND | BPF_K, mask)
+        asm.compare(BPF_JEQ, mask, true, false)
+
+
+def filter_tree(capture_filter):
+    """
+    Expression text, a PacketFilter or a parsed tree -> optimized tree
+    None for a ready-made program (a list of instructions, e.g. from tcpdump -dd).
+    """
+    if isinstance(capture_filter, list):
+        return None
+    if isinstance(capture_filter, str):
+        return optimize(parse_filter(capture_filter))
+    if isinstance(capture_filter, tuple):
+        return optimize(capture_filter)
+    filters = getattr(capture_filter, 'filters', None)
+    if filters is not None:
+        return optimize(('and', tuple(filters)))
+    raise TypeError(f"Not a filter: {capture_filter!r}")
+
+
+def compile_bpf(capture_filter):
+    """
+    Compile a filter expression (or a PacketFilter's rules) into a classic
+    BPF program: a list of (code, jt, jf, k) instructions
+    A list of instructions is passed through unchanged.
+    """
+    tree = filter_tree(capture_filter)
+    if tree is None:
+        return [tuple(instruction) for instruction in capture_filter]
+    return _Compiler().program(tree)
+
+
+def format_bpf(program):
+    """The program in tcpdump -d style, for debugging"""
+    names = {BPF_LD | BPF_W | BPF_ABS: 'ld [{offset}]', BPF_LD | BPF_H | BPF_ABS: 'ldh [{k}]',
+             BPF_LD | BPF_B | BPF_ABS: 'ldb [{k}]', BPF_LD | BPF_H | BPF_IND: 'ldh [x + {k}]',
+             BPF_LD | BPF_B | BPF_IND: 'ldb [x + {k}]', BPF_LD | BPF_W | BPF_LEN: 'ld #pktlen',
+             BPF_LDX | BPF_B | BPF_MSH: 'ldxb 4*([{k}]&0xf)', BPF_ALU | BPF_AND | BPF_K: 'and #0x{k:x}',
+             BPF_JMP | BPF_JA: 'ja {target}', BPF_JMP | BPF_JEQ: 'jeq #0x{k:x} jt {jt} jf {jf}',
+             BPF_JMP | BPF_JGT: 'jgt #0x{k:x} jt {jt} jf {jf}', BPF_JMP | BPF_JGE: 'jge #0x{k:x} jt {jt} jf {jf}',
+             BPF_RET | BPF_K: 'ret #{k}'}
+    lines = []
+    for index, (code, jt, jf, k) in enumerate(program):
+        text = names.get(code, 'op 0x{code:02x} {k}').format(
+            code=code, k=k, offset=k if k < 0x80000000 else k - (1 << 32), jt=index + 1 + jt, jf=index + 1 + jf,
+            target=index + 1 + k)
+        lines.append(f"({index:03d}) {text}")
+    return '\n'.join(lines)
+
+
+def attach_filter(sock, program):
+    """Attach a BPF program to a socket (SO_ATTACH_FILTER); frames it rejects never reach user space"""
+    instructions = b''.join(_SOCK_FILTER.pack(code, jt, jf, k) for code, jt, jf, k in program)
+    buffer = ctypes.create_string_buffer(instructions, len(instructions))
+    fprog = struct.pack('HL', len(program), ctypes.addressof(buffer))
+    sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, fprog)
+
+
+def detach_filter(sock):
+    sock.setsockopt(socket.SOL_SOCKET, SO_DETACH_FILTER, 0)
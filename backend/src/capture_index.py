@@ -0,0 +1,318 @@
+# src/capture_index.py
+"""
+Paged and range queries over captures
+
+CaptureIndex is a sparse index of a pcap/pcapng file: the position of
+every stride-th record and the time span of each block of stride
+records. It is built in one pass over the record headers and saved next
+to the capture (<file>.idx), so a query seeks straight to the block it
+needs and decodes only the packets it returns - page N of a 10M-packet
+capture costs the same as page 1. query_packets() answers the same
+queries over packets already in memory (a PacketTable or a list).
+
+Queries select a packet number range and/or a time range, then page
+through the matches with offset/limit or with the cursor returned by
+the previous page. fields projects every packet onto those keys.
+"""
+import array
+import json
+import os
+from bisect import bisect_left
+
+from src.decoder import decode_frame
+from src.pcap import PcapReader
+from src.reporting import get_logger
+from src.table import PacketTable
+
+try:
+    import numpy as np
+except ImportError:  # query_packets() scans packet by packet without NumPy
+    np = None
+
+log = get_logger('capture_index')
+
+# Records per index block: one seek position and time span each
+DEFAULT_STRIDE = 1024
+
+# Packets per page when a query gives no limit, and the most it may ask for
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 10000
+
+INDEX_MAGIC = b'PKTIDX1\n'
+
+
+def _page(offset, limit, cursor):
+    """Validated (matches to skip, page size, record index to resume at)"""
+    limit = DEFAULT_PAGE_SIZE if limit is None else int(limit)
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    if cursor is not None:
+        try:
+            resume = int(cursor)
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor}") from None
+        if resume < 0:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        return 0, limit, resume
+    offset = int(offset or 0)
+    if offset < 0:
+        raise ValueError("offset must be >= 0")
+    return offset, limit, None
+
+
+def _project(packet, fields):
+    if fields is None:
+        packet.pop('raw_packet', None)
+        return packet
+    return {field: packet.get(field) for field in fields}
+
+
+class Pager:
+    """
+    Page bookkeeping shared by the queries
+
+    Feed take() the matching record indices in capture order, run by run
+    (a range or an ascending list); it counts them and returns those that
+    belong on the page, which the caller decodes and add()s. result()
+    gives the query_packets()-style answer.
+    """
+
+    def __init__(self, offset=0, limit=None, cursor=None):
+        self.skip, self.limit, self.resume = _page(offset, limit, cursor)
+        self.packets = []
+        self.total = 0
+        self.eligible = 0  # Matches at or after the page start: more than limit means there is a next page
+        self.last = None   # Record index of the last packet on the page
+
+    def take(self, indices):
+        """Count a run of matches and return the part of it on the page"""
+        if self.resume is None:
+            start = min(len(indices), max(0, self.skip - self.total))
+        else:
+            start = bisect_left(indices, self.resume)
+        self.total += len(indices)
+        self.eligible += len(indices) - start
+        return indices[start:start + max(0, self.limit - len(self.packets))]
+
+    def add(self, index, packet):
+        self.packets.append(packet)
+        self.last = index
+
+    def result(self):
+        return {
+            'packets': self.packets,
+            'total': self.total,
+            'nextCursor': str(self.last + 1) if self.eligible > self.limit else None,
+        }
+
+
+def query_packets(packets, offset=0, limit=None, cursor=None, start_time=None, end_time=None,
+                  first_number=None, last_number=None, fields=None):
+    """
+    One page of packets (a PacketTable or a list of dicts) matching the ranges
+
+    Numbers are positions in packets (the first is 1); times select
+    start_time <= timestamp < end_time. Pass either offset (matches to
+    skip) or the cursor of the previous page. Returns {'packets',
+    'total' (all matches), 'nextCursor' (None on the last page)}.
+    """
+    pager = Pager(offset, limit, cursor)
+    low = max(0, (first_number or 1) - 1)
+    high = min(len(packets), last_number if last_number is not None else len(packets))
+    if np is not None and isinstance(packets, PacketTable):
+        mask = np.ones(max(0, high - low), dtype=bool)
+        if start_time is not None or end_time is not None:
+            timestamps = packets.column('timestamp')[low:high]
+            if start_time is not None:
+                mask &= timestamps >= start_time
+            if end_time is not None:
+                mask &= timestamps < end_time
+        matches = (np.flatnonzero(mask) + low).tolist()
+    else:
+        matches = [index for index in range(low, high)
+                   if (start_time is None or (packets[index].get('timestamp') or 0) >= start_time)
+                   and (end_time is None or (packets[index].get('timestamp') or 0) < end_time)]
+    for index in pager.take(matches):
+        packet = dict(packets[index])
+        packet['number'] = index + 1
+        pager.add(index, _project(packet, fields))
+    return pager.result()
+
+
+class CaptureIndex:
+    """
+    Sparse block index of a pcap/pcapng capture
+
+    Open one with CaptureIndex.open(path), which reuses <path>.idx when it
+    matches the capture's size and modification time and (re)builds it
+    otherwise. count is the number of records; query() pages through them.
+    """
+
+    def __init__(self, path, stride=DEFAULT_STRIDE):
+        self.path = path
+        self.stride = stride
+        self.count = 0
+        self.format = None
+        self.positions = array.array('Q')   # Record offset (pcap) / block offset (pcapng) of each block's first record
+        self.states = array.array('H')      # Index into section_states of each block's first record
+        self.section_states = []            # pcapng byte order and interfaces a block is read with
+        self.min_times = array.array('d')
+        self.max_times = array.array('d')
+        self._stamp = None
+
+    @classmethod
+    def open(cls, path, stride=DEFAULT_STRIDE):
+        """Load the saved index of a capture, building it if missing or stale"""
+        index = cls(path, stride)
+        if not index._load():
+            index.build()
+            try:
+                index.save()
+            except OSError as e:
+                log.warning(f"⚠️  Could not save capture index {index.index_path}: {e}")
+        return index
+
+    @property
+    def index_path(self):
+        return self.path + '.idx'
+
+    def _file_stamp(self):
+        stat = os.stat(self.path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def build(self):
+        """Walk every record header once and record the block positions and time spans"""
+        self.positions = array.array('Q')
+        self.states = array.array('H')
+        self.min_times = array.array('d')
+        self.max_times = array.array('d')
+        self.section_states = []
+        state_ids = {}
+        self._stamp = self._file_stamp()
+        stride = self.stride
+        count = 0
+        low = high = 0.0
+        with PcapReader(self.path) as reader:
+            self.format = reader.format
+            for timestamp, _, _, _, _, (position, state) in reader.records(positions=True):
+                if not count % stride:
+                    if count:
+                        self.min_times.append(low)
+                        self.max_times.append(high)
+                    if state not in state_ids:
+                        state_ids[state] = len(self.section_states)
+                        self.section_states.append(state)
+                    self.positions.append(position)
+                    self.states.append(state_ids[state])
+                    low = high = timestamp
+                elif timestamp < low:
+                    low = timestamp
+                elif timestamp > high:
+                    high = timestamp
+                count += 1
+        if count:
+            self.min_times.append(low)
+            self.max_times.append(high)
+        self.count = count
+        log.info(f"🗂️  Indexed {count:,} packets of {os.path.basename(self.path)} in {len(self.positions):,} blocks")
+        return self
+
+    def save(self):
+        header = {
+            'stamp': self._stamp,
+            'format': self.format,
+            'stride': self.stride,
+            'count': self.count,
+            'blocks': len(self.positions),
+            'section_states': self.section_states,
+        }
+        with open(self.index_path, 'wb') as f:
+            f.write(INDEX_MAGIC)
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            for column in (self.positions, self.states, self.min_times, self.max_times):
+                column.tofile(f)
+
+    def _load(self):
+        """Read index_path; False when it is missing, unreadable or out of date"""
+        try:
+            with open(self.index_path, 'rb') as f:
+                if f.readline() != INDEX_MAGIC:
+                    return False
+                header = json.loads(f.readline())
+                if header['stamp'] != self._file_stamp() or header['stride'] != self.stride:
+                    return False
+                blocks = header['blocks']
+                columns = (array.array('Q'), array.array('H'), array.array('d'), array.array('d'))
+                for column in columns:
+                    column.fromfile(f, blocks)
+        except (OSError, ValueError, KeyError, EOFError):
+            return False
+        self.positions, self.states, self.min_times, self.max_times = columns
+        self.format = header['format']
+        self.count = header['count']
+        self.section_states = [tuple(state) if state is not None else None for state in header['section_states']]
+        self._stamp = header['stamp']
+        return True
+
+    def _start(self, block):
+        """Reader position of a block's first record"""
+        return self.positions[block], self.section_states[self.states[block]]
+
+    def query(self, offset=0, limit=None, cursor=None, start_time=None, end_time=None,
+              first_number=None, last_number=None, fields=None):
+        """
+        One page of packets matching the ranges, decoded straight from the capture
+
+        Same arguments and result as query_packets(). Blocks whose time
+        span misses the time range are skipped without reading them;
+        blocks entirely inside it are counted without walking them.
+        """
+        pager = Pager(offset, limit, cursor)
+        low = max(0, (first_number or 1) - 1)
+        high = min(self.count, last_number if last_number is not None else self.count)
+        timed = start_time is not None or end_time is not None
+        with PcapReader(self.path) as reader:
+            for block in range(low // self.stride, -(-high // self.stride)):
+                base = block * self.stride
+                first, last = max(base, low), min(base + self.stride, high)
+                if first >= last:
+                    continue
+                earliest, latest = self.min_times[block], self.max_times[block]
+                if timed and ((start_time is not None and latest < start_time)
+                              or (end_time is not None and earliest >= end_time)):
+                    continue
+                if not timed or ((start_time is None or earliest >= start_time)
+                                 and (end_time is None or latest < end_time)):
+                    # Every record of the block matches: work out the page's share arithmetically
+                    wanted = pager.take(range(first, last))
+                    if len(wanted):
+                        for index, record in self._walk(reader, block, wanted.start, wanted.stop):
+                            pager.add(index, self._packet(reader, index, record, fields))
+                    continue
+                records = {index: record for index, record in self._walk(reader, block, first, last)
+                           if (start_time is None or record[0] >= start_time)
+                           and (end_time is None or record[0] < end_time)}
+                for index in pager.take(list(records)):
+                    pager.add(index, self._packet(reader, index, records[index], fields))
+        return pager.result()
+
+    def _walk(self, reader, block, start, stop):
+        """(record index, record) for the records start..stop of a block, reading headers only"""
+        index = block * self.stride
+        for record in reader.records(self._start(block)):
+            if index >= stop:
+                break
+            if index >= start:
+                yield index, record
+            index += 1
+
+    def _packet(self, reader, index, record, fields):
+        timestamp, wire_length, linktype, offset, captured = record
+        frame = reader.frame(offset, captured)
+        packet_info = decode_frame(frame, linktype)
+        frame.release()
+        packet_info['number'] = index + 1
+        packet_info['timestamp'] = timestamp
+        packet_info['length'] = wire_length
+        packet_info['real_packet'] = True
+        return _project(packet_info, fields)
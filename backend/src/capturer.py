@@ -1,23 +1,193 @@
 # src/capturer.py
 import time
 import random
+import itertools
+import threading
+
+from src import afpacket, bpf
+from src.decoder import decode_frame, LINKTYPE_ETHERNET, LINKTYPE_RAW, LINKTYPE_LINUX_SLL, LINKTYPE_LINUX_SLL2
+from src.expression import CompiledFilter
+from src.reporting import PACKETS, get_logger
+from src.ring import FrameRing
+from src.table import PacketTable
+from src.windows import WindowedAnalyzer
+
+# Link type of a Scapy packet's bytes, by its outermost layer
+SCAPY_LINKTYPES = {
+    'Ether': LINKTYPE_ETHERNET,
+    'IP': LINKTYPE_RAW,
+    'IPv6': LINKTYPE_RAW,
+    'CookedLinux': LINKTYPE_LINUX_SLL,
+    'CookedLinuxV2': LINKTYPE_LINUX_SLL2,
+}
+LINKTYPE_UNKNOWN = 0xFFFF  # Decoded as 'Other'
+
+log = get_logger('capturer')
+
+# Frames a consumer takes from the ring at a time
+CONSUMER_BATCH = 256
+
+# Packets per second of an open-ended (count=None) simulated capture
+SIMULATED_RATE = 200
+
+# Simulated protocol -> (transport protocol, server port)
+SIMULATED_SERVICES = {
+    'TCP': ('TCP', 443),
+    'UDP': ('UDP', 123),
+    'HTTP': ('TCP', 80),
+    'DNS': ('UDP', 53),
+    'ICMP': ('ICMP', None),
+}
 
 class PacketCapturer:
     """
     Packet capturer with real Scapy capability and simulation fallback
+
+    capture_backend picks how real packets are read: 'afpacket' (Linux
+    AF_PACKET socket with a TPACKET_V3 mmap ring), 'scapy' (scapy.sniff,
+    portable) or 'auto' (AF_PACKET when the platform and permissions
+    allow it, Scapy otherwise). interface=None captures on all interfaces.
+
+    Real captures run as producer/consumer: the capture thread only copies
+    raw frames into a bounded FrameRing (ring_slots frames of up to snaplen
+    bytes), and `consumers` threads decode them and feed the listeners.
+    backpressure picks what happens when the ring is full: 'drop-newest',
+    'drop-oldest' or 'block'. ring_stats() reports drops and the high-water mark.
+    iter_batches() hands the decoded packets over in batches instead of
+    keeping them all in captured_packets; capture_continuous() runs
+    until stopped and analyzes rolling time windows.
+
+    capture_filter (a filter expression, a PacketFilter or a raw BPF
+    program) keeps only matching packets. On AF_PACKET it is compiled to
+    BPF and attached to the socket, so the kernel discards most unwanted
+    frames before they are copied; the exact filter then runs on every
+    decoded packet. filter_stats reports captured vs filtered counts.
+
+    Messages go through src.reporting; packet lines (show_packets) only
+    appear at its verbose level. progress, e.g. a ProgressReporter, gets
+    the packet, byte and drop counts of every delivered batch.
     """
     
-    def __init__(self, use_real_capture=False):
-        self.captured_packets = []
+    CAPTURE_BACKENDS = ('auto', 'afpacket', 'scapy')
+    
+    def __init__(self, use_real_capture=False, ring_slots=8192, snaplen=2048, backpressure='drop-newest', consumers=1,
+                 capture_backend='auto', interface=None, capture_filter=None):
+        if capture_backend not in self.CAPTURE_BACKENDS:
+            raise ValueError(f"Unknown capture backend: {capture_backend} (use one of {', '.join(self.CAPTURE_BACKENDS)})")
+        self.captured_packets = PacketTable()
         self.packet_count = 0
+        self.listeners = []
+        self.batch_listeners = []
         self.use_real_capture = use_real_capture
         self.scapy_available = self._check_scapy()
+        self.capture_backend = capture_backend
+        self.interface = interface
+        self.capture_filter = capture_filter
+        tree = bpf.filter_tree(capture_filter) if capture_filter is not None else None
+        self._wanted = CompiledFilter(tree).predicate if tree is not None else None
+        self._user_filtered = 0
+        self._delivered = 0
+        self.filter_stats = None
+        self.kernel_stats = None
+        self.is_capturing = False
+        self.show_packets = True
+        self.ring_slots = ring_slots
+        self.snaplen = snaplen
+        self.backpressure = backpressure
+        self.consumers = max(1, consumers)
+        self.ring = None
+        self.progress = None
+        self._kernel_drops = 0
+        self._retain = True
+        self._stop = threading.Event()
+        self._store_lock = threading.Lock()
+        self._store_turn = threading.Condition(self._store_lock)
+        self._next_number = 1
         
-        print("✅ PacketCapturer created!")
-        if self.scapy_available and use_real_capture:
-            print("🔍 Real packet capture enabled")
+        log.debug("✅ PacketCapturer created!")
+        if self._can_capture() and use_real_capture:
+            log.debug("🔍 Real packet capture enabled")
         else:
-            print("💡 Simulation mode (safe for development)")
+            log.debug("💡 Simulation mode (safe for development)")
+    
+    def add_listener(self, callback):
+        """Call callback(packet_info) for every packet as it is captured"""
+        self.listeners.append(callback)
+    
+    def add_batch_listener(self, callback):
+        """Call callback(packets) with each list of packets as it is decoded"""
+        self.batch_listeners.append(callback)
+    
+    def _deliver(self, packets):
+        """
+        Filter, number and store decoded packets, in capture order (call
+        with the store lock held); returns the packets kept
+        """
+        packets = [packet_info for packet_info in packets if self._keep(packet_info)]
+        for packet_info in packets:
+            packet_info['number'] = self._next_number
+            self._next_number += 1
+        if packets:
+            self._store_batch(packets)
+        return packets
+    
+    def _store_batch(self, packets):
+        """Keep captured packets and hand them to the listeners (with the store lock held)"""
+        if self._retain:
+            self.captured_packets.extend(packets)
+        for listener in self.listeners:
+            for packet_info in packets:
+                listener(packet_info)
+        for listener in self.batch_listeners:
+            listener(packets)
+        self._delivered += len(packets)
+        if self.progress is not None:
+            drops = self._kernel_drops + (self.ring.dropped if self.ring is not None else 0)
+            self.progress.update(len(packets), sum(packet_info.get('length', 0) for packet_info in packets), drops)
+    
+    def _show_packets(self, packets):
+        """One line per packet, at the verbose reporting level only"""
+        if self.show_packets and log.isEnabledFor(PACKETS):
+            for packet_info in packets:
+                log.log(PACKETS, f"📦 #{packet_info['number']}: {packet_info['protocol']} - {packet_info['summary']} "
+                                 f"({packet_info['length']} bytes)")
+    
+    def _keep(self, packet_info):
+        """Apply the capture filter in user space (call with the store lock held)"""
+        if self._wanted is None or self._wanted(packet_info):
+            return True
+        self._user_filtered += 1
+        return False
+    
+    def _report_filter(self, delivered_before):
+        if self.capture_filter is None:
+            return
+        kernel_filtered = (self.kernel_stats or {}).get('filtered')
+        self.filter_stats = {
+            'captured': self._delivered - delivered_before,
+            'kernel_filtered': kernel_filtered,
+            'user_filtered': self._user_filtered,
+        }
+        kernel = f"{kernel_filtered} in the kernel, " if kernel_filtered is not None else ""
+        log.info(f"🧹 Capture filter: kept {self.filter_stats['captured']} packets, "
+                 f"discarded {kernel}{self._user_filtered} after decoding")
+    
+    def ring_stats(self):
+        """Counters of the last real capture's frame ring (None before one ran)"""
+        return self.ring.stats() if self.ring is not None else None
+    
+    def stop_capture(self):
+        """
+        Ask a running capture to stop; frames already in the ring are still processed
+        A stop that comes before the capture starts ends it as soon as it starts.
+        """
+        self._stop.set()
+    
+    def _can_capture(self):
+        """True when the selected backend can read real packets on this platform"""
+        if self.capture_backend == 'scapy':
+            return self.scapy_available
+        return afpacket.available() or (self.capture_backend == 'auto' and self.scapy_available)
     
     def _check_scapy(self):
         """Check if Scapy is available"""
@@ -28,122 +198,352 @@ class PacketCapturer:
             return False
     
     def start_capture(self, count=5, timeout=30):
-        """Start packet capture - real or simulated"""
-        if self.use_real_capture and self.scapy_available:
-            self._real_capture(count,timeout)
-        else:
-            self._simulated_capture(count,timeout)
+        """
+        Start packet capture - real or simulated
+        count=None and/or timeout=None run until the other limit, or until stop_capture().
+        """
+        self.is_capturing = True
+        self.kernel_stats = None
+        self._user_filtered = 0
+        delivered_before = self._delivered
+        self._start_progress()
+        try:
+            if self.use_real_capture and self._can_capture():
+                self._real_capture(count,timeout)
+            else:
+                self._simulated_capture(count,timeout)
+        finally:
+            self.is_capturing = False
+            self._stop.clear()
+            self._finish_progress()
+        self.packet_count = len(self.captured_packets)
+        self._report_filter(delivered_before)
+    
+    def replay(self, frames, rate=None):
+        """
+        Push (timestamp, wire length, linktype, frame) records - e.g. a
+        PcapReader - through the capture ring as if they came off the wire
+        rate paces the producer in frames per second (None = as fast as possible).
+        """
+        def produce(push):
+            started = time.perf_counter()
+            for sent, (timestamp, wire_length, linktype, frame) in enumerate(frames):
+                if self._stop.is_set():
+                    break
+                if rate:
+                    delay = started + sent / rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                push(frame, timestamp, linktype, wire_length)
+        
+        self.is_capturing = True
+        self._user_filtered = 0
+        delivered_before = self._delivered
+        self._start_progress()
+        try:
+            self._ring_capture(produce)
+        finally:
+            self.is_capturing = False
+            self._stop.clear()
+            self._finish_progress()
+        self.packet_count = len(self.captured_packets)
+        self._report_filter(delivered_before)
+    
+    def _start_progress(self):
+        self._kernel_drops = 0
+        if self.progress is not None:
+            self.progress.start()
+    
+    def _finish_progress(self):
+        if self.progress is not None:
+            self.progress.finish()
+    
+    def iter_batches(self, batch_size=1024, max_latency_ms=100, count=None, timeout=30, frames=None, rate=None,
+                     heartbeat=False):
+        """
+        Capture on a background thread and yield lists of decoded packets
+        
+        A batch is yielded once it holds batch_size packets, or once its
+        oldest packet has waited max_latency_ms, whichever comes first. With
+        frames, the records are replayed (see replay()) instead of captured.
+        The packets are not kept in captured_packets; stopping the iteration
+        stops the capture. If the loop body falls behind, the capture blocks
+        and the ring's backpressure policy applies. heartbeat=True also
+        yields an empty list after every max_latency_ms without packets, so
+        the caller gets control back on an idle link.
+        """
+        latency = max_latency_ms / 1000
+        limit = 4 * max(batch_size, CONSUMER_BATCH)
+        pending = []
+        oldest = None
+        ready = threading.Condition()
+        finished = []
+        
+        def collect(packets):
+            nonlocal oldest
+            with ready:
+                while len(pending) >= limit and not self._stop.is_set():
+                    ready.wait(0.1)
+                if packets and not pending:
+                    oldest = time.monotonic()
+                pending.extend(packets)
+                ready.notify_all()
+        
+        def run():
+            try:
+                if frames is not None:
+                    self.replay(frames, rate)
+                else:
+                    self.start_capture(count, timeout)
+            except BaseException as e:
+                finished.append(e)
+            finally:
+                with ready:
+                    finished.append(None)
+                    ready.notify_all()
+        
+        self.add_batch_listener(collect)
+        self._retain = False
+        capture = threading.Thread(target=run, daemon=True)
+        capture.start()
+        try:
+            while True:
+                with ready:
+                    idle_until = time.monotonic() + latency if heartbeat else None
+                    while len(pending) < batch_size and not finished:
+                        wait = oldest + latency - time.monotonic() if pending else None
+                        if wait is None and idle_until is not None:
+                            wait = idle_until - time.monotonic()
+                        if wait is not None and wait <= 0:
+                            break
+                        ready.wait(wait)
+                    batch = pending[:batch_size]
+                    del pending[:batch_size]
+                    if not pending:
+                        oldest = None
+                    ready.notify_all()
+                if finished and not batch:
+                    break
+                if batch or heartbeat:
+                    yield batch
+        finally:
+            self.stop_capture()
+            with ready:
+                ready.notify_all()
+            capture.join()
+            self._stop.clear()
+            self._retain = True
+            self.batch_listeners.remove(collect)
+        if finished[0] is not None:
+            raise finished[0]
+    
+    def capture_continuous(self, windows=(1, 10, 60), slide=None, on_window=None, timeout=None, frames=None,
+                           rate=None, batch_size=1024, max_latency_ms=250):
+        """
+        Capture until stop_capture() (or timeout), analyzing rolling windows
+        
+        Each closed window - see WindowedAnalyzer for windows/slide - is
+        passed to on_window(result) with its statistics and detected issues.
+        Packets are released as soon as their window pane closes, so memory
+        stays flat however long this runs. Returns the WindowedAnalyzer.
+        """
+        analyzer = WindowedAnalyzer(windows, slide)
+        if on_window is not None:
+            analyzer.add_listener(on_window)
+        live = frames is None
+        for batch in self.iter_batches(batch_size, max_latency_ms, count=None, timeout=timeout, frames=frames,
+                                       rate=rate, heartbeat=live):
+            analyzer.update_batch(batch)
+            if live and not batch:
+                # Idle link: close the windows by the clock
+                analyzer.advance(time.time() - analyzer.lateness)
+        analyzer.flush()
+        return analyzer
+    
+    def _ring_capture(self, produce):
+        """
+        Run produce(push) on this thread while consumer threads decode
+        the frames it pushes into a fresh FrameRing
+        """
+        self.ring = FrameRing(self.ring_slots, self.snaplen, self.backpressure)
+        self._next_number = len(self.captured_packets) + 1
+        self._turn = 0
+        tickets = itertools.count()
+        pop_lock = threading.Lock()
+        workers = [threading.Thread(target=self._consume, args=(self.ring, pop_lock, tickets), daemon=True)
+                   for _ in range(self.consumers)]
+        for worker in workers:
+            worker.start()
+        try:
+            produce(self.ring.push)
+        finally:
+            self.ring.close()
+            for worker in workers:
+                worker.join()
+        stats = self.ring.stats()
+        if stats['dropped'] or stats['truncated']:
+            log.warning(f"⚠️  Ring dropped {stats['dropped']} frames, truncated {stats['truncated']} "
+                        f"(high-water {stats['high_water']}/{stats['slots']} slots, {stats['policy']})")
+    
+    def _consume(self, ring, pop_lock, tickets):
+        """
+        Consumer thread: decode frames from the ring into packet_info dicts
+        Each batch gets a ticket as it leaves the ring (in capture order);
+        batches are decoded in parallel but stored in ticket order.
+        """
+        while True:
+            with pop_lock:
+                frames = ring.pop_batch(CONSUMER_BATCH, timeout=0.1)
+                ticket = next(tickets) if frames else None
+            if not frames:
+                if ring.closed and not len(ring):
+                    return
+                continue
+            packets = []
+            try:
+                for timestamp, wire_length, linktype, frame in frames:
+                    packet_info = decode_frame(frame, linktype)
+                    packet_info['timestamp'] = timestamp
+                    packet_info['length'] = wire_length
+                    packet_info['real_packet'] = True
+                    packet_info['raw_packet'] = frame
+                    if linktype != LINKTYPE_ETHERNET:
+                        packet_info['linktype'] = linktype
+                    packets.append(packet_info)
+            finally:
+                with self._store_turn:
+                    self._store_turn.wait_for(lambda: self._turn == ticket)
+                    try:
+                        packets = self._deliver(packets)
+                    finally:
+                        # Never leave later batches waiting, even if this one failed
+                        self._turn += 1
+                        self._store_turn.notify_all()
+            self._show_packets(packets)
     
     def _real_capture(self, count,timeout=30):
-        """Real packet capture using Scapy"""
+        """Real packet capture using AF_PACKET or Scapy"""
         try:
-            import scapy.all as scapy
-            from scapy.layers.inet import IP, TCP, UDP, ICMP
+            if self.capture_backend != 'scapy' and afpacket.available():
+                program = None
+                if self.capture_filter is not None:
+                    try:
+                        program = bpf.compile_bpf(self.capture_filter)
+                    except bpf.BpfCompileError as e:
+                        log.warning(f"⚠️  {e}; filtering in user space only")
+                try:
+                    sock = afpacket.AfPacketSocket(self.interface, frame_size=self.snaplen, bpf_program=program)
+                except OSError as e:
+                    if self.capture_backend == 'afpacket' or not self.scapy_available:
+                        raise
+                    log.warning(f"⚠️  AF_PACKET capture unavailable ({e}), using Scapy")
+                else:
+                    with sock:
+                        self._afpacket_capture(sock, count, timeout)
+                    log.info("✅ Real capture completed!")
+                    return
             
-            print(f"🎯 Capturing {count} REAL packets (timeout: {timeout}...")
+            import scapy.all as scapy
             
-            packets_captured = 0
+            log.info(f"🎯 Capturing {count or 'unlimited'} REAL packets (timeout: {timeout or 'none'}s)...")
+            if self.capture_filter is not None:
+                log.info("💡 Scapy capture: the capture filter runs in user space")
             
-            def process_packet(packet):
-                nonlocal packets_captured
-                packets_captured += 1
+            def produce(push):
+                def on_frame(packet):
+                    # Runs inside the sniff loop: copy the bytes and return
+                    push(bytes(packet), float(packet.time), SCAPY_LINKTYPES.get(type(packet).__name__, LINKTYPE_UNKNOWN))
                 
-                # Detect protocol from real packet
-                protocol = self._detect_protocol(packet)
-                
-                packet_info = {
-                    'number': packets_captured,
-                    'timestamp': time.time(),
-                    'length': len(packet),
-                    'protocol': protocol,
-                    'summary': packet.summary(),
-                    'real_packet': True,
-                    'raw_packet': packet 
-                }
-                self.captured_packets.append(packet_info)
-                print(f"📦 #{packet_info['number']}: {protocol} - {packet.summary()}")
-                
-                if packets_captured >= count:
-                    return True  # Stop capture
-                return False
+                scapy.sniff(count=count or 0, prn=on_frame, store=False, timeout=timeout, iface=self.interface,
+                            stop_filter=lambda packet: self._stop.is_set())
             
-            scapy.sniff(count=count, prn=process_packet, timeout=10)
-            print("✅ Real capture completed!")
+            self._ring_capture(produce)
+            log.info("✅ Real capture completed!")
             
         except Exception as e:
-            print(f"❌ Real capture failed: {e}")
-            print("🔄 Falling back to simulation...")
-            self._simulated_capture(count)
+            log.warning(f"❌ Real capture failed: {e}")
+            log.warning("🔄 Falling back to simulation...")
+            self._simulated_capture(count, timeout)
     
-    def _detect_protocol(self, packet):
-        """Detect protocol from real Scapy packet - IMPROVED VERSION"""
-        try:
-            import scapy.all as scapy
-            from scapy.layers.inet import IP, TCP, UDP, ICMP
-            from scapy.layers.inet6 import IPv6
-            
-            if packet.haslayer(TCP):
-                return "TCP"
-            elif packet.haslayer(UDP):
-                return "UDP" 
-            elif packet.haslayer(ICMP):
-                return "ICMP"
-            elif packet.haslayer(IPv6):
-                # Check for ICMPv6
-                if packet.haslayer(scapy.ICMPv6ND_RA) or packet.haslayer(scapy.ICMPv6MLReport2):
-                    return "ICMPv6"
-                return "IPv6"
-            elif packet.haslayer(IP):
-                return "IP"
-            elif packet.haslayer(scapy.ARP):
-                return "ARP"
-            elif packet.haslayer(scapy.DNS):
-                return "DNS"
-            elif packet.haslayer(scapy.DHCP):
-                return "DHCP"
-            else:
-                # Try to get protocol from summary
-                summary = packet.summary()
-                if 'TCP' in summary:
-                    return "TCP"
-                elif 'UDP' in summary:
-                    return "UDP"
-                elif 'DNS' in summary:
-                    return "DNS"
-                elif 'HTTP' in summary:
-                    return "HTTP"
-                else:
-                    return "Other"
-        except:
-            return "Unknown"
+    def _afpacket_capture(self, sock, count, timeout):
+        """Walk the kernel's TPACKET_V3 blocks and push their frames into the capture ring"""
+        log.info(f"🎯 Capturing {count or 'unlimited'} REAL packets via AF_PACKET on {self.interface or 'all interfaces'} "
+                 f"(timeout: {timeout or 'none'}s)...")
+        
+        def produce(push):
+            deadline = time.monotonic() + timeout if timeout is not None else float('inf')
+            limit = count if count is not None else float('inf')
+            seen = 0
+            next_poll = 0
+            while seen < limit and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                frames = sock.read(min(remaining, 0.1))
+                for timestamp, wire_length, linktype, frame in frames:
+                    push(frame, timestamp, linktype, wire_length)
+                    frame.release()
+                    seen += 1
+                    # A busy link never lets read() run dry
+                    if seen >= limit or not seen % 1024 and (time.monotonic() > deadline or self._stop.is_set()):
+                        break
+                frames.close()
+                if self.progress is not None and time.monotonic() >= next_poll:
+                    # Kernel drops so far, for the progress lines
+                    self._kernel_drops = sock.statistics()['drops']
+                    next_poll = time.monotonic() + 0.5
+        
+        self._ring_capture(produce)
+        self.kernel_stats = sock.statistics()
+        if self.kernel_stats['drops']:
+            log.warning(f"⚠️  Kernel dropped {self.kernel_stats['drops']} packets (capture ring full)")
     
     def _simulated_capture(self, count, timeout=30):
         """Simulated packet capture"""
-        print(f"🎯 Simulating capture of {count} packets...")
+        log.info(f"🎯 Simulating capture of {count or 'unlimited'} packets...")
         
         protocols = ['TCP', 'UDP', 'HTTP', 'DNS', 'ICMP']
         source_ips = ['192.168.1.100', '10.0.0.5', '172.16.0.10']
         dest_ips = ['8.8.8.8', '93.184.216.34', '151.101.1.69']
+        started = time.monotonic()
+        deadline = started + timeout if timeout is not None else float('inf')
+        self._next_number = len(self.captured_packets) + 1
         
-        for i in range(count):
+        for i in (range(count) if count is not None else itertools.count()):
+            if self._stop.is_set():
+                break
+            if count is None:
+                # Open-ended: pace like a live link until stopped
+                if time.monotonic() > deadline:
+                    break
+                delay = started + i / SIMULATED_RATE - time.monotonic()
+                if delay > 0:
+                    self._stop.wait(delay)
             protocol = random.choice(protocols)
             src_ip = random.choice(source_ips)
             dst_ip = random.choice(dest_ips)
+            l4_protocol, service_port = SIMULATED_SERVICES[protocol]
             
             packet_info = {
-                'number': i + 1,
                 'timestamp': time.time(),
                 'length': random.randint(60, 1500),
                 'protocol': protocol,
                 'src_ip': src_ip,
                 'dst_ip': dst_ip,
+                'l4_protocol': l4_protocol,
+                'is_broadcast': False,
+                'is_multicast': False,
                 'summary': f"{protocol} {src_ip} → {dst_ip}",
                 'real_packet': False
             }
-            self.captured_packets.append(packet_info)
-            print(f"📦 #{i+1}: {packet_info['summary']} ({packet_info['length']} bytes)")
+            if service_port is not None:
+                packet_info['src_port'] = random.randint(49152, 65535)
+                packet_info['dst_port'] = service_port
+            with self._store_lock:
+                kept = self._deliver([packet_info])
+            self._show_packets(kept)
         
-        print("✅ Capture simulation completed!")
+        log.info("✅ Capture simulation completed!")
     
     def show_protocol_stats(self):
         """Show protocol statistics - FIXED VERSION"""
@@ -0,0 +1,275 @@
+# src/catalog.py
+"""
+Catalog of the saved captures in a storage directory
+
+An SQLite database next to the captures records, for each file, what
+listing and searching need - packet count, bytes, time span, packets per
+protocol and the set of hosts, plus a Bloom filter of those hosts - so
+none of it requires opening the captures. PacketStorage records a
+capture when it saves it and catches up with files it did not write
+(copied in, streamed by the CLI) on its first listing.
+
+find() answers "which captures overlap this time range, contain this
+host and/or carry this protocol" from indexed columns: the time range
+and protocol are SQL lookups, the host is checked against each
+candidate's Bloom filter and then confirmed in its host set. Times are
+per capture: a match means the capture overlaps the range and saw the
+host, not that the host was seen inside the range.
+"""
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+import zlib
+
+from src.table import PacketTable, decode_address, encode_address, unique_rows
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional - summaries are computed packet by packet without it
+    np = None
+
+CATALOG_FILE = 'catalog.sqlite3'
+SCHEMA_VERSION = 1
+BLOOM_FALSE_POSITIVES = 0.01
+BLOOM_MIN_BITS = 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    filename TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    modified_ns INTEGER NOT NULL,
+    packets INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    first_time REAL,
+    last_time REAL,
+    protocols TEXT NOT NULL,
+    host_count INTEGER NOT NULL,
+    hosts BLOB NOT NULL,
+    bloom BLOB NOT NULL,
+    bloom_hashes INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS captures_by_time ON captures (first_time, last_time);
+CREATE INDEX IF NOT EXISTS captures_by_modified ON captures (modified_ns);
+CREATE TABLE IF NOT EXISTS capture_protocols (
+    filename TEXT NOT NULL REFERENCES captures (filename) ON DELETE CASCADE,
+    protocol TEXT NOT NULL,
+    packets INTEGER NOT NULL,
+    PRIMARY KEY (protocol, filename)
+);
+"""
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter of strings
+    Sized for `capacity` items at the given false positive rate; positions
+    come from one BLAKE2b digest by double hashing.
+    """
+
+    def __init__(self, capacity=0, false_positives=BLOOM_FALSE_POSITIVES, bits=None, hashes=None):
+        if bits is None:
+            bits = max(BLOOM_MIN_BITS, math.ceil(-capacity * math.log(false_positives) / math.log(2) ** 2))
+            bits = -(-bits // 8) * 8
+        self.bits = bits
+        self.hashes = hashes or max(1, round(bits / max(capacity, 1) * math.log(2)))
+        self.array = bytearray(bits // 8)
+
+    @classmethod
+    def from_bytes(cls, data, hashes):
+        bloom = cls(bits=len(data) * 8, hashes=hashes)
+        bloom.array = bytearray(data)
+        return bloom
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.bits for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.array[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+def _hosts(packets):
+    """Distinct source/destination IP addresses of the packets"""
+    if np is not None and isinstance(packets, PacketTable):
+        keys = []
+        for name in ('src_ip', 'dst_ip'):
+            present = packets.present(name)
+            keys.append(np.stack([part[present].astype(np.uint64) for part in packets.column(name)], axis=1))
+        keys = np.concatenate(keys)
+        if not len(keys):
+            return set()
+        first, _ = unique_rows(keys)
+        return {decode_address(int(family), int(high), int(low)) for family, high, low in keys[first]}
+    values = {packet.get(name) for packet in packets for name in ('src_ip', 'dst_ip')}
+    return {value for value in values if value and encode_address(value) is not None}
+
+
+def summarize(packets):
+    """What the catalog records about a capture: counts, time span, protocols and hosts"""
+    if np is not None and isinstance(packets, PacketTable):
+        lengths = packets.column('length')[packets.present('length')]
+        timestamps = packets.column('timestamp')[packets.present('timestamp')]
+        protocols = {}
+        present = packets.present('protocol')
+        if present.any():
+            counts = np.bincount(packets.column('protocol')[present], minlength=len(packets.strings('protocol')))
+            protocols = {name: int(count) for name, count in zip(packets.strings('protocol'), counts) if count}
+        first_time = float(timestamps.min()) if len(timestamps) else None
+        last_time = float(timestamps.max()) if len(timestamps) else None
+        total_bytes = int(lengths.sum())
+    else:
+        protocols = {}
+        timestamps = []
+        total_bytes = 0
+        for packet in packets:
+            protocol = packet.get('protocol') or 'Unknown'
+            protocols[protocol] = protocols.get(protocol, 0) + 1
+            if isinstance(packet.get('length'), int):
+                total_bytes += packet['length']
+            if isinstance(packet.get('timestamp'), (int, float)):
+                timestamps.append(packet['timestamp'])
+        first_time = min(timestamps) if timestamps else None
+        last_time = max(timestamps) if timestamps else None
+    return {
+        'packets': len(packets),
+        'bytes': total_bytes,
+        'first_time': first_time,
+        'last_time': last_time,
+        'protocols': protocols,
+        'hosts': sorted(_hosts(packets)),
+    }
+
+
+def merge_summaries(first, second):
+    """Summary of two captures one after the other (a capture and what was appended to it)"""
+    protocols = dict(first['protocols'])
+    for protocol, count in second['protocols'].items():
+        protocols[protocol] = protocols.get(protocol, 0) + count
+    starts = [time for time in (first['first_time'], second['first_time']) if time is not None]
+    ends = [time for time in (first['last_time'], second['last_time']) if time is not None]
+    return {
+        'packets': first['packets'] + second['packets'],
+        'bytes': first['bytes'] + second['bytes'],
+        'first_time': min(starts) if starts else None,
+        'last_time': max(ends) if ends else None,
+        'protocols': protocols,
+        'hosts': sorted(set(first['hosts']) | set(second['hosts'])),
+    }
+
+
+class CaptureCatalog:
+    """SQLite catalog of captures (see above); safe to share between threads"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.execute('PRAGMA foreign_keys = ON')
+            if self._db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                self._db.executescript('DROP TABLE IF EXISTS capture_protocols; DROP TABLE IF EXISTS captures;')
+                self._db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            self._db.executescript(_SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def record(self, filename, size, modified_ns, summary):
+        """Add or replace the entry of a capture"""
+        bloom = BloomFilter(len(summary['hosts']))
+        for host in summary['hosts']:
+            bloom.add(host)
+        hosts = zlib.compress(json.dumps(summary['hosts']).encode('utf-8'))
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM captures WHERE filename = ?', (filename,))
+            self._db.execute('INSERT INTO captures VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                             (filename, size, modified_ns, summary['packets'], summary['bytes'],
+                              summary['first_time'], summary['last_time'], json.dumps(summary['protocols']),
+                              len(summary['hosts']), hosts, bytes(bloom.array), bloom.hashes))
+            self._db.executemany('INSERT INTO capture_protocols VALUES (?, ?, ?)',
+                                 [(filename, protocol, count) for protocol, count in summary['protocols'].items()])
+
+    def remove(self, filename):
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM captures WHERE filename = ?', (filename,))
+
+    def stamps(self):
+        """{filename: (size, modified_ns)} of every recorded capture"""
+        with self._lock:
+            rows = self._db.execute('SELECT filename, size, modified_ns FROM captures').fetchall()
+        return {row['filename']: (row['size'], row['modified_ns']) for row in rows}
+
+    def hosts(self, filename):
+        """The recorded host set of a capture (empty when unknown)"""
+        with self._lock:
+            row = self._db.execute('SELECT hosts FROM captures WHERE filename = ?', (filename,)).fetchone()
+        return json.loads(zlib.decompress(row['hosts'])) if row else []
+
+    def summary(self, filename):
+        """The recorded summary of a capture, as summarize() returns it, or None"""
+        with self._lock:
+            row = self._db.execute('SELECT * FROM captures WHERE filename = ?', (filename,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'packets': row['packets'],
+            'bytes': row['bytes'],
+            'first_time': row['first_time'],
+            'last_time': row['last_time'],
+            'protocols': json.loads(row['protocols']),
+            'hosts': json.loads(zlib.decompress(row['hosts'])),
+        }
+
+    def list(self):
+        """Every recorded capture, newest first"""
+        return self.find()
+
+    def find(self, host=None, start_time=None, end_time=None, protocol=None):
+        """
+        Captures overlapping start_time <= t < end_time that contain host
+        and/or carry protocol, newest first
+        """
+        conditions, parameters = [], []
+        if start_time is not None:
+            conditions.append('last_time >= ?')
+            parameters.append(start_time)
+        if end_time is not None:
+            conditions.append('first_time < ?')
+            parameters.append(end_time)
+        if protocol is not None:
+            conditions.append('filename IN (SELECT filename FROM capture_protocols WHERE protocol = ?)')
+            parameters.append(protocol)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        columns = ('filename, size, modified_ns, packets, bytes, first_time, last_time, protocols, host_count'
+                   + (', bloom, bloom_hashes' if host is not None else ''))
+        with self._lock:
+            rows = self._db.execute(f'SELECT {columns} FROM captures {where} ORDER BY modified_ns DESC',
+                                    parameters).fetchall()
+        if host is not None:
+            rows = [row for row in rows if host in BloomFilter.from_bytes(row['bloom'], row['bloom_hashes'])]
+            # Rule out the Bloom filter's false positives
+            rows = [row for row in rows if host in self.hosts(row['filename'])]
+        return [self._entry(row) for row in rows]
+
+    @staticmethod
+    def _entry(row):
+        return {
+            'filename': row['filename'],
+            'size': row['size'],
+            'modified_ns': row['modified_ns'],
+            'packets': row['packets'],
+            'bytes': row['bytes'],
+            'first_time': row['first_time'],
+            'last_time': row['last_time'],
+            'protocols': json.loads(row['protocols']),
+            'host_count': row['host_count'],
+        }
@@ -2,6 +2,7 @@
 import argparse
 import sys
 import os
+import time
 
 # Add the parent directory to Python path so we can import from src
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
@@ -10,9 +11,14 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from src.capturer import PacketCapturer
 from src.parser import ProtocolParser
 from src.filters import PacketFilter
-from src.statistics import TrafficStatistics
+from src.expression import FilterSyntaxError
+from src.statistics import StreamingStatistics
 from src.detector import IssueDetector
+from src.flows import FlowTable
+from src.parallel import ParallelAnalyzer
+from src.reporting import ProgressReporter, configure
 from src.storage import PacketStorage
+from src.table import PacketTable
 
 class PacketAnalyzerCLI:
     """
@@ -24,9 +30,13 @@ class PacketAnalyzerCLI:
         self.capturer = None
         self.parser = ProtocolParser()
         self.filters = PacketFilter()
-        self.stats = TrafficStatistics()
+        self.stats = StreamingStatistics()
+        self.flows = FlowTable()
         self.detector = IssueDetector()
         self.storage = PacketStorage() 
+        self.workers = None
+        self._parallel_results = None
+        self._streamed_to = None
         
     def run(self):
         """Main CLI entry point"""
@@ -38,7 +48,15 @@ Examples:
   python src/cli.py --capture --count 10      # Capture 10 packets
   python src/cli.py --capture --stats         # Capture and show statistics
   python src/cli.py --capture --analyze       # Capture and analyze packets
+  python src/cli.py --capture --filter "tcp and dst port 443"  # Capture and filter
+  python src/cli.py --capture --interface eth0 --capture-filter "udp and port 53"  # Filter in the kernel
+  python src/cli.py --continuous --windows 1,10,60   # Monitor until Ctrl-C, report every window
   python src/cli.py --load capture.json --stats --detect-issues  # Load and analyze saved capture
+  python src/cli.py --load big.pcap --stats --detect-issues --workers 4  # Analyze on 4 processes
+  python src/cli.py --capture --count 5 --verbose   # Also print every captured packet
+  python src/cli.py --continuous --save live --save-format jsonl.gz   # Write packets to disk as they arrive
+  python src/cli.py --capture --save traffic --save-format pkb --index   # Save with IP/port/protocol indexes
+  python src/cli.py --continuous --save live --save-format rolling --retention-minutes 1440   # Keep a day of segments
             '''
         )
         
@@ -47,14 +65,22 @@ Examples:
                           help='Run complete demo (capture, analyze, stats, detect issues)')
         parser.add_argument('--capture', action='store_true', 
                           help='Capture packets')
+        parser.add_argument('--continuous', action='store_true',
+                          help='Capture until interrupted, with statistics and issues per time window')
         
         # Capture options
         parser.add_argument('--count', type=int, default=10, 
                           help='Number of packets to capture (default: 10)')
-        parser.add_argument('--timeout', type=int, default=30, 
-                          help='Capture timeout in seconds (default: 30)')
+        parser.add_argument('--timeout', type=int, 
+                          help='Capture timeout in seconds (default: 30, none with --continuous)')
         parser.add_argument('--interface', type=str, 
                           help='Network interface to use')
+        parser.add_argument('--capture-filter', type=str,
+                          help='Only capture packets matching this filter expression (compiled to BPF for the kernel)')
+        parser.add_argument('--windows', type=str, default='1,10,60',
+                          help='Window sizes in seconds for --continuous (default: 1,10,60)')
+        parser.add_argument('--slide', type=int,
+                          help='Emit --continuous windows every N seconds (sliding); default: tumbling windows')
         
         # Analysis options
         parser.add_argument('--analyze', action='store_true', 
@@ -63,10 +89,18 @@ Examples:
                           help='Show traffic statistics')
         parser.add_argument('--detect-issues', action='store_true', 
                           help='Detect network issues')
+        parser.add_argument('--flows', action='store_true',
+                          help='Show the largest flows (connections tracked by 5-tuple)')
         parser.add_argument('--parse-all', action='store_true', 
                           help='Parse all captured packets')
+        parser.add_argument('--parser-backend', choices=ProtocolParser.BACKENDS,
+                          help='Header parser: fast raw-bytes decoder (default) or full Scapy dissection')
+        parser.add_argument('--workers', type=int,
+                          help='Analyze on N processes, sharding packets by flow (for large captures)')
         
         # Filter options
+        parser.add_argument('--filter', type=str,
+                          help="Filter expression, e.g. 'tcp and (src 10.0.0.0/8 or dst port 443) and len > 1000'")
         parser.add_argument('--filter-protocol', type=str, 
                           help='Filter by protocol (TCP, UDP, ICMP, etc.)')
         parser.add_argument('--filter-src-ip', type=str, 
@@ -77,8 +111,16 @@ Examples:
         # Storage options
         parser.add_argument('--save', type=str, 
                   help='Save capture to file (provide filename)')
-        parser.add_argument('--save-format', choices=['json', 'pkl'], default='json',
-                  help='File format for saving (default: json)')
+        parser.add_argument('--save-format', choices=['json', 'pkl', 'pkb', 'jsonl', 'jsonl.gz', 'jsonl.zst', 'rolling'],
+                  default='json',
+                  help='File format for saving (default: json); JSON Lines formats are written during the capture, '
+                       'rolling writes one-minute segments to a directory')
+        parser.add_argument('--retention-minutes', type=float,
+                  help='With --save-format rolling: delete segments older than this')
+        parser.add_argument('--retention-mb', type=float,
+                  help='With --save-format rolling: keep at most this many MB of segments')
+        parser.add_argument('--index', action='store_true',
+                  help='With --save-format pkb: also build IP/port/protocol indexes for fast filtered loads')
         parser.add_argument('--load', type=str,
                   help='Load capture from file')
         parser.add_argument('--list-captures', action='store_true',
@@ -86,11 +128,23 @@ Examples:
         parser.add_argument('--delete-capture', type=str,
                   help='Delete a capture file')
         
+        # Output options
+        output = parser.add_mutually_exclusive_group()
+        output.add_argument('--verbose', '-v', action='store_true',
+                          help='Print every captured packet and component messages')
+        output.add_argument('--quiet', '-q', action='store_true',
+                          help='Only print results, warnings and errors')
+        
         args = parser.parse_args()
+        configure('verbose' if args.verbose else 'quiet' if args.quiet else 'info')
         
         print("🚀 Educational Packet Analyzer - Starting...")
         print("=" * 60)
         
+        if args.parser_backend:
+            self.parser.backend = args.parser_backend
+        self.workers = args.workers
+        
         # If no arguments provided, show help and run demo
         if not any(vars(args).values()):
             print("🤔 No arguments provided. Running demo mode...")
@@ -101,6 +155,10 @@ Examples:
             self.run_demo()
             return
         
+        if args.continuous:
+            self.run_continuous(args)
+            return
+        
         # Handle packet loading first
         packets_loaded = False
         if args.load:
@@ -111,12 +169,12 @@ Examples:
             self.capture_packets(args)
         elif not packets_loaded:
             # If no capture but analysis requested, and no packets loaded, we need packets
-            if any([args.analyze, args.stats, args.detect_issues, args.parse_all]):
+            if any([args.analyze, args.stats, args.detect_issues, args.flows, args.parse_all]):
                 print("📡 No packets captured yet. Capturing 10 packets for analysis...")
                 self.capture_packets(args)
         
         # Apply filters if specified
-        if any([args.filter_protocol, args.filter_src_ip, args.filter_dst_ip]):
+        if any([args.filter, args.filter_protocol, args.filter_src_ip, args.filter_dst_ip]):
             self.apply_filters(args)
         
         # Perform analysis if requested
@@ -128,6 +186,9 @@ Examples:
         
         if args.detect_issues:
             self.detect_issues()
+        
+        if args.flows:
+            self.show_flows()
             
         if args.save:
             self.save_capture(args)
@@ -151,7 +212,7 @@ Examples:
         
         # Capture packets
         print(f"\n📡 CAPTURING 8 PACKETS...")
-        self.capturer = PacketCapturer(use_real_capture=True)
+        self._new_capturer(use_real_capture=True)
         self.capturer.start_capture(8, 20)  # 8 packets, 20 second timeout
         
         if not self.capturer.captured_packets:
@@ -182,11 +243,91 @@ Examples:
                 if 'educational_note' in layer_info:
                     print(f"   💡 {layer_info['educational_note']}")
     
+    def run_continuous(self, args):
+        """Monitor until Ctrl-C (or --timeout if given), printing every closed window"""
+        try:
+            windows = [int(size) for size in args.windows.split(',')]
+            self._new_capturer(use_real_capture=True, interface=args.interface, capture_filter=args.capture_filter)
+        except ValueError as e:
+            print(f"❌ Invalid option: {e}")
+            return
+        self.capturer.show_packets = False
+        writer = self._stream_to_file(args)
+        print(f"\n📡 CONTINUOUS CAPTURE - windows {', '.join(f'{size}s' for size in windows)}"
+              f"{f', sliding every {args.slide}s' if args.slide else ''} (Ctrl-C to stop)")
+        try:
+            analyzer = self.capturer.capture_continuous(windows, args.slide, self.print_window, args.timeout)
+        except ValueError as e:
+            print(f"❌ Invalid window options: {e}")
+            return
+        except KeyboardInterrupt:
+            print("\n⏹️  Continuous capture stopped")
+            return
+        finally:
+            self._close_stream(writer)
+        print(f"✅ {analyzer.windows_emitted} windows analyzed ({analyzer.late_packets} late packets)")
+    
+    def print_window(self, result):
+        """One line per closed window, plus its issues"""
+        stats = result['statistics']
+        start = time.strftime('%H:%M:%S', time.localtime(result['start']))
+        line = f"🪟 {result['window']:>3}s @ {start}: {result['packets']} packets"
+        if result['packets']:
+            top = max(stats['protocol_distribution'].items(), key=lambda item: item[1]['count'])
+            line += (f", {stats['total_bytes'] / result['window'] / 1024:.1f} KB/s,"
+                     f" {result['packets'] / result['window']:.1f} pps, top {top[0]} ({top[1]['percentage']}%)")
+        if result['issues']:
+            line += f", {len(result['issues'])} issues: " + ', '.join(sorted({issue['type'] for issue in result['issues']}))
+        print(line)
+    
+    def _new_capturer(self, use_real_capture=False, interface=None, capture_filter=None):
+        """Start a fresh capture; statistics and flows are updated as packets arrive"""
+        self.capturer = PacketCapturer(use_real_capture=use_real_capture, interface=interface,
+                                       capture_filter=capture_filter)
+        self.capturer.progress = ProgressReporter()
+        self._parallel_results = None
+        self.stats.reset()
+        self.flows.reset()
+        self.capturer.add_listener(self.stats.update)
+        self.capturer.add_listener(self.flows.update)
+    
+    def _open_stream(self, args):
+        """Writer for --save in a JSON Lines or rolling format"""
+        if args.save_format == 'rolling':
+            return self.storage.open_rolling(
+                args.save,
+                retention_seconds=args.retention_minutes * 60 if args.retention_minutes else None,
+                retention_bytes=int(args.retention_mb * 2**20) if args.retention_mb else None)
+        return self.storage.open_jsonl(args.save, args.save_format)
+    
+    def _stream_to_file(self, args):
+        """With --save in a JSON Lines or rolling format, write packets to disk as they are captured"""
+        if not args.save or not args.save_format.startswith(('jsonl', 'rolling')):
+            return None
+        writer = self._open_stream(args)
+        self.capturer.add_batch_listener(writer.write_many)
+        return writer
+    
+    def _close_stream(self, writer):
+        if writer is None:
+            return
+        writer.close()
+        self._streamed_to = writer.path
+        print(f"💾 Wrote {writer.count} packets to {writer.path} during the capture")
+    
     def capture_packets(self, args):
         """Capture packets based on CLI arguments"""
         print(f"\n📡 CAPTURING {args.count} PACKETS...")
-        self.capturer = PacketCapturer(use_real_capture=True)
-        self.capturer.start_capture(args.count, args.timeout)
+        try:
+            self._new_capturer(use_real_capture=True, interface=args.interface, capture_filter=args.capture_filter)
+        except FilterSyntaxError as e:
+            print(f"❌ Invalid capture filter: {e}")
+            return
+        writer = self._stream_to_file(args)
+        try:
+            self.capturer.start_capture(args.count, args.timeout if args.timeout is not None else 30)
+        finally:
+            self._close_stream(writer)
         
         if self.capturer.captured_packets:
             print(f"✅ Successfully captured {len(self.capturer.captured_packets)} packets")
@@ -201,11 +342,18 @@ Examples:
         
         print(f"\n🔍 APPLYING FILTERS...")
         
-        if args.filter_protocol:
-            self.filters.add_protocol_filter(args.filter_protocol.upper())
-        
-        if args.filter_src_ip or args.filter_dst_ip:
-            self.filters.add_ip_filter(args.filter_src_ip, args.filter_dst_ip)
+        try:
+            if args.filter:
+                self.filters.add_expression(args.filter)
+            
+            if args.filter_protocol:
+                self.filters.add_protocol_filter(args.filter_protocol.upper())
+            
+            if args.filter_src_ip or args.filter_dst_ip:
+                self.filters.add_ip_filter(args.filter_src_ip, args.filter_dst_ip)
+        except FilterSyntaxError as e:
+            print(f"❌ Invalid filter: {e}")
+            return
         
         filtered_packets = self.filters.apply_filters(self.capturer.captured_packets)
         
@@ -248,9 +396,20 @@ Examples:
             return
         
         print(f"\n📊 GENERATING TRAFFIC STATISTICS...")
-        statistics = self.stats.generate_statistics(self.capturer.captured_packets)
+        if self.workers:
+            statistics = self._run_parallel()['statistics'].snapshot()
+        else:
+            statistics = self.stats.snapshot()
         self.stats.display_statistics(statistics)
     
+    def show_flows(self):
+        """Show the largest tracked flows"""
+        if not self.capturer or not self.capturer.captured_packets:
+            print("❌ No packets available for flow tracking")
+            return
+        
+        self.flows.display_flows()
+    
     def detect_issues(self):
         """Detect network issues"""
         if not self.capturer or not self.capturer.captured_packets:
@@ -258,19 +417,43 @@ Examples:
             return
         
         print(f"\n🚨 DETECTING NETWORK ISSUES...")
-        issues = self.detector.analyze_packets(self.capturer.captured_packets)
+        if self.workers:
+            self.detector.detected_issues = self._run_parallel()['issues']
+        else:
+            self.detector.analyze_packets(self.capturer.captured_packets)
         self.detector.display_issues()
         
+    def _run_parallel(self):
+        """Statistics, issues and parse counts from the worker processes (computed once per capture)"""
+        if self._parallel_results is None:
+            analyzer = ParallelAnalyzer(self.workers, self.parser.backend)
+            started = time.perf_counter()
+            self._parallel_results = analyzer.analyze(self.capturer.captured_packets)
+            print(f"⚙️  Analyzed {len(self.capturer.captured_packets)} packets on "
+                  f"{self._parallel_results['workers']} worker(s) in {time.perf_counter() - started:.2f}s")
+        return self._parallel_results
+    
     def save_capture(self, args):
         """Save captured packets to file"""
+        if self._streamed_to:
+            print(f"✅ Capture already saved to {self._streamed_to}")
+            return
         if not self.capturer or not self.capturer.captured_packets:
             print("❌ No packets available to save")
             return
+        if args.save_format == 'rolling':
+            # Packets not captured live (e.g. --load): filed into segments in one go
+            writer = self._open_stream(args)
+            writer.write_many(self.capturer.captured_packets)
+            writer.close()
+            print(f"💾 Wrote {writer.count} packets to {writer.path}")
+            return
     
         self.storage.save_capture(
             self.capturer.captured_packets, 
             args.save, 
-            args.save_format
+            args.save_format,
+            index=args.index
         )
 
     def load_capture(self, args):
@@ -278,8 +461,11 @@ Examples:
         packets = self.storage.load_capture(args.load)
         if packets:
             # Create a new capturer instance and load the packets
-            self.capturer = PacketCapturer()
-            self.capturer.captured_packets = packets
+            self._new_capturer()
+            self.capturer.captured_packets = PacketTable(packets)
+            if not self.workers:
+                self.stats.update_batch(self.capturer.captured_packets)
+            self.flows.update_batch(self.capturer.captured_packets)
             self.capturer.packet_count = len(packets)
             print(f"✅ Loaded {len(packets)} packets into analyzer")
             
@@ -305,14 +491,27 @@ Examples:
         print(f"\n📖 PARSING ALL {len(self.capturer.captured_packets)} PACKETS...")
         
         protocol_count = {}
-        for packet in self.capturer.captured_packets:
-            protocol = packet.get('protocol', 'Unknown')
-            protocol_count[protocol] = protocol_count.get(protocol, 0) + 1
+        layer_count = {}
+        started = time.perf_counter()
+        if self.workers:
+            results = self._run_parallel()
+            protocol_count, layer_count = results['protocol_count'], results['layer_count']
+        else:
+            for packet in self.capturer.captured_packets:
+                protocol = packet.get('protocol', 'Unknown')
+                protocol_count[protocol] = protocol_count.get(protocol, 0) + 1
+                for layer in self.parser.parse_packet(packet)['layers']:
+                    layer_count[layer] = layer_count.get(layer, 0) + 1
+        elapsed = time.perf_counter() - started
         
         print("📋 PROTOCOL SUMMARY:")
         for protocol, count in protocol_count.items():
             percentage = (count / len(self.capturer.captured_packets)) * 100
             print(f"   {protocol}: {count} packets ({percentage:.1f}%)")
+        
+        print(f"🧱 LAYERS FOUND ({self.parser.backend} parser, {elapsed:.3f}s):")
+        for layer, count in layer_count.items():
+            print(f"   {layer}: {count} packets")
 
 def main():
     """Main function"""
@@ -0,0 +1,654 @@
+# src/decoder.py
+"""
+Fast header decoder working directly on frame bytes
+
+Decodes Ethernet / IPv4 / IPv6 / TCP / UDP / ICMP / ARP / DNS headers with
+struct.unpack_from instead of building Scapy objects. Works on bytes,
+bytearray or memoryview without copying the frame.
+"""
+import socket
+import struct
+
+from src.table import encode_address, unique_rows
+
+# pcap link-layer header types
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+ETH_P_IP = 0x0800
+ETH_P_ARP = 0x0806
+ETH_P_IPV6 = 0x86DD
+VLAN_TYPES = (0x8100, 0x88A8, 0x9100)
+
+IPPROTO_ICMP = 1
+IPPROTO_TCP = 6
+IPPROTO_UDP = 17
+IPPROTO_ICMPV6 = 58
+IPV6_EXTENSION_HEADERS = (0, 43, 44, 51, 60)
+# IP-in-IP, IPv6-in-IPv4 and GRE carry further IP layers Scapy would dissect
+IP_ENCAPSULATIONS = (4, 41, 47)
+
+# ICMPv6 types the capturer reports as ICMPv6 (Router Advertisement, MLDv2 report)
+ICMPV6_REPORTED_TYPES = (134, 143)
+
+_ETHER = struct.Struct('!12xH')
+_VLAN = struct.Struct('!2xH')
+_IPV4 = struct.Struct('!BxH2xHxB2xII')
+_IPV6 = struct.Struct('!4xHBB16s16s')
+_IPV6_EXT = struct.Struct('!BB')
+_PORTS = struct.Struct('!HH')
+_TCP = struct.Struct('!HHIIBBH')
+_UDP = struct.Struct('!HHH')
+_ICMP = struct.Struct('!BB')
+_ARP = struct.Struct('!6xH6sI6sI')
+_DNS = struct.Struct('!HHH')
+_ETHER_HEADER = struct.Struct('!6s6sH')
+_IPV4_HEADER = struct.Struct('!BxHxxHBBxxII')
+_IPV6_HEADER = struct.Struct('!4xHBB16s16s')
+_TCP_HEADER = struct.Struct('!HHIIxBH')
+_U16 = struct.Struct('!H')
+_SACK_BLOCK = struct.Struct('!II')
+_U32_NATIVE = struct.Struct('=I')
+
+# Flag letters in Scapy's order, precomputed for every flag byte
+_FLAG_LETTERS = 'FSRPAUEC'
+TCP_FLAG_STRINGS = tuple(
+    ''.join(letter for bit, letter in enumerate(_FLAG_LETTERS) if value & (1 << bit))
+    for value in range(256)
+)
+
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_PSH = 0x08
+TCP_ACK = 0x10
+TCP_URG = 0x20
+
+BROADCAST_MAC = b'\xff' * 6
+
+_ipv4_cache = {}
+_ipv6_cache = {}
+
+
+def ipv4_to_str(value):
+    """Format a 32-bit integer as dotted IPv4, caching frequent hosts"""
+    text = _ipv4_cache.get(value)
+    if text is None:
+        text = socket.inet_ntop(socket.AF_INET, value.to_bytes(4, 'big'))
+        if len(_ipv4_cache) < 65536:
+            _ipv4_cache[value] = text
+    return text
+
+
+def ipv6_to_str(packed):
+    """Format 16 packed bytes as an IPv6 address, caching frequent hosts"""
+    text = _ipv6_cache.get(packed)
+    if text is None:
+        text = socket.inet_ntop(socket.AF_INET6, packed)
+        if len(_ipv6_cache) < 65536:
+            _ipv6_cache[packed] = text
+    return text
+
+
+def mac_to_str(packed):
+    """Format 6 bytes as a colon separated MAC address"""
+    return bytes(packed).hex(':')
+
+
+def network_offset(data, linktype):
+    """
+    Find where the network layer starts in a frame
+    Returns (ethertype, offset) or (None, None) for unknown link types
+    """
+    if linktype == LINKTYPE_ETHERNET:
+        if len(data) < 14:
+            return None, None
+        ethertype = _ETHER.unpack_from(data, 0)[0]
+        offset = 14
+        while ethertype in VLAN_TYPES and len(data) >= offset + 4:
+            ethertype = _VLAN.unpack_from(data, offset)[0]
+            offset += 4
+        return ethertype, offset
+    if linktype == LINKTYPE_RAW or linktype == 12 or linktype == 14:
+        if not len(data):
+            return None, None
+        return (ETH_P_IPV6 if data[0] >> 4 == 6 else ETH_P_IP), 0
+    if linktype == LINKTYPE_IPV4:
+        return ETH_P_IP, 0
+    if linktype == LINKTYPE_IPV6:
+        return ETH_P_IPV6, 0
+    if linktype == LINKTYPE_LINUX_SLL:
+        if len(data) < 16:
+            return None, None
+        return _U16.unpack_from(data, 14)[0], 16
+    if linktype == LINKTYPE_LINUX_SLL2:
+        if len(data) < 20:
+            return None, None
+        return _U16.unpack_from(data, 0)[0], 20
+    if linktype == LINKTYPE_NULL:
+        if len(data) < 4:
+            return None, None
+        family = _U32_NATIVE.unpack_from(data, 0)[0]
+        if family == 2:
+            return ETH_P_IP, 4
+        if family in (10, 24, 28, 30):
+            return ETH_P_IPV6, 4
+        return None, None
+    return None, None
+
+
+def dns_question(data, offset, end):
+    """
+    Decode the first question of a DNS message
+    Returns (is_response, qname, qtype) or None if it does not look like DNS
+    """
+    if end - offset < 12:
+        return None
+    flags, questions = _DNS.unpack_from(data, offset + 2)[:2]
+    if not questions:
+        return None
+    labels = []
+    position = offset + 12
+    while position < end:
+        size = data[position]
+        if size == 0:
+            position += 1
+            break
+        if size & 0xC0 or position + 1 + size > end:
+            return None  # Compression pointers do not appear in a first question
+        labels.append(bytes(data[position + 1:position + 1 + size]).decode('ascii', 'replace'))
+        position += 1 + size
+    else:
+        return None
+    if position + 2 > end:
+        return None
+    qtype = _U16.unpack_from(data, position)[0]
+    return bool(flags & 0x8000), '.'.join(labels) + '.', qtype
+
+
+def tcp_sack(data, offset, end):
+    """
+    First SACK block of the TCP options in data[offset:end]
+    Returns (left edge, right edge) or None. RFC 2018 puts the block holding
+    the most recently received segment first.
+    """
+    while offset < end:
+        kind = data[offset]
+        if kind == 0:
+            return None
+        if kind == 1:
+            offset += 1
+            continue
+        if offset + 1 >= end:
+            return None
+        size = data[offset + 1]
+        if size < 2:
+            return None
+        if kind == 5 and size >= 10 and offset + 10 <= end:
+            return _SACK_BLOCK.unpack_from(data, offset + 2)
+        offset += size
+    return None
+
+
+def decode_headers(data, linktype=LINKTYPE_ETHERNET):
+    """
+    Decode the raw L2-L4 header fields of one frame
+    Returns {'ethernet': {...}, 'ip' or 'ipv6': {...}, 'tcp'/'udp'/'icmpv6': {...}}
+    using Scapy's field names, or None when the frame needs a full dissector
+    (unknown link or network protocols, tunnels, truncated headers).
+    """
+    ethertype, offset = network_offset(data, linktype)
+    if ethertype is None:
+        return None
+    size = len(data)
+    headers = {}
+    if linktype == LINKTYPE_ETHERNET:
+        dst, src, outer_type = _ETHER_HEADER.unpack_from(data, 0)
+        headers['ethernet'] = {'src': mac_to_str(src), 'dst': mac_to_str(dst), 'type': outer_type}
+
+    if ethertype == ETH_P_ARP:
+        return headers
+    if ethertype == ETH_P_IP and size >= offset + 20:
+        version_ihl, total_length, fragment, ttl, proto, src, dst = _IPV4_HEADER.unpack_from(data, offset)
+        headers['ip'] = {
+            'src': ipv4_to_str(src), 'dst': ipv4_to_str(dst),
+            'ttl': ttl, 'proto': proto, 'len': total_length
+        }
+        if fragment & 0x1FFF:
+            return headers  # Later fragments carry no transport header
+        transport = offset + (version_ihl & 0x0F) * 4
+        end = min(size, offset + total_length) if total_length else size
+    elif ethertype == ETH_P_IPV6 and size >= offset + 40:
+        payload_length, proto, hop_limit, src, dst = _IPV6_HEADER.unpack_from(data, offset)
+        headers['ipv6'] = {
+            'src': ipv6_to_str(src), 'dst': ipv6_to_str(dst),
+            'hlim': hop_limit, 'plen': payload_length
+        }
+        transport = offset + 40
+        end = min(size, transport + payload_length) if payload_length else size
+        while proto in IPV6_EXTENSION_HEADERS and transport + 8 <= end:
+            next_header, ext_length = _IPV6_EXT.unpack_from(data, transport)
+            transport += 8 if proto == 44 else (ext_length + 2) * 4 if proto == 51 else (ext_length + 1) * 8
+            proto = next_header
+    else:
+        return None
+
+    if proto == IPPROTO_TCP:
+        if end < transport + 20:
+            return None
+        sport, dport, seq, ack, flags, window = _TCP_HEADER.unpack_from(data, transport)
+        headers['tcp'] = {'sport': sport, 'dport': dport, 'seq': seq, 'ack': ack, 'flags': flags, 'window': window}
+    elif proto == IPPROTO_UDP:
+        if end < transport + 8:
+            return None
+        sport, dport, length = _UDP.unpack_from(data, transport)
+        headers['udp'] = {'sport': sport, 'dport': dport, 'len': length}
+    elif proto == IPPROTO_ICMPV6 and 'ipv6' in headers:
+        if end < transport + 2:
+            return None
+        icmp_type, icmp_code = _ICMP.unpack_from(data, transport)
+        headers['icmpv6'] = {'type': icmp_type, 'code': icmp_code}
+    elif proto in IP_ENCAPSULATIONS or proto in IPV6_EXTENSION_HEADERS:
+        return None
+    return headers
+
+
+def decode_frame(data, linktype=LINKTYPE_ETHERNET):
+    """
+    Decode the headers of one frame into capturer-style fields
+    Returns a dict with 'protocol', 'summary', 'is_broadcast' and
+    'is_multicast', plus addresses, ports, the transport protocol
+    ('l4_protocol'), TCP flags/seq/ack/window, payload length (tcp_len) and
+    first SACK block (tcp_sack_left/tcp_sack_right), and the first DNS
+    question (dns_qname/dns_qtype/dns_response) whenever the frame has them.
+    """
+    size = len(data)
+    group = linktype == LINKTYPE_ETHERNET and size >= 6 and data[0] & 1
+    broadcast = bool(group) and bytes(data[:6]) == BROADCAST_MAC
+    fields = {'is_broadcast': broadcast, 'is_multicast': bool(group) and not broadcast}
+    ethertype, offset = network_offset(data, linktype)
+    layers = 'Ether' if linktype == LINKTYPE_ETHERNET else 'Raw'
+
+    if ethertype == ETH_P_IP and size >= offset + 20:
+        version_ihl, total_length, fragment, proto, src, dst = _IPV4.unpack_from(data, offset)
+        src_ip = ipv4_to_str(src)
+        dst_ip = ipv4_to_str(dst)
+        fields['src_ip'] = src_ip
+        fields['dst_ip'] = dst_ip
+        if dst == 0xFFFFFFFF:
+            fields['is_broadcast'] = True
+            fields['is_multicast'] = False
+        elif dst >> 28 == 14:
+            fields['is_multicast'] = not fields['is_broadcast']
+        transport = offset + (version_ihl & 0x0F) * 4
+        declared_end = offset + total_length if total_length else size
+        end = min(size, declared_end)
+        layers += ' / IP'
+        protocol = 'IP'
+        if fragment & 0x1FFF:
+            # Later fragments carry no transport header
+            fields['protocol'] = protocol
+            fields['summary'] = f"{layers} {src_ip} > {dst_ip} proto={proto}"
+            return fields
+    elif ethertype == ETH_P_IPV6 and size >= offset + 40:
+        payload_length, proto, _, src, dst = _IPV6.unpack_from(data, offset)
+        src_ip = ipv6_to_str(src)
+        dst_ip = ipv6_to_str(dst)
+        fields['src_ip'] = src_ip
+        fields['dst_ip'] = dst_ip
+        if dst[0] == 0xFF:
+            fields['is_multicast'] = not fields['is_broadcast']
+        transport = offset + 40
+        declared_end = transport + payload_length if payload_length else size
+        end = min(size, declared_end)
+        while proto in IPV6_EXTENSION_HEADERS and transport + 8 <= end:
+            next_header, ext_length = _IPV6_EXT.unpack_from(data, transport)
+            transport += 8 if proto == 44 else (ext_length + 2) * 4 if proto == 51 else (ext_length + 1) * 8
+            proto = next_header
+        layers += ' / IPv6'
+        protocol = 'IPv6'
+    elif ethertype == ETH_P_ARP and size >= offset + 28:
+        operation, _, sender, _, target = _ARP.unpack_from(data, offset)
+        src_ip = ipv4_to_str(sender)
+        dst_ip = ipv4_to_str(target)
+        fields['src_ip'] = src_ip
+        fields['dst_ip'] = dst_ip
+        fields['protocol'] = 'ARP'
+        action = 'who has' if operation == 1 else 'is at'
+        fields['summary'] = f"{layers} / ARP {action} {dst_ip} says {src_ip}"
+        return fields
+    else:
+        fields['protocol'] = 'Other'
+        fields['summary'] = f"{layers} / type 0x{ethertype or 0:04x}"
+        return fields
+
+    if proto == IPPROTO_TCP and end >= transport + 20:
+        src_port, dst_port, seq, ack, data_offset, flags, window = _TCP.unpack_from(data, transport)
+        header_length = (data_offset >> 4) * 4
+        fields['src_port'] = src_port
+        fields['dst_port'] = dst_port
+        fields['l4_protocol'] = 'TCP'
+        fields['tcp_flags'] = flags
+        fields['tcp_seq'] = seq
+        fields['tcp_ack'] = ack
+        fields['tcp_window'] = window
+        # Payload length from the IP header, so snaplen-truncated frames still count it
+        fields['tcp_len'] = max(0, declared_end - transport - header_length)
+        sack = tcp_sack(data, transport + 20, min(end, transport + header_length))
+        if sack is not None:
+            fields['tcp_sack_left'], fields['tcp_sack_right'] = sack
+        fields['protocol'] = 'TCP'
+        fields['summary'] = f"{layers} / TCP {src_ip}:{src_port} > {dst_ip}:{dst_port} {TCP_FLAG_STRINGS[flags]}"
+    elif proto == IPPROTO_UDP and end >= transport + 8:
+        src_port, dst_port = _PORTS.unpack_from(data, transport)
+        fields['src_port'] = src_port
+        fields['dst_port'] = dst_port
+        fields['l4_protocol'] = 'UDP'
+        fields['protocol'] = 'UDP'
+        summary = f"{layers} / UDP {src_ip}:{src_port} > {dst_ip}:{dst_port}"
+        if src_port == 53 or dst_port == 53 or src_port == 5353 or dst_port == 5353:
+            question = dns_question(data, transport + 8, end)
+            if question is not None:
+                is_response, qname, qtype = question
+                fields['dns_qname'] = qname
+                fields['dns_qtype'] = qtype
+                fields['dns_response'] = is_response
+                summary += f" / DNS {'Ans' if is_response else 'Qry'} {qname}"
+        fields['summary'] = summary
+    elif proto == IPPROTO_ICMP and end >= transport + 2:
+        icmp_type, icmp_code = _ICMP.unpack_from(data, transport)
+        fields['l4_protocol'] = 'ICMP'
+        fields['protocol'] = 'ICMP'
+        fields['summary'] = f"{layers} / ICMP {src_ip} > {dst_ip} type={icmp_type} code={icmp_code}"
+    elif proto == IPPROTO_ICMPV6 and end >= transport + 2:
+        icmp_type, icmp_code = _ICMP.unpack_from(data, transport)
+        fields['l4_protocol'] = 'ICMPv6'
+        if icmp_type in ICMPV6_REPORTED_TYPES:
+            fields['protocol'] = 'ICMPv6'
+        else:
+            fields['protocol'] = protocol
+        fields['summary'] = f"{layers} / ICMPv6 {src_ip} > {dst_ip} type={icmp_type} code={icmp_code}"
+    else:
+        fields['protocol'] = protocol
+        fields['summary'] = f"{layers} {src_ip} > {dst_ip} proto={proto}"
+    return fields
+
+
+def decode_columns(buffer, offsets, lengths, linktype=LINKTYPE_ETHERNET):
+    """
+    Vectorized decode of many frames held in one buffer (requires NumPy)
+
+    offsets/lengths locate each captured frame inside buffer. The common
+    IPv4/IPv6 + TCP/UDP/ICMP frames are decoded with array operations; the
+    rest (ARP, IPv6 extension headers, DNS, truncated frames...) go through
+    decode_frame. Returns (values, present) for PacketTable.extend_columns,
+    without the number/timestamp/length columns which the caller knows.
+    """
+    import numpy as np
+
+    buf = np.frombuffer(buffer, dtype=np.uint8)
+    count = len(offsets)
+    last = len(buf) - 1
+    start = np.asarray(offsets, dtype=np.int64)
+    end = start + np.asarray(lengths, dtype=np.int64)
+
+    def u8(position):
+        return buf[np.clip(position, 0, last)].astype(np.uint64)
+
+    def be(position, size):
+        value = np.zeros(len(position), dtype=np.uint64)
+        for byte in range(size):
+            value = (value << np.uint64(8)) | u8(position + byte)
+        return value
+
+    # Link layer -> network layer offset and ethertype
+    if linktype == LINKTYPE_ETHERNET:
+        ethertype = be(start + 12, 2)
+        network = start + 14
+        tagged = np.isin(ethertype, VLAN_TYPES)
+        ethertype = np.where(tagged, be(start + 16, 2), ethertype)
+        network = network + 4 * tagged
+        prefix = 'Ether'
+    elif linktype in (LINKTYPE_RAW, 12, 14, LINKTYPE_IPV4, LINKTYPE_IPV6):
+        network = start
+        ethertype = np.where(u8(start) >> np.uint64(4) == 6, ETH_P_IPV6, ETH_P_IP).astype(np.uint64)
+        prefix = 'Raw'
+    elif linktype == LINKTYPE_LINUX_SLL:
+        ethertype = be(start + 14, 2)
+        network = start + 16
+        prefix = 'Raw'
+    elif linktype == LINKTYPE_LINUX_SLL2:
+        ethertype = be(start, 2)
+        network = start + 20
+        prefix = 'Raw'
+    else:
+        ethertype = np.zeros(count, dtype=np.uint64)
+        network = start
+        prefix = 'Raw'
+
+    version = u8(network) >> np.uint64(4)
+    ipv4 = (ethertype == ETH_P_IP) & (version == 4) & (network + 20 <= end)
+    ipv6 = (ethertype == ETH_P_IPV6) & (version == 6) & (network + 40 <= end)
+
+    # Network layer
+    header_length = (u8(network) & np.uint64(0x0F)).astype(np.int64) * 4
+    transport = np.where(ipv6, network + 40, network + header_length)
+    ip_length = np.where(ipv6, be(network + 4, 2) + np.uint64(40), be(network + 2, 2)).astype(np.int64)
+    ip_end = np.where(ip_length > 0, np.minimum(end, network + ip_length), end)
+    proto = np.where(ipv6, u8(network + 6), u8(network + 9))
+    # Later IPv4 fragments carry no transport header
+    fragment = ipv4 & ((be(network + 6, 2) & np.uint64(0x1FFF)) != 0)
+
+    families = np.where(ipv6, 6, 4).astype(np.uint8)
+    src_high = np.where(ipv6, be(network + 8, 8), 0).astype(np.uint64)
+    src_low = np.where(ipv6, be(network + 16, 8), be(network + 12, 4))
+    dst_high = np.where(ipv6, be(network + 24, 8), 0).astype(np.uint64)
+    dst_low = np.where(ipv6, be(network + 32, 8), be(network + 16, 4))
+
+    # Transport layer
+    tcp = (proto == IPPROTO_TCP) & ~fragment & (transport + 20 <= ip_end)
+    udp = (proto == IPPROTO_UDP) & ~fragment & (transport + 8 <= ip_end)
+    icmp = (proto == IPPROTO_ICMP) & ~ipv6 & ~fragment & (transport + 2 <= ip_end)
+    icmpv6 = (proto == IPPROTO_ICMPV6) & ipv6 & (transport + 2 <= ip_end)
+    ported = tcp | udp
+    src_port = np.where(ported, be(transport, 2), 0)
+    dst_port = np.where(ported, be(transport + 2, 2), 0)
+    flags = np.where(tcp, u8(transport + 13), 0)
+    seq = np.where(tcp, be(transport + 4, 4), 0)
+    ack = np.where(tcp, be(transport + 8, 4), 0)
+    window = np.where(tcp, be(transport + 14, 2), 0)
+    tcp_header = (u8(transport + 12) >> np.uint64(4)).astype(np.int64) * 4
+    declared_end = np.where(ip_length > 0, network + ip_length, end)
+    payload = np.where(tcp, np.maximum(declared_end - transport - tcp_header, 0), 0)
+    sack, sack_left, sack_right = _sack_columns(u8, be, tcp & (tcp_header > 20), transport,
+                                                np.minimum(ip_end, transport + tcp_header))
+    icmp_type = u8(transport)
+    icmp_code = u8(transport + 1)
+
+    # Broadcast / multicast from the destination MAC and IP address
+    if linktype == LINKTYPE_ETHERNET:
+        group = (u8(start) & np.uint64(1)).astype(bool) & (start + 6 <= end)
+        broadcast = group & (be(start, 6) == 0xFFFFFFFFFFFF)
+    else:
+        group = np.zeros(count, dtype=bool)
+        broadcast = group.copy()
+    broadcast |= ipv4 & (dst_low == 0xFFFFFFFF)
+    multicast = group | ipv4 & (dst_low >> np.uint64(28) == 14) | ipv6 & (dst_high >> np.uint64(56) == 0xFF)
+    multicast &= ~broadcast
+
+    # Anything unusual is decoded frame by frame
+    decoded = tcp | udp | icmp | icmpv6 | fragment
+    truncated = ~decoded & np.isin(proto, (IPPROTO_TCP, IPPROTO_UDP, IPPROTO_ICMP, IPPROTO_ICMPV6))
+    dns = udp & np.isin(src_port, (53, 5353)) | udp & np.isin(dst_port, (53, 5353))
+    extension = ipv6 & np.isin(proto, IPV6_EXTENSION_HEADERS)
+    structural = ~(ipv4 | ipv6) | truncated | extension | (transport > ip_end)
+    fallback = structural | dns
+
+    # Protocol name per packet
+    protocol_names = ['IP', 'IPv6', 'TCP', 'UDP', 'ICMP', 'ICMPv6']
+    protocol_codes = np.where(ipv6, 1, 0)
+    protocol_codes = np.where(tcp, 2, protocol_codes)
+    protocol_codes = np.where(udp, 3, protocol_codes)
+    protocol_codes = np.where(icmp, 4, protocol_codes)
+    protocol_codes = np.where(icmpv6 & np.isin(icmp_type, ICMPV6_REPORTED_TYPES), 5, protocol_codes)
+
+    # Transport protocol per packet
+    l4_names = ['TCP', 'UDP', 'ICMP', 'ICMPv6']
+    l4_codes = np.where(tcp, 0, np.where(udp, 1, np.where(icmp, 2, 3)))
+
+    # One summary per distinct header combination instead of per packet
+    kind = np.where(tcp, 0, np.where(udp, 1, np.where(icmp | icmpv6, 2, 3)))
+    detail = np.where(tcp, flags, np.where(icmp | icmpv6, icmp_type << np.uint64(8) | icmp_code, proto))
+    keys = np.stack([
+        kind.astype(np.uint64), families.astype(np.uint64), src_high, src_low, dst_high, dst_low,
+        src_port.astype(np.uint64), dst_port.astype(np.uint64), detail.astype(np.uint64)
+    ], axis=1)
+    keys[fallback] = 0
+    first, inverse = unique_rows(keys)
+    unique_summaries = []
+    for row in first.tolist():
+        if fallback[row]:
+            unique_summaries.append(None)
+            continue
+        if families[row] == 4:
+            src_ip = ipv4_to_str(int(src_low[row]))
+            dst_ip = ipv4_to_str(int(dst_low[row]))
+            layers = prefix + ' / IP'
+        else:
+            src_ip = ipv6_to_str(((int(src_high[row]) << 64) | int(src_low[row])).to_bytes(16, 'big'))
+            dst_ip = ipv6_to_str(((int(dst_high[row]) << 64) | int(dst_low[row])).to_bytes(16, 'big'))
+            layers = prefix + ' / IPv6'
+        if tcp[row]:
+            summary = f"{layers} / TCP {src_ip}:{src_port[row]} > {dst_ip}:{dst_port[row]} {TCP_FLAG_STRINGS[flags[row]]}"
+        elif udp[row]:
+            summary = f"{layers} / UDP {src_ip}:{src_port[row]} > {dst_ip}:{dst_port[row]}"
+        elif icmp[row] or icmpv6[row]:
+            name = 'ICMP' if icmp[row] else 'ICMPv6'
+            summary = f"{layers} / {name} {src_ip} > {dst_ip} type={icmp_type[row]} code={icmp_code[row]}"
+        else:
+            summary = f"{layers} {src_ip} > {dst_ip} proto={proto[row]}"
+        unique_summaries.append(summary)
+    summaries = [unique_summaries[index] for index in inverse.tolist()]
+
+    values = {
+        'protocol': (protocol_codes, protocol_names),
+        'src_ip': (families, src_high, src_low),
+        'dst_ip': (families.copy(), dst_high, dst_low),
+        'src_port': src_port,
+        'dst_port': dst_port,
+        'l4_protocol': (l4_codes, l4_names),
+        'tcp_flags': flags,
+        'tcp_seq': seq,
+        'tcp_ack': ack,
+        'tcp_window': window,
+        'tcp_len': payload,
+        'tcp_sack_left': sack_left,
+        'tcp_sack_right': sack_right,
+        'dns_qname': (np.zeros(count, dtype=np.int64), []),
+        'dns_qtype': np.zeros(count, dtype=np.uint16),
+        'dns_response': np.zeros(count, dtype=np.uint8),
+        'is_broadcast': broadcast.astype(np.uint8),
+        'is_multicast': multicast.astype(np.uint8),
+        'summary': summaries
+    }
+    has_address = ipv4 | ipv6
+    no_question = np.zeros(count, dtype=bool)
+    present = {
+        'src_ip': has_address.copy(),
+        'dst_ip': has_address.copy(),
+        'src_port': ported.copy(),
+        'dst_port': ported.copy(),
+        'l4_protocol': tcp | udp | icmp | icmpv6,
+        'tcp_flags': tcp.copy(),
+        'tcp_seq': tcp.copy(),
+        'tcp_ack': tcp.copy(),
+        'tcp_window': tcp.copy(),
+        'tcp_len': tcp.copy(),
+        'tcp_sack_left': sack,
+        'tcp_sack_right': sack.copy(),
+        'dns_qname': no_question,
+        'dns_qtype': no_question.copy(),
+        'dns_response': no_question.copy()
+    }
+
+    # Patch the frames that need the full per-frame decoder
+    names = {name: code for code, name in enumerate(protocol_names)}
+    qname_codes, qnames = values['dns_qname']
+    qname_ids = {}
+    for row in np.flatnonzero(fallback).tolist():
+        fields = decode_frame(memoryview(buffer)[start[row]:end[row]], linktype)
+        protocol = fields['protocol']
+        if protocol not in names:
+            names[protocol] = len(protocol_names)
+            protocol_names.append(protocol)
+        protocol_codes[row] = names[protocol]
+        summaries[row] = fields['summary']
+        qname = fields.get('dns_qname')
+        if qname is not None:
+            if qname not in qname_ids:
+                qname_ids[qname] = len(qnames)
+                qnames.append(qname)
+            qname_codes[row] = qname_ids[qname]
+            values['dns_qtype'][row] = fields['dns_qtype']
+            values['dns_response'][row] = fields['dns_response']
+            for name in ('dns_qname', 'dns_qtype', 'dns_response'):
+                present[name][row] = True
+        if not structural[row]:
+            continue  # DNS: addresses and ports were decoded above
+        for name in ('src_ip', 'dst_ip'):
+            address = fields.get(name)
+            present[name][row] = address is not None
+            if address is not None:
+                family, high, low = encode_address(address)
+                values[name][0][row] = family
+                values[name][1][row] = high
+                values[name][2][row] = low
+        l4_protocol = fields.get('l4_protocol')
+        present['l4_protocol'][row] = l4_protocol is not None
+        l4_codes[row] = l4_names.index(l4_protocol) if l4_protocol is not None else 0
+        for name in ('src_port', 'dst_port', 'tcp_flags', 'tcp_seq', 'tcp_ack', 'tcp_window', 'tcp_len',
+                     'tcp_sack_left', 'tcp_sack_right'):
+            present[name][row] = name in fields
+            values[name][row] = fields.get(name, 0)
+        values['is_broadcast'][row] = fields['is_broadcast']
+        values['is_multicast'][row] = fields['is_multicast']
+    return values, present
+
+
+def _sack_columns(u8, be, rows, transport, options_end):
+    """
+    Vectorized tcp_sack(): walk the TCP options of the selected rows in lockstep
+    Returns (has SACK, left edges, right edges) for every packet.
+    """
+    import numpy as np
+
+    count = len(rows)
+    found = np.zeros(count, dtype=bool)
+    left = np.zeros(count, dtype=np.uint64)
+    right = np.zeros(count, dtype=np.uint64)
+    active = np.flatnonzero(rows)
+    cursor = transport[active] + 20
+    limit = options_end[active]
+    # 40 bytes of options hold at most 40 options
+    for _ in range(40):
+        live = cursor < limit
+        active, cursor, limit = active[live], cursor[live], limit[live]
+        if not len(active):
+            break
+        kind = u8(cursor)
+        size = np.where(cursor + 1 < limit, u8(cursor + 1), 0).astype(np.int64)
+        is_sack = (kind == 5) & (size >= 10) & (cursor + 10 <= limit)
+        hits = active[is_sack]
+        found[hits] = True
+        left[hits] = be(cursor[is_sack] + 2, 4)
+        right[hits] = be(cursor[is_sack] + 6, 4)
+        # End of options, malformed lengths and the rows already answered stop here
+        keep = (kind != 0) & ~is_sack & ((kind == 1) | (size >= 2))
+        cursor = np.where(kind == 1, cursor + 1, cursor + size)[keep]
+        active, limit = active[keep], limit[keep]
+    return found, left, right
@@ -1,7 +1,36 @@
 # src/detector.py
-from collections import defaultdict, Counter
+from collections import Counter
+import heapq
 import time
 
+from src.reporting import get_logger
+from src.tcp_analysis import TcpAnalyzer
+
+log = get_logger('detector')
+
+# Flows reported per TCP issue type, most affected first
+MAX_FLOWS_PER_ISSUE = 5
+
+# (analyzer event, issue type, severity, description, educational note)
+TCP_SEQUENCE_ISSUES = (
+    ('retransmission', 'TCP_RETRANSMISSION', 'MEDIUM', 'TCP segments retransmitted',
+     'Retransmissions mean segments were lost or their ACKs came too late - a sign of congestion or packet loss'),
+    ('spurious_retransmission', 'TCP_SPURIOUS_RETRANSMISSION', 'LOW', 'TCP data resent after it was acknowledged',
+     'Spurious retransmissions resend data the receiver already had (ACKed or SACKed): the sender timed out too early'),
+    ('out_of_order', 'TCP_OUT_OF_ORDER', 'LOW', 'TCP segments arrived out of order',
+     'Reordering happens when packets take different paths; TCP fixes it, but heavy reordering triggers needless retransmits'),
+    ('dup_ack', 'TCP_DUPLICATE_ACKS', 'LOW', 'Duplicate TCP ACKs',
+     'A receiver repeats its ACK when a segment is missing; three in a row make the sender retransmit (fast retransmit)'),
+    ('zero_window', 'TCP_ZERO_WINDOW', 'MEDIUM', 'TCP receiver window full',
+     'A zero window means the receiving application is not reading fast enough, so the sender has to pause'),
+)
+
+
+def _is_tcp(packet):
+    """True for TCP packets (the transport field, or the protocol name without one)"""
+    return packet.get('l4_protocol', packet.get('protocol')) == 'TCP'
+
+
 class IssueDetector:
     """
     Detects potential network issues and anomalies
@@ -10,62 +39,108 @@ class IssueDetector:
     
     def __init__(self):
         self.detected_issues = []
-        print("🚨 IssueDetector initialized!")
+        log.debug("🚨 IssueDetector initialized!")
     
     def analyze_packets(self, packets):
         """Analyze packets for potential network issues"""
         if not packets:
-            print("No packets to analyze for issues")
+            log.info("No packets to analyze for issues")
             return []
         
+        return self.report(self.collect(packets))
+    
+    def collect(self, packets, tcp_analyzer=None):
+        """
+        Run every check over packets and return the mergeable partial results
+        Partials of captures split by flow combine with merge_partials();
+        report() turns them into issues. Per-packet issues are kept as
+        (row, issue) pairs so merged issues stay in capture order.
+        A long-lived tcp_analyzer carries TCP sequence state across calls
+        (consecutive time windows of one stream).
+        """
+        timestamps = [p.get('timestamp', 0) for p in packets]
+        dns_packets = [p for p in packets if p.get('dns_qname')]
+        return {
+            'packets': len(packets),
+            'first_timestamp': min(timestamps, default=0),
+            'last_timestamp': max(timestamps, default=0),
+            'tcp_flows': self._collect_tcp_sequence_issues(packets, tcp_analyzer),
+            'suspicious_ports': self._detect_suspicious_ports(packets),
+            'broadcast': sum(1 for p in packets if p.get('is_broadcast')),
+            'multicast': sum(1 for p in packets if p.get('is_multicast')),
+            'small_packets': self._detect_malformed_packets(packets),
+            'dns_packets': len(dns_packets),
+            'dns_queries': Counter((p['dns_qname'], p.get('dns_qtype')) for p in dns_packets if not p.get('dns_response'))
+        }
+    
+    @staticmethod
+    def merge_partials(partials):
+        """Combine collect() results of disjoint parts of one capture"""
+        partials = [partial for partial in partials if partial['packets']]
+        merged = {
+            'packets': 0, 'first_timestamp': 0, 'last_timestamp': 0, 'tcp_flows': [],
+            'suspicious_ports': [], 'broadcast': 0, 'multicast': 0, 'small_packets': [],
+            'dns_packets': 0, 'dns_queries': Counter()
+        }
+        if partials:
+            merged['first_timestamp'] = min(partial['first_timestamp'] for partial in partials)
+            merged['last_timestamp'] = max(partial['last_timestamp'] for partial in partials)
+        for partial in partials:
+            for key in ('packets', 'broadcast', 'multicast', 'dns_packets'):
+                merged[key] += partial[key]
+            merged['tcp_flows'].extend(partial['tcp_flows'])
+            merged['dns_queries'].update(partial['dns_queries'])
+        for key in ('suspicious_ports', 'small_packets'):
+            merged[key] = list(heapq.merge(*(partial[key] for partial in partials), key=lambda pair: pair[0]))
+        return merged
+    
+    def report(self, partial):
+        """Turn collected (or merged) partial results into the list of issues"""
         self.detected_issues = []
+        if not partial['packets']:
+            return self.detected_issues
         
         # Run all detection methods
-        self._detect_high_retransmissions(packets)
-        self._detect_unusual_traffic_patterns(packets)
-        self._detect_suspicious_ports(packets)
-        self._detect_broadcast_storms(packets)
-        self._detect_malformed_packets(packets)
-        self._detect_dns_issues(packets)
+        self._detect_tcp_sequence_issues(partial['tcp_flows'])
+        self._detect_unusual_traffic_patterns(partial)
+        self.detected_issues.extend(issue for _, issue in partial['suspicious_ports'])
+        self._detect_broadcast_storms(partial)
+        self.detected_issues.extend(issue for _, issue in partial['small_packets'])
+        self._detect_dns_issues(partial)
         
         return self.detected_issues
     
-    def _detect_high_retransmissions(self, packets):
-        """Detect potential TCP retransmission issues"""
-        tcp_packets = [p for p in packets if p.get('protocol') == 'TCP']
-        
-        if len(tcp_packets) < 3:
-            return
-        
-        # Look for patterns that might indicate retransmissions
-        conversations = defaultdict(list)
-        for packet in tcp_packets:
-            summary = packet.get('summary', '')
-            if '>' in summary:
-                # Extract conversation key
-                parts = summary.split('>')
-                if len(parts) == 2:
-                    conv_key = parts[0].strip() + ">" + parts[1].split('/')[0].strip()
-                    conversations[conv_key].append(packet)
-        
-        # Check for repeated sequences that might indicate retransmissions
-        for conv, conv_packets in conversations.items():
-            if len(conv_packets) > 5:
+    def _collect_tcp_sequence_issues(self, packets, analyzer=None):
+        """[(conversation, Counter of events)] of the TCP flows with sequence problems"""
+        if analyzer is None:
+            analyzer = TcpAnalyzer()
+        analyzer.analyze(packets)
+        return analyzer.take_flow_events()
+    
+    def _detect_tcp_sequence_issues(self, flows):
+        """Detect retransmissions, reordering, duplicate ACKs and zero windows from TCP sequence numbers"""
+        for event, issue_type, severity, description, note in TCP_SEQUENCE_ISSUES:
+            # Ties go by conversation so merged shards report the same flows as one pass
+            affected = sorted((flow for flow in flows if flow[1][event]), key=lambda flow: (-flow[1][event], flow[0]))
+            for conversation, events in affected[:MAX_FLOWS_PER_ISSUE]:
+                details = f'{events[event]} {event.replace("_", " ")} events'
+                if event == 'retransmission' and events['spurious_retransmission']:
+                    details += f', plus {events["spurious_retransmission"]} spurious (data the receiver already had)'
                 self.detected_issues.append({
-                    'type': 'POTENTIAL_RETRANSMISSION',
-                    'severity': 'MEDIUM',
-                    'description': f'High TCP activity in conversation: {conv}',
-                    'details': f'Found {len(conv_packets)} TCP packets in this conversation',
-                    'educational_note': 'High TCP packet counts might indicate retransmissions due to network congestion or packet loss'
+                    'type': issue_type,
+                    'severity': severity,
+                    'description': f'{description}: {conversation}',
+                    'details': details,
+                    'educational_note': note
                 })
     
-    def _detect_unusual_traffic_patterns(self, packets):
+    def _detect_unusual_traffic_patterns(self, partial):
         """Detect unusual traffic patterns"""
-        if len(packets) > 20:
+        if partial['packets'] > 20:
             # Check packet rate
-            duration = max(p.get('timestamp', 0) for p in packets) - min(p.get('timestamp', 0) for p in packets)
+            duration = partial['last_timestamp'] - partial['first_timestamp']
             if duration > 0:
-                packet_rate = len(packets) / duration
+                packet_rate = partial['packets'] / duration
                 if packet_rate > 50:  # More than 50 packets per second
                     self.detected_issues.append({
                         'type': 'HIGH_TRAFFIC_RATE',
@@ -86,88 +161,79 @@ class IssueDetector:
             3389: 'RDP (common brute force target)'
         }
         
-        for packet in packets:
-            summary = packet.get('summary', '').lower()
-            for port, description in suspicious_ports.items():
-                if f':{port}' in summary or f'>{port}' in summary:
-                    self.detected_issues.append({
-                        'type': 'SUSPICIOUS_PORT',
-                        'severity': 'MEDIUM',
-                        'description': f'Traffic on potentially suspicious port {port}',
-                        'details': f'{description} - Packet: {summary[:100]}...',
-                        'educational_note': 'Monitor traffic on these ports for potential security issues'
-                    })
-                    break
+        issues = []
+        for row, packet in enumerate(packets):
+            port = packet.get('dst_port')
+            if port not in suspicious_ports:
+                port = packet.get('src_port')
+                if port not in suspicious_ports:
+                    continue
+            summary = packet.get('summary', '')
+            issues.append((row, {
+                'type': 'SUSPICIOUS_PORT',
+                'severity': 'MEDIUM',
+                'description': f'Traffic on potentially suspicious port {port}',
+                'details': f'{suspicious_ports[port]} - Packet: {summary[:100]}...',
+                'educational_note': 'Monitor traffic on these ports for potential security issues'
+            }))
+        return issues
     
-    def _detect_broadcast_storms(self, packets):
+    def _detect_broadcast_storms(self, partial):
         """Detect potential broadcast/multicast storms"""
-        broadcast_packets = []
-        multicast_packets = []
-        
-        for packet in packets:
-            summary = packet.get('summary', '')
-            # Check for broadcast/multicast addresses
-            if 'ff02::' in summary or '224.0.0.' in summary or '255.255.255.255' in summary:
-                if 'ff02::' in summary:
-                    multicast_packets.append(packet)
-                else:
-                    broadcast_packets.append(packet)
+        total = partial['packets']
+        broadcast_packets = partial['broadcast']
+        multicast_packets = partial['multicast']
         
-        if len(broadcast_packets) > len(packets) * 0.3:  # More than 30% broadcast
+        if broadcast_packets > total * 0.3:  # More than 30% broadcast
             self.detected_issues.append({
                 'type': 'POTENTIAL_BROADCAST_STORM',
                 'severity': 'HIGH',
                 'description': 'High volume of broadcast traffic detected',
-                'details': f'{len(broadcast_packets)} broadcast packets ({len(broadcast_packets)/len(packets)*100:.1f}% of total)',
+                'details': f'{broadcast_packets} broadcast packets ({broadcast_packets/total*100:.1f}% of total)',
                 'educational_note': 'Broadcast storms can degrade network performance and may indicate misconfigured devices'
             })
         
-        if len(multicast_packets) > len(packets) * 0.5:  # More than 50% multicast
+        if multicast_packets > total * 0.5:  # More than 50% multicast
             self.detected_issues.append({
                 'type': 'HIGH_MULTICAST_TRAFFIC',
                 'severity': 'MEDIUM',
                 'description': 'High volume of multicast traffic detected',
-                'details': f'{len(multicast_packets)} multicast packets ({len(multicast_packets)/len(packets)*100:.1f}% of total)',
+                'details': f'{multicast_packets} multicast packets ({multicast_packets/total*100:.1f}% of total)',
                 'educational_note': 'Excessive multicast traffic might indicate issues with multicast applications or network configuration'
             })
     
     def _detect_malformed_packets(self, packets):
         """Detect potentially malformed or unusual packets"""
-        for packet in packets:
+        issues = []
+        for row, packet in enumerate(packets):
             length = packet.get('length', 0)
             summary = packet.get('summary', '')
             
             # Check for unusually small packets (might be malformed)
-            if length < 60 and 'TCP' in summary:
-                self.detected_issues.append({
+            if length < 60 and _is_tcp(packet):
+                issues.append((row, {
                     'type': 'UNUSUALLY_SMALL_PACKET',
                     'severity': 'LOW',
                     'description': 'Very small TCP packet detected',
                     'details': f'Packet size: {length} bytes - {summary[:80]}...',
                     'educational_note': 'Very small TCP packets might be keep-alives, but could also indicate malformed traffic'
-                })
+                }))
+        return issues
     
-    def _detect_dns_issues(self, packets):
+    def _detect_dns_issues(self, partial):
         """Detect potential DNS-related issues"""
-        dns_packets = [p for p in packets if 'DNS' in p.get('summary', '')]
-        
-        if len(dns_packets) > 5:
+        if partial['dns_packets'] > 5:
             # Check for repeated DNS queries (might indicate issues)
-            dns_queries = []
-            for packet in dns_packets:
-                summary = packet.get('summary', '')
-                if 'Qry' in summary:
-                    dns_queries.append(summary)
+            query_counts = partial['dns_queries']
             
-            if len(dns_queries) > 3:
-                query_counts = Counter(dns_queries)
-                for query, count in query_counts.items():
+            if sum(query_counts.values()) > 3:
+                for (qname, qtype), count in query_counts.items():
                     if count > 2:  # Same query repeated multiple times
                         self.detected_issues.append({
                             'type': 'REPEATED_DNS_QUERIES',
                             'severity': 'LOW',
                             'description': 'Repeated DNS queries detected',
-                            'details': f'Query repeated {count} times: {query[:100]}...',
+                            'details': f'Query repeated {count} times: {qname} (type {qtype})',
                             'educational_note': 'Repeated DNS queries might indicate DNS resolution issues or misconfigured applications'
                         })
     
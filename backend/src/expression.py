@@ -0,0 +1,656 @@
+# src/expression.py
+"""
+Small BPF-like filter language for captured packets
+
+    tcp and (src 10.0.0.0/8 or dst port 443) and len > 1000
+
+An expression is parsed once into a tree, optimized (constant folding,
+merging of related predicates, most selective predicate first) and then
+either compiled into one Python predicate or evaluated as a single
+vectorized mask over a PacketTable.
+
+Primitives:
+    tcp, udp, icmp, icmpv6                            transport protocol
+    ip, ip6                                           IPv4 / IPv6 packets
+    arp, dns, http, dhcp                              application protocol
+    proto NAME                                        any of the above, or any protocol name
+    [src|dst] [host] ADDRESS                          IPv4/IPv6 address
+    [src|dst] net CIDR   (or just [src|dst] CIDR)     address prefix
+    [src|dst] port N                                  TCP/UDP port
+    [src|dst] portrange A-B                           port range
+    len OP N, greater N, less N                       OP: < <= > >= == != =
+    flags LETTERS                                     TCP flags set, e.g. flags SA
+    true, false
+combined with and/&&, or/||, not/! and parentheses. Without src/dst a
+host, net or port primitive matches either direction. A protocol may
+qualify the primitive after it, as in tcp port 80 or ip6 src net fe80::/10
+(the same as tcp and port 80).
+
+tcp/udp/icmp/icmpv6 test the transport protocol, so tcp also matches
+HTTP packets; the other names test the protocol the packet was
+classified as.
+"""
+import functools
+import ipaddress
+import re
+
+from src.table import PacketTable
+
+try:
+    import numpy as np
+except ImportError:  # Filters run packet by packet without NumPy
+    np = None
+
+TRANSPORT_KEYWORDS = {'tcp': 'TCP', 'udp': 'UDP', 'icmp': 'ICMP', 'icmpv6': 'ICMPV6'}
+FAMILY_KEYWORDS = {'ip': 4, 'ip6': 6, 'ipv6': 6}
+PROTOCOL_KEYWORDS = {'arp': 'ARP', 'dns': 'DNS', 'http': 'HTTP', 'dhcp': 'DHCP'}
+# Primitives a protocol keyword may qualify (tcp port 80)
+_QUALIFIED = ('src', 'dst', 'host', 'net', 'port', 'portrange')
+COMPARISONS = ('<', '<=', '>', '>=', '==', '!=')
+TCP_FLAG_BITS = {'F': 0x01, 'S': 0x02, 'R': 0x04, 'P': 0x08, 'A': 0x10, 'U': 0x20, 'E': 0x40, 'C': 0x80}
+
+_TOKEN = re.compile(r'\s*(?:(\(|\)|&&|\|\||!=|<=|>=|==|[<>=!])|([^\s()<>=!&|]+))')
+
+
+
+class FilterSyntaxError(ValueError):
+    """Raised for filter expressions that cannot be parsed"""
+
+
+# ----------------------------------------------------------------------
+# Parsing
+#
+# The tree is made of plain tuples:
+#   ('const', bool)                       ('and', children)   ('or', children)
+#   ('not', child)                        ('protocol', frozenset of names)
+#   ('transport', frozenset of names)     ('family', frozenset of IP versions)
+#   ('net', 'src'|'dst', version, network, prefix)
+#   ('port', 'src'|'dst', frozenset of ports)
+#   ('portrange', 'src'|'dst', low, high)
+#   ('len', comparison, value)            ('flags', mask)
+# ----------------------------------------------------------------------
+def _tokenize(text):
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match or match.end() == position:
+            raise FilterSyntaxError(f"Unexpected character at position {position}: {text[position:]!r}")
+        tokens.append(match.group(1) or match.group(2))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text):
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position].lower()
+        return None
+
+    def next(self, expected='a value'):
+        if self.position >= len(self.tokens):
+            raise FilterSyntaxError(f"Expected {expected} at end of expression")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            return ('const', True)
+        node = self.parse_or()
+        if self.position < len(self.tokens):
+            raise FilterSyntaxError(f"Unexpected {self.tokens[self.position]!r}")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() in ('or', '||'):
+            self.position += 1
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else ('or', tuple(children))
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while self.peek() in ('and', '&&'):
+            self.position += 1
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else ('and', tuple(children))
+
+    def parse_not(self):
+        token = self.peek()
+        if token in ('not', '!'):
+            self.position += 1
+            return ('not', self.parse_not())
+        if token == '(':
+            self.position += 1
+            node = self.parse_or()
+            if self.next("')'") != ')':
+                raise FilterSyntaxError("Expected ')'")
+            return node
+        return self.parse_primitive()
+
+    def parse_primitive(self):
+        word = self.next('a filter primitive').lower()
+        if word in ('true', 'false'):
+            return ('const', word == 'true')
+        if word == 'proto':
+            return self.protocol(self.next('a protocol name').lower())
+        if word in TRANSPORT_KEYWORDS or word in FAMILY_KEYWORDS or word in PROTOCOL_KEYWORDS:
+            node = self.protocol(word)
+            if self.peek() in _QUALIFIED:
+                return ('and', (node, self.parse_primitive()))
+            return node
+        if word in ('len', 'length'):
+            comparison = self.next('a comparison')
+            comparison = '==' if comparison == '=' else comparison
+            if comparison not in COMPARISONS:
+                raise FilterSyntaxError(f"Unknown comparison {comparison!r}")
+            return ('len', comparison, self.number(self.next('a length')))
+        if word in ('greater', 'less'):
+            return ('len', '>=' if word == 'greater' else '<=', self.number(self.next('a length')))
+        if word == 'flags':
+            return ('flags', self.flags(self.next('TCP flag letters')))
+
+        direction = None
+        if word in ('src', 'dst'):
+            direction = word
+            word = self.next(f"host, net or port after {word}").lower()
+        if word == 'host':
+            return self.directed(direction, self.address(self.next('an address'), host=True))
+        if word == 'net':
+            return self.directed(direction, self.address(self.next('a network')))
+        if word == 'port':
+            port = self.port(self.next('a port'))
+            return self.directed(direction, lambda side: ('port', side, frozenset([port])))
+        if word == 'portrange':
+            low, _, high = self.next('a port range').partition('-')
+            low, high = self.port(low), self.port(high)
+            if low > high:
+                raise FilterSyntaxError(f"Empty port range {low}-{high}")
+            return self.directed(direction, lambda side: ('portrange', side, low, high))
+        return self.directed(direction, self.address(word))
+
+    def protocol(self, name):
+        if name in TRANSPORT_KEYWORDS:
+            return ('transport', frozenset([TRANSPORT_KEYWORDS[name]]))
+        if name in FAMILY_KEYWORDS:
+            return ('family', frozenset([FAMILY_KEYWORDS[name]]))
+        return ('protocol', frozenset([name.upper()]))
+
+    def directed(self, direction, make):
+        if direction:
+            return make(direction)
+        return ('or', (make('src'), make('dst')))
+
+    def address(self, text, host=False):
+        try:
+            network = ipaddress.ip_network(text, strict=False)
+        except ValueError:
+            raise FilterSyntaxError(f"Not an IP address or network: {text!r}") from None
+        if host and network.prefixlen != network.max_prefixlen:
+            raise FilterSyntaxError(f"host takes an address, not a network: {text!r}")
+        version = network.version
+        value = int(network.network_address)
+        prefix = network.prefixlen
+        return lambda side: ('net', side, version, value, prefix)
+
+    def number(self, text):
+        if not text.isdigit():
+            raise FilterSyntaxError(f"Expected a number, got {text!r}")
+        return int(text)
+
+    def port(self, text):
+        port = self.number(text)
+        if port > 65535:
+            raise FilterSyntaxError(f"Port out of range: {port}")
+        return port
+
+    def flags(self, text):
+        mask = 0
+        for letter in text.upper():
+            if letter not in TCP_FLAG_BITS:
+                raise FilterSyntaxError(f"Unknown TCP flag {letter!r} (use {''.join(TCP_FLAG_BITS)})")
+            mask |= TCP_FLAG_BITS[letter]
+        return mask
+
+
+def parse_filter(expression):
+    """Parse a filter expression into its (unoptimized) tree"""
+    return _Parser(expression).parse()
+
+
+# ----------------------------------------------------------------------
+# Optimization
+# ----------------------------------------------------------------------
+def estimate(node):
+    """Rough fraction of packets a node matches"""
+    kind = node[0]
+    if kind == 'const':
+        return 1.0 if node[1] else 0.0
+    if kind == 'not':
+        return 1.0 - estimate(node[1])
+    if kind == 'and':
+        result = 1.0
+        for child in node[1]:
+            result *= estimate(child)
+        return result
+    if kind == 'or':
+        missed = 1.0
+        for child in node[1]:
+            missed *= 1.0 - estimate(child)
+        return 1.0 - missed
+    if kind == 'protocol':
+        return min(1.0, 0.2 * len(node[1]))
+    if kind == 'transport':
+        return min(1.0, 0.4 * len(node[1]))
+    if kind == 'family':
+        return sum({4: 0.8, 6: 0.15}[version] for version in node[1])
+    if kind == 'net':
+        bits = 32 if node[2] == 4 else 128
+        return max(0.01, 2.0 ** -(node[4] * 6 / bits))
+    if kind == 'port':
+        return min(1.0, 0.05 * len(node[2]))
+    if kind == 'portrange':
+        return max(0.05, (node[3] - node[2] + 1) / 65536)
+    if kind == 'len':
+        return {'==': 0.01, '!=': 0.99}.get(node[1], 0.5)
+    return 0.3  # flags
+
+
+def optimize(node):
+    """Fold constants, merge related predicates and order by selectivity"""
+    kind = node[0]
+    if kind == 'not':
+        child = optimize(node[1])
+        if child[0] == 'const':
+            return ('const', not child[1])
+        if child[0] == 'not':
+            return child[1]
+        return ('not', child)
+    if kind == 'len':
+        return _fold_length(node)
+    if kind not in ('and', 'or'):
+        return node
+
+    identity = kind == 'and'
+    children = []
+    for child in node[1]:
+        child = optimize(child)
+        for item in (child[1] if child[0] == kind else (child,)):
+            if item[0] == 'const':
+                if item[1] != identity:
+                    return ('const', not identity)  # false in 'and', true in 'or'
+            elif item not in children:
+                children.append(item)
+
+    children = _merge(kind, children)
+    if any(child == ('const', not identity) for child in children):
+        return ('const', not identity)
+    children = [child for child in children if child[0] != 'const']
+    if not children:
+        return ('const', identity)
+    if len(children) == 1:
+        return children[0]
+    children.sort(key=lambda child: _rank(kind, child))
+    return (kind, tuple(children))
+
+
+def _rank(kind, node):
+    """
+    Evaluation order inside an and/or node
+    'and' stops at the first False, so the best predicate is the one that
+    rejects the most packets per unit of cost: cost / (1 - match rate).
+    'or' stops at the first True: cost / match rate.
+    """
+    matched = estimate(node)
+    useful = 1.0 - matched if kind == 'and' else matched
+    return cost(node) / max(useful, 1e-6)
+
+
+def cost(node):
+    """Relative cost of evaluating a node for one packet"""
+    kind = node[0]
+    if kind in ('and', 'or'):
+        return sum(cost(child) for child in node[1])
+    if kind == 'not':
+        return cost(node[1])
+    return {'const': 0.0, 'net': 3.0, 'family': 2.0, 'port': 1.5, 'portrange': 1.5}.get(kind, 1.0)
+
+
+def _fold_length(node):
+    _, comparison, value = node
+    if comparison == '<' and value <= 0:
+        return ('const', False)
+    if comparison == '>=' and value <= 0:
+        return ('const', True)
+    return node
+
+
+def _merge(kind, children):
+    """Combine protocol, port and length predicates of one and/or node"""
+    merged = []
+    names = {}  # 'protocol' / 'transport' / 'family' -> set; a packet has one of each
+    ports = {}
+    low, high = 0, None
+    for child in children:
+        if child[0] in ('protocol', 'transport', 'family'):
+            if child[0] not in names:
+                names[child[0]] = child[1]
+            else:
+                names[child[0]] = names[child[0]] & child[1] if kind == 'and' else names[child[0]] | child[1]
+        elif child[0] == 'port':
+            side = child[1]
+            if side not in ports:
+                ports[side] = child[2]
+            else:
+                ports[side] = ports[side] & child[2] if kind == 'and' else ports[side] | child[2]
+        elif child[0] == 'len' and kind == 'and' and child[1] != '!=':
+            comparison, value = child[1], child[2]
+            if comparison in ('>', '>=', '=='):
+                low = max(low, value + 1 if comparison == '>' else value)
+            if comparison in ('<', '<=', '=='):
+                limit = value - 1 if comparison == '<' else value
+                high = limit if high is None else min(high, limit)
+        else:
+            merged.append(child)
+
+    for name, values in names.items():
+        merged.append((name, values) if values else ('const', False))
+    for side, values in ports.items():
+        merged.append(('port', side, values) if values else ('const', False))
+    if kind == 'and' and (low or high is not None):
+        if high is not None and low > high:
+            merged.append(('const', False))
+        elif low == high:
+            merged.append(('len', '==', low))
+        else:
+            if low:
+                merged.append(('len', '>=', low))
+            if high is not None:
+                merged.append(('len', '<=', high))
+    return merged
+
+
+def format_filter(node):
+    """Turn a tree back into expression text"""
+    kind = node[0]
+    if kind == 'const':
+        return 'true' if node[1] else 'false'
+    if kind in ('and', 'or'):
+        return '(' + f' {kind} '.join(format_filter(child) for child in node[1]) + ')'
+    if kind == 'not':
+        return 'not ' + format_filter(node[1])
+    if kind in ('protocol', 'transport', 'family'):
+        if kind == 'family':
+            names = ['ip' if version == 4 else 'ip6' for version in sorted(node[1])]
+        else:
+            names = [name.lower() if kind == 'transport' or name.lower() in PROTOCOL_KEYWORDS else f'proto {name}'
+                     for name in sorted(node[1])]
+        return names[0] if len(names) == 1 else '(' + ' or '.join(names) + ')'
+    if kind == 'net':
+        _, side, version, value, prefix = node
+        address = _address_text(version, value)
+        if prefix == (32 if version == 4 else 128):
+            return f'{side} host {address}'
+        return f'{side} net {address}/{prefix}'
+    if kind == 'port':
+        names = [f'{node[1]} port {port}' for port in sorted(node[2])]
+        return names[0] if len(names) == 1 else '(' + ' or '.join(names) + ')'
+    if kind == 'portrange':
+        return f'{node[1]} portrange {node[2]}-{node[3]}'
+    if kind == 'len':
+        return f'len {node[1]} {node[2]}'
+    letters = ''.join(letter for letter, bit in TCP_FLAG_BITS.items() if node[1] & bit)
+    return f'flags {letters}'
+
+
+def fields_used(node):
+    """Return the packet fields an expression reads"""
+    kind = node[0]
+    if kind in ('and', 'or'):
+        return set().union(*(fields_used(child) for child in node[1]))
+    if kind == 'not':
+        return fields_used(node[1])
+    if kind in ('net', 'port', 'portrange'):
+        return {node[1] + ('_ip' if kind == 'net' else '_port')}
+    return {
+        'protocol': {'protocol'}, 'transport': {'l4_protocol', 'protocol'}, 'family': {'src_ip', 'protocol'},
+        'len': {'length'}, 'flags': {'tcp_flags'}
+    }.get(kind, set())
+
+
+# ----------------------------------------------------------------------
+# Compilation to one Python predicate
+# ----------------------------------------------------------------------
+_address_numbers = {}
+
+
+def _address_number(address):
+    """(version, integer) of an address string, cached"""
+    number = _address_numbers.get(address)
+    if number is None:
+        try:
+            parsed = ipaddress.ip_address(address)
+        except ValueError:
+            number = (0, 0)
+        else:
+            number = (parsed.version, int(parsed))
+        if len(_address_numbers) < 65536:
+            _address_numbers[address] = number
+    return number
+
+
+def _in_network(address, version, network, mask):
+    if not address:
+        return False
+    found_version, number = _address_number(address)
+    return found_version == version and number & mask == network
+
+
+def _ip_version(address, protocol):
+    """IP version of a packet from its source address (ARP packets carry addresses too)"""
+    if not address or protocol == 'ARP':
+        return 0
+    return _address_number(address)[0]
+
+
+_HELPERS = {'_in_network': _in_network, '_ip_version': _ip_version}
+
+
+def _address_text(version, value):
+    return str(ipaddress.IPv4Address(value) if version == 4 else ipaddress.IPv6Address(value))
+
+
+def _network_mask(version, prefix):
+    bits = 32 if version == 4 else 128
+    return ((1 << prefix) - 1) << (bits - prefix)
+
+
+def _source(node, constants):
+    """Python source of a node, reading the packet from variable p"""
+    def constant(value):
+        name = f'_c{len(constants)}'
+        constants[name] = value
+        return name
+
+    kind = node[0]
+    if kind == 'const':
+        return repr(node[1])
+    if kind in ('and', 'or'):
+        return '(' + f' {kind} '.join(_source(child, constants) for child in node[1]) + ')'
+    if kind == 'not':
+        return f'(not {_source(node[1], constants)})'
+    if kind == 'protocol':
+        return f"((p.get('protocol') or '').upper() in {constant(node[1])})"
+    if kind == 'transport':
+        # Packets saved before l4_protocol was recorded only have the protocol
+        return f"((p.get('l4_protocol') or p.get('protocol') or '').upper() in {constant(node[1])})"
+    if kind == 'family':
+        return f"(_ip_version(p.get('src_ip'), p.get('protocol')) in {constant(node[1])})"
+    if kind == 'net':
+        _, side, version, value, prefix = node
+        return f"_in_network(p.get('{side}_ip'), {version}, {value}, {_network_mask(version, prefix)})"
+    if kind == 'port':
+        if len(node[2]) == 1:
+            return f"(p.get('{node[1]}_port', -1) == {next(iter(node[2]))})"
+        return f"(p.get('{node[1]}_port', -1) in {constant(node[2])})"
+    if kind == 'portrange':
+        port = f"p.get('{node[1]}_port')"
+        return f"({node[2]} <= ({port} if {port} is not None else -1) <= {node[3]})"
+    if kind == 'len':
+        return f"((p.get('length') or 0) {node[1]} {node[2]})"
+    return f"((p.get('tcp_flags') or 0) & {node[1]} == {node[1]})"
+
+
+def _compile(node):
+    """
+    Compile a tree into (predicate, select, select_indices)
+    select() and select_indices() inline the expression in one list
+    comprehension, so filtering costs no function call per packet.
+    """
+    constants = {}
+    source = _source(node, constants)
+    namespace = dict(_HELPERS, **constants)
+    code = (
+        f"def predicate(p):\n    return {source}\n"
+        f"def select(packets):\n    return [p for p in packets if {source}]\n"
+        f"def select_indices(packets):\n    return [i for i, p in enumerate(packets) if {source}]\n"
+    )
+    exec(compile(code, '<filter>', 'exec'), namespace)
+    return namespace['predicate'], namespace['select'], namespace['select_indices']
+
+
+# ----------------------------------------------------------------------
+# Vectorized evaluation over a PacketTable
+# ----------------------------------------------------------------------
+def _column_mask(node, table, columns):
+    def column(name):
+        if name not in columns:
+            columns[name] = table.column(name)
+        return columns[name]
+
+    def present(name):
+        key = ('present', name)
+        if key not in columns:
+            columns[key] = table.present(name)
+        return columns[key]
+
+    def named(names, name):
+        ids = [index for index, value in enumerate(table.strings(name)) if value.upper() in names]
+        return np.isin(column(name), ids) & present(name)
+
+    kind = node[0]
+    if kind == 'const':
+        return np.full(len(table), node[1], dtype=bool)
+    if kind == 'and':
+        result = _column_mask(node[1][0], table, columns)
+        for child in node[1][1:]:
+            if not result.any():
+                break
+            result &= _column_mask(child, table, columns)
+        return result
+    if kind == 'or':
+        result = _column_mask(node[1][0], table, columns)
+        for child in node[1][1:]:
+            if result.all():
+                break
+            result |= _column_mask(child, table, columns)
+        return result
+    if kind == 'not':
+        return ~_column_mask(node[1], table, columns)
+    if kind == 'protocol':
+        return named(node[1], 'protocol')
+    if kind == 'transport':
+        # Packets saved before l4_protocol was recorded only have the protocol
+        return np.where(present('l4_protocol'), named(node[1], 'l4_protocol'), named(node[1], 'protocol'))
+    if kind == 'family':
+        families = column('src_ip')[0]
+        return np.isin(families, list(node[1])) & present('src_ip') & ~named({'ARP'}, 'protocol')
+    if kind == 'net':
+        _, side, version, value, prefix = node
+        name = side + '_ip'
+        families, highs, lows = column(name)
+        mask = _network_mask(version, prefix)
+        if version == 4:
+            match = (families == 4) & ((lows & np.uint64(mask)) == np.uint64(value))
+        else:
+            high_mask, low_mask = mask >> 64, mask & 0xFFFFFFFFFFFFFFFF
+            match = (families == 6) & ((highs & np.uint64(high_mask)) == np.uint64(value >> 64))
+            match &= (lows & np.uint64(low_mask)) == np.uint64(value & 0xFFFFFFFFFFFFFFFF)
+        return match & present(name)
+    if kind == 'port':
+        name = node[1] + '_port'
+        return np.isin(column(name), list(node[2])) & present(name)
+    if kind == 'portrange':
+        name = node[1] + '_port'
+        values = column(name)
+        return (values >= node[2]) & (values <= node[3]) & present(name)
+    if kind == 'len':
+        values = column('length').astype(np.int64)
+        return {
+            '<': np.less, '<=': np.less_equal, '>': np.greater,
+            '>=': np.greater_equal, '==': np.equal, '!=': np.not_equal
+        }[node[1]](values, node[2])
+    return (column('tcp_flags') & node[1]) == node[1]
+
+
+class CompiledFilter:
+    """
+    A parsed, optimized and compiled filter expression
+
+    Call it with one packet, or use filter()/mask() for many packets at once.
+    """
+
+    def __init__(self, tree, expression=None):
+        self.tree = optimize(tree)
+        self.expression = expression if expression is not None else format_filter(tree)
+        self.fields = fields_used(self.tree)
+        self.predicate, self._select, self._select_indices = _compile(self.tree)
+
+    def __call__(self, packet):
+        return self.predicate(packet)
+
+    def __str__(self):
+        return format_filter(self.tree)
+
+    def __repr__(self):
+        return f"CompiledFilter({self.expression!r})"
+
+    def mask(self, table):
+        """Boolean NumPy mask of the rows of a PacketTable that match"""
+        result = _column_mask(self.tree, table, {})
+
+        # Rows the columns cannot answer alone go through the predicate
+        rows = set()
+        for name in self.fields:
+            rows.update(table.extras(name))
+        predicate = self.predicate
+        for index in rows:
+            result[index] = predicate(table[index])
+        return result
+
+    def indices(self, packets):
+        """Positions of the matching packets"""
+        if np is not None and isinstance(packets, PacketTable):
+            return np.flatnonzero(self.mask(packets)).tolist()
+        return self._select_indices(packets)
+
+    def filter(self, packets):
+        """
+        Return the matching packets
+        A PacketTable gives back a PacketTable, anything else a list.
+        """
+        if isinstance(packets, PacketTable):
+            return packets.take(self.indices(packets))
+        return self._select(packets)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_filter(expression):
+    """Parse, optimize and compile an expression (cached per expression text)"""
+    return CompiledFilter(parse_filter(expression), expression)
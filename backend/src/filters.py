@@ -1,117 +1,114 @@
 # src/filters.py
+from src.expression import CompiledFilter, format_filter, parse_filter
+from src.reporting import get_logger
+from src.table import PacketTable
+
+log = get_logger('filters')
+
+
 class PacketFilter:
     """
     Custom filtering system for network packets
     Educational tool for understanding packet filtering concepts
+
+    Every filter is kept as an expression tree (see src/expression.py).
+    apply_filters() combines them with AND, compiles the result once and
+    filters all packets in a single pass.
     """
-    
+
     def __init__(self):
         self.filters = []
         self.protocol_filters = []  # Special handling for protocol filters
-        print("🔍 PacketFilter initialized!")
-    
+        self._protocol_slot = None
+        self._compiled = None
+        log.debug("🔍 PacketFilter initialized!")
+
+    def _add(self, node):
+        self.filters.append(node)
+        self._compiled = None
+
+    def add_expression(self, expression):
+        """Filter with a BPF-like expression, e.g. 'tcp and dst port 443'"""
+        node = parse_filter(expression)
+        self._add(node)
+        log.info(f"✅ Added filter expression: {expression}")
+
     def add_protocol_filter(self, protocol):
         """Filter by protocol type (TCP, UDP, ICMP, etc.)"""
         self.protocol_filters.append(protocol.upper())
-        print(f"✅ Added protocol filter: {protocol}")
-    
+        # Protocol filters are ORed together, so they share one node
+        node = ('protocol', frozenset(self.protocol_filters))
+        if self._protocol_slot is None:
+            self._protocol_slot = len(self.filters)
+            self.filters.append(node)
+        else:
+            self.filters[self._protocol_slot] = node
+        self._compiled = None
+        log.info(f"✅ Added protocol filter: {protocol}")
+
     def add_ip_filter(self, src_ip=None, dst_ip=None):
         """Filter by source and/or destination IP"""
-        def ip_filter(packet_info):
-            packet_src_ip = packet_info.get('src_ip')
-            packet_dst_ip = packet_info.get('dst_ip')
-            summary = packet_info.get('summary', '')
-            
-            # Try to extract IPs from summary if direct fields are not available
-            if not packet_src_ip or not packet_dst_ip:
-                # Simple IP extraction from summary
-                import re
-                ip_pattern = r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}'
-                ips_in_summary = re.findall(ip_pattern, summary)
-                
-                if not packet_src_ip and ips_in_summary:
-                    packet_src_ip = ips_in_summary[0]
-                if not packet_dst_ip and len(ips_in_summary) > 1:
-                    packet_dst_ip = ips_in_summary[1]
-            
-            # Apply filters
-            if src_ip and packet_src_ip != src_ip:
-                return False
-            if dst_ip and packet_dst_ip != dst_ip:
-                return False
-            
-            return True
-        
-        self.filters.append(ip_filter)
+        terms = []
         filter_desc = []
         if src_ip:
+            terms.append(f"src host {src_ip}")
             filter_desc.append(f"Source: {src_ip}")
         if dst_ip:
+            terms.append(f"dst host {dst_ip}")
             filter_desc.append(f"Destination: {dst_ip}")
-        print(f"✅ Added IP filter - {', '.join(filter_desc)}")
-    
+        self._add(parse_filter(' and '.join(terms)))
+        log.info(f"✅ Added IP filter - {', '.join(filter_desc)}")
+
     def add_port_filter(self, port=None, src_port=None, dst_port=None):
         """Filter by port numbers"""
-        def port_filter(packet_info):
-            summary = packet_info.get('summary', '').lower()
-            
-            # Look for port patterns in the summary
-            if port:
-                port_str = str(port)
-                if f":{port_str} " not in summary and f">{port_str}" not in summary:
-                    return False
-            
-            if src_port:
-                src_port_str = str(src_port)
-                if f":{src_port_str} >" not in summary:
-                    return False
-            
-            if dst_port:
-                dst_port_str = str(dst_port)
-                if f">{dst_port_str}" not in summary:
-                    return False
-            
-            return True
-        
-        self.filters.append(port_filter)
-        print(f"✅ Added port filter - Port: {port}, Src: {src_port}, Dst: {dst_port}")
-    
+        terms = []
+        if port:
+            terms.append(f"port {port}")
+        if src_port:
+            terms.append(f"src port {src_port}")
+        if dst_port:
+            terms.append(f"dst port {dst_port}")
+        self._add(parse_filter(' and '.join(terms)))
+        log.info(f"✅ Added port filter - Port: {port}, Src: {src_port}, Dst: {dst_port}")
+
+    def compiled(self):
+        """Return all active filters compiled into one CompiledFilter"""
+        if self._compiled is None:
+            self._compiled = CompiledFilter(('and', tuple(self.filters)))
+        return self._compiled
+
     def apply_filters(self, packets):
-        """Apply all filters to a list of packets"""
+        """Apply all filters to a list of packets (or a PacketTable)"""
         if not packets:
             return []
-        
-        filtered_packets = packets
-        
-        # Apply protocol filters (OR logic for multiple protocols)
-        if self.protocol_filters:
-            filtered_packets = [
-                p for p in filtered_packets 
-                if p.get('protocol', '').upper() in self.protocol_filters
-            ]
-        
-        # Apply other filters (AND logic)
-        for filter_func in self.filters:
-            filtered_packets = [p for p in filtered_packets if filter_func(p)]
-        
-        print(f"📊 Filters applied: {len(packets)} → {len(filtered_packets)} packets")
+
+        if not self.filters:
+            filtered_packets = packets
+        elif isinstance(packets, PacketTable):
+            # Vectorized mask over the columns, then row views of the matches
+            filtered_packets = [packets[index] for index in self.compiled().indices(packets)]
+        else:
+            filtered_packets = self.compiled().filter(packets)
+
+        log.info(f"📊 Filters applied: {len(packets)} → {len(filtered_packets)} packets")
         return filtered_packets
-    
+
     def clear_filters(self):
         """Clear all filters"""
         self.filters = []
         self.protocol_filters = []
-        print("🧹 All filters cleared")
-    
+        self._protocol_slot = None
+        self._compiled = None
+        log.info("🧹 All filters cleared")
+
     def show_active_filters(self):
         """Display currently active filters"""
-        if not self.filters and not self.protocol_filters:
+        if not self.filters:
             print("No active filters")
             return
-        
+
         print("🔍 Active Filters:")
-        for i, protocol in enumerate(self.protocol_filters):
-            print(f"  {i+1}. Protocol: {protocol}")
-        
-        for i, filter_func in enumerate(self.filters, start=len(self.protocol_filters) + 1):
-            print(f"  {i}. {filter_func.__name__}")
\ No newline at end of file
+        for i, node in enumerate(self.filters, start=1):
+            print(f"  {i}. {format_filter(node)}")
+        print(f"  Compiled: {self.compiled()}")
+
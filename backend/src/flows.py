@@ -0,0 +1,606 @@
+# src/flows.py
+"""
+Flow table: connection tracking keyed by a bidirectional 5-tuple
+
+Both directions of a conversation share one flow. Every flow lives in a
+slot of a set of typed arrays (like PacketTable columns); a dict maps the
+canonical 5-tuple, packed into one integer, to its slot. Expired flows
+hand their slot back for reuse.
+
+Memory budget: 200 bytes per IPv4 flow, so 1M concurrent flows stay under
+200 MB (benchmarks/flow_table.py measures ~170 B: ~45 B of arrays, the
+packed key and the dict entry). IPv6 keys are ~30 bytes larger. max_flows
+caps the table: when it is full the least recently seen flows are evicted.
+"""
+import array
+import heapq
+from collections import Counter
+
+from src.decoder import TCP_SYN, TCP_FIN, TCP_RST, TCP_ACK
+from src.statistics import _endpoint
+from src.table import PacketTable, encode_address, decode_address, unique_rows
+
+try:
+    import numpy as np
+except ImportError:  # update_batch() feeds packets one by one without NumPy
+    np = None
+
+PROTOCOL_NUMBERS = {'ICMP': 1, 'TCP': 6, 'UDP': 17, 'ICMPv6': 58}
+PROTOCOL_NAMES = {number: name for name, number in PROTOCOL_NUMBERS.items()}
+
+# TCP connection states (index = stored state code)
+TCP_STATES = (
+    'NONE', 'SYN_SENT', 'SYN_RECEIVED', 'ESTABLISHED',
+    'FIN_WAIT', 'CLOSE_WAIT', 'LAST_ACK', 'TIME_WAIT', 'CLOSED'
+)
+(NONE, SYN_SENT, SYN_RECEIVED, ESTABLISHED,
+ FIN_WAIT, CLOSE_WAIT, LAST_ACK, TIME_WAIT, CLOSED) = range(len(TCP_STATES))
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+_PORT_PROTOCOLS = (6, 17)
+
+
+def _tcp_transition(state, direction, flags):
+    """
+    Next TCP state after a segment with `flags`
+    direction is 0 for the connection initiator, 1 for the responder.
+    """
+    syn = flags & TCP_SYN
+    ack = flags & TCP_ACK
+    fin = flags & TCP_FIN
+    if flags & TCP_RST:
+        return CLOSED
+    if syn and not ack and direction == 0 and state in (NONE, TIME_WAIT, CLOSED):
+        return SYN_SENT  # New connection (or port reuse)
+    if state == NONE:
+        if syn:
+            return SYN_RECEIVED
+        if fin:
+            return FIN_WAIT if direction == 0 else CLOSE_WAIT
+        return ESTABLISHED  # Picked up mid-connection
+    if state == SYN_SENT:
+        return SYN_RECEIVED if syn and ack and direction == 1 else state
+    if state == SYN_RECEIVED:
+        if ack and not syn and direction == 0:
+            return FIN_WAIT if fin else ESTABLISHED
+        return state
+    if state == ESTABLISHED and fin:
+        return FIN_WAIT if direction == 0 else CLOSE_WAIT
+    if state == FIN_WAIT and fin and direction == 1:
+        return LAST_ACK
+    if state == CLOSE_WAIT and fin and direction == 0:
+        return LAST_ACK
+    if state == LAST_ACK and ack and not fin:
+        return TIME_WAIT
+    return state
+
+
+# Precomputed: _TRANSITIONS[state * 512 + direction * 256 + flags]
+_TRANSITIONS = bytes(
+    _tcp_transition(state, direction, flags)
+    for state in range(len(TCP_STATES)) for direction in (0, 1) for flags in range(256)
+)
+_FINISHED = (TIME_WAIT, CLOSED)
+
+
+def _pack_keys(keys):
+    """
+    Rows of update_batch() key columns -> packed integer keys
+    Columns: family << 8 | protocol, then (high, low, port) of both endpoints.
+    """
+    family_protocol = keys[:, 0]
+    if (family_protocol >> 8 == 4).all():
+        # IPv4: the key is first endpoint << 60 | second endpoint << 12 | family/protocol
+        first = keys[:, 2] << 16 | keys[:, 3]
+        second = (keys[:, 5] << 16 | keys[:, 6]) << 12 | family_protocol
+        return [a << 60 | b for a, b in zip(first.tolist(), second.tolist())]
+    packed = []
+    for family_protocol, a_high, a_low, a_port, b_high, b_low, b_port in keys.tolist():
+        width = 48 if family_protocol >> 8 == 4 else 144
+        a_end = ((a_high << 64) | a_low) << 16 | a_port
+        b_end = ((b_high << 64) | b_low) << 16 | b_port
+        packed.append(((a_end << width | b_end) << 12) | family_protocol)
+    return packed
+
+
+class FlowTable:
+    """
+    Tracks flows incrementally, one packet (or one batch) at a time
+
+    Per flow: packets and bytes per direction, first/last seen, TCP flags
+    seen per direction and the TCP connection state. The flow's source is
+    the side that sent its first packet (the SYN sender for TCP).
+
+    Flows expire after idle_timeout seconds without packets, after
+    active_timeout seconds in total (long flows are reported in pieces,
+    like NetFlow) or closed_timeout seconds after a RST / the final FIN
+    handshake. Time is packet time, so replaying a capture file behaves
+    like a live capture. Listeners get each expired flow as a dict.
+    """
+
+    def __init__(self, idle_timeout=60.0, active_timeout=1800.0, closed_timeout=10.0,
+                 max_flows=1_000_000, sweep_interval=1.0):
+        self.idle_timeout = idle_timeout
+        self.active_timeout = active_timeout
+        self.closed_timeout = closed_timeout
+        self.max_flows = max_flows
+        self.sweep_interval = sweep_interval
+        self.listeners = []
+        self.reset()
+
+    def reset(self):
+        """Forget every flow"""
+        self._keys = {}           # packed 5-tuple -> slot
+        self._slot_keys = []      # slot -> packed 5-tuple (None when free)
+        self._free = []
+        self._used = array.array('B')
+        self._orientation = array.array('B')  # 1 when the initiator is the key's second endpoint
+        self._packets = (array.array('I'), array.array('I'))
+        self._bytes = (array.array('Q'), array.array('Q'))
+        self._flags = (array.array('B'), array.array('B'))
+        self._first_seen = array.array('d')
+        self._last_seen = array.array('d')
+        self._state = array.array('B')
+        self._ids = array.array('Q')          # flow id: creation order, never reused
+        self._addresses = {}
+        self._next_sweep = None
+        self.created = 0
+        self.evictions = Counter()
+
+    def add_listener(self, callback):
+        """Call callback(flow) for every flow that expires or is flushed"""
+        self.listeners.append(callback)
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+    def _address(self, address):
+        """IP address string -> (family, integer), cached"""
+        encoded = self._addresses.get(address)
+        if encoded is None:
+            family_high_low = encode_address(address)
+            if family_high_low is None:
+                return None
+            family, high, low = family_high_low
+            encoded = (family, (high << 64) | low)
+            if len(self._addresses) < 65536:
+                self._addresses[address] = encoded
+        return encoded
+
+    def _key(self, packet):
+        """
+        Canonical packed 5-tuple of a packet -> (key, swapped)
+        swapped is 1 when the packet goes from the key's second endpoint
+        to its first. Returns (None, 0) for packets without addresses.
+        """
+        get = packet.get
+        src = get('src_ip')
+        dst = get('dst_ip')
+        if not src or not dst:
+            return None, 0
+        src = self._address(src)
+        dst = self._address(dst)
+        if src is None or dst is None or src[0] != dst[0]:
+            return None, 0
+        family = src[0]
+        protocol = PROTOCOL_NUMBERS.get(get('l4_protocol') or get('protocol'), 0)
+        src_end = src[1] << 16 | (get('src_port') or 0)
+        dst_end = dst[1] << 16 | (get('dst_port') or 0)
+        width = 48 if family == 4 else 144
+        if src_end <= dst_end:
+            return ((src_end << width | dst_end) << 12) | family << 8 | protocol, 0
+        return ((dst_end << width | src_end) << 12) | family << 8 | protocol, 1
+
+    @staticmethod
+    def _unpack_key(key):
+        """Packed key -> (family, protocol, first endpoint, second endpoint)"""
+        protocol = key & 0xFF
+        family = key >> 8 & 0xF
+        width = 48 if family == 4 else 144
+        ends = key >> 12
+        return family, protocol, ends >> width, ends & ((1 << width) - 1)
+
+    # ------------------------------------------------------------------
+    # Slots
+    # ------------------------------------------------------------------
+    def _new_slot(self, key, orientation, timestamp):
+        if len(self._keys) >= self.max_flows:
+            self._make_room(timestamp)
+        if self._free:
+            slot = self._free.pop()
+            self._slot_keys[slot] = key
+            self._used[slot] = 1
+            self._orientation[slot] = orientation
+            for direction in (0, 1):
+                self._packets[direction][slot] = 0
+                self._bytes[direction][slot] = 0
+                self._flags[direction][slot] = 0
+            self._first_seen[slot] = timestamp
+            self._last_seen[slot] = timestamp
+            self._state[slot] = NONE
+            self._ids[slot] = self.created + 1
+        else:
+            slot = len(self._slot_keys)
+            self._slot_keys.append(key)
+            self._used.append(1)
+            self._orientation.append(orientation)
+            for direction in (0, 1):
+                self._packets[direction].append(0)
+                self._bytes[direction].append(0)
+                self._flags[direction].append(0)
+            self._first_seen.append(timestamp)
+            self._last_seen.append(timestamp)
+            self._state.append(NONE)
+            self._ids.append(self.created + 1)
+        self._keys[key] = slot
+        self.created += 1
+        return slot
+
+    def _new_slots(self, keys, orientations, timestamps):
+        """Allocate slots for many new flows at once (NumPy only); same slots as repeated _new_slot()"""
+        count = len(keys)
+        reused = self._free[:-count - 1:-1] if count else []
+        del self._free[len(self._free) - len(reused):]
+        fresh = count - len(reused)
+        start = len(self._slot_keys)
+        slots = np.concatenate([np.asarray(reused, dtype=np.int64), np.arange(start, start + fresh, dtype=np.int64)])
+
+        self._slot_keys.extend([None] * fresh)
+        columns = (self._used, self._orientation, self._first_seen, self._last_seen, self._ids, self._state,
+                   *self._packets, *self._bytes, *self._flags)
+        for column in columns:
+            column.frombytes(bytes(fresh * column.itemsize))
+        views = [np.frombuffer(column, dtype=column.typecode) for column in columns]
+        for view in views:
+            view[slots] = 0
+        used, orientation, first_seen, last_seen, ids = views[:5]
+        used[slots] = 1
+        orientation[slots] = orientations
+        first_seen[slots] = timestamps
+        last_seen[slots] = timestamps
+        ids[slots] = np.arange(self.created + 1, self.created + count + 1, dtype=np.uint64)
+        del views, used, orientation, first_seen, last_seen, ids
+
+        slot_list = slots.tolist()
+        slot_keys = self._slot_keys
+        for key, slot in zip(keys, slot_list):
+            slot_keys[slot] = key
+        self._keys.update(zip(keys, slot_list))
+        self.created += count
+        return slots
+
+    def _make_room(self, now, needed=1, keep=None):
+        """
+        Expire what can be expired; if still full, drop the least recently seen flows
+        keep: slots that must survive (flows already matched by the current batch)
+        """
+        if keep is None:
+            self.expire(now)
+        excess = len(self._keys) + needed - self.max_flows
+        if excess <= 0:
+            return
+        # Evict in batches (1% of the table) so a full table is not rescanned per packet
+        count = max(excess, self.max_flows // 100)
+        if np is not None:
+            last_seen = np.frombuffer(self._last_seen, dtype=np.float64).copy()
+            last_seen[np.frombuffer(self._used, dtype=np.uint8) == 0] = np.inf
+            if keep is not None:
+                last_seen[keep] = np.inf
+            count = min(count, int(np.isfinite(last_seen).sum()))
+            oldest = np.argpartition(last_seen, count - 1)[:count].tolist() if count else []
+        else:
+            kept = set(keep) if keep is not None else ()
+            slots = [slot for slot in range(len(self._slot_keys)) if self._used[slot] and slot not in kept]
+            oldest = heapq.nsmallest(count, slots, key=self._last_seen.__getitem__)
+        self._evict(oldest, 'capacity')
+
+    def _evict(self, slots, reason):
+        listeners = self.listeners
+        for slot in slots:
+            if listeners:
+                flow = self._flow(slot, reason)
+                for listener in listeners:
+                    listener(flow)
+            del self._keys[self._slot_keys[slot]]
+            self._slot_keys[slot] = None
+            self._used[slot] = 0
+            self._free.append(slot)
+        self.evictions[reason] += len(slots)
+
+    # ------------------------------------------------------------------
+    # Feeding
+    # ------------------------------------------------------------------
+    def update(self, packet):
+        """
+        Account one packet (usable as a PacketCapturer listener)
+        Returns (slot, direction) of its flow, or None for packets without
+        IP addresses. direction is 0 from the initiator, 1 towards it.
+        """
+        key, swapped = self._key(packet)
+        if key is None:
+            return None
+        get = packet.get
+        timestamp = get('timestamp') or 0.0
+        flags = get('tcp_flags')
+        if self._next_sweep is None:
+            self._next_sweep = timestamp + self.sweep_interval
+        elif timestamp >= self._next_sweep:
+            self.expire(timestamp)
+
+        slot = self._keys.get(key)
+        if slot is None:
+            # A SYN-ACK seen first means the other side opened the connection
+            reply = flags is not None and flags & (TCP_SYN | TCP_ACK) == TCP_SYN | TCP_ACK
+            slot = self._new_slot(key, swapped ^ reply, timestamp)
+        direction = swapped ^ self._orientation[slot]
+
+        self._packets[direction][slot] += 1
+        self._bytes[direction][slot] += get('length') or 0
+        if timestamp > self._last_seen[slot]:
+            self._last_seen[slot] = timestamp
+        if flags is not None and key & 0xFF == 6:
+            self._flags[direction][slot] |= flags
+            self._state[slot] = _TRANSITIONS[self._state[slot] * 512 + direction * 256 + flags]
+        return slot, direction
+
+    def update_batch(self, packets):
+        """
+        Account many packets, in order
+        A PacketTable is grouped into flows with NumPy; only the TCP state
+        machine steps through the rows one by one.
+
+        Returns (slots, directions, flow ids) with one entry per packet, slot
+        -1 for packets without a flow. Slots are reused once flows end, so
+        flow ids tell two flows of the same slot apart.
+        """
+        if np is None or not isinstance(packets, PacketTable) or self._batch_irregular(packets):
+            slots, directions, flow_ids = [], [], []
+            for packet in packets:
+                result = self.update(packet)
+                slot, direction = result if result is not None else (-1, 0)
+                slots.append(slot)
+                directions.append(direction)
+                flow_ids.append(self._ids[slot] if slot >= 0 else 0)
+            return slots, directions, flow_ids
+
+        count = len(packets)
+        result = (np.full(count, -1, dtype=np.int64), np.zeros(count, dtype=np.int64), np.zeros(count, dtype=np.uint64))
+        rows = np.flatnonzero(packets.present('src_ip') & packets.present('dst_ip'))
+        src_family, src_high, src_low = (part[rows] for part in packets.column('src_ip'))
+        dst_family, dst_high, dst_low = (part[rows] for part in packets.column('dst_ip'))
+        same_family = src_family == dst_family
+        rows = rows[same_family]
+        if not len(rows):
+            return result
+        src_port = np.where(packets.present('src_port'), packets.column('src_port'), 0)[rows].astype(np.uint64)
+        dst_port = np.where(packets.present('dst_port'), packets.column('dst_port'), 0)[rows].astype(np.uint64)
+        protocol = np.where(packets.present('l4_protocol')[rows], self._protocol_numbers(packets, 'l4_protocol', rows),
+                            self._protocol_numbers(packets, 'protocol', rows))
+        columns = {
+            'row': rows,
+            'family': src_family[same_family].astype(np.uint64),
+            'src_high': src_high[same_family], 'src_low': src_low[same_family], 'src_port': src_port,
+            'dst_high': dst_high[same_family], 'dst_low': dst_low[same_family], 'dst_port': dst_port,
+            'protocol': protocol,
+            'timestamp': packets.column('timestamp')[rows],
+            'length': packets.column('length')[rows].astype(np.uint64),
+            'has_flags': packets.present('tcp_flags')[rows] & (protocol == 6),
+            'flags': packets.column('tcp_flags')[rows].astype(np.int64),
+        }
+        # Steps end where update() would sweep, and hold at most half of max_flows rows
+        # so their distinct flows always fit in the table
+        clock = np.maximum.accumulate(columns['timestamp'])
+        limit = max(1, self.max_flows // 2)
+        start = 0
+        while start < len(rows):
+            if self._next_sweep is None:
+                self._next_sweep = clock[start].item() + self.sweep_interval
+            elif clock[start] >= self._next_sweep:
+                self.expire(clock[start].item())
+            end = min(start + limit, int(np.searchsorted(clock, self._next_sweep, side='left')))
+            end = max(end, start + 1)
+            self._update_rows({name: values[start:end] for name, values in columns.items()}, clock[start].item(),
+                              result)
+            start = end
+        return result
+
+    def _update_rows(self, rows, now, result):
+        """Account one step of update_batch(): rows between two sweeps"""
+        timestamps = rows['timestamp']
+
+        # Canonical endpoint order, compared as (address, port)
+        src_high, src_low, src_port = rows['src_high'], rows['src_low'], rows['src_port']
+        dst_high, dst_low, dst_port = rows['dst_high'], rows['dst_low'], rows['dst_port']
+        swapped = (src_high > dst_high) | (src_high == dst_high) & (
+            (src_low > dst_low) | (src_low == dst_low) & (src_port > dst_port))
+        keys = np.stack([
+            rows['family'] << np.uint64(8) | rows['protocol'],
+            np.where(swapped, dst_high, src_high), np.where(swapped, dst_low, src_low),
+            np.where(swapped, dst_port, src_port), np.where(swapped, src_high, dst_high),
+            np.where(swapped, src_low, dst_low), np.where(swapped, src_port, dst_port)
+        ], axis=1)
+        first, inverse = unique_rows(keys)
+
+        # One dict lookup per flow per step; new flows are created in order of first appearance
+        unique_keys = _pack_keys(keys[first])
+        get = self._keys.get
+        slots = np.array([-1 if slot is None else slot for slot in map(get, unique_keys)], dtype=np.int64)
+        new = np.flatnonzero(slots < 0)
+        flags, has_flags = rows['flags'], rows['has_flags']
+        if len(new):
+            if len(self._keys) + len(new) > self.max_flows:
+                self._make_room(now, len(new), keep=slots[slots >= 0])
+            new = new[np.argsort(first[new], kind='stable')]
+            new_rows = first[new]
+            # A SYN-ACK seen first means the other side opened the connection
+            reply = has_flags[new_rows] & (flags[new_rows] & (TCP_SYN | TCP_ACK) == TCP_SYN | TCP_ACK)
+            slots[new] = self._new_slots([unique_keys[unique] for unique in new.tolist()],
+                                         swapped[new_rows] ^ reply, timestamps[new_rows])
+
+        row_slots = slots[inverse]
+        directions = swapped.astype(np.int64) ^ np.frombuffer(self._orientation, dtype=np.uint8)[row_slots]
+        self._accumulate(row_slots, directions, rows['length'], timestamps, np.where(has_flags, flags, 0))
+        result_slots, result_directions, result_ids = result
+        result_slots[rows['row']] = row_slots
+        result_directions[rows['row']] = directions
+        result_ids[rows['row']] = np.frombuffer(self._ids, dtype=np.uint64)[row_slots]
+
+        # TCP state machine, in packet order
+        tcp = np.flatnonzero(has_flags)
+        state = self._state
+        transitions = _TRANSITIONS
+        codes = (directions[tcp] * 256 + flags[tcp]).tolist()
+        for slot, code in zip(row_slots[tcp].tolist(), codes):
+            state[slot] = transitions[state[slot] * 512 + code]
+
+    @staticmethod
+    def _protocol_numbers(packets, name, rows):
+        """IP protocol numbers of a protocol-name column (0 where absent or unknown)"""
+        numbers = [PROTOCOL_NUMBERS.get(value, 0) for value in packets.strings(name)]
+        codes = np.where(packets.present(name), packets.column(name), len(numbers))[rows]
+        return np.asarray(numbers + [0], dtype=np.uint64)[codes]
+
+    def _batch_irregular(self, packets):
+        """True when a table holds values the column path cannot read"""
+        names = ('src_ip', 'dst_ip', 'src_port', 'dst_port', 'l4_protocol', 'protocol', 'tcp_flags', 'length', 'timestamp')
+        return any(packets.extras(name) for name in names)
+
+    def _accumulate(self, slots, directions, lengths, timestamps, flags):
+        """Add per-row packet/byte counts, flags and times into the slot arrays"""
+        for direction in (0, 1):
+            rows = directions == direction
+            packet_counts = np.frombuffer(self._packets[direction], dtype=np.uint32)
+            byte_counts = np.frombuffer(self._bytes[direction], dtype=np.uint64)
+            flags_seen = np.frombuffer(self._flags[direction], dtype=np.uint8)
+            np.add.at(packet_counts, slots[rows], 1)
+            np.add.at(byte_counts, slots[rows], lengths[rows])
+            np.bitwise_or.at(flags_seen, slots[rows], flags[rows].astype(np.uint8))
+            del packet_counts, byte_counts, flags_seen
+        last_seen = np.frombuffer(self._last_seen, dtype=np.float64)
+        np.maximum.at(last_seen, slots, timestamps)
+        del last_seen
+
+    # ------------------------------------------------------------------
+    # Expiry
+    # ------------------------------------------------------------------
+    def expire(self, now):
+        """Evict the flows whose timeouts have passed at time `now`"""
+        self._next_sweep = now + self.sweep_interval
+        if not self._keys:
+            return 0
+        idle_before = now - self.idle_timeout
+        active_before = now - self.active_timeout
+        closed_before = now - self.closed_timeout
+        if np is not None:
+            used = np.frombuffer(self._used, dtype=np.uint8).astype(bool)
+            last_seen = np.frombuffer(self._last_seen, dtype=np.float64)
+            first_seen = np.frombuffer(self._first_seen, dtype=np.float64)
+            finished = np.isin(np.frombuffer(self._state, dtype=np.uint8), _FINISHED)
+            idle = np.flatnonzero(used & (last_seen < idle_before)).tolist()
+            active = np.flatnonzero(used & (last_seen >= idle_before) & (first_seen < active_before)).tolist()
+            closed = np.flatnonzero(used & finished & (last_seen < closed_before) & (last_seen >= idle_before)
+                                    & (first_seen >= active_before)).tolist()
+            del last_seen, first_seen
+        else:
+            idle, active, closed = [], [], []
+            for slot in range(len(self._slot_keys)):
+                if not self._used[slot]:
+                    continue
+                if self._last_seen[slot] < idle_before:
+                    idle.append(slot)
+                elif self._first_seen[slot] < active_before:
+                    active.append(slot)
+                elif self._state[slot] in _FINISHED and self._last_seen[slot] < closed_before:
+                    closed.append(slot)
+        self._evict(idle, 'idle')
+        self._evict(active, 'active')
+        self._evict(closed, 'closed')
+        return len(idle) + len(active) + len(closed)
+
+    def flush(self):
+        """Evict every flow (end of capture)"""
+        self._evict([slot for slot in range(len(self._slot_keys)) if self._used[slot]], 'flush')
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+    def _flow(self, slot, end_reason=None):
+        family, protocol, first_end, second_end = self._unpack_key(self._slot_keys[slot])
+        if self._orientation[slot]:
+            first_end, second_end = second_end, first_end
+        src = first_end >> 16
+        dst = second_end >> 16
+        forward_packets, reverse_packets = self._packets[0][slot], self._packets[1][slot]
+        forward_bytes, reverse_bytes = self._bytes[0][slot], self._bytes[1][slot]
+        flow = {
+            'src_ip': decode_address(family, src >> 64, src & _MASK64),
+            'dst_ip': decode_address(family, dst >> 64, dst & _MASK64),
+            'src_port': first_end & 0xFFFF if protocol in _PORT_PROTOCOLS else None,
+            'dst_port': second_end & 0xFFFF if protocol in _PORT_PROTOCOLS else None,
+            'protocol': PROTOCOL_NAMES.get(protocol, 'Other'),
+            'packets': forward_packets + reverse_packets,
+            'bytes': forward_bytes + reverse_bytes,
+            'forward_packets': forward_packets,
+            'reverse_packets': reverse_packets,
+            'forward_bytes': forward_bytes,
+            'reverse_bytes': reverse_bytes,
+            'first_seen': self._first_seen[slot],
+            'last_seen': self._last_seen[slot],
+            'duration': self._last_seen[slot] - self._first_seen[slot],
+            'flow_id': self._ids[slot],
+        }
+        if protocol == 6:
+            flow['tcp_state'] = TCP_STATES[self._state[slot]]
+            flow['forward_flags'] = self._flags[0][slot]
+            flow['reverse_flags'] = self._flags[1][slot]
+        if end_reason is not None:
+            flow['end_reason'] = end_reason
+        return flow
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        """Yield every active flow as a dict"""
+        for slot in list(self._keys.values()):
+            yield self._flow(slot)
+
+    def flow_id(self, slot):
+        """Id of the flow currently held by a slot (see update())"""
+        return self._ids[slot]
+
+    def lookup(self, packet):
+        """Return the active flow a packet belongs to, or None"""
+        key, _ = self._key(packet)
+        slot = self._keys.get(key) if key is not None else None
+        return self._flow(slot) if slot is not None else None
+
+    def top(self, count=5, by='bytes'):
+        """The `count` largest active flows by 'bytes' or 'packets'"""
+        totals = self._bytes if by == 'bytes' else self._packets
+        slots = heapq.nlargest(count, self._keys.values(), key=lambda slot: totals[0][slot] + totals[1][slot])
+        return [self._flow(slot) for slot in slots]
+
+    def display_flows(self, count=5):
+        """Display the largest active flows in educational format"""
+        print(f"\n🔗 FLOWS ({len(self)} active, {self.created} seen):")
+        for i, flow in enumerate(self.top(count), 1):
+            src = _endpoint(flow['src_ip'], flow['src_port'])
+            dst = _endpoint(flow['dst_ip'], flow['dst_port'])
+            state = f", {flow['tcp_state']}" if 'tcp_state' in flow else ''
+            print(f"   {i}. {flow['protocol']} {src} ↔ {dst}: {flow['packets']} packets, "
+                  f"{flow['bytes']:,} bytes ({flow['forward_packets']} → / {flow['reverse_packets']} ←{state})")
+        if self.evictions:
+            ended = ', '.join(f"{reason}: {number}" for reason, number in self.evictions.items())
+            print(f"   Ended flows - {ended}")
+        print("   💡 A flow is every packet of one conversation, both directions, keyed by its 5-tuple")
+
+    def nbytes(self):
+        """Approximate memory held by the flow slots (arrays, keys and index)"""
+        slots = len(self._slot_keys)
+        per_slot = sum(column.itemsize for column in (
+            self._used, self._orientation, self._first_seen, self._last_seen, self._state, self._ids,
+            *self._packets, *self._bytes, *self._flags
+        ))
+        keys = sum(key.__sizeof__() for key in self._keys)
+        return slots * (per_slot + 8) + keys + self._keys.__sizeof__()
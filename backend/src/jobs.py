@@ -0,0 +1,175 @@
+# src/jobs.py
+"""
+Captures as background jobs
+
+A request handler submits a capture and returns at once; the capture
+runs on a bounded thread pool. At most max_concurrent captures run at a
+time, up to max_queued more wait for a thread and further submissions
+are refused (JobLimitReached). A job can be stopped while it waits or
+runs; what it captured so far is kept.
+"""
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.capturer import PacketCapturer
+from src.reporting import get_logger
+
+log = get_logger('jobs')
+
+
+class JobNotFound(KeyError):
+    """No job with this id (never submitted, or finished long ago)"""
+
+
+class JobLimitReached(RuntimeError):
+    """Too many captures running and waiting already"""
+
+
+class CaptureJob:
+    """
+    One capture run off the request thread
+
+    state moves from 'queued' to 'running' and ends 'completed', 'failed'
+    or 'cancelled'. The packets go to session (an AnalysisSession; they are
+    numbered on from its last packet) when the capture ends, and stay in
+    the capturer otherwise.
+    """
+
+    FINISHED = ('completed', 'failed', 'cancelled')
+
+    def __init__(self, job_id, capturer, count, timeout, session=None):
+        self.id = job_id
+        self.capturer = capturer
+        self.count = count
+        self.timeout = timeout
+        self.session = session
+        self.state = 'queued'
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def packets(self):
+        return self.capturer.captured_packets
+
+    def run(self):
+        with self._lock:
+            if self._cancelled:
+                # Cancelled after a worker picked it up, before it started
+                self._finish('cancelled')
+                return
+            self.state = 'running'
+            self.started = time.time()
+        try:
+            self.capturer.start_capture(self.count, self.timeout)
+            if self.session is not None:
+                self.session.append(self.capturer.captured_packets, renumber=True)
+            self.state = 'cancelled' if self._cancelled else 'completed'
+        except Exception as e:
+            self.state = 'failed'
+            self.error = str(e)
+            log.warning(f"❌ Capture job {self.id} failed: {e}")
+        finally:
+            self.finished = time.time()
+            self._done.set()
+
+    def cancel(self):
+        """Stop the capture (it keeps what it captured) or drop it from the queue"""
+        with self._lock:
+            self._cancelled = True
+            if self.future is not None and self.future.cancel():
+                self._finish('cancelled')
+            elif self.state == 'running':
+                # A stop that lands before start_capture() still ends it
+                self.capturer.stop_capture()
+
+    def _finish(self, state):
+        self.state = state
+        self.finished = time.time()
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """Block until the job has finished; returns whether it has"""
+        return self._done.wait(timeout)
+
+    @property
+    def done(self):
+        return self.state in self.FINISHED
+
+    def info(self):
+        return {
+            'jobId': self.id,
+            'state': self.state,
+            'count': self.count,
+            'timeout': self.timeout,
+            'captured': len(self.capturer.captured_packets),
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'error': self.error,
+            'sessionId': getattr(self.session, 'id', None),
+        }
+
+
+class CaptureJobManager:
+    """
+    Thread pool of capture jobs, by id
+
+    The newest keep_finished finished jobs stay queryable; older ones
+    are forgotten.
+    """
+
+    def __init__(self, max_concurrent=4, max_queued=16, keep_finished=100):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='capture-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, count=10, timeout=30, use_real_capture=False, session=None, capturer=None):
+        """Queue a capture; returns its CaptureJob"""
+        with self._lock:
+            self._prune()
+            active = sum(1 for job in self._jobs.values() if not job.done)
+            if active >= self.max_concurrent + self.max_queued:
+                raise JobLimitReached(f"{active} captures already running or queued")
+            capturer = capturer or PacketCapturer(use_real_capture=use_real_capture)
+            job = CaptureJob(secrets.token_hex(8), capturer, count, timeout, session)
+            self._jobs[job.id] = job
+            job.future = self._executor.submit(job.run)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise JobNotFound(job_id)
+        return job
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        job.cancel()
+        return job
+
+    def shutdown(self):
+        """Stop every job and wait for the threads"""
+        for job in self.jobs():
+            job.cancel()
+        self._executor.shutdown(wait=True)
+
+    def _prune(self):
+        finished = sorted((job for job in self._jobs.values() if job.done), key=lambda job: job.finished or 0)
+        for job in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job.id]
@@ -0,0 +1,190 @@
+# src/jsonl.py
+"""
+Streaming JSON Lines captures
+
+One packet per line. JsonlWriter appends packets as they arrive and
+iter_jsonl() reads them back one at a time, so memory stays flat however
+long the capture. Files ending in .gz or .zst are compressed in
+independent frames of chunk_size packets (concatenated gzip members or
+zstd frames - ordinary gzip/zstd files to other tools), each written out
+when complete: a crash loses at most the frame being filled.
+read_jsonl() hands chunks of lines to worker processes and collects the
+decoded packets in one PacketTable.
+"""
+import gzip
+import json
+import os
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from src.reporting import get_logger
+from src.table import PacketTable
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional - gzip and plain files work without it
+    zstandard = None
+
+log = get_logger('jsonl')
+
+FORMATS = ('jsonl', 'jsonl.gz', 'jsonl.zst')
+CHUNK_PACKETS = 4096            # Packets per compressed frame
+DECODE_CHUNK_BYTES = 4 << 20    # Lines handed to a worker at a time
+MIN_PARALLEL_BYTES = 32 << 20   # Smaller files are decoded in this process
+
+# One encoder for every line (json.dumps with options builds a new one per call)
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def compression_of(path):
+    """'gzip', 'zstd' or None, from the file name"""
+    if path.endswith('.gz'):
+        return 'gzip'
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError("zstd compression needs the zstandard package (pip install zstandard)")
+        return 'zstd'
+    return None
+
+
+def _record(packet):
+    """The JSON-serializable fields of a packet (live Scapy objects are dropped)"""
+    record = {}
+    for key, value in packet.items():
+        if key == 'raw_packet':
+            continue
+        if not isinstance(value, (str, int, float, bool, list, dict, type(None))):
+            value = str(value)
+        record[key] = value
+    return record
+
+
+class JsonlWriter:
+    """
+    Append packets to a JSON Lines capture, chunk_size at a time
+
+    write() can be used as a capturer listener and write_many() as a
+    batch listener. append=True adds to an existing file.
+    """
+
+    def __init__(self, path, chunk_size=CHUNK_PACKETS, level=None, append=False):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.compression = compression_of(path)
+        self.level = level
+        self.count = 0
+        self._lines = []
+        self._compressor = zstandard.ZstdCompressor(level=level or 3) if self.compression == 'zstd' else None
+        self._file = open(path, 'ab' if append else 'wb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, packet):
+        self._lines.append(_encode(_record(packet)))
+        if len(self._lines) >= self.chunk_size:
+            self.flush()
+
+    def write_many(self, packets):
+        for packet in packets:
+            self.write(packet)
+
+    def flush(self):
+        """Write out the buffered packets as one frame"""
+        if not self._lines:
+            return
+        data = ('\n'.join(self._lines) + '\n').encode('utf-8')
+        if self.compression == 'gzip':
+            data = gzip.compress(data, compresslevel=self.level or 6, mtime=0)
+        elif self.compression == 'zstd':
+            data = self._compressor.compress(data)
+        self._file.write(data)
+        self._file.flush()
+        self.count += len(self._lines)
+        self._lines = []
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+
+
+def _decompressor(compression):
+    if compression == 'gzip':
+        return zlib.decompressobj(wbits=31)
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+def _decompressed(raw, compression, size):
+    """Decompressed pieces of a file of concatenated frames; a frame cut off mid-write ends it with a warning"""
+    if compression is None:
+        yield from iter(lambda: raw.read(size), b'')
+        return
+    frame = _decompressor(compression)
+    started = False
+    for data in iter(lambda: raw.read(size), b''):
+        while data:
+            started = True
+            yield frame.decompress(data)
+            if not frame.eof:
+                break
+            data = frame.unused_data
+            frame = _decompressor(compression)
+            started = False
+    if started:
+        log.warning(f"⚠️  {os.path.basename(raw.name)} ends in an incomplete frame, read up to where it stops")
+
+
+def _chunks(path, size=DECODE_CHUNK_BYTES):
+    """The decompressed file in pieces of whole lines (an incomplete last line is skipped)"""
+    with open(path, 'rb') as raw:
+        rest = b''
+        for data in _decompressed(raw, compression_of(path), size):
+            data = rest + data
+            cut = data.rfind(b'\n') + 1
+            rest = data[cut:]
+            if cut:
+                yield data[:cut]
+        if rest.strip():
+            log.warning(f"⚠️  {os.path.basename(path)} ends in an incomplete line, skipped")
+
+
+def _decode_chunk(data):
+    """Lines of JSON to a PacketTable (runs in a worker process)"""
+    return PacketTable(json.loads(line) for line in data.splitlines() if line.strip())
+
+
+def iter_jsonl(path):
+    """Yield the packets of a JSON Lines capture one at a time"""
+    for data in _chunks(path):
+        for line in data.splitlines():
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_jsonl(path, workers=None):
+    """
+    Read a JSON Lines capture into a PacketTable
+    Large files are decoded on `workers` processes (default: every CPU),
+    with at most two chunks per worker in flight.
+    """
+    workers = workers or os.cpu_count() or 1
+    table = PacketTable()
+    if workers == 1 or os.path.getsize(path) < MIN_PARALLEL_BYTES:
+        table.extend(iter_jsonl(path))
+        return table
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for data in _chunks(path):
+            pending.append(pool.submit(_decode_chunk, data))
+            if len(pending) >= 2 * workers:
+                table.extend_table(pending.popleft().result())
+        while pending:
+            table.extend_table(pending.popleft().result())
+    return table
@@ -0,0 +1,168 @@
+# src/parallel.py
+"""
+Multi-process analysis of large captures
+
+The capture is split into shards by a hash of each packet's flow (both
+directions of a conversation hash alike), so every flow is seen whole by
+one worker process. Each worker runs the parser, StreamingStatistics and
+the IssueDetector checks on its shard; the parent merges the partial
+results: counters and histograms are summed, top conversations merged,
+issue lists concatenated (per-packet issues in capture order).
+"""
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from src.detector import IssueDetector
+from src.parser import ProtocolParser
+from src.statistics import StreamingStatistics
+from src.table import PacketTable
+
+try:
+    import numpy as np
+except ImportError:  # Shards are hashed packet by packet without NumPy
+    np = None
+
+# Shards smaller than this are not worth a process of their own
+MIN_SHARD_PACKETS = 10000
+
+_MIX_1 = 0xFF51AFD7ED558CCD
+_MIX_2 = 0xC4CEB9FE1A85EC53
+_PORT_MIX = 0x9E3779B97F4A7C15
+
+
+def _mix(values):
+    """64-bit finalizer (MurmurHash3 fmix64) of a uint64 array"""
+    values = values ^ (values >> np.uint64(33))
+    values = values * np.uint64(_MIX_1)
+    values = values ^ (values >> np.uint64(33))
+    values = values * np.uint64(_MIX_2)
+    return values ^ (values >> np.uint64(33))
+
+
+def _endpoint_hashes(packets, address, port):
+    """Hash of each row's (address, port) endpoint"""
+    family, high, low = packets.column(address)
+    ports = np.where(packets.present(port), packets.column(port), 0).astype(np.uint64)
+    return _mix(high ^ _mix(low ^ family.astype(np.uint64)) ^ ports * np.uint64(_PORT_MIX))
+
+
+def shard_rows(packets, shards):
+    """
+    Split the rows of a capture into `shards` lists by flow hash
+    Packets without addresses (ARP, ...) belong to no flow and are dealt
+    round-robin. Rows keep their capture order inside each shard.
+    """
+    count = len(packets)
+    if shards <= 1:
+        return [np.arange(count) if np is not None else list(range(count))]
+
+    if np is not None and isinstance(packets, PacketTable) and not packets.extras('src_ip') and not packets.extras('dst_ip'):
+        src = _endpoint_hashes(packets, 'src_ip', 'src_port')
+        dst = _endpoint_hashes(packets, 'dst_ip', 'dst_port')
+        # min/max makes the hash the same in both directions
+        keys = _mix(np.minimum(src, dst) * np.uint64(_PORT_MIX) ^ np.maximum(src, dst))
+        assigned = (keys % np.uint64(shards)).astype(np.int64)
+        no_flow = ~(packets.present('src_ip') & packets.present('dst_ip'))
+        assigned[no_flow] = np.arange(int(no_flow.sum())) % shards
+        order = np.argsort(assigned, kind='stable')
+        bounds = np.searchsorted(assigned[order], np.arange(1, shards))
+        return np.split(order, bounds)
+
+    rows = [[] for _ in range(shards)]
+    spare = 0
+    for row, packet in enumerate(packets):
+        get = packet.get
+        src, dst = get('src_ip'), get('dst_ip')
+        if not src or not dst:
+            rows[spare % shards].append(row)
+            spare += 1
+            continue
+        ends = sorted(((str(src), get('src_port') or 0), (str(dst), get('dst_port') or 0)))
+        rows[hash(tuple(ends)) % shards].append(row)
+    return rows
+
+
+def analyze_shard(packets, parser_backend='fast', parse=True):
+    """
+    Analyze one shard (or a whole capture) and return its mergeable partials
+    Runs in the worker processes; everything it returns is picklable.
+    """
+    statistics = StreamingStatistics()
+    statistics.update_batch(packets)
+    partial = {
+        'statistics': statistics,
+        'issues': IssueDetector().collect(packets),
+        'protocol_count': Counter(),
+        'layer_count': Counter()
+    }
+    if parse:
+        parser = ProtocolParser(parser_backend)
+        for packet in packets:
+            partial['protocol_count'][packet.get('protocol', 'Unknown')] += 1
+            partial['layer_count'].update(list(parser.parse_packet(packet)['layers']))
+    return partial
+
+
+def _analyze_rows(packets, rows, parser_backend, parse):
+    """analyze_shard() with per-packet issue rows mapped back to the capture"""
+    partial = analyze_shard(packets, parser_backend, parse)
+    positions = rows.tolist() if np is not None and hasattr(rows, 'tolist') else rows
+    for key in ('suspicious_ports', 'small_packets'):
+        partial['issues'][key] = [(positions[row], issue) for row, issue in partial['issues'][key]]
+    return partial
+
+
+class ParallelAnalyzer:
+    """
+    Runs statistics, issue detection and parsing over a capture on
+    several processes and merges the results
+
+    workers=None uses every CPU; with one worker (or a small capture)
+    everything runs in this process.
+    """
+
+    def __init__(self, workers=None, parser_backend='fast', parse=True, min_shard_packets=MIN_SHARD_PACKETS):
+        self.workers = workers or os.cpu_count() or 1
+        self.parser_backend = parser_backend
+        self.parse = parse
+        self.min_shard_packets = min_shard_packets
+        self.detector = IssueDetector()
+
+    def analyze(self, packets):
+        """
+        Analyze a capture; returns a dict with the merged 'statistics'
+        (a StreamingStatistics), 'issues', 'protocol_count', 'layer_count'
+        and the number of 'workers' used
+        """
+        workers = max(1, min(self.workers, len(packets) // max(self.min_shard_packets, 1)))
+        if workers == 1:
+            partials = [analyze_shard(packets, self.parser_backend, self.parse)]
+        else:
+            if np is not None and not isinstance(packets, PacketTable):
+                packets = PacketTable(packets)
+            shards = [rows for rows in shard_rows(packets, workers) if len(rows)]
+            take = packets.take if isinstance(packets, PacketTable) else (lambda rows: [packets[row] for row in rows])
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_analyze_rows, take(rows), rows, self.parser_backend, self.parse)
+                           for rows in shards]
+                partials = [future.result() for future in futures]
+        return self.merge(partials, workers)
+
+    def merge(self, partials, workers=1):
+        """Combine the partial results of the shards"""
+        statistics = StreamingStatistics()
+        protocol_count = Counter()
+        layer_count = Counter()
+        for partial in partials:
+            statistics.merge(partial['statistics'])
+            protocol_count.update(partial['protocol_count'])
+            layer_count.update(partial['layer_count'])
+        issues = self.detector.report(IssueDetector.merge_partials([partial['issues'] for partial in partials]))
+        return {
+            'statistics': statistics,
+            'issues': issues,
+            'protocol_count': dict(protocol_count),
+            'layer_count': dict(layer_count),
+            'workers': workers
+        }
@@ -1,12 +1,50 @@
 # src/parser.py
+from src.decoder import (decode_headers, LINKTYPE_ETHERNET, LINKTYPE_IPV4, LINKTYPE_IPV6, LINKTYPE_LINUX_SLL,
+                         LINKTYPE_LINUX_SLL2, LINKTYPE_NULL, LINKTYPE_RAW, TCP_FLAG_STRINGS)
+from src.reporting import get_logger
+
+log = get_logger('parser')
+
+_scapy = None
+
+# Scapy layer a frame of each pcap link type starts with (raw IP types pick IP/IPv6 by version)
+SCAPY_LAYERS = {
+    LINKTYPE_ETHERNET: 'Ether',
+    LINKTYPE_NULL: 'Loopback',
+    LINKTYPE_IPV4: 'IP',
+    LINKTYPE_IPV6: 'IPv6',
+    LINKTYPE_LINUX_SLL: 'CookedLinux',
+    LINKTYPE_LINUX_SLL2: 'CookedLinuxV2',
+}
+RAW_IP_LINKTYPES = (LINKTYPE_RAW, 12, 14)
+
+
+def _load_scapy():
+    """Import Scapy once, on first use"""
+    global _scapy
+    if _scapy is None:
+        import scapy.all as scapy
+        _scapy = scapy
+    return _scapy
+
+
 class ProtocolParser:
     """
     Parses network protocol headers for educational purposes.
     Shows exactly what happens at each layer of the network stack.
+
+    backend='fast' decodes headers straight from the packet bytes and only
+    falls back to Scapy for frames it does not understand; backend='scapy'
+    always uses full Scapy dissection.
     """
     
-    def __init__(self):
-        print("🔍 ProtocolParser initialized!")
+    BACKENDS = ('fast', 'scapy')
+    
+    def __init__(self, backend='fast'):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown parser backend: {backend} (use one of {', '.join(self.BACKENDS)})")
+        self.backend = backend
+        log.debug("🔍 ProtocolParser initialized!")
     
     def parse_packet(self, packet_info):
         """
@@ -49,111 +87,158 @@ class ProtocolParser:
         'summary': 'Basic analysis - ' + message
     }
     def _parse_real_packet(self, packet_info):
-        """Parse real Scapy packet with better error handling"""
+        """Parse a real packet with the selected backend"""
+        raw_packet = packet_info.get('raw_packet')
+        if raw_packet is None or not len(raw_packet):
+            return self._create_basic_analysis(packet_info, "No raw packet data available")
+
         try:
-            import scapy.all as scapy
-            from scapy.layers.inet import IP, TCP, UDP, ICMP
-            from scapy.layers.inet6 import IPv6
-            from scapy.layers.l2 import Ether
-            
-            # Get the actual packet object
-            raw_packet = packet_info.get('raw_packet')
-            if not raw_packet:
-                return self._create_basic_analysis(packet_info, "No raw packet data available")
-            
-            layers = {}
-            
-            # Ethernet Layer (Layer 2)
-            if Ether in raw_packet:
-                eth = raw_packet[Ether]
-                layers['ethernet'] = {
-                    'source_mac': eth.src,
-                    'destination_mac': eth.dst,
-                    'type': eth.type,
-                    'description': 'Data Link Layer - Local network delivery between devices',
-                    'educational_note': 'MAC addresses identify devices on the same local network'
-                }
-            
-            # IPv4 Layer (Layer 3)  
-            if IP in raw_packet:
-                ip = raw_packet[IP]
-                layers['ip'] = {
-                    'version': 4,
-                    'source_ip': ip.src,
-                    'destination_ip': ip.dst,
-                    'time_to_live': ip.ttl,
-                    'protocol': ip.proto,
-                    'length': ip.len,
-                    'description': 'Network Layer - Routes packets between different networks using IPv4',
-                    'educational_note': f'TTL: {ip.ttl} (prevents infinite routing loops)'
-                }
-            
-            # IPv6 Layer (Layer 3)
-            elif IPv6 in raw_packet:
-                ipv6 = raw_packet[IPv6]
-                layers['ipv6'] = {
-                    'version': 6,
-                    'source_ip': ipv6.src,
-                    'destination_ip': ipv6.dst,
-                    'hop_limit': ipv6.hlim,
-                    'length': ipv6.plen,
-                    'description': 'Network Layer - Next-generation Internet Protocol with larger address space',
-                    'educational_note': 'IPv6 uses 128-bit addresses vs IPv4 32-bit addresses'
-                }
-            
-            # TCP Layer (Layer 4)
-            if TCP in raw_packet:
-                tcp = raw_packet[TCP]
-                layers['tcp'] = {
-                    'source_port': tcp.sport,
-                    'destination_port': tcp.dport,
-                    'sequence_number': tcp.seq,
-                    'acknowledgment_number': tcp.ack,
-                    'flags': self._parse_tcp_flags(tcp.flags),
-                    'window_size': tcp.window,
-                    'description': 'Transport Layer - Reliable, connection-oriented communication',
-                    'educational_note': 'Sequence numbers ensure data arrives in correct order'
-                }
-            
-            # UDP Layer (Layer 4)
-            if UDP in raw_packet:
-                udp = raw_packet[UDP]
-                layers['udp'] = {
-                    'source_port': udp.sport,
-                    'destination_port': udp.dport,
-                    'length': udp.len,
-                    'description': 'Transport Layer - Fast, connectionless communication',
-                    'educational_note': 'Used for DNS, VoIP, and other time-sensitive applications'
-                }
-            
-            # Special protocols
-            if scapy.ICMPv6ND_RA in raw_packet:
-                layers['icmpv6'] = {
-                    'type': 'Router Advertisement',
-                    'description': 'ICMPv6 - Router discovery and configuration',
-                    'educational_note': 'Helps devices automatically configure IPv6 addresses'
-                }
-            elif scapy.ICMPv6MLReport2 in raw_packet:
-                layers['icmpv6'] = {
-                    'type': 'Multicast Listener Report',
-                    'description': 'ICMPv6 - Multicast group management',
-                    'educational_note': 'Devices use this to join/leave multicast groups'
-                }
-            
-            if layers:
-                return {
-                    'packet_number': packet_info['number'],
-                    'protocol': packet_info.get('protocol', 'Mixed'),
-                    'layers': layers,
-                    'summary': f"Parsed {len(layers)} protocol layers"
-                }
-            else:
-                return self._create_basic_analysis(packet_info, "No recognizable protocol layers found")
-            
+            headers = None
+            if self.backend == 'fast':
+                headers = self._fast_headers(raw_packet, packet_info.get('linktype', LINKTYPE_ETHERNET))
+            if headers is None:
+                headers = self._scapy_headers(raw_packet, packet_info.get('linktype', LINKTYPE_ETHERNET))
+            layers = self._build_layers(headers)
         except Exception as e:
             return self._create_basic_analysis(packet_info, f"Parsing error: {str(e)}")
 
-    
+        if layers:
+            return {
+                'packet_number': packet_info['number'],
+                'protocol': packet_info.get('protocol', 'Mixed'),
+                'layers': layers,
+                'summary': f"Parsed {len(layers)} protocol layers"
+            }
+        return self._create_basic_analysis(packet_info, "No recognizable protocol layers found")
+
+    def _fast_headers(self, raw_packet, linktype):
+        """Decode headers straight from the packet bytes (None = needs Scapy)"""
+        if isinstance(raw_packet, (bytes, bytearray, memoryview)):
+            return decode_headers(raw_packet, linktype)
+        if type(raw_packet).__name__ == 'Ether':
+            # Sniffed Scapy packet: its bytes are cached from the capture
+            return decode_headers(bytes(raw_packet), LINKTYPE_ETHERNET)
+        return None
+
+    def _scapy_headers(self, raw_packet, linktype=LINKTYPE_ETHERNET):
+        """Dissect the packet with Scapy into the same header fields"""
+        scapy = _load_scapy()
+        if isinstance(raw_packet, (bytes, bytearray, memoryview)):
+            data = bytes(raw_packet)
+            if linktype in RAW_IP_LINKTYPES:
+                layer = 'IPv6' if data and data[0] >> 4 == 6 else 'IP'
+            else:
+                layer = SCAPY_LAYERS.get(linktype, 'Raw')
+            raw_packet = getattr(scapy, layer)(data)
+
+        headers = {}
+        if scapy.Ether in raw_packet:
+            eth = raw_packet[scapy.Ether]
+            headers['ethernet'] = {'src': eth.src, 'dst': eth.dst, 'type': eth.type}
+        if scapy.IP in raw_packet:
+            ip = raw_packet[scapy.IP]
+            headers['ip'] = {'src': ip.src, 'dst': ip.dst, 'ttl': ip.ttl, 'proto': ip.proto, 'len': ip.len}
+        elif scapy.IPv6 in raw_packet:
+            ipv6 = raw_packet[scapy.IPv6]
+            headers['ipv6'] = {'src': ipv6.src, 'dst': ipv6.dst, 'hlim': ipv6.hlim, 'plen': ipv6.plen}
+        if scapy.TCP in raw_packet:
+            tcp = raw_packet[scapy.TCP]
+            headers['tcp'] = {
+                'sport': tcp.sport, 'dport': tcp.dport, 'seq': tcp.seq, 'ack': tcp.ack,
+                'flags': int(tcp.flags) & 0xFF, 'window': tcp.window
+            }
+        if scapy.UDP in raw_packet:
+            udp = raw_packet[scapy.UDP]
+            headers['udp'] = {'sport': udp.sport, 'dport': udp.dport, 'len': udp.len}
+        if scapy.ICMPv6ND_RA in raw_packet:
+            headers['icmpv6'] = {'type': 134}
+        elif scapy.ICMPv6MLReport2 in raw_packet:
+            headers['icmpv6'] = {'type': 143}
+        return headers
+
+    def _build_layers(self, headers):
+        """Turn decoded header fields into the educational layer structure"""
+        layers = {}
+
+        # Ethernet Layer (Layer 2)
+        if 'ethernet' in headers:
+            eth = headers['ethernet']
+            layers['ethernet'] = {
+                'source_mac': eth['src'],
+                'destination_mac': eth['dst'],
+                'type': eth['type'],
+                'description': 'Data Link Layer - Local network delivery between devices',
+                'educational_note': 'MAC addresses identify devices on the same local network'
+            }
+
+        # IPv4 Layer (Layer 3)
+        if 'ip' in headers:
+            ip = headers['ip']
+            layers['ip'] = {
+                'version': 4,
+                'source_ip': ip['src'],
+                'destination_ip': ip['dst'],
+                'time_to_live': ip['ttl'],
+                'protocol': ip['proto'],
+                'length': ip['len'],
+                'description': 'Network Layer - Routes packets between different networks using IPv4',
+                'educational_note': f"TTL: {ip['ttl']} (prevents infinite routing loops)"
+            }
+
+        # IPv6 Layer (Layer 3)
+        elif 'ipv6' in headers:
+            ipv6 = headers['ipv6']
+            layers['ipv6'] = {
+                'version': 6,
+                'source_ip': ipv6['src'],
+                'destination_ip': ipv6['dst'],
+                'hop_limit': ipv6['hlim'],
+                'length': ipv6['plen'],
+                'description': 'Network Layer - Next-generation Internet Protocol with larger address space',
+                'educational_note': 'IPv6 uses 128-bit addresses vs IPv4 32-bit addresses'
+            }
+
+        # TCP Layer (Layer 4)
+        if 'tcp' in headers:
+            tcp = headers['tcp']
+            layers['tcp'] = {
+                'source_port': tcp['sport'],
+                'destination_port': tcp['dport'],
+                'sequence_number': tcp['seq'],
+                'acknowledgment_number': tcp['ack'],
+                'flags': self._parse_tcp_flags(TCP_FLAG_STRINGS[tcp['flags']]),
+                'window_size': tcp['window'],
+                'description': 'Transport Layer - Reliable, connection-oriented communication',
+                'educational_note': 'Sequence numbers ensure data arrives in correct order'
+            }
+
+        # UDP Layer (Layer 4)
+        if 'udp' in headers:
+            udp = headers['udp']
+            layers['udp'] = {
+                'source_port': udp['sport'],
+                'destination_port': udp['dport'],
+                'length': udp['len'],
+                'description': 'Transport Layer - Fast, connectionless communication',
+                'educational_note': 'Used for DNS, VoIP, and other time-sensitive applications'
+            }
+
+        # Special protocols
+        icmpv6_type = headers.get('icmpv6', {}).get('type')
+        if icmpv6_type == 134:
+            layers['icmpv6'] = {
+                'type': 'Router Advertisement',
+                'description': 'ICMPv6 - Router discovery and configuration',
+                'educational_note': 'Helps devices automatically configure IPv6 addresses'
+            }
+        elif icmpv6_type == 143:
+            layers['icmpv6'] = {
+                'type': 'Multicast Listener Report',
+                'description': 'ICMPv6 - Multicast group management',
+                'educational_note': 'Devices use this to join/leave multicast groups'
+            }
+        return layers
+
     def _parse_tcp_flags(self, flags):
         """Convert TCP flags to human-readable format"""
         flag_descriptions = {
@@ -0,0 +1,320 @@
+# src/pcap.py
+import array
+import mmap
+import os
+import struct
+import time
+
+from src.decoder import decode_frame, decode_columns, LINKTYPE_ETHERNET
+from src.table import PacketTable
+
+try:
+    import numpy as np
+except ImportError:  # read_table() decodes packet by packet without NumPy
+    np = None
+
+PCAP_MAGIC_USEC = 0xA1B2C3D4
+PCAP_MAGIC_NSEC = 0xA1B23C4D
+PCAPNG_SECTION_HEADER = 0x0A0D0D0A
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+
+PCAPNG_INTERFACE_DESCRIPTION = 0x00000001
+PCAPNG_PACKET = 0x00000002
+PCAPNG_SIMPLE_PACKET = 0x00000003
+PCAPNG_ENHANCED_PACKET = 0x00000006
+PCAPNG_OPTION_TSRESOL = 9
+
+SCAN_CHUNK = 65536   # Record headers gathered per step by _scan_pcap (16 x 8-byte index each)
+
+
+class PcapFormatError(ValueError):
+    """Raised when a file is not a readable pcap/pcapng capture"""
+
+
+class PcapReader:
+    """
+    Streaming reader for pcap and pcapng files
+
+    The file is memory-mapped and every record is handed out as a
+    memoryview slice of the mapping - no per-packet copies and no Scapy.
+    Release the slices (or copy them with bytes()) before close().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < 24:
+            self._file.close()
+            raise PcapFormatError(f"File too small to be a capture: {path}")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        magic = struct.unpack_from('<I', self._view, 0)[0]
+        if magic == PCAPNG_SECTION_HEADER:
+            self.format = 'pcapng'
+        elif magic in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC) or struct.unpack_from('>I', self._view, 0)[0] in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC):
+            self.format = 'pcap'
+        else:
+            self.close()
+            raise PcapFormatError(f"Not a pcap or pcapng file: {path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Unmap and close the file"""
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # A caller still holds record slices; the GC unmaps later
+            self._mmap = None
+        self._file.close()
+
+    def __iter__(self):
+        """Yield (timestamp, wire_length, linktype, frame memoryview) per record"""
+        view = self._view
+        for timestamp, wire_length, linktype, offset, captured in self._records():
+            yield timestamp, wire_length, linktype, view[offset:offset + captured]
+
+    def _records(self, start=None, positions=False):
+        """
+        Yield (timestamp, wire_length, linktype, data offset, captured length)
+        From start, a position of an earlier positions=True pass, instead of
+        the first record; positions=True appends each record's position.
+        """
+        if self.format == 'pcap':
+            return self._pcap_records(start, positions)
+        return self._pcapng_records(start, positions)
+
+    def records(self, start=None, positions=False):
+        """Record locations without decoding anything (see _records); frame() reads one"""
+        return self._records(start, positions)
+
+    def frame(self, offset, captured):
+        """The bytes of a record, as a memoryview slice of the mapping"""
+        return self._view[offset:offset + captured]
+
+    def _pcap_header(self):
+        """Return (byte order, timestamp divisor, linktype) of a classic pcap"""
+        magic_le = struct.unpack_from('<I', self._view, 0)[0]
+        order = '<' if magic_le in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC) else '>'
+        magic = struct.unpack_from(order + 'I', self._view, 0)[0]
+        divisor = 1e9 if magic == PCAP_MAGIC_NSEC else 1e6
+        linktype = struct.unpack_from(order + 'I', self._view, 20)[0] & 0x0FFFFFFF
+        return order, divisor, linktype
+
+    def _pcap_records(self, start=None, positions=False):
+        view = self._view
+        order, divisor, linktype = self._pcap_header()
+        unpack_from = struct.Struct(order + 'IIII').unpack_from
+        offset = start[0] if start else 24
+        end = len(view)
+        while offset + 16 <= end:
+            seconds, fraction, captured, wire_length = unpack_from(view, offset)
+            if offset + 16 + captured > end:
+                break  # Truncated final record
+            if positions:
+                yield seconds + fraction / divisor, wire_length, linktype, offset + 16, captured, (offset, None)
+            else:
+                yield seconds + fraction / divisor, wire_length, linktype, offset + 16, captured
+            offset += 16 + captured
+
+    def _pcapng_records(self, start=None, positions=False):
+        view = self._view
+        end = len(view)
+        offset = 0
+        order = '<'
+        interfaces = []
+        if start:
+            # (block offset, (byte order, interfaces)) - the section state the block is read with
+            offset, (order, interfaces) = start[0], start[1]
+            interfaces = [tuple(interface) for interface in interfaces]
+        state = (order, tuple(interfaces))
+
+        while offset + 12 <= end:
+            block_type = struct.unpack_from(order + 'I', view, offset)[0]
+            if block_type == PCAPNG_SECTION_HEADER:
+                byte_order = struct.unpack_from('<I', view, offset + 8)[0]
+                order = '<' if byte_order == PCAPNG_BYTE_ORDER_MAGIC else '>'
+                interfaces = []
+                state = (order, ())
+            block_length = struct.unpack_from(order + 'I', view, offset + 4)[0]
+            if block_length < 12 or offset + block_length > end:
+                break  # Truncated or corrupt block
+            body = offset + 8
+            body_end = offset + block_length - 4
+
+            if block_type == PCAPNG_ENHANCED_PACKET:
+                interface, high, low, captured, wire_length = struct.unpack_from(order + 'IIIII', view, body)
+                linktype, resolution = interfaces[interface] if interface < len(interfaces) else (LINKTYPE_ETHERNET, 1e-6)
+                data = body + 20
+                record = ((high << 32) | low) * resolution, wire_length, linktype, data, min(captured, body_end - data)
+                yield record + ((offset, state),) if positions else record
+            elif block_type == PCAPNG_SIMPLE_PACKET:
+                wire_length = struct.unpack_from(order + 'I', view, body)[0]
+                linktype = interfaces[0][0] if interfaces else LINKTYPE_ETHERNET
+                data = body + 4
+                record = 0.0, wire_length, linktype, data, min(wire_length, body_end - data)
+                yield record + ((offset, state),) if positions else record
+            elif block_type == PCAPNG_PACKET:
+                interface, _, high, low, captured, wire_length = struct.unpack_from(order + 'HHIIII', view, body)
+                linktype, resolution = interfaces[interface] if interface < len(interfaces) else (LINKTYPE_ETHERNET, 1e-6)
+                data = body + 20
+                record = ((high << 32) | low) * resolution, wire_length, linktype, data, min(captured, body_end - data)
+                yield record + ((offset, state),) if positions else record
+            elif block_type == PCAPNG_INTERFACE_DESCRIPTION:
+                linktype = struct.unpack_from(order + 'H', view, body)[0]
+                interfaces.append((linktype, self._interface_resolution(view, order, body + 8, body_end)))
+                state = (order, tuple(interfaces))
+
+            offset += block_length
+
+    def _interface_resolution(self, view, order, offset, end):
+        """Read the if_tsresol option of an interface (default microseconds)"""
+        while offset + 4 <= end:
+            code, length = struct.unpack_from(order + 'HH', view, offset)
+            if code == 0:
+                break
+            if code == PCAPNG_OPTION_TSRESOL and length >= 1:
+                value = view[offset + 4]
+                return 2.0 ** -(value & 0x7F) if value & 0x80 else 10.0 ** -value
+            offset += 4 + (length + 3) // 4 * 4
+        return 1e-6
+
+    def iter_packets(self, start_number=1):
+        """Yield one capturer-style packet_info dict per record"""
+        number = start_number
+        for timestamp, wire_length, linktype, frame in self:
+            packet_info = decode_frame(frame, linktype)
+            packet_info['number'] = number
+            packet_info['timestamp'] = timestamp
+            packet_info['length'] = wire_length
+            packet_info['real_packet'] = True
+            frame.release()
+            yield packet_info
+            number += 1
+
+    def read_table(self):
+        """
+        Decode the whole file into a PacketTable
+        With NumPy the headers are decoded column-wise in a few array passes.
+        """
+        if np is None:
+            return PacketTable(self.iter_packets())
+
+        scan = self._scan_pcap() if self.format == 'pcap' else self._scan_pcapng()
+        if scan is None:
+            return PacketTable(self.iter_packets())  # Mixed link types
+        timestamps, wire_lengths, offsets, captured, linktype = scan
+
+        table = PacketTable()
+        count = len(offsets)
+        if not count:
+            return table
+        values, present = decode_columns(self._mmap, offsets, captured, linktype)
+        values['number'] = np.arange(1, count + 1, dtype=np.uint32)
+        values['timestamp'] = timestamps
+        values['length'] = wire_lengths
+        values['real_packet'] = np.ones(count, dtype=np.uint8)
+        table.extend_columns(count, values, present)
+        return table
+
+    def _scan_pcap(self):
+        """Locate every record of a classic pcap in one tight loop"""
+        view = self._view
+        order, divisor, linktype = self._pcap_header()
+        unpack_from = struct.Struct(order + 'I').unpack_from
+        headers = array.array('Q')
+        append = headers.append
+        offset = 24
+        end = len(view) - 16
+        while offset <= end:
+            captured = unpack_from(view, offset + 8)[0]
+            if offset + 16 + captured > end + 16:
+                break  # Truncated final record
+            append(offset)
+            offset += 16 + captured
+
+        # Gather the 16-byte record headers a chunk at a time and split them into fields
+        positions = np.frombuffer(headers, dtype=np.uint64).astype(np.int64)
+        count = len(positions)
+        timestamps = np.empty(count, dtype=np.float64)
+        wire_lengths = np.empty(count, dtype=np.int64)
+        captured_lengths = np.empty(count, dtype=np.int64)
+        data = np.frombuffer(self._mmap, dtype=np.uint8)
+        span = np.arange(16)
+        for start in range(0, count, SCAN_CHUNK):
+            stop = min(start + SCAN_CHUNK, count)
+            raw = data[positions[start:stop, None] + span]
+            fields = raw.view(order + 'u4').astype(np.int64)
+            timestamps[start:stop] = fields[:, 0] + fields[:, 1] / divisor
+            captured_lengths[start:stop] = fields[:, 2]
+            wire_lengths[start:stop] = fields[:, 3]
+        return timestamps, wire_lengths, positions + 16, captured_lengths, linktype
+
+    def _scan_pcapng(self):
+        """Locate every packet block of a pcapng file"""
+        timestamps = array.array('d')
+        wire_lengths = array.array('Q')
+        offsets = array.array('Q')
+        captured_lengths = array.array('Q')
+        linktypes = set()
+        for timestamp, wire_length, linktype, offset, captured in self._pcapng_records():
+            timestamps.append(timestamp)
+            wire_lengths.append(wire_length)
+            offsets.append(offset)
+            captured_lengths.append(captured)
+            linktypes.add(linktype)
+        if len(linktypes) > 1:
+            return None
+        return (
+            np.frombuffer(timestamps, dtype=np.float64).copy(),
+            np.frombuffer(wire_lengths, dtype=np.uint64).astype(np.int64),
+            np.frombuffer(offsets, dtype=np.uint64).astype(np.int64),
+            np.frombuffer(captured_lengths, dtype=np.uint64).astype(np.int64),
+            linktypes.pop() if linktypes else LINKTYPE_ETHERNET
+        )
+
+
+class PcapWriter:
+    """Writes raw frames to a classic (microsecond) pcap file"""
+
+    def __init__(self, path, linktype=LINKTYPE_ETHERNET, snaplen=262144):
+        self._file = open(path, 'wb')
+        self._record = struct.Struct('<IIII')
+        self._file.write(struct.pack('<IHHiIII', PCAP_MAGIC_USEC, 2, 4, 0, 0, snaplen, linktype))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, frame, timestamp=None, wire_length=None):
+        """Append one frame"""
+        if timestamp is None:
+            timestamp = time.time()
+        seconds = int(timestamp)
+        micros = int(round((timestamp - seconds) * 1e6))
+        if micros >= 1000000:
+            seconds += 1
+            micros -= 1000000
+        self._file.write(self._record.pack(seconds, micros, len(frame), wire_length or len(frame)))
+        self._file.write(frame)
+
+    def close(self):
+        self._file.close()
+
+
+def read_pcap(path):
+    """Read a pcap/pcapng file into a PacketTable"""
+    with PcapReader(path) as reader:
+        return reader.read_table()
@@ -0,0 +1,115 @@
+# src/reporting.py
+"""
+Console reporting: leveled messages and rate-limited capture progress
+
+Library modules never print from their hot paths. They report through
+the 'packetanalyzer' logger, which stays silent until the application
+calls configure(). Levels, quietest first:
+  quiet   - warnings and errors only
+  info    - what captures, filters, loads and saves did
+  verbose - also constructor banners and one line per packet
+A capture's progress (ProgressReporter) is reported at info level, at
+most once per interval instead of once per packet.
+"""
+import logging
+import sys
+import time
+
+# Level of the per-packet lines, below DEBUG (constructor banners)
+PACKETS = 5
+logging.addLevelName(PACKETS, 'PACKETS')
+
+LEVELS = {
+    'quiet': logging.WARNING,
+    'info': logging.INFO,
+    'verbose': PACKETS,
+}
+
+logger = logging.getLogger('packetanalyzer')
+logger.addHandler(logging.NullHandler())
+_handler = None
+
+
+def get_logger(name):
+    """The logger a module reports through, e.g. get_logger('capturer')"""
+    return logger.getChild(name)
+
+
+def configure(level='info', stream=None):
+    """
+    Show the analyzer's messages at `level` (see LEVELS) and above as plain
+    lines on stream (default: stdout). Calling it again replaces the
+    previous configuration.
+    """
+    global _handler
+    if level not in LEVELS:
+        raise ValueError(f"Unknown reporting level: {level} (use one of {', '.join(LEVELS)})")
+    if _handler is not None:
+        logger.removeHandler(_handler)
+    _handler = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(LEVELS[level])
+    logger.propagate = False
+    return logger
+
+
+def format_rate(bytes_per_second):
+    """Human readable bytes/s"""
+    for unit in ('B', 'KB', 'MB'):
+        if bytes_per_second < 1024:
+            return f"{bytes_per_second:.1f} {unit}/s"
+        bytes_per_second /= 1024
+    return f"{bytes_per_second:.1f} GB/s"
+
+
+class ProgressReporter:
+    """
+    Capture progress, one line per interval seconds at most
+
+    A capturer calls start(), then update(packets, bytes, drops) as
+    batches are delivered, then finish(). Each line gives the packet and
+    byte rates since the previous line, the running total and the drops
+    (ring plus kernel) so far. Lines go to emit(line) - the info level of
+    the 'packetanalyzer' logger by default. Any object with these three
+    methods can be plugged into PacketCapturer.progress instead.
+    """
+
+    def __init__(self, interval=1.0, emit=None):
+        self.interval = interval
+        self.emit = emit if emit is not None else get_logger('progress').info
+        self.lines = 0
+        self.start()
+
+    def start(self):
+        self.packets = 0
+        self.bytes = 0
+        self.drops = 0
+        self._started = self._last = time.monotonic()
+        self._last_packets = 0
+        self._last_bytes = 0
+
+    def update(self, packets, nbytes=0, drops=None):
+        self.packets += packets
+        self.bytes += nbytes
+        if drops is not None:
+            self.drops = drops
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            self._report(now)
+
+    def finish(self):
+        """Report what arrived since the last line (only if lines were reported)"""
+        if self.lines and self.packets != self._last_packets:
+            self._report(time.monotonic())
+
+    def _report(self, now):
+        elapsed = max(now - self._last, 1e-9)
+        rate = (self.packets - self._last_packets) / elapsed
+        byte_rate = (self.bytes - self._last_bytes) / elapsed
+        self.emit(f"⏱️  {rate:,.0f} pkt/s, {format_rate(byte_rate)} - {self.packets:,} packets "
+                  f"in {now - self._started:.0f}s, {self.drops:,} dropped")
+        self.lines += 1
+        self._last = now
+        self._last_packets = self.packets
+        self._last_bytes = self.bytes
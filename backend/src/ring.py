@@ -0,0 +1,148 @@
+# src/ring.py
+"""
+Bounded frame ring between the capture thread and the packet consumers
+
+The capture thread only copies each frame's bytes into a preallocated slot
+and moves on; decoding, statistics and everything else happen on consumer
+threads that drain the ring. When consumers fall behind, the backpressure
+policy decides what gives:
+
+- drop-newest: incoming frames are dropped while the ring is full
+- drop-oldest: the oldest unread frame is overwritten
+- block:       the capture thread waits for a free slot (the kernel
+               socket buffer absorbs the burst, or drops instead)
+"""
+import array
+import threading
+import time
+
+from src.decoder import LINKTYPE_ETHERNET
+
+POLICIES = ('drop-newest', 'drop-oldest', 'block')
+
+
+class FrameRing:
+    """
+    Fixed-size ring of raw frames with drop counters
+
+    slots frames of at most snaplen bytes each live in one preallocated
+    buffer, so pushing a frame never allocates. Longer frames are cut to
+    snaplen (counted as truncated; the wire length is kept).
+    """
+
+    def __init__(self, slots=8192, snaplen=2048, policy='drop-newest'):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy} (use one of {', '.join(POLICIES)})")
+        if slots < 1 or snaplen < 1:
+            raise ValueError("slots and snaplen must be positive")
+        self.slots = slots
+        self.snaplen = snaplen
+        self.policy = policy
+        self._buffer = bytearray(slots * snaplen)
+        self._view = memoryview(self._buffer)
+        self._captured = array.array('I', [0]) * slots
+        self._wire = array.array('I', [0]) * slots
+        self._timestamps = array.array('d', [0.0]) * slots
+        self._linktypes = array.array('H', [0]) * slots
+        self._head = 0  # Frames ever written
+        self._tail = 0  # Frames ever read (or overwritten)
+        self._closed = False
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self.pushed = 0
+        self.popped = 0
+        self.dropped = 0
+        self.truncated = 0
+        self.high_water = 0
+        self.blocked_seconds = 0.0
+
+    def push(self, data, timestamp, linktype=LINKTYPE_ETHERNET, wire_length=None):
+        """Copy one frame into the ring; returns False when it was dropped"""
+        with self._lock:
+            if self._closed:
+                return False
+            if self._head - self._tail >= self.slots:
+                if self.policy == 'drop-newest':
+                    self.dropped += 1
+                    return False
+                if self.policy == 'drop-oldest':
+                    self._tail += 1
+                    self.dropped += 1
+                else:
+                    started = time.perf_counter()
+                    while self._head - self._tail >= self.slots and not self._closed:
+                        self._not_full.wait()
+                    self.blocked_seconds += time.perf_counter() - started
+                    if self._closed:
+                        return False
+
+            slot = self._head % self.slots
+            size = len(data)
+            if size > self.snaplen:
+                size = self.snaplen
+                self.truncated += 1
+            start = slot * self.snaplen
+            self._view[start:start + size] = data[:size] if size < len(data) else data
+            self._captured[slot] = size
+            self._wire[slot] = wire_length if wire_length is not None else len(data)
+            self._timestamps[slot] = timestamp
+            self._linktypes[slot] = linktype
+            self._head += 1
+            self.pushed += 1
+            depth = self._head - self._tail
+            if depth > self.high_water:
+                self.high_water = depth
+            self._not_empty.notify()
+            return True
+
+    def pop_batch(self, max_count=64, timeout=None):
+        """
+        Take up to max_count frames, oldest first, as
+        (timestamp, wire length, linktype, bytes) tuples
+        Waits up to timeout seconds (None = forever) for the first one; an
+        empty list means the wait timed out or the ring is closed and drained.
+        """
+        with self._lock:
+            if self._head == self._tail and not self._closed:
+                self._not_empty.wait(timeout)
+            count = min(max_count, self._head - self._tail)
+            frames = []
+            for sequence in range(self._tail, self._tail + count):
+                slot = sequence % self.slots
+                start = slot * self.snaplen
+                frames.append((self._timestamps[slot], self._wire[slot], self._linktypes[slot],
+                               bytes(self._view[start:start + self._captured[slot]])))
+            self._tail += count
+            self.popped += count
+            if count:
+                self._not_full.notify_all()
+            return frames
+
+    def close(self):
+        """Stop accepting frames; consumers drain what is left, then get []"""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def __len__(self):
+        return self._head - self._tail
+
+    def stats(self):
+        """Counters of the ring: frames pushed/popped/dropped, depth and high-water mark"""
+        return {
+            'policy': self.policy,
+            'slots': self.slots,
+            'pushed': self.pushed,
+            'popped': self.popped,
+            'dropped': self.dropped,
+            'truncated': self.truncated,
+            'depth': len(self),
+            'high_water': self.high_water,
+            'blocked_seconds': round(self.blocked_seconds, 3)
+        }
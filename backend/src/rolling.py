@@ -0,0 +1,354 @@
+# src/rolling.py
+"""
+Rolling capture storage for continuous monitoring
+
+RollingStorage writes packets into a directory of time-partitioned .pkb
+segments, one per segment_seconds bucket of packet time:
+
+  segment-<start>-<end>-<seq>.pkb     start/end: epoch seconds, end excluded
+
+A segment is closed (its index written) once packets of a later bucket
+arrive or its bucket is over, and rotated to the next seq when it grows
+past max_segment_bytes. Packets that arrive for a bucket whose segment
+is closed start a new seq rather than reopening it, so closed segments
+never change. A background thread flushes open segments every
+flush_seconds, merges runs of small closed segments into one (their
+names then span several buckets) and applies the retention policy:
+segments that ended more than retention_seconds ago and the oldest
+beyond retention_bytes in total are deleted.
+
+Time-range reads pick segments by name and read them through their
+block index, so only the segments and blocks that overlap the range are
+decoded.
+
+Crash safety: open segments are flushed block by block, and a segment
+cut off mid-write keeps its complete blocks - on start its index is
+rebuilt from them. A merge writes the new segment to a temporary file
+and records what it replaces in compaction.json before swapping it in;
+on start a merge that got that far is finished and any other is undone.
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+from src.blockstore import BlockReader, BlockWriter, DEFAULT_BLOCK_SIZE
+from src.reporting import get_logger
+from src.table import PacketTable
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional - packets are routed to segments one at a time without it
+    np = None
+
+log = get_logger('rolling')
+
+JOURNAL_FILE = 'compaction.json'
+_SEGMENT_NAME = re.compile(r'^segment-(\d+)-(\d+)-(\d+)\.pkb$')
+
+Segment = namedtuple('Segment', 'path start end seq size')
+
+
+def segment_name(start, end, seq):
+    return f"segment-{start}-{end}-{seq:03d}.pkb"
+
+
+class RollingStorage:
+    """
+    Time-partitioned capture segments with rotation, compaction and retention
+
+    write() / write_many() can be used as capturer listeners; close() at
+    the end. maintenance_interval=None runs no background thread
+    (call maintain() instead).
+    """
+
+    def __init__(self, directory, segment_seconds=60, max_segment_bytes=64 << 20, compact_bytes=None,
+                 retention_seconds=None, retention_bytes=None, flush_seconds=5, maintenance_interval=10,
+                 block_size=DEFAULT_BLOCK_SIZE):
+        self.path = directory
+        self.segment_seconds = int(segment_seconds)
+        self.max_segment_bytes = max_segment_bytes
+        self.compact_bytes = compact_bytes if compact_bytes is not None else max_segment_bytes // 8
+        self.retention_seconds = retention_seconds
+        self.retention_bytes = retention_bytes
+        self.flush_seconds = flush_seconds
+        self.block_size = block_size
+        self.count = 0
+        self._writers = {}     # bucket start -> BlockWriter of its open segment
+        self._newest = None
+        self._flushed = time.monotonic()
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+        self._stop = threading.Event()
+        self._thread = None
+        if maintenance_interval:
+            self._thread = threading.Thread(target=self._maintenance, args=(maintenance_interval,),
+                                            name='rolling-maintenance', daemon=True)
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Segments
+
+    def segments(self, start_time=None, end_time=None):
+        """Segments overlapping start_time <= t < end_time, oldest first"""
+        found = []
+        for filename in os.listdir(self.path):
+            match = _SEGMENT_NAME.match(filename)
+            if match is None:
+                continue
+            start, end, seq = (int(part) for part in match.groups())
+            if (start_time is not None and end <= start_time) or (end_time is not None and start >= end_time):
+                continue
+            path = os.path.join(self.path, filename)
+            try:
+                found.append(Segment(path, start, end, seq, os.path.getsize(path)))
+            except OSError:
+                continue  # Removed by compaction or retention meanwhile
+        return sorted(found, key=lambda segment: (segment.start, segment.end, segment.seq))
+
+    def _next_seq(self, start, end):
+        taken = [segment.seq for segment in self.segments() if (segment.start, segment.end) == (start, end)]
+        return max(taken) + 1 if taken else 0
+
+    def _bucket(self, timestamp):
+        return int(timestamp // self.segment_seconds) * self.segment_seconds
+
+    def _open_paths(self):
+        return {writer.path for writer in self._writers.values()}
+
+    def _timestamp(self, packet):
+        timestamp = packet.get('timestamp')
+        return timestamp if isinstance(timestamp, (int, float)) else time.time()
+
+    # Writing
+
+    def write(self, packet):
+        """Add one packet; packets without a timestamp are filed under the current time"""
+        self.write_many([packet])
+
+    def write_many(self, packets):
+        """Add many packets; a PacketTable is split by bucket column-wise"""
+        if not isinstance(packets, PacketTable) or np is None:
+            with self._lock:
+                for packet in packets:
+                    bucket = self._bucket(self._timestamp(packet))
+                    writer = self._writer(bucket)
+                    writer.write(packet)
+                    self.count += 1
+                    if writer.size >= self.max_segment_bytes:
+                        self._rotate(bucket)
+                self._after_write()
+            return
+        timestamps = np.where(packets.present('timestamp'), packets.column('timestamp'), time.time())
+        buckets = (timestamps // self.segment_seconds).astype(np.int64) * self.segment_seconds
+        with self._lock:
+            for bucket in np.unique(buckets):
+                rows = np.flatnonzero(buckets == bucket)
+                self._writer(int(bucket)).write_many(packets if len(rows) == len(packets) else packets.take(rows))
+            self.count += len(packets)
+            self._after_write()
+
+    def _writer(self, bucket):
+        """The open segment of a bucket, opening a new one if needed"""
+        if bucket in self._writers:
+            return self._writers[bucket]
+        if self._newest is None or bucket > self._newest:
+            self._newest = bucket
+        end = bucket + self.segment_seconds
+        path = os.path.join(self.path, segment_name(bucket, end, self._next_seq(bucket, end)))
+        writer = self._writers[bucket] = BlockWriter(path, self.block_size)
+        return writer
+
+    def _after_write(self):
+        for bucket, writer in list(self._writers.items()):
+            if bucket < self._newest - self.segment_seconds:
+                # Older than the bucket before the newest: over (or late packets, filed away)
+                self._close_writer(bucket)
+            elif writer.size >= self.max_segment_bytes:
+                self._rotate(bucket)
+        if time.monotonic() - self._flushed >= self.flush_seconds:
+            self.flush()
+
+    def _rotate(self, bucket):
+        """Close a full segment; the bucket's next packets start the next seq"""
+        writer = self._writers[bucket]
+        log.debug(f"🔄 Rotating {os.path.basename(writer.path)} at {writer.size / 2**20:.1f} MB")
+        self._close_writer(bucket)
+
+    def _close_writer(self, bucket):
+        self._writers.pop(bucket).close()
+
+    def flush(self):
+        """Write the buffered packets of every open segment to disk"""
+        with self._lock:
+            for writer in self._writers.values():
+                writer.flush()
+            self._flushed = time.monotonic()
+
+    def close(self):
+        """Stop the maintenance thread and close every open segment"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            for bucket in list(self._writers):
+                self._close_writer(bucket)
+
+    # Reading
+
+    def _readers(self, start_time=None, end_time=None):
+        """BlockReaders of the overlapping segments; open ones are flushed and read up to there"""
+        readers = []
+        with self._lock:
+            live = {writer.path: writer for writer in self._writers.values()}
+            for segment in self.segments(start_time, end_time):
+                writer = live.get(segment.path)
+                if writer is not None:
+                    writer.flush()
+                    readers.append(BlockReader(segment.path, blocks=writer.blocks))
+                else:
+                    readers.append(BlockReader(segment.path))
+        return readers
+
+    def read_table(self, start_time=None, end_time=None, protocols=None):
+        """Packets with start_time <= timestamp < end_time (and of the protocols), in one PacketTable"""
+        table = PacketTable()
+        for reader in self._readers(start_time, end_time):
+            with reader:
+                table.extend_table(reader.read_table(start_time, end_time, protocols))
+        return table
+
+    def iter_packets(self, start_time=None, end_time=None, protocols=None):
+        """Yield the matching packets segment by segment, block by block"""
+        for reader in self._readers(start_time, end_time):
+            with reader:
+                yield from reader.iter_packets(start_time, end_time, protocols)
+
+    # Maintenance
+
+    def _maintenance(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.maintain()
+            except Exception as e:
+                log.error(f"❌ Rolling storage maintenance failed: {e}")
+
+    def maintain(self):
+        """Flush, close segments whose bucket is over, merge small segments and apply retention"""
+        with self._lock:
+            self.flush()
+            now = time.time()
+            for bucket in [bucket for bucket in self._writers if bucket + 2 * self.segment_seconds <= now]:
+                self._close_writer(bucket)
+        self.compact()
+        self.apply_retention()
+
+    def compact(self):
+        """Merge runs of adjacent small closed segments, each run into one segment; returns the merges done"""
+        with self._lock:
+            open_paths = self._open_paths()
+            closed = [segment for segment in self.segments() if segment.path not in open_paths]
+        runs, run = [], []
+        for segment in closed:
+            small = segment.size < self.compact_bytes
+            if small and sum(member.size for member in run) + segment.size <= self.max_segment_bytes:
+                run.append(segment)
+                continue
+            runs.append(run)
+            run = [segment] if small else []
+        runs.append(run)
+        merged = 0
+        for run in runs:
+            if len(run) > 1:
+                self._merge(run)
+                merged += 1
+        return merged
+
+    def _merge(self, sources):
+        start, end = sources[0].start, max(source.end for source in sources)
+        temporary = os.path.join(self.path, f"{segment_name(start, end, 0)}.tmp")
+        with BlockWriter(temporary, self.block_size) as writer:
+            for source in sources:
+                with BlockReader(source.path) as reader:
+                    writer.write_many(reader.read_table())
+        with self._lock:
+            target = os.path.join(self.path, segment_name(start, end, self._next_seq(start, end)))
+            journal = os.path.join(self.path, JOURNAL_FILE)
+            with open(journal, 'w') as f:
+                json.dump({'target': os.path.basename(target),
+                           'sources': [os.path.basename(source.path) for source in sources]}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, target)
+            for source in sources:
+                os.remove(source.path)
+            os.remove(journal)
+        log.debug(f"🧱 Merged {len(sources)} segments into {os.path.basename(target)}")
+
+    def apply_retention(self):
+        """Delete closed segments past the age limit, then the oldest ones over the size limit; returns them"""
+        with self._lock:
+            open_paths = self._open_paths()
+            segments = self.segments()
+            doomed = []
+            if self.retention_seconds is not None:
+                cutoff = time.time() - self.retention_seconds
+                doomed = [segment for segment in segments if segment.end <= cutoff and segment.path not in open_paths]
+            if self.retention_bytes is not None:
+                total = sum(segment.size for segment in segments if segment not in doomed)
+                for segment in segments:
+                    if total <= self.retention_bytes:
+                        break
+                    if segment not in doomed and segment.path not in open_paths:
+                        doomed.append(segment)
+                        total -= segment.size
+            for segment in doomed:
+                os.remove(segment.path)
+        if doomed:
+            log.info(f"🗑️  Retention removed {len(doomed)} segment(s), "
+                     f"{sum(segment.size for segment in doomed) / 2**20:.1f} MB")
+        return doomed
+
+    # Recovery
+
+    def _recover(self):
+        """Finish or undo an interrupted merge and repair segments cut off mid-write"""
+        journal = os.path.join(self.path, JOURNAL_FILE)
+        if os.path.exists(journal):
+            try:
+                with open(journal) as f:
+                    entry = json.load(f)
+                if os.path.exists(os.path.join(self.path, entry['target'])):
+                    for source in entry['sources']:
+                        if os.path.exists(os.path.join(self.path, source)):
+                            os.remove(os.path.join(self.path, source))
+                    log.info(f"🧱 Finished interrupted merge into {entry['target']}")
+            except (OSError, ValueError, KeyError) as e:
+                log.warning(f"⚠️  Ignoring unreadable {JOURNAL_FILE}: {e}")
+            os.remove(journal)
+        for filename in os.listdir(self.path):
+            if filename.endswith('.tmp'):
+                os.remove(os.path.join(self.path, filename))
+        for segment in self.segments():
+            try:
+                reader = BlockReader(segment.path)
+            except ValueError:
+                # Cut off before its file header was complete: nothing in it to keep
+                os.replace(segment.path, segment.path + '.damaged')
+                log.warning(f"⚠️  {os.path.basename(segment.path)} is unreadable, moved aside")
+                continue
+            if reader.recovered:
+                # Reopening for append truncates after the last complete block; closing writes the index
+                BlockWriter(segment.path, reader=reader).close()
+            else:
+                reader.close()
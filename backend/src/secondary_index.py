@@ -0,0 +1,216 @@
+# src/secondary_index.py
+"""
+Secondary indexes of a .pkb capture: IP, port and protocol -> packets
+
+For every address, port and protocol in a capture the index keeps the
+positions of the packets that carry it (a posting list). A list is
+stored sorted, as deltas in the narrowest unsigned type that holds them
+and zlib-compressed, so dense lists (a protocol) cost about a byte per
+packet and sparse ones (a host) a few bytes per packet.
+
+The index lives next to the capture in <capture>.sidx: a JSON directory
+of the posting lists (key -> offset, size, entries, delta width) followed
+by the compressed lists. Opening it reads only the directory; a lookup
+reads and intersects the lists of the terms asked for, and
+BlockReader.read_rows() then decodes only the blocks holding the
+matches. Like the pcap CaptureIndex, it records the capture's size and
+modification time and is ignored once they no longer match.
+
+NumPy only: without it PacketStorage filters full loads instead.
+"""
+import json
+import os
+import zlib
+
+from src.reporting import get_logger
+from src.table import decode_address, unique_rows
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional - captures are then filtered after a full load
+    np = None
+
+log = get_logger('secondary_index')
+
+INDEX_SUFFIX = '.sidx'
+INDEX_MAGIC = b'PKBSIDX1\n'
+FIELDS = ('ip', 'port', 'protocol')
+_WIDTHS = ('u1', 'u2', 'u4', 'u8')
+
+
+def encode_postings(positions):
+    """Sorted unique packet positions -> (compressed bytes, delta width)"""
+    deltas = np.diff(positions, prepend=0)
+    width = next(width for width in _WIDTHS if not len(deltas) or deltas.max() <= np.iinfo(width).max)
+    return zlib.compress(deltas.astype(width).tobytes(), 1), width
+
+
+def decode_postings(data, width):
+    return np.cumsum(np.frombuffer(zlib.decompress(data), dtype=width), dtype=np.int64)
+
+
+def _grouped(keys, rows, base):
+    """
+    (key, sorted unique positions) for each distinct key, from parallel
+    arrays of non-negative keys and row numbers within a batch
+    Key and row are packed into one integer, so one sort orders by key,
+    then position; repeats (a packet sent to itself) are dropped.
+    """
+    if not len(keys):
+        return
+    span = int(rows.max()) + 1
+    packed = np.sort(keys.astype(np.int64) * span + rows)
+    packed = packed[np.concatenate(([True], packed[1:] != packed[:-1]))]
+    keys, positions = np.divmod(packed, span)
+    positions += base
+    cuts = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    for start, stop in zip(np.concatenate(([0], cuts)), np.concatenate((cuts, [len(keys)]))):
+        yield int(keys[start]), positions[start:stop]
+
+
+class SecondaryIndex:
+    """
+    Posting lists of a capture, built with add() as packets are saved
+
+    Build: SecondaryIndex(path), add(table, base) for each batch of
+    packets (base = position of its first packet), save(). Query:
+    SecondaryIndex.open(path) and lookup(ip=..., port=..., protocol=...).
+    """
+
+    def __init__(self, path):
+        if np is None:
+            raise RuntimeError("Secondary indexes need NumPy (pip install numpy)")
+        self.path = path
+        self.count = 0
+        self.directory = {field: {} for field in FIELDS}
+        self._pending = {field: {} for field in FIELDS}
+        self._data_offset = None
+
+    @property
+    def index_path(self):
+        return self.path + INDEX_SUFFIX
+
+    def _file_stamp(self):
+        stat = os.stat(self.path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    @classmethod
+    def open(cls, path):
+        """The saved index of a capture, or None when it is missing or out of date"""
+        index = cls(path)
+        try:
+            with open(index.index_path, 'rb') as f:
+                if f.readline() != INDEX_MAGIC:
+                    return None
+                header = json.loads(f.readline())
+                index._data_offset = f.tell()
+            if header['stamp'] != index._file_stamp():
+                return None
+        except (OSError, ValueError, KeyError):
+            return None
+        index.count = header['count']
+        index.directory = header['directory']
+        return index
+
+    def add(self, table, base):
+        """Index the packets of a PacketTable, the first of which is packet `base` of the capture"""
+        if base < self.count:
+            raise ValueError(f"Packets must be added in order: {base} < {self.count}")
+        self.count = base + len(table)
+
+        present = table.present('protocol')
+        strings = table.strings('protocol') if present.any() else []
+        for code, positions in _grouped(table.column('protocol')[present], np.flatnonzero(present), base):
+            self._pending['protocol'].setdefault(strings[code], []).append(positions)
+
+        ports, rows = [], []
+        for name in ('src_port', 'dst_port'):
+            present = table.present(name)
+            ports.append(table.column(name)[present])
+            rows.append(np.flatnonzero(present))
+        for port, positions in _grouped(np.concatenate(ports), np.concatenate(rows), base):
+            self._pending['port'].setdefault(str(port), []).append(positions)
+
+        keys, rows = [], []
+        for name in ('src_ip', 'dst_ip'):
+            present = table.present(name)
+            keys.append(np.stack([part[present].astype(np.uint64) for part in table.column(name)], axis=1))
+            rows.append(np.flatnonzero(present))
+        keys = np.concatenate(keys)
+        if len(keys):
+            first, inverse = unique_rows(keys)
+            for key, positions in _grouped(inverse, np.concatenate(rows), base):
+                family, high, low = (int(part) for part in keys[first[key]])
+                self._pending['ip'].setdefault(decode_address(family, high, low), []).append(positions)
+
+    def save(self):
+        """Write the index for the capture as it is on disk now"""
+        blobs = []
+        offset = 0
+        for field in FIELDS:
+            for key, parts in self._pending[field].items():
+                if key in self.directory[field]:
+                    parts = [self._postings(field, key)] + parts
+                # Batches come in order, so the lists only need joining
+                positions = np.concatenate(parts)
+                data, width = encode_postings(positions)
+                blobs.append(data)
+                self.directory[field][key] = [offset, len(data), len(positions), width]
+                offset += len(data)
+        # Lists that did not change are copied over from the old file
+        for field in FIELDS:
+            for key, entry in self.directory[field].items():
+                if key not in self._pending[field]:
+                    blobs.append(self._read(entry))
+                    self.directory[field][key] = [offset] + entry[1:]
+                    offset += entry[1]
+        header = {'stamp': self._file_stamp(), 'count': self.count, 'directory': self.directory}
+        temporary = self.index_path + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(INDEX_MAGIC)
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            self._data_offset = f.tell()
+            for data in blobs:
+                f.write(data)
+        os.replace(temporary, self.index_path)
+        self._pending = {field: {} for field in FIELDS}
+        log.info(f"🗂️  Indexed {self.count:,} packets of {os.path.basename(self.path)}: "
+                 f"{len(self.directory['ip']):,} hosts, {len(self.directory['port']):,} ports, "
+                 f"{len(self.directory['protocol'])} protocols")
+
+    def _read(self, entry):
+        with open(self.index_path, 'rb') as f:
+            f.seek(self._data_offset + entry[0])
+            return f.read(entry[1])
+
+    def _postings(self, field, key):
+        entry = self.directory[field].get(key)
+        if entry is None:
+            return np.zeros(0, dtype=np.int64)
+        return decode_postings(self._read(entry), entry[3])
+
+    def keys(self, field):
+        """The distinct values of a field in the capture"""
+        return list(self.directory[field])
+
+    def lookup(self, ip=None, port=None, protocol=None):
+        """
+        Sorted positions of the packets to or from ip, with port as source or
+        destination port, and of protocol (a name or a list of names)
+        """
+        matches = None
+        terms = []
+        if ip is not None:
+            terms.append([self._postings('ip', ip)])
+        if port is not None:
+            terms.append([self._postings('port', str(int(port)))])
+        if protocol is not None:
+            names = {name.upper() for name in ([protocol] if isinstance(protocol, str) else protocol)}
+            terms.append([self._postings('protocol', key) for key in self.directory['protocol']
+                          if key.upper() in names])
+        for lists in sorted(terms, key=lambda lists: sum(len(positions) for positions in lists)):
+            positions = np.unique(np.concatenate(lists)) if len(lists) > 1 else next(iter(lists), np.zeros(0, np.int64))
+            matches = positions if matches is None else np.intersect1d(matches, positions, assume_unique=True)
+            if not len(matches):
+                break
+        return matches if matches is not None else np.arange(self.count, dtype=np.int64)
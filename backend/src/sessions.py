@@ -0,0 +1,162 @@
+# src/sessions.py
+"""
+Server-side analysis sessions
+
+A session owns one capture's packets in a PacketTable, so API clients
+refer to it by id instead of sending the packet list back with every
+request. Statistics, issues and per-packet analyses are computed once
+and cached until packets are appended to the session.
+"""
+import secrets
+import threading
+import time
+
+from src.capturer import PacketCapturer
+from src.detector import IssueDetector
+from src.parser import ProtocolParser
+from src.reporting import get_logger
+from src.statistics import TrafficStatistics
+from src.table import PacketTable
+
+log = get_logger('sessions')
+
+
+class SessionNotFound(KeyError):
+    """No session with this id (never created, deleted or expired)"""
+
+
+class AnalysisSession:
+    """
+    Packets of one capture plus the analysis results computed from them
+
+    append() and capture() add packets (numbered on from the last one
+    unless they carry a number) and invalidate the cached results;
+    version counts these changes.
+    """
+
+    def __init__(self, session_id, packets=None):
+        self.id = session_id
+        self.packets = PacketTable()
+        self.version = 0
+        self._last_number = 0
+        self.created = self.last_used = time.time()
+        self.parser = ProtocolParser()
+        self.statistics_engine = TrafficStatistics()
+        self.detector = IssueDetector()
+        self._results = {}
+        self._lock = threading.RLock()
+        if packets:
+            self.append(packets)
+
+    def __len__(self):
+        return len(self.packets)
+
+    def append(self, packets, renumber=False):
+        """
+        Add packets to the session; returns how many were added
+        Packets keep their number (a filtered load keeps the capture's) and
+        those without one are numbered on from the last; renumber=True
+        numbers every packet on, as a capture into the session does.
+        """
+        with self._lock:
+            first = len(self.packets)
+            if isinstance(packets, PacketTable):
+                self.packets.extend_table(packets)
+            else:
+                for packet in packets:
+                    self.packets.append(packet)
+            added = len(self.packets) - first
+            if added:
+                numbered = self.packets.present('number')
+                extras = self.packets.extras('number')
+                numbers = self.packets.column('number')
+                for index in range(first, first + added):
+                    if renumber or not numbered[index] and extras.get(index) is None:
+                        self._last_number += 1
+                        self.packets[index]['number'] = self._last_number
+                    elif numbered[index]:
+                        self._last_number = max(self._last_number, int(numbers[index]))
+                self.version += 1
+                self._results.clear()
+            return added
+
+    def capture(self, count=10, use_real_capture=False, capturer=None):
+        """Capture count packets into the session; returns how many were added"""
+        capturer = capturer or PacketCapturer(use_real_capture=use_real_capture)
+        capturer.start_capture(count)
+        return self.append(capturer.captured_packets, renumber=True)
+
+    def cached(self, name, compute):
+        """compute(packets), cached under name until the packets change"""
+        with self._lock:
+            self.last_used = time.time()
+            if name not in self._results:
+                self._results[name] = compute(self.packets)
+            return self._results[name]
+
+    def statistics(self):
+        return self.cached('statistics', self.statistics_engine.generate_statistics)
+
+    def issues(self):
+        return self.cached('issues', self.detector.analyze_packets)
+
+    def analyses(self):
+        return self.cached('analyses', lambda packets: [self.parser.parse_packet(packet) for packet in packets])
+
+    def info(self):
+        return {
+            'sessionId': self.id,
+            'total': len(self.packets),
+            'version': self.version,
+            'created': self.created,
+            'lastUsed': self.last_used,
+        }
+
+
+class SessionManager:
+    """
+    Thread-safe registry of AnalysisSessions by id
+
+    Sessions unused for idle_timeout seconds are dropped, and the least
+    recently used ones go when more than max_sessions exist.
+    """
+
+    def __init__(self, max_sessions=32, idle_timeout=3600):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def create(self, packets=None):
+        session = AnalysisSession(secrets.token_hex(8), packets)
+        with self._lock:
+            self._expire()
+            while len(self._sessions) >= self.max_sessions:
+                oldest = min(self._sessions.values(), key=lambda other: other.last_used)
+                del self._sessions[oldest.id]
+                log.info(f"🧹 Session {oldest.id} dropped (more than {self.max_sessions} sessions)")
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id):
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is None:
+                raise SessionNotFound(session_id)
+            session.last_used = time.time()
+            return session
+
+    def delete(self, session_id):
+        with self._lock:
+            if self._sessions.pop(session_id, None) is None:
+                raise SessionNotFound(session_id)
+
+    def _expire(self):
+        cutoff = time.time() - self.idle_timeout
+        for session_id in [session_id for session_id, session in self._sessions.items() if session.last_used < cutoff]:
+            del self._sessions[session_id]
+            log.info(f"🧹 Session {session_id} expired")
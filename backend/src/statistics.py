@@ -1,7 +1,30 @@
 # src/statistics.py
+import array
 import time
 from collections import Counter
 
+from src.reporting import get_logger
+from src.table import PacketTable, decode_address, unique_rows
+
+try:
+    import numpy as np
+except ImportError:  # Fall back to the pure Python passes below
+    np = None
+
+log = get_logger('statistics')
+
+# Above this many empty seconds per packet the timeline uses np.unique instead of bincount
+TIMELINE_SPARSITY_LIMIT = 64
+
+def _endpoint(address, port):
+    """'address:port', with IPv6 addresses in brackets"""
+    if port is None:
+        return address
+    if ':' in address:
+        return f"[{address}]:{port}"
+    return f"{address}:{port}"
+
+
 class TrafficStatistics:
     """
     Generates traffic statistics and analysis
@@ -9,14 +32,19 @@ class TrafficStatistics:
     """
     
     def __init__(self):
-        print("📊 TrafficStatistics initialized!")
+        log.debug("📊 TrafficStatistics initialized!")
     
     def generate_statistics(self, packets):
         """Generate comprehensive traffic statistics with proper data handling"""
         if not packets:
-            print("No packets to analyze")
+            log.info("No packets to analyze")
             return self._create_empty_stats()
         
+        if np is not None:
+            columns = self._packet_columns(packets)
+            if columns is not None:
+                return self._generate_vectorized(packets, columns)
+        
         # Calculate basic metrics with proper error handling
         total_packets = len(packets)
         total_bytes = self._calculate_total_bytes(packets)
@@ -40,6 +68,136 @@ class TrafficStatistics:
         
         return stats
     
+    def _packet_columns(self, packets):
+        """
+        Collect length, timestamp and protocol columns plus the conversation
+        counts in one pass
+        Returns None when the values are too irregular for the vectorized engine
+        """
+        if isinstance(packets, PacketTable):
+            if packets.extras('length') or packets.extras('timestamp') or packets.extras('protocol'):
+                return None
+            names = packets.strings('protocol') + ['Unknown']
+            protocol_ids = packets.column('protocol').astype(np.int64)
+            protocol_ids[~packets.present('protocol')] = len(names) - 1
+            return {
+                'lengths': packets.column('length').astype(np.int64),
+                'timestamps': packets.column('timestamp'),
+                'protocol_ids': protocol_ids,
+                'protocol_names': names,
+                'conversations': self._table_conversations(packets)
+            }
+        
+        lengths = []
+        timestamps = []
+        protocol_ids = []
+        endpoints = []
+        ids = {}
+        for packet in packets:
+            get = packet.get
+            lengths.append(get('length', 0))
+            timestamps.append(get('timestamp', 0))
+            endpoints.append((get('src_ip'), get('src_port'), get('dst_ip'), get('dst_port')))
+            protocol = get('protocol', 'Unknown')
+            protocol_id = ids.get(protocol)
+            if protocol_id is None:
+                protocol_id = ids[protocol] = len(ids)
+            protocol_ids.append(protocol_id)
+        
+        lengths = np.array(lengths)
+        timestamps = np.array(timestamps)
+        if lengths.dtype.kind not in 'iuf' or timestamps.dtype.kind not in 'iuf':
+            return None
+        return {
+            'lengths': lengths,
+            'timestamps': timestamps,
+            'protocol_ids': np.array(protocol_ids, dtype=np.int64),
+            'protocol_names': list(ids),
+            'conversations': self._count_endpoints(endpoints)
+        }
+    
+    def _generate_vectorized(self, packets, columns):
+        """Compute every statistic from NumPy columns - same output as the Python passes"""
+        lengths = columns['lengths']
+        timestamps = columns['timestamps']
+        total_packets = len(lengths)
+        
+        # Missing lengths are estimated per packet - rare, so done in Python
+        sizes = lengths
+        totals = lengths
+        needs_estimate = np.flatnonzero(lengths <= 0)
+        if len(needs_estimate):
+            sizes = lengths.copy()
+            totals = lengths.copy()
+            for index in needs_estimate.tolist():
+                estimate = self._estimate_packet_length(packets[index])
+                totals[index] = estimate
+                if lengths[index] == 0:
+                    sizes[index] = estimate
+        total_bytes = totals.sum().item()
+        size_sum = sizes.sum().item()
+        
+        # Duration from the valid (positive) timestamps
+        duration = 1.0
+        if total_packets >= 2:
+            valid = timestamps[timestamps > 0]
+            if len(valid) >= 2:
+                duration = max((valid.max() - valid.min()).item(), 0.1)
+        traffic_rate = total_packets / duration if duration > 0 else total_packets
+        
+        # Protocol histogram
+        protocol_counts = np.bincount(columns['protocol_ids'], minlength=len(columns['protocol_names']))
+        protocol_distribution = {}
+        for protocol, count in zip(columns['protocol_names'], protocol_counts.tolist()):
+            if count:
+                count += protocol_distribution.get(protocol, {}).get('count', 0)
+                protocol_distribution[protocol] = {
+                    'count': count,
+                    'percentage': round((count / total_packets) * 100, 1)
+                }
+        
+        # Size buckets
+        small = int(np.count_nonzero(sizes < 100))
+        large = int(np.count_nonzero(sizes >= 1000))
+        
+        return {
+            'total_packets': total_packets,
+            'total_bytes': total_bytes,
+            'total_data': total_bytes,  # Alias for frontend compatibility
+            'capture_duration': duration,
+            'traffic_rate': round(traffic_rate, 2),
+            'protocol_distribution': protocol_distribution,
+            'packet_size_distribution': {
+                'small': small,
+                'medium': total_packets - small - large,
+                'large': large,
+                'average_size': round(size_sum / total_packets, 2),
+                'min_size': sizes.min().item(),
+                'max_size': sizes.max().item()
+            },
+            'average_packet_size': round(total_bytes / total_packets, 2),
+            'traffic_timeline': self._vectorized_timeline(timestamps),
+            'top_conversations': Counter(dict(columns['conversations'])).most_common(5)
+        }
+    
+    def _vectorized_timeline(self, timestamps):
+        """Packets per second via bincount on the floored timestamps"""
+        seconds = timestamps.astype(np.int64)  # Truncates like int()
+        if not np.all(seconds[1:] >= seconds[:-1]):
+            # Out-of-order capture: keep the first-seen key order of the Python version
+            occupied, first_seen, counts = np.unique(seconds, return_index=True, return_counts=True)
+            order = np.argsort(first_seen)
+            return dict(zip(occupied[order].tolist(), counts[order].tolist()))
+        
+        first = seconds[0].item()
+        span = seconds[-1].item() - first + 1
+        if span <= TIMELINE_SPARSITY_LIMIT * len(seconds):
+            counts = np.bincount(seconds - first, minlength=span)
+            occupied = np.flatnonzero(counts)
+            return dict(zip((occupied + first).tolist(), counts[occupied].tolist()))
+        occupied, counts = np.unique(seconds, return_counts=True)
+        return dict(zip(occupied.tolist(), counts.tolist()))
+    
     def _create_empty_stats(self):
         """Return empty statistics structure"""
         return {
@@ -177,19 +335,80 @@ class TrafficStatistics:
     
     def _top_conversations(self, packets):
         """Identify top conversations (source-destination pairs)"""
-        conversations = []
+        return Counter(dict(self._count_endpoints(self._endpoints(packets)))).most_common(5)
+    
+    def _endpoints(self, packets):
+        """(src_ip, src_port, dst_ip, dst_port) of every packet"""
+        return [
+            (packet.get('src_ip'), packet.get('src_port'), packet.get('dst_ip'), packet.get('dst_port'))
+            for packet in packets
+        ]
+    
+    def _count_endpoints(self, endpoints):
+        """
+        Count conversations from (src_ip, src_port, dst_ip, dst_port) tuples
+        Returns [(conversation, count)] in first-seen order
+        """
+        conversations = Counter()
         
-        for packet in packets:
-            summary = packet.get('summary', '')
-            # Extract conversation info from summary
-            if '>' in summary:
-                parts = summary.split('>')
-                if len(parts) == 2:
-                    src = parts[0].strip()
-                    dst = parts[1].split('/')[0].strip() if '/' in parts[1] else parts[1].strip()
-                    conversations.append(f"{src} → {dst}")
+        # Packets of one flow share their endpoints, so format each distinct one once
+        for (src_ip, src_port, dst_ip, dst_port), occurrences in Counter(endpoints).items():
+            conversation = self._format_conversation(src_ip, src_port, dst_ip, dst_port)
+            if conversation:
+                conversations[conversation] += occurrences
+        
+        return list(conversations.items())
+    
+    def _table_conversations(self, table):
+        """Count conversations of a PacketTable from its address and port columns"""
+        names = ('src_ip', 'src_port', 'dst_ip', 'dst_port')
+        if any(table.extras(name) for name in names):
+            return self._count_endpoints(self._endpoints(table))
+        rows = np.flatnonzero(table.present('src_ip') & table.present('dst_ip'))
+        if not len(rows):
+            return []
         
-        return Counter(conversations).most_common(5)
+        src_families, src_highs, src_lows = table.column('src_ip')
+        dst_families, dst_highs, dst_lows = table.column('dst_ip')
+        # Ports, "no port" bits and address families packed into one word
+        tag = np.zeros(len(table), dtype=np.uint64)
+        for shift, name in ((0, 'src_port'), (17, 'dst_port')):
+            port = table.column(name).astype(np.uint64) | (~table.present(name)).astype(np.uint64) << np.uint64(16)
+            tag |= port << np.uint64(shift)
+        tag |= src_families.astype(np.uint64) << np.uint64(34)
+        tag |= dst_families.astype(np.uint64) << np.uint64(38)
+        keys = np.stack([src_highs[rows], src_lows[rows], dst_highs[rows], dst_lows[rows], tag[rows]], axis=1)
+        first, inverse = unique_rows(keys)
+        counts = np.bincount(inverse, minlength=len(first)).tolist()
+        
+        addresses = {}
+        def address(family, high, low):
+            if (family, high, low) not in addresses:
+                addresses[family, high, low] = decode_address(family, high, low)
+            return addresses[family, high, low]
+        
+        conversations = []
+        unique_keys = keys[first].tolist()
+        for unique in np.argsort(first, kind='stable').tolist():
+            src_high, src_low, dst_high, dst_low, packed = unique_keys[unique]
+            src_port = None if packed & 0x10000 else packed & 0xFFFF
+            dst_port = None if packed >> 17 & 0x10000 else packed >> 17 & 0xFFFF
+            conversation = self._format_conversation(
+                address(packed >> 34 & 0xF, src_high, src_low), src_port,
+                address(packed >> 38 & 0xF, dst_high, dst_low), dst_port
+            )
+            conversations.append((conversation, counts[unique]))
+        return conversations
+    
+    def _conversation_key(self, packet):
+        """'src → dst' from a packet's address and port fields (None without addresses)"""
+        get = packet.get
+        return self._format_conversation(get('src_ip'), get('src_port'), get('dst_ip'), get('dst_port'))
+    
+    def _format_conversation(self, src_ip, src_port, dst_ip, dst_port):
+        if not src_ip or not dst_ip:
+            return None
+        return f"{_endpoint(src_ip, src_port)} → {_endpoint(dst_ip, dst_port)}"
     
     def display_statistics(self, stats):
         """Display statistics in educational format"""
@@ -227,4 +446,268 @@ class TrafficStatistics:
         else:
             print("   No timeline data available")
         
-        print("\n" + "="*60)
\ No newline at end of file
+        print("\n" + "="*60)
+
+
+class TopK:
+    """
+    Bounded heavy-hitter counter (Space-Saving algorithm)
+    Tracks at most `capacity` items; counts of evicted items are inherited by
+    their replacement, so a reported count may overestimate by `errors[item]`.
+    Every update is O(1): items are grouped into buckets by count.
+    """
+    
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self._buckets = {}
+        self._min_count = 0
+    
+    def add(self, item, amount=1):
+        """Count `amount` more occurrences of item"""
+        count = self.counts.get(item)
+        if count is None:
+            count = 0
+            if len(self.counts) >= self.capacity:
+                # Replace an item holding the minimum count and inherit it
+                count = self._min_count
+                evicted = next(iter(self._buckets[count]))
+                self._unbucket(evicted, count)
+                del self.counts[evicted]
+                del self.errors[evicted]
+            self.errors[item] = count
+        else:
+            self._unbucket(item, count)
+        
+        emptied_min = self._min_count not in self._buckets
+        count += amount
+        self.counts[item] = count
+        self._buckets.setdefault(count, set()).add(item)
+        if not self._min_count or count < self._min_count:
+            self._min_count = count
+        elif emptied_min:
+            # One step up is the usual case and stays O(1)
+            self._min_count = count if count == self._min_count + 1 else min(self._buckets)
+    
+    def _unbucket(self, item, count):
+        bucket = self._buckets[count]
+        bucket.discard(item)
+        if not bucket:
+            del self._buckets[count]
+    
+    def merge(self, other):
+        """Add the counts of another TopK (exact while both hold every item)"""
+        for item, count in other.counts.items():
+            self.add(item, count)
+    
+    def most_common(self, n):
+        """Return the n items with the highest counts, like Counter.most_common"""
+        return Counter(self.counts).most_common(n)
+    
+    def __len__(self):
+        return len(self.counts)
+
+
+class StreamingStatistics(TrafficStatistics):
+    """
+    Incremental traffic statistics for long-running captures
+    Each packet updates running counters in O(1); memory stays constant
+    however long the capture runs. snapshot() returns the same structure
+    as generate_statistics().
+    """
+    
+    def __init__(self, timeline_seconds=3600, top_conversations=5, conversation_capacity=1000):
+        super().__init__()
+        self.top_conversations = top_conversations
+        self.timeline_seconds = timeline_seconds
+        self.reset(conversation_capacity)
+    
+    def reset(self, conversation_capacity=None):
+        """Forget everything counted so far"""
+        if conversation_capacity is None:
+            conversation_capacity = self.conversations.capacity
+        self.total_packets = 0
+        self.total_bytes = 0
+        self.size_sum = 0
+        self.size_buckets = {'small': 0, 'medium': 0, 'large': 0}
+        self.min_size = None
+        self.max_size = None
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.valid_timestamps = 0
+        self.protocols = {}
+        self.conversations = TopK(conversation_capacity)
+        # Ring buffer of per-second counts: slot = second % timeline_seconds
+        self._timeline_keys = array.array('q', [-1]) * self.timeline_seconds
+        self._timeline_counts = array.array('Q', [0]) * self.timeline_seconds
+        self._latest_second = None
+    
+    def update(self, packet):
+        """Add one packet to the running statistics"""
+        get = packet.get
+        length = get('length', 0)
+        self._add_sizes(
+            length if length > 0 else self._estimate_packet_length(packet),
+            length if length != 0 else self._estimate_packet_length(packet)
+        )
+        
+        timestamp = get('timestamp', 0)
+        self._add_timestamp(timestamp, 1)
+        self._add_second(int(timestamp), 1)
+        
+        protocol = get('protocol', 'Unknown')
+        self.protocols[protocol] = self.protocols.get(protocol, 0) + 1
+        
+        conversation = self._conversation_key(packet)
+        if conversation:
+            self.conversations.add(conversation)
+        self.total_packets += 1
+    
+    def update_batch(self, packets):
+        """Add many packets, using the vectorized engine when possible"""
+        if not packets:
+            return
+        columns = self._packet_columns(packets) if np is not None else None
+        if columns is None:
+            for packet in packets:
+                self.update(packet)
+            return
+        
+        lengths = columns['lengths']
+        sizes = lengths.copy()
+        totals = lengths.copy()
+        for index in np.flatnonzero(lengths <= 0).tolist():
+            estimate = self._estimate_packet_length(packets[index])
+            totals[index] = estimate
+            if lengths[index] == 0:
+                sizes[index] = estimate
+        
+        self.total_bytes += totals.sum().item()
+        self.size_sum += sizes.sum().item()
+        small = int(np.count_nonzero(sizes < 100))
+        large = int(np.count_nonzero(sizes >= 1000))
+        self.size_buckets['small'] += small
+        self.size_buckets['medium'] += len(sizes) - small - large
+        self.size_buckets['large'] += large
+        self._add_extremes(sizes.min().item(), sizes.max().item())
+        
+        timestamps = columns['timestamps']
+        valid = timestamps[timestamps > 0]
+        if len(valid):
+            self._add_timestamp(valid.min().item(), 0)
+            self._add_timestamp(valid.max().item(), len(valid))
+        for second, count in self._vectorized_timeline(timestamps).items():
+            self._add_second(second, count)
+        
+        protocol_counts = np.bincount(columns['protocol_ids'], minlength=len(columns['protocol_names']))
+        for protocol, count in zip(columns['protocol_names'], protocol_counts.tolist()):
+            if count:
+                self.protocols[protocol] = self.protocols.get(protocol, 0) + count
+        
+        for conversation, occurrences in columns['conversations']:
+            self.conversations.add(conversation, occurrences)
+        self.total_packets += len(lengths)
+    
+    def merge(self, other):
+        """Add the counts of another StreamingStatistics, e.g. one per shard of a capture"""
+        if not other.total_packets:
+            return
+        self.total_packets += other.total_packets
+        self.total_bytes += other.total_bytes
+        self.size_sum += other.size_sum
+        for bucket, count in other.size_buckets.items():
+            self.size_buckets[bucket] += count
+        self._add_extremes(other.min_size, other.max_size)
+        if other.valid_timestamps:
+            self._add_timestamp(other.first_timestamp, 0)
+            self._add_timestamp(other.last_timestamp, other.valid_timestamps)
+        for second, count in other._timeline().items():
+            self._add_second(second, count)
+        for protocol, count in other.protocols.items():
+            self.protocols[protocol] = self.protocols.get(protocol, 0) + count
+        self.conversations.merge(other.conversations)
+    
+    def _add_sizes(self, total_length, size):
+        self.total_bytes += total_length
+        self.size_sum += size
+        if size < 100:
+            self.size_buckets['small'] += 1
+        elif size < 1000:
+            self.size_buckets['medium'] += 1
+        else:
+            self.size_buckets['large'] += 1
+        self._add_extremes(size, size)
+    
+    def _add_extremes(self, smallest, largest):
+        if self.min_size is None or smallest < self.min_size:
+            self.min_size = smallest
+        if self.max_size is None or largest > self.max_size:
+            self.max_size = largest
+    
+    def _add_timestamp(self, timestamp, count):
+        if timestamp <= 0:
+            return
+        self.valid_timestamps += count
+        if self.first_timestamp is None or timestamp < self.first_timestamp:
+            self.first_timestamp = timestamp
+        if self.last_timestamp is None or timestamp > self.last_timestamp:
+            self.last_timestamp = timestamp
+    
+    def _add_second(self, second, count):
+        """Count packets in the per-second ring buffer"""
+        if self._latest_second is not None and second <= self._latest_second - self.timeline_seconds:
+            return  # Older than the window we keep
+        slot = second % self.timeline_seconds
+        if self._timeline_keys[slot] != second:
+            self._timeline_keys[slot] = second
+            self._timeline_counts[slot] = 0
+        self._timeline_counts[slot] += count
+        if self._latest_second is None or second > self._latest_second:
+            self._latest_second = second
+    
+    def _timeline(self):
+        """Per-second counts still inside the ring buffer, oldest first"""
+        if self._latest_second is None:
+            return {}
+        oldest = self._latest_second - self.timeline_seconds
+        timeline = {
+            second: count
+            for second, count in zip(self._timeline_keys, self._timeline_counts)
+            if second > oldest and count
+        }
+        return dict(sorted(timeline.items()))
+    
+    def snapshot(self):
+        """Return the current statistics in the generate_statistics() format"""
+        if not self.total_packets:
+            return self._create_empty_stats()
+        
+        total = self.total_packets
+        duration = 1.0
+        if total >= 2 and self.valid_timestamps >= 2:
+            duration = max(self.last_timestamp - self.first_timestamp, 0.1)
+        traffic_rate = total / duration if duration > 0 else total
+        
+        return {
+            'total_packets': total,
+            'total_bytes': self.total_bytes,
+            'total_data': self.total_bytes,  # Alias for frontend compatibility
+            'capture_duration': duration,
+            'traffic_rate': round(traffic_rate, 2),
+            'protocol_distribution': {
+                protocol: {'count': count, 'percentage': round((count / total) * 100, 1)}
+                for protocol, count in self.protocols.items()
+            },
+            'packet_size_distribution': {
+                'small': self.size_buckets['small'],
+                'medium': self.size_buckets['medium'],
+                'large': self.size_buckets['large'],
+                'average_size': round(self.size_sum / total, 2),
+                'min_size': self.min_size,
+                'max_size': self.max_size
+            },
+            'average_packet_size': round(self.total_bytes / total, 2),
+            'traffic_timeline': self._timeline(),
+            'top_conversations': self.conversations.most_common(self.top_conversations)
+        }
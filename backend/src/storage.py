@@ -1,10 +1,67 @@
 # src/storage.py
 import json
 import pickle
+import re
+import socket
+import sqlite3
 import time
 import os
 from datetime import datetime
 
+from src.blockstore import BlockReader, BlockWriter
+from src.capture_index import CaptureIndex, query_packets
+from src.filters import PacketFilter
+from src.catalog import CATALOG_FILE, CaptureCatalog, merge_summaries, summarize
+from src.jsonl import FORMATS as JSONL_FORMATS, JsonlWriter, iter_jsonl, read_jsonl
+from src.pcap import PcapReader
+from src.reporting import get_logger
+from src.rolling import RollingStorage
+from src.secondary_index import INDEX_SUFFIX, SecondaryIndex
+from src.table import PacketTable
+
+log = get_logger('storage')
+
+CAPTURE_EXTENSIONS = ('.json', '.pkl', '.pcap', '.pcapng', '.pkb') + tuple(f'.{format}' for format in JSONL_FORMATS)
+
+# Captures saved before packets carried address/port fields only have them in the summary
+_LEGACY_ENDPOINTS = re.compile(r'(\d{1,3}(?:\.\d{1,3}){3})(?::(\w+))? > (\d{1,3}(?:\.\d{1,3}){3})(?::(\w+))?')
+_service_ports = {}
+
+
+def _legacy_port(name):
+    """Port number from a summary port ('443' or a service name like 'https')"""
+    if name is None:
+        return None
+    if name.isdigit():
+        return int(name)
+    if name not in _service_ports:
+        try:
+            _service_ports[name] = socket.getservbyname(name)
+        except OSError:
+            _service_ports[name] = None
+    return _service_ports[name]
+
+
+def _upgrade_legacy_packets(packets):
+    """
+    Fill in src/dst address and port fields of packets saved without them
+    Done once at load time, so analysis never parses summary strings.
+    """
+    for packet in packets:
+        if 'src_ip' in packet or not isinstance(packet.get('summary'), str):
+            continue
+        match = _LEGACY_ENDPOINTS.search(packet['summary'])
+        if match is None:
+            continue
+        src_ip, src_port, dst_ip, dst_port = match.groups()
+        packet['src_ip'] = src_ip
+        packet['dst_ip'] = dst_ip
+        for name, value in (('src_port', _legacy_port(src_port)), ('dst_port', _legacy_port(dst_port))):
+            if value is not None:
+                packet[name] = value
+    return packets
+
+
 class PacketStorage:
     """
     Handles saving and loading packet captures
@@ -14,25 +71,29 @@ class PacketStorage:
     def __init__(self, storage_dir="captures"):
         self.storage_dir = storage_dir
         self._ensure_storage_dir()
-        print("💾 PacketStorage initialized!")
+        self.catalog = CaptureCatalog(os.path.join(storage_dir, CATALOG_FILE))
+        self._catalog_synced = False
+        log.debug("💾 PacketStorage initialized!")
     
     def _ensure_storage_dir(self):
         """Create storage directory if it doesn't exist"""
         if not os.path.exists(self.storage_dir):
             os.makedirs(self.storage_dir)
-            print(f"📁 Created storage directory: {self.storage_dir}")
+            log.info(f"📁 Created storage directory: {self.storage_dir}")
     
-    def save_capture(self, packets, filename=None, format='json'):
+    def save_capture(self, packets, filename=None, format='json', index=False):
         """
         Save packet capture to file
         
         Args:
             packets: List of packet dictionaries
             filename: Custom filename (optional)
-            format: 'json' or 'pkl' (pickle)
+            format: 'json', 'pkl' (pickle), 'pkb' (compressed packet blocks)
+                    or 'jsonl' / 'jsonl.gz' / 'jsonl.zst' (JSON Lines)
+            index: Also build IP/port/protocol indexes ('pkb' only, see find_packets)
         """
         if not packets:
-            print("❌ No packets to save")
+            log.error("❌ No packets to save")
             return False
         
         # Generate filename if not provided
@@ -51,19 +112,44 @@ class PacketStorage:
                 self._save_json(packets, filepath)
             elif format == 'pkl':
                 self._save_pickle(packets, filepath)
+            elif format in JSONL_FORMATS:
+                with JsonlWriter(filepath) as writer:
+                    writer.write_many(packets)
+            elif format == 'pkb':
+                for path in (filepath, filepath + INDEX_SUFFIX):
+                    if os.path.exists(path):
+                        os.remove(path)
+                self._save_blocks(packets, filepath)
+                if index:
+                    self._index_blocks(filepath, packets)
             else:
-                print(f"❌ Unsupported format: {format}")
+                log.error(f"❌ Unsupported format: {format}")
                 return False
+            if index and format != 'pkb':
+                log.warning(f"⚠️  Secondary indexes are only built for pkb captures, not {format}")
             
-            print(f"✅ Capture saved: {filepath}")
-            print(f"   📦 Packets: {len(packets)}")
-            print(f"   📊 Format: {format.upper()}")
+            self._record(filename, packets)
+            log.info(f"✅ Capture saved: {filepath}")
+            log.info(f"   📦 Packets: {len(packets)}")
+            log.info(f"   📊 Format: {format.upper()}")
             return True
             
         except Exception as e:
-            print(f"❌ Error saving capture: {e}")
+            log.error(f"❌ Error saving capture: {e}")
             return False
     
+    def _record(self, filename, packets, previous=None):
+        """Catalog a capture just written; `previous` is its summary before packets were appended"""
+        try:
+            stat = os.stat(os.path.join(self.storage_dir, filename))
+            summary = summarize(packets)
+            if previous is not None:
+                summary = merge_summaries(previous, summary)
+            self.catalog.record(filename, stat.st_size, stat.st_mtime_ns, summary)
+        except (OSError, sqlite3.Error) as e:
+            log.warning(f"⚠️  Could not catalog {filename}: {e}")
+            self._catalog_synced = False
+    
     def _save_json(self, packets, filepath):
         """Save packets as JSON (human-readable)"""
         # Convert packets to JSON-serializable format
@@ -113,6 +199,62 @@ class PacketStorage:
         with open(filepath, 'wb') as f:
             pickle.dump(capture_data, f)
     
+    def _save_blocks(self, packets, filepath):
+        """Save packets as compressed blocks (see blockstore); an existing file is appended to"""
+        with BlockWriter(filepath) as writer:
+            writer.write_many(packets)
+    
+    def _index_blocks(self, filepath, packets, index=None):
+        """Add the packets just written to a .pkb file to its secondary index (a new one by default)"""
+        try:
+            index = index or SecondaryIndex(filepath)
+            index.add(packets if isinstance(packets, PacketTable) else PacketTable(packets), index.count)
+            index.save()
+        except (RuntimeError, OSError) as e:
+            log.warning(f"⚠️  Could not index {os.path.basename(filepath)}: {e}")
+    
+    def open_jsonl(self, filename, format='jsonl'):
+        """
+        JsonlWriter for a capture written while it is captured, e.g.
+        capturer.add_batch_listener(writer.write_many); close() it at the end
+        """
+        if not filename.endswith(f'.{format}'):
+            filename = f"{filename}.{format}"
+        # Written outside this class: cataloged on the next listing
+        self._catalog_synced = False
+        return JsonlWriter(os.path.join(self.storage_dir, filename))
+    
+    def open_rolling(self, name, **options):
+        """
+        RollingStorage writing time-partitioned segments to <storage dir>/<name>/
+        (see rolling.RollingStorage for the rotation, compaction and retention
+        options); use as a capturer batch listener and close() it at the end
+        """
+        return RollingStorage(os.path.join(self.storage_dir, name), **options)
+    
+    def append_capture(self, packets, filename):
+        """Append packets to a .pkb capture (created if missing) without rewriting it"""
+        if not filename.endswith('.pkb'):
+            filename = f"{filename}.pkb"
+        filepath = os.path.join(self.storage_dir, filename)
+        existed = os.path.exists(filepath)
+        recorded = self.catalog.summary(filename)
+        # An index that is current now is extended; a stale one stays ignored
+        index = SecondaryIndex.open(filepath) if existed else None
+        try:
+            self._save_blocks(packets, filepath)
+            if index is not None:
+                self._index_blocks(filepath, packets, index)
+            if not existed or recorded is not None:
+                self._record(filename, packets, recorded)
+            else:
+                self._catalog_synced = False
+            log.info(f"✅ Appended {len(packets)} packets to {filepath}")
+            return True
+        except Exception as e:
+            log.error(f"❌ Error appending to capture: {e}")
+            return False
+    
     def load_capture(self, filename):
         """
         Load packet capture from file
@@ -123,20 +265,28 @@ class PacketStorage:
         filepath = os.path.join(self.storage_dir, filename)
         
         if not os.path.exists(filepath):
-            print(f"❌ Capture file not found: {filepath}")
+            log.error(f"❌ Capture file not found: {filepath}")
             return None
         
         try:
-            if filename.endswith('.json'):
+            if os.path.isdir(filepath):
+                return self._load_rolling(filepath)
+            elif filename.endswith('.json'):
                 return self._load_json(filepath)
+            elif filename.endswith(tuple(f'.{format}' for format in JSONL_FORMATS)):
+                return self._load_jsonl(filepath)
             elif filename.endswith('.pkl'):
                 return self._load_pickle(filepath)
+            elif filename.endswith(('.pcap', '.pcapng')):
+                return self._load_pcap(filepath)
+            elif filename.endswith('.pkb'):
+                return self._load_blocks(filepath)
             else:
-                print(f"❌ Unsupported file format: {filename}")
+                log.error(f"❌ Unsupported file format: {filename}")
                 return None
                 
         except Exception as e:
-            print(f"❌ Error loading capture: {e}")
+            log.error(f"❌ Error loading capture: {e}")
             return None
     
     def _load_json(self, filepath):
@@ -145,7 +295,7 @@ class PacketStorage:
             capture_data = json.load(f)
         
         self._display_capture_info(capture_data['metadata'], filepath)
-        return capture_data['packets']
+        return _upgrade_legacy_packets(capture_data['packets'])
     
     def _load_pickle(self, filepath):
         """Load packets from pickle file"""
@@ -153,49 +303,189 @@ class PacketStorage:
             capture_data = pickle.load(f)
         
         self._display_capture_info(capture_data['metadata'], filepath)
-        return capture_data['packets']
+        return _upgrade_legacy_packets(capture_data['packets'])
+    
+    def _load_pcap(self, filepath):
+        """Load packets from a pcap/pcapng file (decoded without Scapy)"""
+        with PcapReader(filepath) as reader:
+            packets = reader.read_table()
+        
+        self._display_capture_info({
+            'capture_date': datetime.fromtimestamp(os.path.getmtime(filepath)).isoformat(),
+            'total_packets': len(packets),
+            'total_bytes': int(sum(packets.column('length'))),
+            'protocols': list(packets.strings('protocol'))
+        }, filepath)
+        return packets
+    
+    def _load_jsonl(self, filepath):
+        """Load packets from a JSON Lines file (decoded on several processes when large)"""
+        packets = read_jsonl(filepath)
+        self._display_capture_info({
+            'capture_date': datetime.fromtimestamp(os.path.getmtime(filepath)).isoformat(),
+            'total_packets': len(packets),
+            'total_bytes': int(sum(packets.column('length'))),
+            'protocols': list(packets.strings('protocol'))
+        }, filepath)
+        return packets
+    
+    def _load_blocks(self, filepath):
+        """Load packets from a packet block file into a PacketTable"""
+        with BlockReader(filepath) as reader:
+            packets = reader.read_table()
+            self._display_capture_info({**reader.metadata, 'total_packets': len(reader),
+                                        'total_bytes': reader.total_bytes}, filepath)
+        return packets
+    
+    def _load_rolling(self, directory):
+        """Load every segment of a rolling capture directory"""
+        with RollingStorage(directory, maintenance_interval=None) as rolling:
+            packets = rolling.read_table()
+            segments = rolling.segments()
+        self._display_capture_info({
+            'capture_date': datetime.fromtimestamp(segments[-1].end).isoformat() if segments else 'Unknown',
+            'total_packets': len(packets),
+            'total_bytes': int(sum(packets.column('length'))),
+            'protocols': list(packets.strings('protocol'))
+        }, directory)
+        return packets
+    
+    def query_capture(self, filename, **query):
+        """
+        One page of a saved capture - see query_packets() for the arguments
+        pcap/pcapng files are read through their CaptureIndex and .pkb files
+        through their block index, so only the page is decoded; JSON/pickle
+        captures have to be loaded whole.
+        Returns None when the file does not exist.
+        """
+        filepath = os.path.join(self.storage_dir, filename)
+        if not os.path.exists(filepath):
+            log.error(f"❌ Capture file not found: {filepath}")
+            return None
+        if filename.endswith(('.pcap', '.pcapng')):
+            return CaptureIndex.open(filepath).query(**query)
+        if filename.endswith('.pkb'):
+            with BlockReader(filepath) as reader:
+                return reader.query(**query)
+        return query_packets(self.load_capture(filename) or [], **query)
+    
+    def find_packets(self, filename, ip=None, port=None, protocol=None):
+        """
+        Packets of a saved capture to or from ip, on port (source or
+        destination) and of protocol (a name or a list of names)
+        A .pkb capture saved with index=True is answered from its secondary
+        index, decoding only the blocks that hold matches; anything else is
+        loaded whole and filtered. Returns None when the file does not exist.
+        """
+        filepath = os.path.join(self.storage_dir, filename)
+        if not os.path.exists(filepath):
+            log.error(f"❌ Capture file not found: {filepath}")
+            return None
+        index = SecondaryIndex.open(filepath) if filename.endswith('.pkb') else None
+        if index is not None:
+            with BlockReader(filepath) as reader:
+                return reader.read_rows(index.lookup(ip, port, protocol))
+        
+        packet_filter = PacketFilter()
+        if ip is not None:
+            packet_filter.add_expression(f"host {ip}")
+        if port is not None:
+            packet_filter.add_expression(f"port {int(port)}")
+        for name in [protocol] if isinstance(protocol, str) else protocol or []:
+            packet_filter.add_protocol_filter(name)
+        return packet_filter.apply_filters(self.load_capture(filename) or [])
+    
+    def iter_pcap(self, filename):
+        """Stream packets from a pcap/pcapng file without loading it all"""
+        with PcapReader(os.path.join(self.storage_dir, filename)) as reader:
+            yield from reader.iter_packets()
+    
+    def iter_jsonl(self, filename):
+        """Stream packets from a JSON Lines file without loading it all"""
+        yield from iter_jsonl(os.path.join(self.storage_dir, filename))
     
     def _display_capture_info(self, metadata, filepath):
         """Display information about loaded capture"""
-        print(f"✅ Capture loaded: {os.path.basename(filepath)}")
-        print(f"   📅 Date: {metadata.get('capture_date', 'Unknown')}")
-        print(f"   📦 Packets: {metadata.get('total_packets', 0)}")
-        print(f"   📊 Data: {metadata.get('total_bytes', 0):,} bytes")
-        print(f"   🔍 Protocols: {', '.join(metadata.get('protocols', []))}")
-    
-    def list_captures(self):
-        """List all available capture files"""
+        log.info(f"✅ Capture loaded: {os.path.basename(filepath)}")
+        log.info(f"   📅 Date: {metadata.get('capture_date', 'Unknown')}")
+        log.info(f"   📦 Packets: {metadata.get('total_packets', 0)}")
+        log.info(f"   📊 Data: {metadata.get('total_bytes', 0):,} bytes")
+        log.info(f"   🔍 Protocols: {', '.join(metadata.get('protocols', []))}")
+    
+    def sync_catalog(self):
+        """
+        Bring the catalog up to date with the storage directory
+        Files that are new or changed since they were recorded (by size and
+        modification time) are loaded and cataloged; entries of files that
+        are gone are dropped. Returns the number of files (re)cataloged.
+        """
+        self._catalog_synced = True
         if not os.path.exists(self.storage_dir):
-            print("📁 No captures directory found")
-            return []
-        
-        capture_files = []
+            return 0
+        recorded = self.catalog.stamps()
+        present = set()
+        cataloged = 0
         for filename in os.listdir(self.storage_dir):
-            if filename.endswith(('.json', '.pkl')):
-                filepath = os.path.join(self.storage_dir, filename)
-                file_info = {
-                    'filename': filename,
-                    'size': os.path.getsize(filepath),
-                    'modified': datetime.fromtimestamp(os.path.getmtime(filepath))
-                }
-                capture_files.append(file_info)
+            if not filename.endswith(CAPTURE_EXTENSIONS):
+                continue
+            present.add(filename)
+            try:
+                stat = os.stat(os.path.join(self.storage_dir, filename))
+            except OSError:
+                continue
+            if recorded.get(filename) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            packets = self.load_capture(filename)
+            if packets is None:
+                continue
+            self.catalog.record(filename, stat.st_size, stat.st_mtime_ns, summarize(packets))
+            cataloged += 1
+        for filename in set(recorded) - present:
+            self.catalog.remove(filename)
+        if cataloged:
+            log.info(f"📇 Cataloged {cataloged} capture(s)")
+        return cataloged
+    
+    def _catalog_entries(self, entries):
+        for entry in entries:
+            entry['modified'] = datetime.fromtimestamp(entry['modified_ns'] / 1e9)
+        return entries
+    
+    def find_captures(self, host=None, start_time=None, end_time=None, protocol=None, refresh=False):
+        """
+        Captures that overlap start_time <= t < end_time, contain host and/or
+        carry protocol, newest first - answered from the catalog without
+        opening any capture (see catalog.CaptureCatalog.find)
+        """
+        if refresh or not self._catalog_synced:
+            self.sync_catalog()
+        return self._catalog_entries(self.catalog.find(host, start_time, end_time, protocol))
+    
+    def list_captures(self, refresh=False):
+        """
+        List all available capture files, newest first
+        Read from the catalog; the directory is only scanned on the first
+        listing (or with refresh=True) to pick up files written elsewhere.
+        """
+        if not os.path.exists(self.storage_dir):
+            log.info("📁 No captures directory found")
+            return []
         
+        capture_files = self.find_captures(refresh=refresh)
         if not capture_files:
-            print("📁 No capture files found")
+            log.info("📁 No capture files found")
             return []
         
-        # Sort by modification time (newest first)
-        capture_files.sort(key=lambda x: x['modified'], reverse=True)
-        
-        print("\n📁 AVAILABLE CAPTURES:")
-        print("-" * 60)
+        log.info("\n📁 AVAILABLE CAPTURES:")
+        log.info("-" * 60)
         for i, file_info in enumerate(capture_files, 1):
             size_kb = file_info['size'] / 1024
             modified_str = file_info['modified'].strftime("%Y-%m-%d %H:%M:%S")
-            print(f"{i}. {file_info['filename']}")
-            print(f"   📏 Size: {size_kb:.1f} KB")
-            print(f"   ⏰ Modified: {modified_str}")
-            print()
+            log.info(f"{i}. {file_info['filename']}")
+            log.info(f"   📏 Size: {size_kb:.1f} KB")
+            log.info(f"   ⏰ Modified: {modified_str}")
+            log.info(f"   📦 Packets: {file_info['packets']}")
+            log.info("")
         
         return capture_files
     
@@ -204,13 +494,17 @@ class PacketStorage:
         filepath = os.path.join(self.storage_dir, filename)
         
         if not os.path.exists(filepath):
-            print(f"❌ Capture file not found: {filename}")
+            log.error(f"❌ Capture file not found: {filename}")
             return False
         
         try:
             os.remove(filepath)
-            print(f"🗑️  Deleted capture: {filename}")
+            for suffix in ('.idx', INDEX_SUFFIX):
+                if os.path.exists(filepath + suffix):
+                    os.remove(filepath + suffix)
+            self.catalog.remove(filename)
+            log.info(f"🗑️  Deleted capture: {filename}")
             return True
         except Exception as e:
-            print(f"❌ Error deleting capture: {e}")
+            log.error(f"❌ Error deleting capture: {e}")
             return False
\ No newline at end of file
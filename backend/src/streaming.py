@@ -0,0 +1,93 @@
+# src/streaming.py
+"""
+Live capture as a stream of throttled events
+
+stream_capture() runs a capture and turns it into (event, data) pairs a
+web client can render while packets arrive:
+  'packets'    decoded packets, coalesced to at most one event per
+               interval and max_packets per event; the rest are counted
+               in 'skipped' (they are still in the session, if one is given)
+  'statistics' every stats_window seconds: that window's statistics (the
+               delta) plus the running totals
+  'issues'     issues detected in that window, when there are any
+  'done'       final totals once the capture ends
+format_sse() encodes an event for a text/event-stream (SSE) response.
+"""
+import json
+import time
+
+from src.statistics import StreamingStatistics
+from src.windows import WindowedAnalyzer
+
+
+def format_sse(event, data):
+    """One server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def stream_capture(capturer, count=None, timeout=30, interval=0.25, max_packets=500, stats_window=1,
+                   session=None, serialize=dict):
+    """
+    Run capturer.iter_batches() and yield (event, data) pairs (see above)
+
+    Packets are numbered in capture order - continuing the session's
+    numbers when a session is given - and each is passed through
+    serialize() before it is sent. Closing the generator (the client went
+    away) stops the capture.
+    """
+    analyzer = WindowedAnalyzer(windows=(stats_window,), lateness=min(interval, 0.5))
+    totals = StreamingStatistics(timeline_seconds=60)
+    windows = []
+    analyzer.add_listener(windows.append)
+    number = len(session) if session is not None else 0
+    pending = []
+    skipped = 0
+    last_sent = time.monotonic()
+
+    def packets_event():
+        nonlocal pending, skipped, last_sent
+        event = ('packets', {'packets': [serialize(packet) for packet in pending], 'skipped': skipped,
+                             'total': totals.total_packets})
+        pending = []
+        skipped = 0
+        last_sent = time.monotonic()
+        return event
+
+    def window_events():
+        for result in windows:
+            yield 'statistics', {
+                'window': result['window'],
+                'start': result['start'],
+                'end': result['end'],
+                'statistics': result['statistics'],
+                'totals': totals.snapshot(),
+            }
+            if result['issues']:
+                yield 'issues', {'start': result['start'], 'end': result['end'], 'issues': result['issues']}
+        windows.clear()
+
+    for batch in capturer.iter_batches(1024, interval * 1000, count=count, timeout=timeout, heartbeat=True):
+        if batch:
+            for packet in batch:
+                number += 1
+                packet['number'] = number
+            if session is not None:
+                session.append(batch)
+            totals.update_batch(batch)
+            room = max(0, max_packets - len(pending))
+            pending.extend(batch[:room])
+            skipped += len(batch) - len(batch[:room])
+            analyzer.update_batch(batch)
+        else:
+            # Idle link: close the windows by the clock
+            analyzer.advance(time.time() - analyzer.lateness)
+        if (pending or skipped) and time.monotonic() - last_sent >= interval:
+            yield packets_event()
+        yield from window_events()
+
+    analyzer.flush()
+    if pending or skipped:
+        yield packets_event()
+    yield from window_events()
+    yield 'done', {'total': totals.total_packets, 'bytes': totals.total_bytes,
+                   'sessionId': session.id if session is not None else None}
@@ -0,0 +1,661 @@
+# src/table.py
+import array
+import socket
+from collections.abc import MutableMapping
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional - columns are plain arrays without it
+    np = None
+
+
+# Column kinds
+INT = 'int'
+FLOAT = 'float'
+BOOL = 'bool'
+STRING = 'string'    # Interned: many packets share the same value
+TEXT = 'text'        # Free-form: stored as-is, one reference per packet
+ADDRESS = 'address'  # IPv4/IPv6 address stored as integers
+
+# (field name, kind, array typecode) - the order is also the row key order
+SCHEMA = (
+    ('number', INT, 'I'),
+    ('timestamp', FLOAT, 'd'),
+    ('length', INT, 'I'),
+    ('protocol', STRING, 'H'),
+    ('src_ip', ADDRESS, None),
+    ('dst_ip', ADDRESS, None),
+    ('src_port', INT, 'H'),
+    ('dst_port', INT, 'H'),
+    ('l4_protocol', STRING, 'B'),
+    ('tcp_flags', INT, 'B'),
+    ('tcp_seq', INT, 'I'),
+    ('tcp_ack', INT, 'I'),
+    ('tcp_window', INT, 'H'),
+    ('tcp_len', INT, 'I'),
+    ('tcp_sack_left', INT, 'I'),
+    ('tcp_sack_right', INT, 'I'),
+    ('dns_qname', STRING, 'I'),
+    ('dns_qtype', INT, 'H'),
+    ('dns_response', BOOL, 'B'),
+    ('is_broadcast', BOOL, 'B'),
+    ('is_multicast', BOOL, 'B'),
+    ('summary', TEXT, None),
+    ('real_packet', BOOL, 'B'),
+)
+
+_INT_LIMITS = {'B': 0xFF, 'H': 0xFFFF, 'I': 0xFFFFFFFF, 'Q': 0xFFFFFFFFFFFFFFFF}
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+def unique_rows(keys):
+    """
+    np.unique over the rows of a uint64 matrix (NumPy only)
+    Returns (first index, inverse). Rows are hashed to one word so the sort is 1-D; collisions are checked
+    and resolved with the slower structured unique.
+    """
+    hashed = np.zeros(len(keys), dtype=np.uint64)
+    for column in keys.T:
+        hashed = (hashed ^ column) * np.uint64(0x9E3779B97F4A7C15)
+        hashed ^= hashed >> np.uint64(29)
+    _, first, inverse = np.unique(hashed, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    if np.array_equal(keys[first][inverse], keys):
+        return first, inverse
+    _, first, inverse = np.unique(keys.view([('', np.uint64)] * keys.shape[1]).ravel(), return_index=True, return_inverse=True)
+    return first, inverse.ravel()
+
+
+class StringTable:
+    """
+    Interns repeated strings as small integer ids
+    A million 'TCP' strings become one string plus a million 2-byte ids
+    """
+
+    def __init__(self):
+        self.strings = []
+        self.ids = {}
+
+    def intern(self, value):
+        """Return the id for a string, adding it on first sight"""
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(value)
+            self.ids[value] = string_id
+        return string_id
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __getitem__(self, string_id):
+        return self.strings[string_id]
+
+
+def encode_address(value):
+    """
+    Convert an IP address string to (family, high 64 bits, low 64 bits)
+    Returns None for anything that is not a canonical IPv4/IPv6 string
+    """
+    if type(value) is not str:
+        return None
+    try:
+        if ':' in value:
+            number = int.from_bytes(socket.inet_pton(socket.AF_INET6, value), 'big')
+            encoded = (6, number >> 64, number & _MASK64)
+        else:
+            encoded = (4, 0, int.from_bytes(socket.inet_pton(socket.AF_INET, value), 'big'))
+    except (OSError, ValueError):
+        return None
+    # Only keep addresses that come back exactly as given ('FE80::1' would not)
+    if decode_address(*encoded) != value:
+        return None
+    return encoded
+
+
+def decode_address(family, high, low):
+    """Convert (family, high, low) back to the IP address string"""
+    if family == 4:
+        return socket.inet_ntop(socket.AF_INET, low.to_bytes(4, 'big'))
+    return socket.inet_ntop(socket.AF_INET6, ((high << 64) | low).to_bytes(16, 'big'))
+
+
+class PacketRow(MutableMapping):
+    """
+    Dict-compatible view of one packet stored in a PacketTable
+    Reads and writes go straight to the table columns
+    """
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table, index):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key):
+        return self._table._get_value(self._index, key)
+
+    def get(self, key, default=None):
+        try:
+            return self._table._get_value(self._index, key)
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, value):
+        self._table._set_value(self._index, key, value)
+
+    def __delitem__(self, key):
+        self._table._delete_value(self._index, key)
+
+    def __iter__(self):
+        return iter(self._table._row_keys(self._index))
+
+    def __len__(self):
+        return len(self._table._row_keys(self._index))
+
+    def __contains__(self, key):
+        return self._table._has_value(self._index, key)
+
+    def copy(self):
+        """Return a plain dict copy of the packet"""
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"PacketRow({self.copy()!r})"
+
+
+class PacketTable:
+    """
+    Compact columnar store for captured packets
+
+    Each field in SCHEMA lives in its own typed array instead of one Python
+    dict per packet. Values that do not fit their column (wrong type, out of
+    range, unknown fields such as 'raw_packet') are kept in sparse per-field
+    dicts. Numbers a column holds exactly are coerced to its type (an int
+    time reads back as a float, an integral float count as an int); every
+    other value reads back as it was appended.
+    """
+
+    def __init__(self, packets=None):
+        self._strings = {}
+        self._kinds = {}
+        self._columns = {}
+        self._text = {}
+        self._address = {}
+        self._present = array.array('Q')
+        self._extras = {}
+        self._address_cache = {}
+        self._address_text = {}
+        self._bits = {}
+
+        for bit, (name, kind, typecode) in enumerate(SCHEMA):
+            self._bits[name] = 1 << bit
+            self._kinds[name] = kind
+            if kind == STRING:
+                self._strings[name] = StringTable()
+            if kind == TEXT:
+                self._text[name] = []
+            elif kind == ADDRESS:
+                self._address[name] = (array.array('B'), array.array('Q'), array.array('Q'))
+            else:
+                self._columns[name] = array.array(typecode)
+
+        self._appenders = tuple(self._make_appender(name, kind, typecode) for name, kind, typecode in SCHEMA)
+        self._appender_by_name = {name: appender for (name, _, _), appender in zip(SCHEMA, self._appenders)}
+        self._schema_names = frozenset(self._bits)
+
+        if packets:
+            self.extend(packets)
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+    def _make_appender(self, name, kind, typecode):
+        """Build the function that appends one value to a column"""
+        bit = self._bits[name]
+
+        if kind == TEXT:
+            column = self._text[name]
+
+            def append_text(value):
+                if type(value) is str:
+                    column.append(value)
+                    return bit
+                column.append(None)
+                return 0
+            return append_text
+
+        if kind == ADDRESS:
+            families, highs, lows = self._address[name]
+            cache = self._address_cache
+
+            def append_address(value):
+                encoded = cache.get(value) if type(value) is str else None
+                if encoded is None:
+                    encoded = encode_address(value)
+                    if encoded is not None and len(cache) < 65536:
+                        cache[value] = encoded
+                if encoded is None:
+                    families.append(0)
+                    highs.append(0)
+                    lows.append(0)
+                    return 0
+                families.append(encoded[0])
+                highs.append(encoded[1])
+                lows.append(encoded[2])
+                return bit
+            return append_address
+
+        column = self._columns[name]
+
+        if kind == STRING:
+            strings = self._strings[name]
+            limit = _INT_LIMITS[typecode]
+
+            def append_string(value):
+                if type(value) is str:
+                    string_id = strings.intern(value)
+                    if string_id <= limit:
+                        column.append(string_id)
+                        return bit
+                column.append(0)
+                return 0
+            return append_string
+
+        if kind == FLOAT:
+            def append_float(value):
+                if type(value) is float:
+                    column.append(value)
+                    return bit
+                # Integer times (1700000000 from a JSON client) are times too,
+                # as long as a float holds them exactly
+                if type(value) is int:
+                    try:
+                        exact = float(value) == value
+                    except OverflowError:
+                        exact = False
+                    if exact:
+                        column.append(value)
+                        return bit
+                column.append(0.0)
+                return 0
+            return append_float
+
+        if kind == BOOL:
+            def append_bool(value):
+                if type(value) is bool:
+                    column.append(value)
+                    return bit
+                column.append(0)
+                return 0
+            return append_bool
+
+        limit = _INT_LIMITS[typecode]
+
+        def append_int(value):
+            if type(value) is int and 0 <= value <= limit:
+                column.append(value)
+                return bit
+            if type(value) is float and value.is_integer() and 0 <= value <= limit:
+                column.append(int(value))
+                return bit
+            column.append(0)
+            return 0
+        return append_int
+
+    def append(self, packet):
+        """Append one packet dict (or PacketRow) to the table; on error the table is left as it was"""
+        index = len(self._present)
+        present = 0
+        get = packet.get
+        try:
+            for (name, _, _), append_value in zip(SCHEMA, self._appenders):
+                value = get(name)
+                if value is None:
+                    append_value(None)
+                    if name in packet:
+                        self._extras.setdefault(name, {})[index] = None
+                    continue
+                stored = append_value(value)
+                if stored:
+                    present |= stored
+                else:
+                    self._extras.setdefault(name, {})[index] = value
+
+            for key in packet:
+                if key not in self._schema_names:
+                    self._extras.setdefault(key, {})[index] = packet[key]
+        except BaseException:
+            self._truncate(index)
+            raise
+        self._present.append(present)
+
+    def _truncate(self, length):
+        """Drop everything past the first length packets (undoes a partial append)"""
+        for column in self._columns.values():
+            del column[length:]
+        for text in self._text.values():
+            del text[length:]
+        for parts in self._address.values():
+            for column in parts:
+                del column[length:]
+        del self._present[length:]
+        for extra in self._extras.values():
+            for index in [index for index in extra if index >= length]:
+                del extra[index]
+
+    def extend(self, packets):
+        """Append many packets"""
+        for packet in packets:
+            self.append(packet)
+
+    def extend_columns(self, count, values, present=None):
+        """
+        Append `count` packets given column by column
+
+        values maps field names to sequences of length count. STRING fields
+        take (codes, names) where codes index the names list; ADDRESS fields
+        take (families, highs, lows). present optionally maps field names to
+        boolean sequences marking the rows that really hold a value; fields
+        not in values are absent on every new row.
+        """
+        present = present or {}
+        masks = array.array('Q', [0]) * count
+        for name, column_values in values.items():
+            kind = self._kinds[name]
+            if kind == TEXT:
+                self._text[name].extend(column_values)
+            elif kind == ADDRESS:
+                for column, part in zip(self._address[name], column_values):
+                    _extend_array(column, part)
+            elif kind == STRING:
+                codes, names = column_values
+                strings = self._strings[name]
+                remap = [strings.intern(value) for value in names]
+                if np is not None:
+                    ids = np.asarray(remap, dtype=np.int64)[np.asarray(codes, dtype=np.int64)] if remap else codes
+                else:
+                    ids = [remap[code] for code in codes]
+                _extend_array(self._columns[name], ids)
+            else:
+                _extend_array(self._columns[name], column_values)
+
+            bit = self._bits[name]
+            rows = present.get(name)
+            if np is not None:
+                mask = np.frombuffer(masks, dtype=np.uint64)
+                if rows is None:
+                    mask |= np.uint64(bit)
+                else:
+                    mask[np.asarray(rows, dtype=bool)] |= np.uint64(bit)
+            else:
+                for index in range(count):
+                    if rows is None or rows[index]:
+                        masks[index] |= bit
+
+        # Fields without values still need a placeholder slot on every row
+        for name, kind, typecode in SCHEMA:
+            if name in values:
+                continue
+            if kind == TEXT:
+                self._text[name].extend([None] * count)
+            elif kind == ADDRESS:
+                for column in self._address[name]:
+                    column.extend(array.array(column.typecode, [0]) * count)
+            else:
+                column = self._columns[name]
+                column.extend(array.array(column.typecode, [0]) * count)
+        self._present.extend(masks)
+
+    def extend_table(self, other):
+        """Append every packet of another PacketTable, column by column"""
+        base = len(self)
+        values = {}
+        for name, kind, _ in SCHEMA:
+            values[name] = (other.column(name), other.strings(name)) if kind == STRING else other.column(name)
+        self.extend_columns(len(other), values, {name: other.present(name) for name, _, _ in SCHEMA})
+        for name in other.extra_names():
+            extras = self._extras.setdefault(name, {})
+            for index, value in other.extras(name).items():
+                extras[base + index] = value
+
+    def clear(self):
+        """Remove every packet"""
+        self.__init__()
+
+    def __getstate__(self):
+        """Pickle the columns only; appenders are closures and the caches rebuild on use"""
+        state = self.__dict__.copy()
+        for name in ('_appenders', '_appender_by_name', '_address_cache', '_address_text'):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._address_cache = {}
+        self._address_text = {}
+        self._appenders = tuple(self._make_appender(name, kind, typecode) for name, kind, typecode in SCHEMA)
+        self._appender_by_name = {name: appender for (name, _, _), appender in zip(SCHEMA, self._appenders)}
+
+    def take(self, indices):
+        """Return a new table holding the given rows, in the given order"""
+        table = PacketTable()
+        indices = np.asarray(indices, dtype=np.int64) if np is not None else list(indices)
+        if not len(indices):
+            return table
+        positions = indices.tolist() if np is not None else indices
+
+        for name, strings in self._strings.items():
+            table._strings[name].strings.extend(strings.strings)
+            table._strings[name].ids.update(strings.ids)
+        for name, column in self._columns.items():
+            _extend_array(table._columns[name], _take_array(column, indices))
+        for name, text in self._text.items():
+            table._text[name].extend([text[index] for index in positions])
+        for name, columns in self._address.items():
+            for target, column in zip(table._address[name], columns):
+                _extend_array(target, _take_array(column, indices))
+        _extend_array(table._present, _take_array(self._present, indices))
+
+        for key, values in self._extras.items():
+            selected = {new: values[old] for new, old in enumerate(positions) if old in values}
+            if selected:
+                table._extras[key] = selected
+        return table
+
+    @classmethod
+    def from_packets(cls, packets):
+        """Build a table from any iterable of packet dicts"""
+        if isinstance(packets, cls):
+            return packets
+        return cls(packets)
+
+    # ------------------------------------------------------------------
+    # Row access (used by PacketRow)
+    # ------------------------------------------------------------------
+    def _check_index(self, index):
+        size = len(self._present)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("packet index out of range")
+        return index
+
+    def _get_value(self, index, key):
+        extra = self._extras.get(key)
+        if extra is not None and index in extra:
+            return extra[index]
+
+        bit = self._bits.get(key)
+        if bit is None or not self._present[index] & bit:
+            raise KeyError(key)
+
+        column = self._columns.get(key)
+        if column is not None:
+            value = column[index]
+            kind = self._kinds[key]
+            if kind == STRING:
+                return self._strings[key][value]
+            if kind == BOOL:
+                return bool(value)
+            return value
+
+        text = self._text.get(key)
+        if text is not None:
+            return text[index]
+
+        families, highs, lows = self._address[key]
+        encoded = (families[index], highs[index], lows[index])
+        address = self._address_text.get(encoded)
+        if address is None:
+            address = decode_address(*encoded)
+            if len(self._address_text) < 65536:
+                self._address_text[encoded] = address
+        return address
+
+    def _has_value(self, index, key):
+        extra = self._extras.get(key)
+        if extra is not None and index in extra:
+            return True
+        bit = self._bits.get(key)
+        return bit is not None and bool(self._present[index] & bit)
+
+    def _row_keys(self, index):
+        present = self._present[index]
+        keys = [name for name, _, _ in SCHEMA if present & self._bits[name]]
+        for key, values in self._extras.items():
+            if index in values and key not in keys:
+                keys.append(key)
+        return keys
+
+    def _set_value(self, index, key, value):
+        self._delete_value(index, key, missing_ok=True)
+        if key not in self._schema_names or value is None:
+            self._extras.setdefault(key, {})[index] = value
+            return
+
+        # Encode by appending to the end of the column, then move it into place
+        stored = self._appender_by_name[key](value)
+        if key in self._columns:
+            column = self._columns[key]
+            column[index] = column.pop()
+        elif key in self._text:
+            text = self._text[key]
+            text[index] = text.pop()
+        else:
+            for column in self._address[key]:
+                column[index] = column.pop()
+
+        if stored:
+            self._present[index] |= stored
+        else:
+            self._extras.setdefault(key, {})[index] = value
+
+    def _delete_value(self, index, key, missing_ok=False):
+        found = False
+        extra = self._extras.get(key)
+        if extra is not None and index in extra:
+            del extra[index]
+            found = True
+        bit = self._bits.get(key)
+        if bit is not None and self._present[index] & bit:
+            self._present[index] &= ~bit & _MASK64
+            found = True
+        if not found and not missing_ok:
+            raise KeyError(key)
+
+    # ------------------------------------------------------------------
+    # Sequence protocol
+    # ------------------------------------------------------------------
+    def __len__(self):
+        return len(self._present)
+
+    def __bool__(self):
+        return len(self._present) > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [PacketRow(self, i) for i in range(*index.indices(len(self)))]
+        return PacketRow(self, self._check_index(index))
+
+    def __iter__(self):
+        for index in range(len(self._present)):
+            yield PacketRow(self, index)
+
+    def __eq__(self, other):
+        if isinstance(other, (PacketTable, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"PacketTable({len(self)} packets)"
+
+    def to_dicts(self):
+        """Return the packets as a list of plain dicts"""
+        return [row.copy() for row in self]
+
+    # ------------------------------------------------------------------
+    # Column access
+    # ------------------------------------------------------------------
+    def column(self, name):
+        """
+        Return a copy of one column, as a NumPy array when NumPy is installed
+
+        Address columns return (family, high, low), string columns return ids
+        into strings(name), text columns return a list.
+        """
+        if name in self._text:
+            return list(self._text[name])
+        if name in self._address:
+            return tuple(self._export(column) for column in self._address[name])
+        return self._export(self._columns[name])
+
+    def strings(self, name):
+        """Return the list of distinct values of an interned string column"""
+        return self._strings[name].strings
+
+    def present(self, name):
+        """Return a boolean mask of the packets where a column holds a value"""
+        bit = self._bits[name]
+        if np is not None:
+            return (np.frombuffer(self._present, dtype=np.uint64) & np.uint64(bit)) != 0
+        return [bool(mask & bit) for mask in self._present]
+
+    def extras(self, name):
+        """Return the {index: value} dict of values stored outside the columns"""
+        return self._extras.get(name, {})
+
+    def extra_names(self):
+        """Return the names of the fields with values stored outside the columns"""
+        return [name for name, values in self._extras.items() if values]
+
+    def _export(self, column):
+        if np is None:
+            return array.array(column.typecode, column)
+        # Copy so the array can keep growing after we hand it out
+        return np.frombuffer(column, dtype=column.typecode).copy() if len(column) else np.array([], dtype=column.typecode)
+
+    def nbytes(self):
+        """Approximate memory held by the table, excluding shared strings"""
+        total = self._present.itemsize * len(self._present)
+        for column in self._columns.values():
+            total += column.itemsize * len(column)
+        for columns in self._address.values():
+            total += sum(column.itemsize * len(column) for column in columns)
+        for text in self._text.values():
+            total += 8 * len(text)
+        return total
+
+
+def _extend_array(column, values):
+    """Append a sequence (or NumPy array) to a typed array"""
+    if np is not None and isinstance(values, np.ndarray):
+        column.frombytes(values.astype(column.typecode, copy=False).tobytes())
+    else:
+        column.extend(array.array(column.typecode, values))
+
+
+def _take_array(column, indices):
+    """Select positions of a typed array (NumPy array or list of indices)"""
+    if np is not None:
+        return np.frombuffer(column, dtype=column.typecode)[indices] if len(column) else np.array([], dtype=column.typecode)
+    return [column[index] for index in indices]
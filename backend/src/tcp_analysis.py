@@ -0,0 +1,294 @@
+# src/tcp_analysis.py
+"""
+TCP sequence analysis in one streaming pass
+
+Follows the sequence and acknowledgement numbers of every TCP flow (flows
+come from a FlowTable) and reports, per packet:
+
+- retransmission:          data sent again that the receiver had not acknowledged
+- spurious_retransmission: data sent again that the receiver had already
+                           acknowledged or reported in a SACK block
+- out_of_order:            a segment filling a sequence gap shortly after the gap appeared
+- dup_ack:                 the same ACK again, with no data and no window change,
+                           while data is outstanding
+- zero_window:             the receiver advertises a zero receive window
+
+State per flow direction is fixed-size (next expected sequence number, last
+ACK, window) plus at most MAX_RANGES sequence gaps and SACKed
+ranges, so memory follows the number of active flows, not packets.
+"""
+import array
+from collections import Counter
+
+from src.decoder import TCP_SYN, TCP_FIN, TCP_RST, TCP_ACK
+from src.flows import FlowTable
+from src.statistics import _endpoint
+from src.table import PacketTable
+
+try:
+    import numpy as np
+except ImportError:  # analyze() feeds packets one by one without NumPy
+    np = None
+
+EVENT_TYPES = ('retransmission', 'spurious_retransmission', 'out_of_order', 'dup_ack', 'zero_window')
+
+MAX_RANGES = 4            # Sequence gaps / SACKed ranges remembered per direction
+REORDER_WINDOW = 0.003    # A gap filled within 3 ms is reordering, later it is a retransmission
+MAX_REPORTED_FLOWS = 10000
+
+_SEQ_MASK = 0xFFFFFFFF
+_HALF = 1 << 31
+_HAVE_SEQ = 1
+_HAVE_ACK = 2
+_NO_EVENTS = ()
+
+
+def _diff(a, b):
+    """Signed distance from b to a in 32-bit sequence space"""
+    return ((a - b + _HALF) & _SEQ_MASK) - _HALF
+
+
+def _remove_range(ranges, start, end):
+    """
+    Remove [start, end) from a list of [start, end, ...] ranges
+    Returns the first range it overlapped, or None.
+    """
+    hit = None
+    for entry in list(ranges):
+        if _diff(end, entry[0]) <= 0 or _diff(entry[1], start) <= 0:
+            continue
+        hit = hit or list(entry)
+        ranges.remove(entry)
+        if _diff(start, entry[0]) > 0:
+            ranges.append([entry[0], start, *entry[2:]])
+        if _diff(entry[1], end) > 0:
+            ranges.append([end, entry[1], *entry[2:]])
+    if len(ranges) > MAX_RANGES:
+        del ranges[:len(ranges) - MAX_RANGES]
+    return hit
+
+
+def _covered(ranges, start, end):
+    """True when [start, end) lies inside one of the ranges"""
+    for entry in ranges:
+        if _diff(start, entry[0]) >= 0 and _diff(entry[1], end) >= 0:
+            return True
+    return False
+
+
+class TcpAnalyzer:
+    """
+    Detects retransmissions, reordering, duplicate ACKs and zero windows
+
+    Feed it packets with update() (usable as a PacketCapturer listener) or
+    a whole capture with analyze(). Packets need the tcp_seq/tcp_ack/
+    tcp_len fields the decoder extracts; others are skipped.
+    """
+
+    def __init__(self, flow_table=None):
+        self.flows = flow_table if flow_table is not None else FlowTable()
+        self.reset()
+
+    def reset(self):
+        """Forget all sequence state and counts"""
+        self._slot_ids = array.array('Q')   # flow id the slot state belongs to
+        # Per flow direction (index = slot * 2 + direction)
+        self._have = array.array('B')
+        self._next_seq = array.array('I')
+        self._ack = array.array('I')
+        self._window = array.array('H')
+        self._gaps = {}     # index -> [[start, end, time seen]] sequence ranges not seen yet
+        self._sacked = {}   # index -> [[left, right]] ranges the peer reported holding
+        self.counts = Counter()
+        self.segments = 0
+        self._flow_events = {}  # flow id -> (conversation, Counter of events)
+
+    # ------------------------------------------------------------------
+    # Feeding
+    # ------------------------------------------------------------------
+    def update(self, packet):
+        """Analyze one packet; returns the tuple of events it triggered"""
+        get = packet.get
+        seq = get('tcp_seq')
+        if seq is None or get('tcp_len') is None or get('l4_protocol', get('protocol')) != 'TCP':
+            return _NO_EVENTS
+        result = self.flows.update(packet)
+        if result is None:
+            return _NO_EVENTS
+        slot, direction = result
+        flow_id = self.flows.flow_id(slot)
+        events = self._segment(slot, direction, flow_id, get('timestamp') or 0.0, get('tcp_flags') or 0,
+                               seq, get('tcp_ack') or 0, get('tcp_len'), get('tcp_window'),
+                               get('tcp_sack_left'), get('tcp_sack_right'))
+        if events:
+            self._record(flow_id, direction, packet, events)
+        return events
+
+    def analyze(self, packets):
+        """Analyze a whole capture in order (a PacketTable is grouped into flows with NumPy)"""
+        if np is None or not isinstance(packets, PacketTable):
+            for packet in packets:
+                self.update(packet)
+            return self.summary()
+
+        slots, directions, flow_ids = (np.asarray(values) for values in self.flows.update_batch(packets))
+        tcp = (slots >= 0) & packets.present('tcp_seq') & packets.present('tcp_len')
+        names = packets.strings('l4_protocol')
+        if 'TCP' not in names:
+            return self.summary()
+        tcp &= packets.present('l4_protocol') & (packets.column('l4_protocol') == names.index('TCP'))
+        rows = np.flatnonzero(tcp)
+
+        def column(name):
+            return packets.column(name)[rows].tolist()
+
+        def optional(name):
+            present = packets.present(name)[rows].tolist()
+            return [value if has else None for value, has in zip(column(name), present)]
+
+        segment = self._segment
+        columns = zip(rows.tolist(), slots[rows].tolist(), directions[rows].tolist(), flow_ids[rows].tolist(),
+                      column('timestamp'), column('tcp_flags'), column('tcp_seq'), column('tcp_ack'),
+                      column('tcp_len'), optional('tcp_window'), optional('tcp_sack_left'), optional('tcp_sack_right'))
+        for row, slot, direction, flow_id, timestamp, flags, seq, ack, length, window, left, right in columns:
+            events = segment(slot, direction, flow_id, timestamp, flags, seq, ack, length, window, left, right)
+            if events:
+                self._record(flow_id, direction, packets[row], events)
+        return self.summary()
+
+    # ------------------------------------------------------------------
+    # Sequence tracking
+    # ------------------------------------------------------------------
+    def _claim(self, slot, flow_id):
+        """Make sure the per-slot state exists and belongs to flow_id"""
+        if slot >= len(self._slot_ids):
+            grow = slot + 1 - len(self._slot_ids)
+            self._slot_ids.extend([0] * grow)
+            for column in (self._have, self._next_seq, self._ack, self._window):
+                column.extend([0] * (2 * grow))
+        if self._slot_ids[slot] != flow_id:
+            # The slot held an earlier flow: start from scratch
+            self._slot_ids[slot] = flow_id
+            for index in (2 * slot, 2 * slot + 1):
+                self._have[index] = 0
+                self._gaps.pop(index, None)
+                self._sacked.pop(index, None)
+
+    def _segment(self, slot, direction, flow_id, timestamp, flags, seq, ack, length, window, sack_left, sack_right):
+        """Update the state of one flow direction with a segment; returns its events"""
+        self._claim(slot, flow_id)
+        self.segments += 1
+        index = 2 * slot + direction
+        peer = index ^ 1
+        have = self._have
+        events = []
+        control = flags & (TCP_SYN | TCP_FIN | TCP_RST)
+
+        if window == 0 and not control:
+            events.append('zero_window')
+
+        # Data: SYN and FIN take one sequence number each
+        size = length + (1 if flags & TCP_SYN else 0) + (1 if flags & TCP_FIN else 0)
+        if size and not flags & TCP_RST:
+            end = (seq + size) & _SEQ_MASK
+            expected = self._next_seq[index]
+            if not have[index] & _HAVE_SEQ:
+                self._next_seq[index] = end
+                have[index] |= _HAVE_SEQ
+            elif flags & TCP_SYN and _diff(end, expected) != 0:
+                self._next_seq[index] = end  # New connection on the same ports
+                self._gaps.pop(index, None)
+            elif seq == expected:
+                self._next_seq[index] = end
+            elif length <= 1 and not control and _diff(seq, expected) == -1:
+                pass  # Keep-alive: one byte (or none) just below the window, not a retransmission
+            elif _diff(seq, expected) > 0:
+                # Segments in between are missing (lost before the capture point, or late)
+                gaps = self._gaps.setdefault(index, [])
+                gaps.append([expected, seq, timestamp])
+                if len(gaps) > MAX_RANGES:
+                    del gaps[0]
+                self._next_seq[index] = end
+            else:
+                if _diff(end, expected) > 0:
+                    self._next_seq[index] = end
+                old_end = end if _diff(end, expected) <= 0 else expected
+                events.append(self._resent(index, peer, seq, old_end, timestamp))
+
+        # Acknowledgements of the peer's data
+        if flags & TCP_ACK:
+            if not have[index] & _HAVE_ACK:
+                self._ack[index] = ack
+                have[index] |= _HAVE_ACK
+            elif ack == self._ack[index]:
+                outstanding = have[peer] & _HAVE_SEQ and _diff(self._next_seq[peer], ack) > 0
+                if not length and not control and window == self._window[index] and outstanding:
+                    events.append('dup_ack')
+            elif _diff(ack, self._ack[index]) > 0:
+                self._ack[index] = ack
+                # Everything below the cumulative ACK has arrived
+                for ranges in (self._gaps.get(peer), self._sacked.get(peer)):
+                    if ranges:
+                        ranges[:] = [entry for entry in ranges if _diff(entry[1], ack) > 0]
+            if sack_left is not None and sack_right is not None and _diff(sack_right, ack) > 0:
+                sacked = self._sacked.setdefault(peer, [])
+                _remove_range(sacked, sack_left, sack_right)
+                sacked.append([sack_left, sack_right])
+                if len(sacked) > MAX_RANGES:
+                    del sacked[0]
+        if window is not None:
+            self._window[index] = window
+        return tuple(events)
+
+    def _resent(self, index, peer, start, end, timestamp):
+        """Classify data at or below the next expected sequence number"""
+        gaps = self._gaps.get(index)
+        gap = _remove_range(gaps, start, end) if gaps else None
+        if gap is not None and timestamp - gap[2] <= REORDER_WINDOW:
+            return 'out_of_order'
+        acked = self._have[peer] & _HAVE_ACK and _diff(end, self._ack[peer]) <= 0
+        if acked or _covered(self._sacked.get(index, ()), start, end):
+            return 'spurious_retransmission'
+        return 'retransmission'
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+    def _record(self, flow_id, direction, packet, events):
+        self.counts.update(events)
+        entry = self._flow_events.get(flow_id)
+        if entry is None:
+            if len(self._flow_events) >= MAX_REPORTED_FLOWS:
+                return
+            src = _endpoint(packet.get('src_ip'), packet.get('src_port'))
+            dst = _endpoint(packet.get('dst_ip'), packet.get('dst_port'))
+            conversation = f"{src} → {dst}" if direction == 0 else f"{dst} → {src}"
+            entry = self._flow_events[flow_id] = (conversation, Counter())
+        entry[1].update(events)
+
+    def summary(self):
+        """Totals of every event type and the number of TCP segments analyzed"""
+        totals = {event: self.counts.get(event, 0) for event in EVENT_TYPES}
+        totals['segments'] = self.segments
+        return totals
+
+    def flow_events(self, event=None, count=None):
+        """
+        [(conversation, Counter of events)] of the flows with events,
+        most affected first (by `event`, or by all events)
+        """
+        def weight(entry):
+            counter = entry[1]
+            return counter[event] if event else sum(counter.values())
+        ranked = sorted((entry for entry in self._flow_events.values() if weight(entry)), key=weight, reverse=True)
+        return ranked[:count] if count is not None else ranked
+
+    def take_flow_events(self):
+        """
+        flow_events() since the last call, then forget them
+        Sequence state is kept, so a long-running analyzer can report per
+        time window without missing events that span two windows.
+        """
+        events = self.flow_events()
+        self._flow_events = {}
+        return events
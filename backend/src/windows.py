@@ -0,0 +1,174 @@
+# src/windows.py
+"""
+Rolling analysis windows over an unbounded packet stream
+
+Packets are binned by timestamp into short panes. When a pane closes its
+packets are summarized - StreamingStatistics plus the detector's
+mergeable partial results - and released, so memory depends on the
+window sizes, not on how long the capture runs. A window is the merge of
+its panes: tumbling windows emit every `size` seconds, sliding windows
+every `slide` seconds.
+"""
+from collections import deque
+from functools import reduce
+from math import gcd
+
+from src.detector import IssueDetector
+from src.statistics import StreamingStatistics
+from src.tcp_analysis import TcpAnalyzer
+
+
+class _Pane:
+    __slots__ = ('start', 'packets', 'statistics', 'partial')
+
+    def __init__(self, start, statistics):
+        self.start = start
+        self.packets = []
+        self.statistics = statistics
+        self.partial = None
+
+
+class WindowedAnalyzer:
+    """
+    Statistics and issue detection per time window of a packet stream
+
+    windows are window sizes in whole seconds, e.g. (1, 10, 60). With
+    slide=None every window tumbles (back-to-back, no overlap); otherwise
+    each window of `size` seconds is emitted every `slide` seconds.
+    Windows are aligned to the epoch (a 10s window covers :00-:10, ...).
+
+    Feed packets in rough timestamp order with update()/update_batch().
+    A pane closes once a packet `lateness` seconds past its end arrives,
+    or when advance() moves the clock on (idle links); packets for panes
+    that already closed count as late and go to the oldest open pane.
+    Silences longer than the largest window are skipped, not emitted as
+    empty windows.
+    Every window result goes to the listeners (add_listener) and is
+    returned by update_batch()/advance()/flush().
+    """
+
+    def __init__(self, windows=(1, 10, 60), slide=None, lateness=0.5, top_conversations=5):
+        windows = tuple(sorted(set(int(size) for size in windows)))
+        if not windows or windows[0] < 1:
+            raise ValueError("Window sizes must be whole seconds >= 1")
+        if slide is not None and (int(slide) < 1 or any(size % int(slide) for size in windows)):
+            raise ValueError("slide must be a whole number of seconds dividing every window size")
+        self.windows = windows
+        self.slide = int(slide) if slide is not None else None
+        self.lateness = lateness
+        self.pane_seconds = reduce(gcd, windows + ((self.slide,) if self.slide else ()))
+        self.top_conversations = top_conversations
+        self.listeners = []
+        self.detector = IssueDetector()
+        self.tcp = TcpAnalyzer()
+        self.late_packets = 0
+        self.windows_emitted = 0
+        self._open = {}          # pane start -> _Pane still taking packets
+        self._closed = deque()   # summarized panes, oldest first, as long as the largest window
+        self._closed_until = None
+        self._watermark = None
+        self._spare = []         # StreamingStatistics of dropped panes, for reuse
+
+    def add_listener(self, callback):
+        """Call callback(window result) for every window that closes"""
+        self.listeners.append(callback)
+
+    def update(self, packet):
+        return self.update_batch([packet])
+
+    def update_batch(self, packets):
+        """Add packets; returns the results of the windows they closed"""
+        width = self.pane_seconds
+        latest = self._watermark
+        for packet in packets:
+            timestamp = packet.get('timestamp') or 0
+            start = int(timestamp // width) * width
+            if self._closed_until is not None and start < self._closed_until:
+                self.late_packets += 1
+                start = min(self._open) if self._open else self._closed_until
+            pane = self._open.get(start)
+            if pane is None:
+                pane = self._open[start] = _Pane(start, self._statistics())
+            pane.packets.append(packet)
+            if latest is None or timestamp > latest:
+                latest = timestamp
+        return self.advance(latest - self.lateness if latest is not None else None)
+
+    def advance(self, now):
+        """Close every pane that ends at or before `now` (seconds since the epoch)"""
+        results = []
+        if now is None:
+            return results
+        self._watermark = now if self._watermark is None else max(self._watermark, now)
+        width = self.pane_seconds
+        if self._closed_until is None:
+            if not self._open:
+                # Nothing seen yet: windows start now
+                self._closed_until = int(now // width) * width
+                return results
+            self._closed_until = min(self._open)
+        while self._closed_until + width <= self._watermark:
+            start = self._closed_until
+            idle_until = min(self._open, default=self._watermark) - max(self.windows)
+            if start not in self._open and idle_until > start + width:
+                # A long silence: skip ahead instead of emitting empty windows one pane at a time
+                self._spare.extend(pane.statistics for pane in self._closed)
+                self._closed.clear()
+                self._closed_until = int(idle_until // width) * width
+                continue
+            pane = self._open.pop(start, None) or _Pane(start, self._statistics())
+            self._close(pane)
+            self._closed_until = start + width
+            results.extend(self._emit(self._closed_until))
+        return results
+
+    def flush(self):
+        """Close all open panes and emit the windows that end with them (end of capture)"""
+        results = []
+        if self._open:
+            last = max(self._open) + self.pane_seconds
+            results = self.advance(last)
+        return results
+
+    def _statistics(self):
+        if self._spare:
+            statistics = self._spare.pop()
+            statistics.reset()
+            return statistics
+        return StreamingStatistics(timeline_seconds=max(self.windows) + 1, top_conversations=self.top_conversations)
+
+    def _close(self, pane):
+        """Summarize a pane and release its packets"""
+        pane.statistics.update_batch(pane.packets)
+        pane.partial = self.detector.collect(pane.packets, self.tcp)
+        pane.packets = None
+        self._closed.append(pane)
+        keep = max(self.windows) // self.pane_seconds
+        while len(self._closed) > keep:
+            self._spare.append(self._closed.popleft().statistics)
+
+    def _emit(self, end):
+        results = []
+        for size in self.windows:
+            step = self.slide or size
+            if end % step:
+                continue
+            panes = [pane for pane in self._closed if pane.start >= end - size]
+            statistics = self._statistics()
+            for pane in panes:
+                statistics.merge(pane.statistics)
+            partial = IssueDetector.merge_partials([pane.partial for pane in panes])
+            result = {
+                'window': size,
+                'start': end - size,
+                'end': end,
+                'packets': statistics.total_packets,
+                'statistics': statistics.snapshot(),
+                'issues': self.detector.report(partial) if partial['packets'] else [],
+            }
+            self._spare.append(statistics)
+            self.windows_emitted += 1
+            for listener in self.listeners:
+                listener(result)
+            results.append(result)
+        return results
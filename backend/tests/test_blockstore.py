@@ -0,0 +1,123 @@
+import pytest
+import random
+import shutil
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.blockstore import BlockReader, BlockWriter
+from src.capture_index import query_packets
+from src.table import PacketTable
+
+
+def sample_packets(count, start=1000.0):
+    protocols = ['TCP', 'UDP', 'DNS', 'ICMP']
+    return [{
+        'number': i + 1,
+        'timestamp': start + i * 0.01,
+        'length': 60 + i % 1400,
+        'protocol': protocols[i % 4],
+        'src_ip': f"10.0.{i % 7}.{i % 250}",
+        'dst_ip': '192.168.1.1',
+        'src_port': 1024 + i,
+        'dst_port': 53,
+        'summary': f"packet {i}",
+        'real_packet': False,
+    } for i in range(count)]
+
+
+class TestBlockStore:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'test.pkb')
+        self.packets = sample_packets(2500)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip_and_append(self):
+        """Test packets read back exactly, including odd values, across appended writes"""
+        self.packets[3]['tags'] = ['a', 'b']
+        self.packets[4]['length'] = -1
+        self.packets[5]['protocol'] = None
+        with BlockWriter(self.path, block_size=256) as writer:
+            writer.write_many(self.packets[:1000])
+        with BlockWriter(self.path) as writer:
+            writer.write_many(PacketTable(self.packets[1000:]))
+
+        with BlockReader(self.path) as reader:
+            assert len(reader) == 2500 and reader.block_size == 256
+            assert [block.count for block in reader.blocks[3:5]] == [232, 256]
+            assert reader.read_table().to_dicts() == self.packets
+            assert sorted(reader.metadata['protocols']) == ['DNS', 'ICMP', 'TCP', 'UDP']
+
+    def test_table_batches(self):
+        """Test PacketTable batches of any size fill whole blocks, continuing the previous batch's partial block"""
+        with BlockWriter(self.path, block_size=256) as writer:
+            for start, stop in ((0, 100), (100, 150), (150, 1000), (1000, 2500)):
+                writer.write_many(PacketTable(self.packets[start:stop]))
+
+        with BlockReader(self.path) as reader:
+            assert [block.count for block in reader.blocks] == [256] * 9 + [196]
+            assert reader.read_table().to_dicts() == self.packets
+
+    def test_query_matches_scan(self):
+        """Test paged range queries return what query_packets returns on the loaded capture"""
+        with BlockWriter(self.path, block_size=128) as writer:
+            writer.write_many(self.packets)
+        table = PacketTable(self.packets)
+        rng = random.Random(1)
+        with BlockReader(self.path) as reader:
+            for _ in range(100):
+                query = {'limit': rng.choice([1, 7, 100])}
+                if rng.random() < 0.5:
+                    query['start_time'] = rng.uniform(1000, 1025)
+                if rng.random() < 0.5:
+                    query['end_time'] = rng.uniform(1000, 1025)
+                if rng.random() < 0.3:
+                    query['first_number'] = rng.randint(1, 2500)
+                if rng.random() < 0.5:
+                    query['offset'] = rng.randint(0, 2500)
+                page = reader.query(**query)
+                assert page == query_packets(table, **query)
+                if page['nextCursor']:
+                    query.pop('offset', None)
+                    query['cursor'] = page['nextCursor']
+                    assert reader.query(**query) == query_packets(table, **query)
+
+    def test_selective_reads(self):
+        """Test time and protocol filters only decode blocks that can match"""
+        with BlockWriter(self.path, block_size=100) as writer:
+            writer.write_many(self.packets)
+        with BlockReader(self.path) as reader:
+            assert reader.select(start_time=1010, end_time=1012) == [10, 11]
+            dns = reader.read_table(protocols=['DNS'])
+            assert len(dns) == 625 and set(dns.strings('protocol')) >= {'DNS'}
+            assert all(packet['protocol'] == 'DNS' for packet in dns)
+            window = list(reader.iter_packets(start_time=1010.5, end_time=1011))
+            assert [packet['number'] for packet in window] == list(range(1051, 1101))
+
+    def test_recovers_truncated_file(self):
+        """Test a file cut off mid-write keeps its complete blocks and can be appended to"""
+        with BlockWriter(self.path, block_size=500) as writer:
+            writer.write_many(self.packets)
+        with BlockReader(self.path) as reader:
+            third_block_end = reader.blocks[3].offset - 1
+        with open(self.path, 'r+b') as f:
+            f.truncate(third_block_end)
+
+        with BlockReader(self.path) as reader:
+            assert len(reader) == 1000
+            assert reader.read_table().to_dicts() == self.packets[:1000]
+        with BlockWriter(self.path) as writer:
+            writer.write_many(self.packets[1000:1200])
+        with BlockReader(self.path) as reader:
+            assert reader.read_table().to_dicts() == self.packets[:1200]
+
+    def test_not_a_block_file(self):
+        """Test other files are refused"""
+        with open(self.path, 'wb') as f:
+            f.write(b'{"packets": []}')
+        with pytest.raises(ValueError):
+            BlockReader(self.path)
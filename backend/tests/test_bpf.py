@@ -0,0 +1,181 @@
+import pytest
+import socket
+import struct
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src import afpacket
+from src.bpf import compile_bpf, format_bpf, BpfCompileError, ACCEPT_BYTES, SKF_AD_OFF, SKF_AD_HATYPE
+from src.afpacket import AfPacketSocket, ARPHRD_ETHER
+from src.decoder import decode_frame
+from src.expression import CompiledFilter, parse_filter
+from src.filters import PacketFilter
+
+ETHERNET = b'\x02\x00\x00\x00\x00\x01\x02\x00\x00\x00\x00\x02'
+
+
+def run_bpf(program, frame, hatype=ARPHRD_ETHER):
+    """Minimal classic BPF interpreter for the instructions compile_bpf emits"""
+    a = x = pc = 0
+    while True:
+        code, jt, jf, k = program[pc]
+        pc += 1
+        kind, size, mode = code & 0x07, code & 0x18, code & 0xE0
+        if kind in (0x00, 0x01):
+            if code == 0x20 and k == (SKF_AD_OFF + SKF_AD_HATYPE) & 0xFFFFFFFF:
+                a = hatype
+                continue
+            if mode == 0x80:
+                a = len(frame)
+                continue
+            if mode == 0xA0:
+                if k >= len(frame):
+                    return 0
+                x = (frame[k] & 0xF) * 4
+                continue
+            offset = k + x if mode == 0x40 else k
+            width = {0x00: 4, 0x08: 2, 0x10: 1}[size]
+            if offset + width > len(frame):
+                return 0
+            a = int.from_bytes(frame[offset:offset + width], 'big')
+        elif kind == 0x04:
+            a &= k
+        elif kind == 0x05:
+            if code & 0xF0 == 0x00:
+                pc += k
+                continue
+            taken = {0x10: a == k, 0x20: a > k, 0x30: a >= k}[code & 0xF0]
+            pc += jt if taken else jf
+        else:
+            return k
+
+
+def ipv4_frame(protocol, src='10.0.0.1', dst='192.168.1.2', transport=b''):
+    ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(transport), 0, 0, 64, protocol, 0,
+                     socket.inet_aton(src), socket.inet_aton(dst))
+    return ETHERNET + b'\x08\x00' + ip + transport
+
+
+def tcp(src_port, dst_port, flags=0x18):
+    return struct.pack('!HHIIBBHHH', src_port, dst_port, 1, 1, 5 << 4, flags, 65535, 0, 0)
+
+
+def udp(src_port, dst_port, payload=b'hello'):
+    return struct.pack('!HHHH', src_port, dst_port, 8 + len(payload), 0) + payload
+
+
+def ipv6_frame(next_header, transport, src='fe80::1', dst='2001:db8::2'):
+    ip = struct.pack('!IHBB16s16s', 6 << 28, len(transport), next_header, 64,
+                     socket.inet_pton(socket.AF_INET6, src), socket.inet_pton(socket.AF_INET6, dst))
+    return ETHERNET + b'\x86\xdd' + ip + transport
+
+
+def arp_frame(sender='10.0.0.7', target='10.0.0.1'):
+    arp = struct.pack('!HHBBH6s4s6s4s', 1, 0x0800, 6, 4, 1, b'\x02' * 6, socket.inet_aton(sender),
+                      b'\0' * 6, socket.inet_aton(target))
+    return ETHERNET + b'\x08\x06' + arp
+
+
+FRAMES = [
+    ipv4_frame(6, transport=tcp(40000, 80)),
+    ipv4_frame(6, src='192.168.1.2', dst='10.0.0.1', transport=tcp(80, 40000, flags=0x12)),
+    ipv4_frame(6, src='172.16.0.9', transport=tcp(5555, 443, flags=0x02)),
+    ipv4_frame(17, transport=udp(5353, 53)),
+    ipv4_frame(17, src='8.8.8.8', transport=udp(53, 5353, b'x' * 900)),
+    ipv4_frame(1, transport=b'\x08\x00\x00\x00\x00\x01\x00\x01'),
+    ipv4_frame(47, transport=b'\0' * 8),
+    ipv6_frame(6, tcp(40000, 443)),
+    ipv6_frame(17, udp(546, 547)),
+    ipv6_frame(58, b'\x86\x00\x00\x00' + b'\0' * 12),
+    ipv6_frame(0, b'\x06\x00' + b'\0' * 6 + tcp(1, 80)),
+    arp_frame(),
+    ETHERNET + b'\x81\x00\x00\x05\x08\x00' + ipv4_frame(6, transport=tcp(1, 2))[14:],
+]
+
+EXPRESSIONS = [
+    'tcp', 'udp or icmp', 'icmpv6', 'arp', 'ip', 'ipv6', 'dns', 'not tcp',
+    'port 80', 'dst port 53', 'not port 80', 'portrange 400-600', 'src portrange 5000-6000',
+    'host 10.0.0.1', 'src net 192.168.0.0/16', 'not net 10.0.0.0/8', 'dst host 2001:db8::2',
+    'src net fe80::/10', 'len > 500', 'len <= 60', 'len != 54', 'greater 100',
+    'flags S', 'flags SA', 'tcp and not flags S', 'tcp and (dst port 80 or dst port 443) and not src net 172.16.0.0/12',
+    'udp and len > 500 or arp', 'not (icmp or arp)', 'true', 'false',
+    'tcp port 80', 'ip and tcp', 'ip6 and not udp', 'not ip',
+]
+
+
+class TestBpf:
+    def test_program_shape(self):
+        """Test a program checks the device type first and ends in accept/reject"""
+        program = compile_bpf('tcp and port 80')
+        assert program[0] == (0x20, 0, 0, (SKF_AD_OFF + SKF_AD_HATYPE) & 0xFFFFFFFF)
+        assert program[-2:] == [(0x06, 0, 0, ACCEPT_BYTES), (0x06, 0, 0, 0)]
+        assert all(0 <= jt <= 255 and 0 <= jf <= 255 for _, jt, jf, _ in program)
+        assert 'ldh [12]' in format_bpf(program)
+
+    @pytest.mark.parametrize('expression', EXPRESSIONS)
+    def test_kernel_never_drops_a_match(self, expression):
+        """Test every frame the exact filter keeps passes the BPF program"""
+        program = compile_bpf(expression)
+        wanted = CompiledFilter(parse_filter(expression))
+        for frame in FRAMES:
+            packet = decode_frame(frame)
+            packet['length'] = len(frame)
+            if wanted(packet):
+                assert run_bpf(program, frame), f"{expression!r} rejected {packet['summary']}"
+
+    def test_rejects_plain_mismatches(self):
+        """Test frames decidable from fixed offsets are rejected in the kernel"""
+        program = compile_bpf('tcp and dst port 80')
+        accepted = [run_bpf(program, frame) > 0 for frame in FRAMES]
+        assert accepted[0]
+        assert not any(accepted[1:10])
+        assert accepted[10]  # IPv6 extension header: left to user space
+        assert not accepted[11]
+        assert accepted[12]  # VLAN tag: left to user space
+
+    def test_non_ethernet_device_accepts(self):
+        """Test frames of devices without Ethernet headers are not judged by offsets"""
+        program = compile_bpf('tcp')
+        assert run_bpf(program, b'\x45' * 40, hatype=0xFFFE) == ACCEPT_BYTES
+
+    def test_packet_filter_and_raw_program(self):
+        """Test PacketFilter rules compile and raw programs pass through"""
+        rules = PacketFilter()
+        rules.add_protocol_filter('UDP')
+        program = compile_bpf(rules)
+        assert run_bpf(program, FRAMES[3]) and not run_bpf(program, FRAMES[0])
+        raw = [(0x06, 0, 0, 0)]
+        assert compile_bpf(raw) == raw
+        with pytest.raises(TypeError):
+            compile_bpf(42)
+
+    def test_too_large(self):
+        """Test filters beyond the jump range are refused"""
+        expression = ' or '.join(f'host 10.0.{i // 250}.{i % 250}' for i in range(200))
+        with pytest.raises(BpfCompileError):
+            compile_bpf('tcp and (' + expression + ')')
+
+    def test_loopback_attach(self):
+        """Test an attached program keeps only matching packets and reports the rest"""
+        if not afpacket.available():
+            pytest.skip("AF_PACKET needs Linux")
+        try:
+            sock = AfPacketSocket('lo', bpf_program=compile_bpf('udp and dst port 47101'))
+        except PermissionError:
+            pytest.skip("AF_PACKET needs root or CAP_NET_RAW")
+
+        ports = []
+        with sock, socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+            for port in range(47100, 47104):
+                sender.sendto(b'ping', ('127.0.0.1', port))
+            deadline = time.monotonic() + 1
+            while time.monotonic() < deadline:
+                for _, _, linktype, frame in sock.read(0.1):
+                    ports.append(decode_frame(frame, linktype).get('dst_port'))
+                    frame.release()
+            stats = sock.statistics()
+
+        assert ports == [47101]
+        assert stats['filtered'] >= 6
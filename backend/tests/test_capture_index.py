@@ -0,0 +1,138 @@
+import pytest
+import random
+import shutil
+import socket
+import struct
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.capture_index import CaptureIndex, query_packets
+from src.pcap import PcapReader, PcapWriter
+
+
+def udp_frame(src_port):
+    transport = struct.pack('!HHHH', src_port, 53, 8, 0)
+    ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 28, 0, 0, 64, 17, 0,
+                     socket.inet_aton('10.0.0.1'), socket.inet_aton('10.0.0.2'))
+    return b'\x02\x00\x00\x00\x00\x01\x02\x00\x00\x00\x00\x02\x08\x00' + ip + transport
+
+
+def pcapng_block(block_type, body):
+    body += b'\x00' * (-len(body) % 4)
+    length = 12 + len(body)
+    return struct.pack('<II', block_type, length) + body + struct.pack('<I', length)
+
+
+def random_queries(rng, count, first, last, trials=100):
+    for _ in range(trials):
+        query = {'limit': rng.choice([1, 7, 100]), 'fields': ['number', 'timestamp', 'src_port']}
+        if rng.random() < 0.5:
+            query['start_time'] = rng.uniform(first, last)
+        if rng.random() < 0.5:
+            query['end_time'] = rng.uniform(first, last)
+        if rng.random() < 0.3:
+            query['first_number'] = rng.randint(1, count)
+        if rng.random() < 0.3:
+            query['last_number'] = rng.randint(1, count)
+        if rng.random() < 0.5:
+            query['offset'] = rng.randint(0, count)
+        yield query
+
+
+class TestCaptureIndex:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'test.pcap')
+        rng = random.Random(1)
+        with PcapWriter(self.path) as capture:
+            for i in range(1000):
+                # Roughly ordered timestamps, as captured by several threads
+                capture.write(udp_frame(1000 + i), 1000 + i * 0.01 + rng.uniform(-0.05, 0.05))
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_matches_full_scan(self):
+        """Test indexed queries return exactly what a scan of the decoded capture returns"""
+        index = CaptureIndex.open(self.path, stride=32)
+        with PcapReader(self.path) as reader:
+            table = reader.read_table()
+        dicts = table.to_dicts()
+        assert index.count == 1000
+
+        for query in random_queries(random.Random(2), 1000, 999.9, 1010.1):
+            assert index.query(**query) == query_packets(table, **query)
+            assert query_packets(dicts, **query) == query_packets(table, **query)
+
+    def test_cursor_pages(self):
+        """Test following nextCursor visits every match once, in capture order"""
+        index = CaptureIndex.open(self.path, stride=32)
+        numbers = []
+        cursor = None
+        while True:
+            page = index.query(limit=64, cursor=cursor, start_time=1002, end_time=1008)
+            numbers += [packet['number'] for packet in page['packets']]
+            cursor = page['nextCursor']
+            if cursor is None:
+                break
+        assert numbers == sorted(set(numbers))
+        assert len(numbers) == page['total']
+        assert 550 < len(numbers) < 650
+
+    def test_cursor_without_number(self):
+        """Test pages projected without 'number' still get a cursor that resumes after them"""
+        index = CaptureIndex.open(self.path, stride=32)
+        with PcapReader(self.path) as reader:
+            table = reader.read_table()
+        for query in ({}, {'start_time': 1002, 'end_time': 1008}):
+            page = index.query(limit=3, fields=['src_port'], **query)
+            assert page == query_packets(table, limit=3, fields=['src_port'], **query)
+            following = index.query(limit=3, fields=['number'], cursor=page['nextCursor'], **query)
+            numbers = [packet['number'] for packet in index.query(limit=6, fields=['number'], **query)['packets']]
+            assert [packet['number'] for packet in following['packets']] == numbers[3:]
+
+    def test_index_reused_and_rebuilt(self):
+        """Test the saved index is reused, and rebuilt once the capture changes"""
+        CaptureIndex.open(self.path)
+        assert os.path.exists(self.path + '.idx')
+        index = CaptureIndex(self.path)
+        assert index._load() and index.count == 1000
+
+        with PcapWriter(self.path) as capture:
+            capture.write(udp_frame(1), 5.0)
+        os.utime(self.path, ns=(0, 0))
+        assert not CaptureIndex(self.path)._load()
+        page = CaptureIndex.open(self.path).query(fields=['number', 'timestamp'])
+        assert page == {'packets': [{'number': 1, 'timestamp': 5.0}], 'total': 1, 'nextCursor': None}
+
+    def test_pcapng_sections(self):
+        """Test blocks resume with the right byte order and interfaces in a multi-section pcapng"""
+        path = os.path.join(self.temp_dir, 'test.pcapng')
+        tsresol = struct.pack('<HHB', 9, 1, 9) + b'\x00' * 3 + b'\x00' * 4
+        with open(path, 'wb') as capture:
+            for section in range(2):
+                capture.write(pcapng_block(0x0A0D0D0A, struct.pack('<IHHq', 0x1A2B3C4D, 1, 0, -1)))
+                capture.write(pcapng_block(1, struct.pack('<HHI', 1, 0, 65535)))
+                capture.write(pcapng_block(1, struct.pack('<HHI', 1, 0, 65535) + tsresol))
+                for i in range(100):
+                    frame = udp_frame(section * 100 + i)
+                    interface = i % 2
+                    ticks = int((2000 + section * 100 + i) * (1e9 if interface else 1e6))
+                    capture.write(pcapng_block(6, struct.pack('<IIIII', interface, ticks >> 32, ticks & 0xFFFFFFFF,
+                                                              len(frame), len(frame)) + frame))
+        index = CaptureIndex.open(path, stride=16)
+        page = index.query(offset=150, limit=20, fields=['number', 'timestamp', 'src_port'])
+
+        assert page['total'] == 200
+        assert [packet['src_port'] for packet in page['packets']] == list(range(150, 170))
+        assert [packet['timestamp'] for packet in page['packets']] == pytest.approx(list(range(2150, 2170)))
+        assert index.query(start_time=2120, end_time=2130)['total'] == 10
+
+    def test_invalid_page(self):
+        """Test out-of-range limits, offsets and cursors are refused"""
+        index = CaptureIndex.open(self.path)
+        for query in ({'limit': 0}, {'limit': 10 ** 6}, {'offset': -1}, {'cursor': 'abc'}):
+            with pytest.raises(ValueError):
+                index.query(**query)
@@ -1,10 +1,20 @@
 import pytest
+import socket
+import struct
 import sys
 import os
+import time
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
+from src import capturer as capturer_module
 from src.capturer import PacketCapturer
 
+
+def tcp_frame(src, dst, src_port, dst_port, flags=0x18):
+    transport = struct.pack('!HHIIBBHHH', src_port, dst_port, 1, 1, 5 << 4, flags, 65535, 0, 0)
+    ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 40, 0, 0, 64, 6, 0, socket.inet_aton(src), socket.inet_aton(dst))
+    return b'\x02\x00\x00\x00\x00\x01\x02\x00\x00\x00\x00\x02\x08\x00' + ip + transport
+
 class TestPacketCapturer:
     def test_initialization(self):
         """Test capturer initializes correctly"""
@@ -53,4 +63,95 @@ class TestPacketCapturer:
         """Test Scapy availability detection"""
         capturer = PacketCapturer()
         # Should not raise an exception
-        assert isinstance(capturer.scapy_available, bool)
\ No newline at end of file
+        assert isinstance(capturer.scapy_available, bool)
+        
+    def test_simulated_packets_have_fields(self):
+        """Test simulated packets carry structured fields, not just a summary"""
+        capturer = PacketCapturer(use_real_capture=False)
+        capturer.start_capture(10)
+        
+        for packet in capturer.captured_packets:
+            assert packet['l4_protocol'] in ('TCP', 'UDP', 'ICMP')
+            assert packet['is_broadcast'] is False
+            assert ('dst_port' in packet) == (packet['l4_protocol'] != 'ICMP')
+    
+    def test_replay_through_ring(self, monkeypatch):
+        """Test frames pushed through the capture ring are decoded by the consumers"""
+        decode_frame = capturer_module.decode_frame
+        
+        def slow_first_frame(frame, linktype):
+            # Hold up the consumer of the first batch so the others overtake it
+            fields = decode_frame(frame, linktype)
+            if fields.get('src_port') == 1000:
+                time.sleep(0.05)
+            return fields
+        
+        monkeypatch.setattr(capturer_module, 'decode_frame', slow_first_frame)
+        frames = [(1000.0 + i, 54, 1, tcp_frame('10.0.0.1', '10.0.0.2', 1000 + i, 80)) for i in range(2000)]
+        capturer = PacketCapturer(ring_slots=16, backpressure='block', consumers=4)
+        capturer.show_packets = False
+        capturer.replay(frames)
+        
+        # Several consumers decode at once, but packets are stored and numbered in capture order
+        assert capturer.packet_count == 2000
+        assert [packet['number'] for packet in capturer.captured_packets] == list(range(1, 2001))
+        assert [packet['src_port'] for packet in capturer.captured_packets] == list(range(1000, 3000))
+        assert all(packet['protocol'] == 'TCP' and packet['real_packet'] for packet in capturer.captured_packets)
+        assert capturer.ring_stats()['dropped'] == 0
+        assert capturer.is_capturing == False
+
+    def test_simulated_numbering(self):
+        """Test simulated captures number the packets they keep, continuing earlier captures"""
+        capturer = PacketCapturer(use_real_capture=False, capture_filter='udp')
+        capturer.show_packets = False
+        capturer.start_capture(40)
+        capturer.start_capture(40)
+        numbers = [packet['number'] for packet in capturer.captured_packets]
+        assert numbers == list(range(1, len(capturer.captured_packets) + 1))
+        assert all(packet['l4_protocol'] == 'UDP' for packet in capturer.captured_packets)
+    
+    def test_capture_filter(self):
+        """Test the capture filter keeps only matching packets and counts the rest"""
+        frames = [(1000.0 + i, 54, 1, tcp_frame('10.0.0.1', '10.0.0.2', 1000 + i, 80 if i % 2 else 443)) for i in range(20)]
+        capturer = PacketCapturer(capture_filter='tcp and dst port 443')
+        capturer.show_packets = False
+        capturer.replay(frames)
+        
+        assert [packet['number'] for packet in capturer.captured_packets] == list(range(1, 11))
+        assert all(packet['dst_port'] == 443 for packet in capturer.captured_packets)
+        assert capturer.filter_stats == {'captured': 10, 'kernel_filtered': None, 'user_filtered': 10}
+
+    def test_iter_batches(self):
+        """Test decoded packets come out in batches of at most batch_size"""
+        frames = [(1000.0 + i, 54, 1, tcp_frame('10.0.0.1', '10.0.0.2', 1000 + i, 80)) for i in range(1000)]
+        capturer = PacketCapturer(backpressure='block')
+        capturer.show_packets = False
+        batches = list(capturer.iter_batches(300, frames=frames))
+        
+        assert all(len(batch) <= 300 for batch in batches)
+        assert [packet['src_port'] for batch in batches for packet in batch] == list(range(1000, 2000))
+        assert capturer.captured_packets == []
+        assert capturer.batch_listeners == []
+        
+    def test_iter_batches_latency(self):
+        """Test a slow trickle of packets is flushed after max_latency_ms"""
+        frames = [(1000.0 + i, 54, 1, tcp_frame('10.0.0.1', '10.0.0.2', 1000 + i, 80)) for i in range(20)]
+        capturer = PacketCapturer()
+        capturer.show_packets = False
+        batches = list(capturer.iter_batches(1000, max_latency_ms=20, frames=frames, rate=100))
+        
+        assert len(batches) > 2
+        assert sum(len(batch) for batch in batches) == 20
+
+    def test_capture_continuous(self):
+        """Test continuous capture reports every window and keeps no packets"""
+        frames = [(1000.0 + i * 0.01, 54, 1, tcp_frame('10.0.0.1', '10.0.0.2', 1000 + i, 80)) for i in range(500)]
+        capturer = PacketCapturer(backpressure='block')
+        capturer.show_packets = False
+        results = []
+        analyzer = capturer.capture_continuous((1, 5), on_window=results.append, frames=frames)
+        
+        assert [result['packets'] for result in results if result['window'] == 1] == [100] * 5
+        assert [result['packets'] for result in results if result['window'] == 5] == [500]
+        assert analyzer.late_packets == 0
+        assert capturer.captured_packets == []
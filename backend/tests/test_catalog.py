@@ -0,0 +1,73 @@
+import pytest
+import sys
+import os
+import shutil
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.catalog import BloomFilter, CaptureCatalog, merge_summaries, summarize
+from src.table import PacketTable
+
+
+def make_packets(count, host, start):
+    return [{'number': i + 1, 'protocol': 'TCP' if i % 2 else 'DNS', 'length': 60 + i,
+             'timestamp': start + i, 'src_ip': host, 'dst_ip': f'10.1.0.{i % 50}'} for i in range(count)]
+
+
+class TestCaptureCatalog:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.catalog = CaptureCatalog(os.path.join(self.temp_dir, 'catalog.sqlite3'))
+
+    def teardown_method(self):
+        self.catalog.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_bloom_filter(self):
+        """Test the Bloom filter keeps every added host and rejects most others"""
+        bloom = BloomFilter(1000)
+        hosts = [f'10.0.{i // 256}.{i % 256}' for i in range(1000)]
+        for host in hosts:
+            bloom.add(host)
+        assert all(host in bloom for host in hosts)
+
+        restored = BloomFilter.from_bytes(bytes(bloom.array), bloom.hashes)
+        assert all(host in restored for host in hosts)
+        false_positives = sum(f'192.168.{i // 256}.{i % 256}' in restored for i in range(10000))
+        assert false_positives < 300
+
+    def test_summarize(self):
+        """Test dict lists and PacketTables summarize the same way"""
+        packets = make_packets(40, '10.0.0.5', 1000.0) + [{'number': 41, 'protocol': 'ARP', 'length': 42}]
+        summary = summarize(packets)
+        assert summary['packets'] == 41
+        assert summary['bytes'] == sum(60 + i for i in range(40)) + 42
+        assert (summary['first_time'], summary['last_time']) == (1000.0, 1039.0)
+        assert summary['protocols'] == {'TCP': 20, 'DNS': 20, 'ARP': 1}
+        assert '10.0.0.5' in summary['hosts'] and len(summary['hosts']) == 41
+        assert summarize(PacketTable(packets)) == summary
+
+        merged = merge_summaries(summary, summarize(make_packets(2, '10.0.0.6', 2000.0)))
+        assert merged['packets'] == 43
+        assert merged['last_time'] == 2001.0
+        assert merged['protocols']['DNS'] == 21
+        assert '10.0.0.6' in merged['hosts']
+
+    def test_find(self):
+        """Test captures are found by host, time range and protocol"""
+        self.catalog.record('morning.json', 100, 2, summarize(make_packets(10, '10.0.0.5', 1000.0)))
+        self.catalog.record('evening.json', 100, 3, summarize(make_packets(10, '10.0.0.7', 5000.0)))
+        self.catalog.record('arp.json', 100, 1, summarize([{'protocol': 'ARP', 'length': 42, 'timestamp': 3000.0}]))
+
+        names = lambda entries: [entry['filename'] for entry in entries]
+        assert names(self.catalog.list()) == ['evening.json', 'morning.json', 'arp.json']
+        assert names(self.catalog.find(host='10.0.0.5')) == ['morning.json']
+        assert names(self.catalog.find(host='10.1.0.3')) == ['evening.json', 'morning.json']
+        assert names(self.catalog.find(host='10.9.9.9')) == []
+        assert names(self.catalog.find(host='10.0.0.5', start_time=1009.5)) == []
+        assert names(self.catalog.find(start_time=2000, end_time=5000)) == ['arp.json']
+        assert names(self.catalog.find(protocol='DNS', end_time=5001)) == ['evening.json', 'morning.json']
+
+        self.catalog.remove('morning.json')
+        assert names(self.catalog.find(protocol='DNS')) == ['evening.json']
+        assert self.catalog.find(protocol='DNS')[0]['protocols'] == {'TCP': 5, 'DNS': 5}
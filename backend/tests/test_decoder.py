@@ -0,0 +1,209 @@
+import pytest
+import socket
+import struct
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.decoder import decode_frame, decode_columns, dns_question, LINKTYPE_ETHERNET, LINKTYPE_RAW
+
+ETHER = b'\x02\x00\x00\x00\x00\x01\x02\x00\x00\x00\x00\x02'
+
+
+def ipv4(src, dst, proto, payload):
+    header = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(payload), 0, 0, 64, proto, 0,
+                         socket.inet_aton(src), socket.inet_aton(dst))
+    return ETHER + b'\x08\x00' + header + payload
+
+
+def ipv6(src, dst, proto, payload):
+    header = struct.pack('!IHBB16s16s', 0x60000000, len(payload), proto, 64,
+                         socket.inet_pton(socket.AF_INET6, src), socket.inet_pton(socket.AF_INET6, dst))
+    return ETHER + b'\x86\xdd' + header + payload
+
+
+def tcp(src_port, dst_port, flags):
+    return struct.pack('!HHIIBBHHH', src_port, dst_port, 1, 1, 5 << 4, flags, 65535, 0, 0)
+
+
+def tcp_segment(seq, ack, flags, options=b'', payload=b'', window=1024):
+    """TCP 1234 -> 80 with options (padded to 4 bytes) and payload"""
+    options += b'\x00' * (-len(options) % 4)
+    header = struct.pack('!HHIIBBHHH', 1234, 80, seq, ack, (5 + len(options) // 4) << 4, flags, window, 0, 0)
+    return header + options + payload
+
+
+NOP_NOP_TIMESTAMP = b'\x01\x01\x08\x0a' + b'\x00' * 8
+SACK_BLOCK = b'\x01\x01\x05\x0a' + struct.pack('!II', 3000, 4000)
+
+
+def udp(src_port, dst_port, payload=b''):
+    return struct.pack('!HHHH', src_port, dst_port, 8 + len(payload), 0) + payload
+
+
+def dns_query(name, qtype=1):
+    labels = b''.join(bytes([len(part)]) + part.encode() for part in name.split('.'))
+    return struct.pack('!HHHHHH', 0x1234, 0x0100, 1, 0, 0, 0) + labels + b'\x00' + struct.pack('!HH', qtype, 1)
+
+
+def arp_request(sender, target):
+    body = struct.pack('!HHBBH6s4s6s4s', 1, 0x0800, 6, 4, 1, b'\x02' * 6, socket.inet_aton(sender),
+                       b'\x00' * 6, socket.inet_aton(target))
+    return ETHER + b'\x08\x06' + body
+
+
+def broadcast(frame):
+    return b'\xff' * 6 + frame[6:]
+
+
+def fragment(frame, offset, more=False):
+    """Set the IPv4 fragment offset (in 8-byte units) and More Fragments flag of a frame"""
+    return frame[:20] + struct.pack('!H', (0x2000 if more else 0) | offset) + frame[22:]
+
+
+class TestDecodeFrame:
+    def test_tcp(self):
+        """Test an IPv4 TCP frame is decoded like the capturer would"""
+        fields = decode_frame(ipv4('10.0.0.1', '10.0.0.2', 6, tcp(1234, 80, 0x12)))
+        assert fields['protocol'] == 'TCP'
+        assert fields['src_ip'] == '10.0.0.1'
+        assert fields['dst_port'] == 80
+        assert fields['tcp_flags'] == 0x12
+        assert fields['summary'] == 'Ether / IP / TCP 10.0.0.1:1234 > 10.0.0.2:80 SA'
+
+    def test_structured_fields(self):
+        """Test transport, TCP sequence and DNS fields are extracted as typed values"""
+        fields = decode_frame(ipv4('10.0.0.1', '10.0.0.2', 6, tcp(1234, 80, 0x12)))
+        assert fields['l4_protocol'] == 'TCP'
+        assert fields['tcp_seq'] == 1
+        assert fields['tcp_ack'] == 1
+        assert fields['is_broadcast'] is False
+        assert fields['is_multicast'] is False
+
+        fields = decode_frame(ipv4('10.0.0.1', '8.8.8.8', 17, udp(5000, 53, dns_query('example.com', 28))))
+        assert fields['l4_protocol'] == 'UDP'
+        assert fields['dns_qname'] == 'example.com.'
+        assert fields['dns_qtype'] == 28
+        assert fields['dns_response'] is False
+        assert 'tcp_seq' not in fields
+
+    def test_tcp_window_length_sack(self):
+        """Test the TCP window, payload length and first SACK block"""
+        fields = decode_frame(ipv4('10.0.0.1', '10.0.0.2', 6, tcp_segment(100, 1, 0x18, NOP_NOP_TIMESTAMP, b'x' * 300)))
+        assert fields['tcp_window'] == 1024
+        assert fields['tcp_len'] == 300
+        assert 'tcp_sack_left' not in fields
+
+        fields = decode_frame(ipv4('10.0.0.2', '10.0.0.1', 6, tcp_segment(1, 2000, 0x10, NOP_NOP_TIMESTAMP + SACK_BLOCK)))
+        assert fields['tcp_len'] == 0
+        assert (fields['tcp_sack_left'], fields['tcp_sack_right']) == (3000, 4000)
+
+        # Snaplen-truncated frame: the payload length still comes from the IP header
+        frame = ipv4('10.0.0.1', '10.0.0.2', 6, tcp_segment(100, 1, 0x10, payload=b'x' * 1000))
+        assert decode_frame(frame[:80])['tcp_len'] == 1000
+
+    def test_broadcast_multicast(self):
+        """Test broadcast and multicast detection from MAC and IP destinations"""
+        fields = decode_frame(broadcast(arp_request('192.168.1.1', '192.168.1.2')))
+        assert fields['is_broadcast'] is True
+        assert fields['is_multicast'] is False
+        fields = decode_frame(ipv4('10.0.0.1', '255.255.255.255', 17, udp(68, 67)))
+        assert fields['is_broadcast'] is True
+        fields = decode_frame(ipv4('10.0.0.1', '224.0.0.251', 17, udp(5353, 5353)))
+        assert fields['is_multicast'] is True
+        fields = decode_frame(ipv6('fe80::1', 'ff02::1', 58, b'\x86\x00\x00\x00'))
+        assert fields['is_multicast'] is True
+        assert fields['is_broadcast'] is False
+
+    def test_udp_dns(self):
+        """Test DNS questions are added to UDP summaries"""
+        fields = decode_frame(ipv4('10.0.0.1', '8.8.8.8', 17, udp(5000, 53, dns_query('example.com'))))
+        assert fields['protocol'] == 'UDP'
+        assert fields['summary'].endswith('/ DNS Qry example.com.')
+
+    def test_ipv6_icmp(self):
+        """Test IPv6 addresses and ICMPv6 type reporting"""
+        fields = decode_frame(ipv6('fe80::1', 'ff02::1', 58, b'\x86\x00\x00\x00'))
+        assert fields['src_ip'] == 'fe80::1'
+        assert fields['protocol'] == 'ICMPv6'
+
+    def test_arp(self):
+        """Test ARP requests"""
+        fields = decode_frame(arp_request('192.168.1.1', '192.168.1.2'))
+        assert fields['protocol'] == 'ARP'
+        assert fields['summary'] == 'Ether / ARP who has 192.168.1.2 says 192.168.1.1'
+
+    def test_truncated(self):
+        """Test truncated and unknown frames never raise"""
+        frame = ipv4('10.0.0.1', '10.0.0.2', 6, tcp(1234, 80, 0x02))
+        assert decode_frame(frame[:40])['protocol'] == 'IP'
+        assert decode_frame(frame[:10])['protocol'] == 'Other'
+        assert decode_frame(b'')['protocol'] == 'Other'
+
+    def test_fragments(self):
+        """Test later IPv4 fragments stop at the IP layer instead of reading payload as ports"""
+        frame = ipv4('10.0.0.1', '10.0.0.2', 6, tcp(1, 515, 0x0D))
+        fields = decode_frame(fragment(frame, 0xB9))
+        assert fields['protocol'] == 'IP'
+        assert fields['src_ip'] == '10.0.0.1'
+        assert fields['summary'] == 'Ether / IP 10.0.0.1 > 10.0.0.2 proto=6'
+        for name in ('src_port', 'dst_port', 'l4_protocol', 'tcp_flags'):
+            assert name not in fields
+
+        # The first fragment still carries the TCP header
+        fields = decode_frame(fragment(frame, 0, more=True))
+        assert fields['protocol'] == 'TCP'
+        assert fields['dst_port'] == 515
+
+    def test_raw_linktype(self):
+        """Test frames without an Ethernet header"""
+        frame = ipv4('10.0.0.1', '10.0.0.2', 17, udp(1, 2))[14:]
+        fields = decode_frame(frame, LINKTYPE_RAW)
+        assert fields['summary'] == 'Raw / IP / UDP 10.0.0.1:1 > 10.0.0.2:2'
+
+    def test_dns_question(self):
+        """Test the DNS question parser"""
+        message = dns_query('a.b.c', 28)
+        assert dns_question(message, 0, len(message)) == (False, 'a.b.c.', 28)
+        assert dns_question(message[:8], 0, 8) is None
+
+
+class TestDecodeColumns:
+    def test_matches_decode_frame(self):
+        """Test the vectorized decoder agrees with decode_frame on every frame"""
+        np = pytest.importorskip('numpy')
+        from src.table import PacketTable
+
+        frames = [
+            ipv4('10.0.0.1', '10.0.0.2', 6, tcp(1234, 80, 0x18)),
+            ipv4('10.0.0.2', '10.0.0.1', 6, tcp(80, 1234, 0x10)),
+            ipv4('10.0.0.1', '10.0.0.2', 6, tcp(1234, 80, 0x18)),
+            ipv4('10.0.0.1', '8.8.8.8', 17, udp(5000, 53, dns_query('example.com'))),
+            ipv4('10.0.0.1', '10.0.0.2', 1, b'\x08\x00\x00\x00'),
+            ipv6('fe80::1', 'ff02::1', 58, b'\x86\x00\x00\x00'),
+            ipv6('2001:db8::1', '2001:db8::2', 6, tcp(443, 5555, 0x11)),
+            arp_request('192.168.1.1', '192.168.1.2'),
+            broadcast(arp_request('192.168.1.1', '192.168.1.2')),
+            ipv4('10.0.0.1', '255.255.255.255', 17, udp(68, 67)),
+            broadcast(ipv4('10.0.0.1', '10.0.0.255', 17, udp(137, 137))),
+            ipv4('10.0.0.1', '224.0.0.251', 17, udp(5353, 5353)),
+            ipv4('10.0.0.1', '10.0.0.2', 6, tcp(1234, 80, 0x02))[:40],
+            ipv4('10.0.0.1', '10.0.0.2', 6, tcp_segment(100, 1, 0x18, NOP_NOP_TIMESTAMP, b'x' * 300)),
+            ipv4('10.0.0.2', '10.0.0.1', 6, tcp_segment(1, 2000, 0x10, NOP_NOP_TIMESTAMP + SACK_BLOCK)),
+            ipv6('2001:db8::1', '2001:db8::2', 6, tcp_segment(1, 2000, 0x10, SACK_BLOCK, window=0)),
+            ipv4('10.0.0.1', '10.0.0.2', 6, tcp_segment(100, 1, 0x10, b'\x05\x01', b'x' * 10)),
+            ipv4('10.0.0.1', '10.0.0.2', 6, tcp_segment(100, 1, 0x10, payload=b'x' * 1000))[:80],
+            fragment(ipv4('10.0.0.1', '10.0.0.2', 6, tcp(1, 515, 0x0D)), 0xB9),
+            fragment(ipv4('10.0.0.1', '10.0.0.2', 17, udp(53, 53, dns_query('example.com'))), 3),
+            fragment(ipv4('10.0.0.1', '10.0.0.2', 1, b'\x08\x00\x00\x00'), 1),
+            fragment(ipv4('10.0.0.1', '10.0.0.2', 6, tcp(1234, 80, 0x18)), 0, more=True),
+            b'\x00' * 6,
+        ]
+        buffer = b''.join(frames)
+        offsets = np.cumsum([0] + [len(frame) for frame in frames[:-1]])
+        lengths = np.array([len(frame) for frame in frames])
+
+        values, present = decode_columns(buffer, offsets, lengths, LINKTYPE_ETHERNET)
+        table = PacketTable()
+        table.extend_columns(len(frames), values, present)
+        assert table.to_dicts() == [decode_frame(frame) for frame in frames]
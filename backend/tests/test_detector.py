@@ -51,4 +51,47 @@ class TestIssueDetector:
                 assert 'severity' in issue
                 assert 'description' in issue
                 assert 'details' in issue
-                assert 'educational_note' in issue
\ No newline at end of file
+                assert 'educational_note' in issue
+        
+    def test_suspicious_port_fields(self):
+        """Test suspicious ports are matched on the port fields, not the summary"""
+        packets = [
+            {'protocol': 'TCP', 'length': 60, 'src_port': 51000, 'dst_port': 3389, 'summary': 'RDP'},
+            {'protocol': 'TCP', 'length': 60, 'src_port': 51000, 'dst_port': 2345, 'summary': 'TCP a:2345 > b:23'}
+        ]
+        issues = self.detector.analyze_packets(packets)
+        ports = [issue['description'] for issue in issues if issue['type'] == 'SUSPICIOUS_PORT']
+        assert ports == ['Traffic on potentially suspicious port 3389']
+
+    def test_broadcast_storm_fields(self):
+        """Test broadcast storms are detected from the is_broadcast field"""
+        packets = [{'protocol': 'ARP', 'length': 60, 'is_broadcast': True, 'is_multicast': False}] * 4
+        packets.append({'protocol': 'TCP', 'length': 60, 'is_broadcast': False, 'is_multicast': False})
+        issues = self.detector.analyze_packets(packets)
+        assert 'POTENTIAL_BROADCAST_STORM' in [issue['type'] for issue in issues]
+        assert 'HIGH_MULTICAST_TRAFFIC' not in [issue['type'] for issue in issues]
+
+    def test_repeated_dns_queries(self):
+        """Test repeated DNS questions are counted per (qname, qtype)"""
+        query = {'protocol': 'UDP', 'length': 80, 'dns_qname': 'example.com.', 'dns_qtype': 1, 'dns_response': False}
+        answer = dict(query, dns_response=True)
+        issues = self.detector.analyze_packets([query] * 4 + [answer] * 2)
+        dns = [issue for issue in issues if issue['type'] == 'REPEATED_DNS_QUERIES']
+        assert len(dns) == 1
+        assert dns[0]['details'] == 'Query repeated 4 times: example.com. (type 1)'
+
+    def test_tcp_sequence_issues(self):
+        """Test retransmissions come from sequence numbers, not from packet counts"""
+        def segment(seq, length=100):
+            return {'timestamp': seq / 1000, 'length': 54 + length, 'l4_protocol': 'TCP', 'protocol': 'TCP',
+                    'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2', 'src_port': 5000, 'dst_port': 80,
+                    'tcp_flags': 0x10, 'tcp_seq': seq, 'tcp_ack': 1, 'tcp_len': length, 'tcp_window': 1000}
+        busy = [segment(1 + 100 * i) for i in range(10)]
+        types = [issue['type'] for issue in self.detector.analyze_packets(busy)]
+        assert 'TCP_RETRANSMISSION' not in types
+
+        issues = self.detector.analyze_packets(busy + [segment(301)])
+        retransmissions = [issue for issue in issues if issue['type'] == 'TCP_RETRANSMISSION']
+        assert len(retransmissions) == 1
+        assert retransmissions[0]['description'] == 'TCP segments retransmitted: 10.0.0.1:5000 → 10.0.0.2:80'
+        assert retransmissions[0]['details'] == '1 retransmission events'
@@ -0,0 +1,113 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.expression import compile_filter, parse_filter, optimize, format_filter, FilterSyntaxError
+from src.table import PacketTable
+
+class TestFilterExpression:
+    def setup_method(self):
+        self.packets = [
+            {'number': 1, 'protocol': 'TCP', 'length': 1200, 'src_ip': '10.0.0.5', 'dst_ip': '93.184.216.34',
+             'src_port': 51000, 'dst_port': 443, 'tcp_flags': 0x18},
+            {'number': 2, 'protocol': 'UDP', 'length': 80, 'src_ip': '192.168.1.10', 'dst_ip': '8.8.8.8',
+             'src_port': 53000, 'dst_port': 53},
+            {'number': 3, 'protocol': 'TCP', 'length': 60, 'src_ip': '172.16.0.1', 'dst_ip': '10.0.0.5',
+             'src_port': 443, 'dst_port': 51000, 'tcp_flags': 0x12},
+            {'number': 4, 'protocol': 'IPv6', 'length': 1500, 'src_ip': 'fe80::1', 'dst_ip': 'ff02::1'},
+            {'number': 5, 'protocol': 'TCP', 'length': 1400, 'src_ip': '10.9.9.9', 'dst_ip': '1.1.1.1',
+             'src_port': 40000, 'dst_port': 443, 'summary': 'TCP 10.9.9.9:40000 > 1.1.1.1:443 A'},
+        ]
+
+    def numbers(self, expression, packets=None):
+        matched = compile_filter(expression).filter(self.packets if packets is None else packets)
+        return [packet['number'] for packet in matched]
+
+    def test_example_expression(self):
+        """Test the example from the filter language documentation"""
+        assert self.numbers('tcp and (src 10.0.0.0/8 or dst port 443) and len > 1000') == [1, 5]
+
+    def test_primitives(self):
+        """Test each kind of primitive"""
+        assert self.numbers('udp') == [2]
+        assert self.numbers('proto ipv6') == [4]
+        assert self.numbers('host 10.0.0.5') == [1, 3]
+        assert self.numbers('dst host 10.0.0.5') == [3]
+        assert self.numbers('src net fe80::/10') == [4]
+        assert self.numbers('port 443') == [1, 3, 5]
+        assert self.numbers('src portrange 50000-53000') == [1, 2]
+        assert self.numbers('len <= 80') == [2, 3]
+        assert self.numbers('greater 1400') == [4, 5]
+        assert self.numbers('flags SA') == [3]
+        assert self.numbers('not tcp && !udp') == [4]
+
+    def test_protocol_layers(self):
+        """Test transport and IP keywords match by layer, application names by classified protocol"""
+        packets = [
+            {'number': 1, 'protocol': 'HTTP', 'l4_protocol': 'TCP', 'src_ip': '10.0.0.1', 'dst_port': 80},
+            {'number': 2, 'protocol': 'DNS', 'l4_protocol': 'UDP', 'src_ip': 'fe80::1', 'dst_port': 53},
+            {'number': 3, 'protocol': 'ARP', 'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2'},
+            {'number': 4, 'protocol': 'TCP', 'l4_protocol': 'TCP', 'src_ip': '10.0.0.2', 'src_port': None},
+            {'number': 5, 'protocol': 'IP', 'src_ip': '10.0.0.3'},
+        ]
+        assert self.numbers('tcp', packets) == [1, 4]
+        assert self.numbers('udp', packets) == [2]
+        assert self.numbers('ip', packets) == [1, 4, 5]
+        assert self.numbers('ip6', packets) == [2]
+        assert self.numbers('ip and tcp', packets) == [1, 4]
+        assert self.numbers('http', packets) == [1]
+        assert self.numbers('proto tcp', packets) == [1, 4]
+        assert self.numbers('not ip', packets) == [2, 3]
+
+        # Protocol-qualified primitives, and ports that are present but None
+        assert self.numbers('tcp port 80', packets) == [1]
+        assert self.numbers('udp dst port 53 or tcp src portrange 0-100', packets) == [2]
+        assert self.numbers('ip6 src net fe80::/10', packets) == [2]
+        assert format_filter(optimize(parse_filter('tcp port 80'))) == '(tcp and (src port 80 or dst port 80))'
+
+        pytest.importorskip('numpy')
+        table = PacketTable(packets)
+        for expression in ('tcp', 'ip', 'ip6', 'ip and tcp', 'http or udp', 'not ip', 'tcp portrange 0-100'):
+            compiled = compile_filter(expression)
+            assert compiled.mask(table).tolist() == [compiled(packet) for packet in packets], expression
+
+    def test_summary_is_not_parsed(self):
+        """Test address and port primitives read the structured fields only"""
+        assert self.numbers('src 10.9.9.9 and dst port 443') == [5]
+        legacy = [{'number': 6, 'protocol': 'TCP', 'summary': 'TCP 10.9.9.9:40000 > 1.1.1.1:443 A'}]
+        assert self.numbers('src 10.9.9.9 or port 443', legacy) == []
+        assert self.numbers('not port 443', legacy) == [6]
+
+    def test_constant_folding(self):
+        """Test contradictions and constants fold away"""
+        assert optimize(parse_filter('tcp and udp')) == ('const', False)
+        assert optimize(parse_filter('len > 10 and len < 5')) == ('const', False)
+        assert optimize(parse_filter('udp or true')) == ('const', True)
+        assert optimize(parse_filter('not not tcp')) == ('transport', frozenset(['TCP']))
+        assert optimize(parse_filter('ip and ip6')) == ('const', False)
+        assert format_filter(optimize(parse_filter('len >= 100 and len <= 100'))) == 'len == 100'
+        assert format_filter(optimize(parse_filter(''))) == 'true'
+
+    def test_selective_predicates_first(self):
+        """Test and-nodes evaluate the most selective cheap predicate first"""
+        tree = optimize(parse_filter('len > 100 and tcp and dst port 443'))
+        assert tree[1][-1][0] == 'len'
+
+    def test_syntax_errors(self):
+        """Test invalid expressions raise FilterSyntaxError"""
+        for expression in ('tcp and', '(tcp', 'port 70000', 'host 10.0.0.0/8', 'src nowhere', 'len ~ 5', 'flags X', 'tcp & udp'):
+            with pytest.raises(FilterSyntaxError):
+                compile_filter(expression)
+
+    def test_table_mask_matches_predicate(self):
+        """Test the vectorized PacketTable path agrees with the predicate"""
+        pytest.importorskip('numpy')
+        table = PacketTable(self.packets)
+        for expression in ('tcp and (src 10.0.0.0/8 or dst port 443) and len > 1000', 'not port 443',
+                           'src net fe80::/10 or flags SA', 'portrange 1-100 or len == 60'):
+            compiled = compile_filter(expression)
+            matched = compiled.filter(table)
+            assert isinstance(matched, PacketTable)
+            assert matched.to_dicts() == compiled.filter(self.packets)
+            assert compiled.mask(table).tolist() == [compiled(packet) for packet in self.packets]
@@ -13,19 +13,25 @@ class TestPacketFilter:
                 'protocol': 'TCP', 
                 'summary': 'TCP 192.168.1.1:80 > 10.0.0.2:54321 SYN',
                 'src_ip': '192.168.1.1',
-                'dst_ip': '10.0.0.2'
+                'dst_ip': '10.0.0.2',
+                'src_port': 80,
+                'dst_port': 54321
             },
             {
                 'protocol': 'UDP',
                 'summary': 'UDP 192.168.1.1:53 > 10.0.0.2:49152',
                 'src_ip': '192.168.1.1', 
-                'dst_ip': '10.0.0.2'
+                'dst_ip': '10.0.0.2',
+                'src_port': 53,
+                'dst_port': 49152
             },
             {
                 'protocol': 'TCP',
                 'summary': 'TCP 10.0.0.2:54321 > 192.168.1.1:80 ACK',
                 'src_ip': '10.0.0.2',
-                'dst_ip': '192.168.1.1'
+                'dst_ip': '192.168.1.1',
+                'src_port': 54321,
+                'dst_port': 80
             }
         ]
     
@@ -90,4 +96,29 @@ class TestPacketFilter:
         """Test displaying active filters"""
         self.filter.add_protocol_filter('TCP')
         # Should not raise an exception
-        self.filter.show_active_filters()
\ No newline at end of file
+        self.filter.show_active_filters()
+
+    def test_port_filter(self):
+        """Test filtering by ports"""
+        self.filter.add_port_filter(port=80)
+        assert len(self.filter.apply_filters(self.sample_packets)) == 2
+
+        self.filter.clear_filters()
+        self.filter.add_port_filter(dst_port=49152)
+        filtered = self.filter.apply_filters(self.sample_packets)
+        assert [p['protocol'] for p in filtered] == ['UDP']
+
+    def test_expression_filter(self):
+        """Test filter expressions combine with the other filters"""
+        self.filter.add_expression('src net 192.168.0.0/16 or dst port 80')
+        self.filter.add_protocol_filter('TCP')
+        filtered = self.filter.apply_filters(self.sample_packets)
+
+        assert len(filtered) == 2
+        assert all(p['protocol'] == 'TCP' for p in filtered)
+
+    def test_invalid_expression(self):
+        """Test invalid expressions are rejected when added"""
+        from src.expression import FilterSyntaxError
+        with pytest.raises(FilterSyntaxError):
+            self.filter.add_expression('tcp and port')
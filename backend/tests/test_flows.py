@@ -0,0 +1,140 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.flows import FlowTable
+from src.table import PacketTable
+
+SYN, ACK, FIN, RST, PSH = 0x02, 0x10, 0x01, 0x04, 0x08
+
+
+def tcp(timestamp, forward, flags, length=60, client='10.0.0.1', server='10.0.0.2'):
+    """A packet of one TCP connection, client:5000 <-> server:80"""
+    src, dst, sport, dport = (client, server, 5000, 80) if forward else (server, client, 80, 5000)
+    return {'timestamp': timestamp, 'length': length, 'protocol': 'TCP', 'l4_protocol': 'TCP',
+            'src_ip': src, 'dst_ip': dst, 'src_port': sport, 'dst_port': dport, 'tcp_flags': flags}
+
+
+class TestFlowTable:
+    def setup_method(self):
+        self.flows = FlowTable(idle_timeout=60, active_timeout=300, closed_timeout=5)
+        self.handshake = [
+            tcp(0.0, True, SYN),
+            tcp(0.1, False, SYN | ACK),
+            tcp(0.2, True, ACK),
+            tcp(0.3, True, PSH | ACK, length=200),
+            tcp(0.4, False, PSH | ACK, length=1500),
+        ]
+
+    def test_both_directions_share_a_flow(self):
+        """Test replies are counted on the same flow, per direction"""
+        for packet in self.handshake:
+            self.flows.update(packet)
+        assert len(self.flows) == 1
+        flow = next(iter(self.flows))
+        assert (flow['src_ip'], flow['src_port'], flow['dst_ip'], flow['dst_port']) == ('10.0.0.1', 5000, '10.0.0.2', 80)
+        assert (flow['forward_packets'], flow['reverse_packets']) == (3, 2)
+        assert (flow['forward_bytes'], flow['reverse_bytes']) == (320, 1560)
+        assert flow['first_seen'] == 0.0 and flow['last_seen'] == 0.4
+        assert flow['tcp_state'] == 'ESTABLISHED'
+        assert flow['reverse_flags'] == SYN | ACK | PSH
+
+    def test_update_returns_direction(self):
+        """Test update() reports 0 for the initiator and 1 for the responder"""
+        directions = [self.flows.update(packet)[1] for packet in self.handshake]
+        assert directions == [0, 1, 0, 0, 1]
+        assert self.flows.update({'protocol': 'ARP', 'length': 60}) is None
+
+    def test_syn_ack_first_marks_server(self):
+        """Test a flow picked up at the SYN-ACK still points from client to server"""
+        for packet in self.handshake[1:]:
+            self.flows.update(packet)
+        flow = next(iter(self.flows))
+        assert flow['src_ip'] == '10.0.0.1'
+        assert flow['dst_port'] == 80
+
+    def test_tcp_close(self):
+        """Test the FIN handshake and RST close the connection"""
+        closing = self.handshake + [
+            tcp(1.0, True, FIN | ACK), tcp(1.1, False, FIN | ACK), tcp(1.2, True, ACK)
+        ]
+        for packet in closing:
+            self.flows.update(packet)
+        assert next(iter(self.flows))['tcp_state'] == 'TIME_WAIT'
+
+        reset = FlowTable()
+        for packet in self.handshake[:3] + [tcp(0.5, False, RST)]:
+            reset.update(packet)
+        assert next(iter(reset))['tcp_state'] == 'CLOSED'
+
+    def test_timeouts(self):
+        """Test idle, active and closed flows expire with the right reason"""
+        ended = []
+        self.flows.add_listener(ended.append)
+        self.flows.update(tcp(0.0, True, ACK, client='10.0.0.3'))           # goes idle
+        for packet in self.handshake[:3] + [tcp(1.0, False, RST)]:          # closed
+            self.flows.update(packet)
+        for second in range(0, 400, 30):                                    # long-lived
+            self.flows.update(tcp(float(second), True, ACK, client='10.0.0.4'))
+        reasons = {flow['src_ip']: flow['end_reason'] for flow in ended}
+        assert reasons == {'10.0.0.3': 'idle', '10.0.0.1': 'closed', '10.0.0.4': 'active'}
+        assert self.flows.evictions == {'idle': 1, 'closed': 1, 'active': 1}
+
+    def test_capacity_eviction(self):
+        """Test a full table evicts the least recently seen flows"""
+        flows = FlowTable(max_flows=10)
+        for i in range(15):
+            flows.update({'timestamp': float(i), 'length': 60, 'l4_protocol': 'UDP',
+                          'src_ip': f'10.0.0.{i}', 'dst_ip': '8.8.8.8', 'src_port': 5353, 'dst_port': 53})
+        assert len(flows) <= 10
+        assert flows.evictions['capacity'] == 5
+        assert flows.lookup({'src_ip': '10.0.0.14', 'dst_ip': '8.8.8.8', 'src_port': 5353,
+                             'dst_port': 53, 'l4_protocol': 'UDP'}) is not None
+        assert flows.lookup({'src_ip': '10.0.0.0', 'dst_ip': '8.8.8.8', 'src_port': 5353,
+                             'dst_port': 53, 'l4_protocol': 'UDP'}) is None
+
+    def test_batch_matches_per_packet(self):
+        """Test update_batch on a PacketTable gives the same flows as update()"""
+        pytest.importorskip('numpy')
+        packets = self.handshake + [
+            tcp(2.0, True, SYN, client='10.0.0.9'),
+            {'timestamp': 2.5, 'length': 90, 'l4_protocol': 'UDP', 'src_ip': 'fe80::1', 'dst_ip': 'ff02::1',
+             'src_port': 546, 'dst_port': 547},
+            {'timestamp': 2.6, 'length': 98, 'l4_protocol': 'ICMP', 'src_ip': '10.0.0.2', 'dst_ip': '10.0.0.1'},
+            {'timestamp': 2.7, 'length': 60, 'protocol': 'ARP'},
+            {'timestamp': 2.8, 'length': 70, 'protocol': 'UDP', 'src_ip': '10.0.0.5', 'dst_ip': '10.0.0.1',
+             'src_port': 123, 'dst_port': 123},
+            tcp(100.0, False, FIN | ACK, client='10.0.0.9'),
+        ]
+        one_by_one, batched = FlowTable(), FlowTable()
+        expected = []
+        for packet in packets:
+            slot, direction = one_by_one.update(packet) or (-1, 0)
+            expected.append((slot, direction, one_by_one.flow_id(slot) if slot >= 0 else 0))
+        slots, directions, flow_ids = batched.update_batch(PacketTable(packets))
+        assert list(zip(slots.tolist(), directions.tolist(), flow_ids.tolist())) == expected
+        assert list(batched) == list(one_by_one)
+        assert batched.evictions == one_by_one.evictions
+
+    def test_flush(self):
+        """Test flush() hands every remaining flow to the listeners"""
+        ended = []
+        self.flows.add_listener(ended.append)
+        for packet in self.handshake:
+            self.flows.update(packet)
+        self.flows.flush()
+        assert len(self.flows) == 0
+        assert [flow['end_reason'] for flow in ended] == ['flush']
+        assert ended[0]['packets'] == 5
+
+    def test_batch_capacity(self):
+        """Test update_batch keeps a full table within max_flows"""
+        pytest.importorskip('numpy')
+        packets = [{'timestamp': i * 0.01, 'length': 60, 'l4_protocol': 'UDP', 'src_ip': f'10.0.1.{i}',
+                    'dst_ip': '8.8.8.8', 'src_port': 5353, 'dst_port': 53} for i in range(50)]
+        flows = FlowTable(max_flows=20)
+        flows.update_batch(PacketTable(packets))
+        assert len(flows) <= 20
+        assert flows.evictions['capacity'] == 30
+        assert flows.lookup(packets[-1])['packets'] == 1
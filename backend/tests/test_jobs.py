@@ -0,0 +1,93 @@
+import pytest
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from concurrent.futures import Future
+
+from src.capturer import PacketCapturer
+from src.jobs import CaptureJob, CaptureJobManager, JobLimitReached, JobNotFound
+from src.sessions import SessionManager
+
+
+class TestCaptureJobs:
+    def setup_method(self):
+        self.jobs = CaptureJobManager(max_concurrent=2, max_queued=1)
+
+    def teardown_method(self):
+        self.jobs.shutdown()
+
+    def test_job_fills_session(self):
+        """Test a job captures in the background and appends its packets to the session"""
+        session = SessionManager().create()
+        job = self.jobs.submit(count=50, session=session)
+        assert job.wait(10)
+
+        info = self.jobs.get(job.id).info()
+        assert info['state'] == 'completed' and info['captured'] == 50
+        assert info['sessionId'] == session.id and len(session) == 50
+        assert info['started'] >= info['created'] and info['finished'] >= info['started']
+
+    def test_concurrency_limit_and_cancel(self):
+        """Test at most max_concurrent jobs run, extra ones queue, and stopping keeps what was captured"""
+        running = [self.jobs.submit(count=None, timeout=30) for _ in range(2)]
+        queued = self.jobs.submit(count=None, timeout=30)
+        with pytest.raises(JobLimitReached):
+            self.jobs.submit(count=5)
+
+        time.sleep(0.3)
+        assert [job.state for job in running] == ['running', 'running']
+        assert queued.state == 'queued'
+
+        self.jobs.cancel(queued.id)
+        assert queued.state == 'cancelled' and queued.wait(0)
+        started = time.monotonic()
+        for job in running:
+            self.jobs.cancel(job.id)
+            assert job.wait(5)
+        assert time.monotonic() - started < 2
+        assert all(job.state == 'cancelled' and job.info()['captured'] > 0 for job in running)
+
+    def test_unknown_and_failed_jobs(self):
+        """Test unknown ids raise JobNotFound and a capture error marks the job failed"""
+        with pytest.raises(JobNotFound):
+            self.jobs.get('missing')
+
+        class BrokenCapturer:
+            captured_packets = []
+
+            def start_capture(self, count, timeout):
+                raise OSError('no such device')
+
+            def stop_capture(self):
+                pass
+
+        job = self.jobs.submit(capturer=BrokenCapturer())
+        assert job.wait(5)
+        assert job.state == 'failed' and job.error == 'no such device'
+
+    def test_cancel_racing_job_start(self):
+        """Test a cancel that lands as a worker starts the job still ends it cancelled"""
+        picked_up = Future()
+        picked_up.set_running_or_notify_cancel()
+        job = CaptureJob('picked-up', PacketCapturer(), 5, 30)
+        job.future = picked_up
+        job.cancel()
+        job.run()
+        assert job.wait(0) and job.state == 'cancelled'
+        assert job.started is None and job.finished is not None
+
+        submitted = []
+
+        class CancelledOnStart(PacketCapturer):
+            def start_capture(self, count=5, timeout=30):
+                while not submitted:
+                    time.sleep(0.01)
+                submitted[0].cancel()
+                super().start_capture(count, timeout)
+
+        starting = self.jobs.submit(count=1000, capturer=CancelledOnStart())
+        submitted.append(starting)
+        assert starting.wait(5)
+        assert starting.state == 'cancelled' and starting.info()['captured'] == 0
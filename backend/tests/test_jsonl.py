@@ -0,0 +1,73 @@
+import pytest
+import gzip
+import json
+import shutil
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import src.jsonl as jsonl
+from src.jsonl import JsonlWriter, iter_jsonl, read_jsonl
+from src.table import PacketTable
+
+
+def sample_packets(count):
+    return [{'number': i + 1, 'timestamp': 1000.0 + i, 'length': 60 + i, 'protocol': ['TCP', 'UDP'][i % 2],
+             'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2', 'summary': f"packet {i}"} for i in range(count)]
+
+
+class TestJsonl:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.packets = sample_packets(1000)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    @pytest.mark.parametrize('extension', ['jsonl', 'jsonl.gz'])
+    def test_round_trip(self, extension):
+        """Test packets written in chunks and appended later read back in order"""
+        path = os.path.join(self.temp_dir, f'capture.{extension}')
+        with JsonlWriter(path, chunk_size=64) as writer:
+            writer.write_many(self.packets[:500])
+            writer.write({**self.packets[500], 'raw_packet': object()})
+        with JsonlWriter(path, append=True) as writer:
+            writer.write_many(PacketTable(self.packets[501:]))
+
+        assert list(iter_jsonl(path)) == self.packets
+        assert read_jsonl(path) == self.packets
+        if extension.endswith('.gz'):
+            # Independent frames still make an ordinary gzip file
+            with gzip.open(path, 'rt') as f:
+                assert json.loads(f.readline()) == self.packets[0]
+
+    def test_truncated_file(self):
+        """Test a file cut off mid-frame reads back every complete packet before the cut"""
+        path = os.path.join(self.temp_dir, 'capture.jsonl.gz')
+        with JsonlWriter(path, chunk_size=100) as writer:
+            writer.write_many(self.packets)
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) - 50)
+
+        packets = list(iter_jsonl(path))
+        assert 900 <= len(packets) < 1000
+        assert packets == self.packets[:len(packets)]
+
+    def test_parallel_decode(self, monkeypatch):
+        """Test decoding chunks on worker processes gives the same table as one process"""
+        path = os.path.join(self.temp_dir, 'capture.jsonl')
+        with JsonlWriter(path) as writer:
+            writer.write_many(self.packets)
+        monkeypatch.setattr(jsonl, 'MIN_PARALLEL_BYTES', 0)
+        monkeypatch.setattr(jsonl, 'DECODE_CHUNK_BYTES', 10000)
+
+        assert read_jsonl(path, workers=2) == self.packets
+
+    def test_zstd(self):
+        """Test zstd frames round trip when the zstandard package is installed"""
+        pytest.importorskip('zstandard')
+        path = os.path.join(self.temp_dir, 'capture.jsonl.zst')
+        with JsonlWriter(path, chunk_size=64) as writer:
+            writer.write_many(self.packets)
+        assert list(iter_jsonl(path)) == self.packets
@@ -0,0 +1,73 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.parallel import ParallelAnalyzer, shard_rows, analyze_shard
+from src.detector import IssueDetector
+from src.statistics import StreamingStatistics
+from src.table import PacketTable
+
+
+def tcp_packet(number, client, forward=True, seq=1, length=1000, dst_port=443):
+    """A data segment of client <-> 10.0.0.1:dst_port"""
+    ends = [(f'192.168.0.{client}', 40000 + client), ('10.0.0.1', dst_port)]
+    (src_ip, src_port), (dst_ip, dst_port) = ends if forward else ends[::-1]
+    return {'number': number, 'timestamp': 1000.0 + number * 0.001, 'length': 54 + length,
+            'protocol': 'TCP', 'l4_protocol': 'TCP', 'src_ip': src_ip, 'dst_ip': dst_ip,
+            'src_port': src_port, 'dst_port': dst_port, 'tcp_flags': 0x18, 'tcp_seq': seq,
+            'tcp_ack': 1, 'tcp_len': length, 'tcp_window': 65535, 'summary': f'TCP packet {number}'}
+
+
+class TestParallelAnalyzer:
+    def setup_method(self):
+        # Client c sends 5 + c segments (distinct conversation sizes); every 7th repeats the one before
+        self.packets = []
+        sent = [0] * 20
+        for number in range(290):
+            client = next(c for c in range(number % 20, number % 20 + 20) if sent[c % 20] < 5 + c % 20) % 20
+            segment = sent[client] - (1 if number % 7 == 0 and sent[client] else 0)
+            sent[client] += 1
+            self.packets.append(tcp_packet(number, client, seq=1 + segment * 1000))
+        self.packets += [tcp_packet(290 + client, client, forward=False, length=0) for client in range(20)]
+        self.packets.append(tcp_packet(310, 3, length=0, dst_port=3389))
+        self.packets.append({'number': 311, 'timestamp': 1000.5, 'length': 42, 'protocol': 'ARP', 'summary': 'ARP'})
+
+    def test_shards_keep_flows_together(self):
+        """Test every row lands in exactly one shard, with both directions of a flow together"""
+        for packets in (PacketTable(self.packets), self.packets):
+            shards = shard_rows(packets, 4)
+            rows = sorted(row for shard in shards for row in list(shard))
+            assert rows == list(range(len(self.packets)))
+            flow_shards = {}
+            for index, shard in enumerate(shards):
+                for row in list(shard):
+                    packet = self.packets[row]
+                    if packet.get('src_ip'):
+                        flow = frozenset([(packet['src_ip'], packet['src_port']), (packet['dst_ip'], packet['dst_port'])])
+                        flow_shards.setdefault(flow, set()).add(index)
+            assert len(flow_shards) == 21
+            assert all(len(indices) == 1 for indices in flow_shards.values())
+
+    def test_matches_single_process(self):
+        """Test merged worker results equal one pass over the whole capture"""
+        table = PacketTable(self.packets)
+        expected_stats = StreamingStatistics()
+        expected_stats.update_batch(table)
+        expected_issues = IssueDetector().analyze_packets(table)
+        single = analyze_shard(table)
+
+        results = ParallelAnalyzer(workers=3, min_shard_packets=1).analyze(table)
+
+        assert results['workers'] == 3
+        assert results['statistics'].snapshot() == expected_stats.snapshot()
+        assert results['issues'] == expected_issues
+        assert any(issue['type'] == 'TCP_RETRANSMISSION' for issue in results['issues'])
+        assert results['protocol_count'] == dict(single['protocol_count'])
+        assert results['layer_count'] == dict(single['layer_count'])
+
+    def test_small_capture_runs_in_process(self):
+        """Test captures below the shard size are not sent to worker processes"""
+        results = ParallelAnalyzer(workers=4).analyze(self.packets)
+        assert results['workers'] == 1
+        assert results['statistics'].total_packets == len(self.packets)
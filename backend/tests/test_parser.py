@@ -1,4 +1,6 @@
 import pytest
+import socket
+import struct
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
@@ -56,4 +58,45 @@ class TestProtocolParser:
         analysis = self.parser.parse_packet(packet_info)
         assert analysis['packet_number'] == 0
         assert analysis['protocol'] == 'Unknown'
-        assert 'error' in analysis['layers']
\ No newline at end of file
+        assert 'error' in analysis['layers']
+
+    def test_invalid_backend(self):
+        """Test unknown parser backends are rejected"""
+        with pytest.raises(ValueError):
+            ProtocolParser(backend='nope')
+
+    def test_fast_backend_raw_bytes(self):
+        """Test the fast backend decodes layers straight from frame bytes"""
+        ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 40, 0, 0, 64, 6, 0,
+                         socket.inet_aton('192.168.1.1'), socket.inet_aton('192.168.1.2'))
+        tcp = struct.pack('!HHIIBBHHH', 1234, 443, 100, 200, 5 << 4, 0x12, 8192, 0, 0)
+        frame = b'\x02\x00\x00\x00\x00\x01\x02\x00\x00\x00\x00\x02\x08\x00' + ip + tcp
+        packet_info = {'number': 7, 'protocol': 'TCP', 'real_packet': True, 'raw_packet': frame}
+
+        analysis = ProtocolParser(backend='fast').parse_packet(packet_info)
+        assert analysis['packet_number'] == 7
+        assert list(analysis['layers']) == ['ethernet', 'ip', 'tcp']
+        assert analysis['layers']['ethernet']['source_mac'] == '02:00:00:00:00:02'
+        assert analysis['layers']['ip']['time_to_live'] == 64
+        assert analysis['layers']['tcp']['sequence_number'] == 100
+        assert analysis['layers']['tcp']['flags'] == ['SYN - Synchronize sequence numbers', 'ACK - Acknowledgment']
+
+    def test_scapy_backend_link_types(self):
+        """Test the Scapy backend starts dissecting at the layer the packet's link type says"""
+        pytest.importorskip('scapy')
+        ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 28, 0, 0, 64, 17, 0,
+                         socket.inet_aton('10.0.0.1'), socket.inet_aton('10.0.0.2'))
+        udp = struct.pack('!HHHH', 5000, 53, 8, 0)
+        cooked = struct.pack('!HHH8sH', 0, 1, 6, b'\x02' * 6 + b'\x00\x00', 0x0800)
+        for linktype, frame in ((101, ip + udp), (113, cooked + ip + udp), (0, struct.pack('=I', 2) + ip + udp)):
+            packet_info = {'number': 1, 'real_packet': True, 'raw_packet': frame, 'linktype': linktype}
+            fast = ProtocolParser(backend='fast').parse_packet(packet_info)
+            scapy = ProtocolParser(backend='scapy').parse_packet(packet_info)
+            assert list(scapy['layers']) == list(fast['layers']) == ['ip', 'udp']
+            assert scapy['layers']['ip']['source_ip'] == '10.0.0.1'
+            assert scapy['layers']['udp']['destination_port'] == 53
+
+    def test_real_packet_without_data(self):
+        """Test real packets without raw data get a basic analysis"""
+        analysis = self.parser.parse_packet({'number': 3, 'protocol': 'TCP', 'real_packet': True})
+        assert 'basic' in analysis['layers']
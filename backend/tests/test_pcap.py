@@ -0,0 +1,116 @@
+import pytest
+import socket
+import struct
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src import pcap as pcap_module
+from src.pcap import PcapReader, PcapWriter, PcapFormatError, read_pcap
+from src.storage import PacketStorage
+from src.table import PacketTable
+
+
+def tcp_frame(src, dst, src_port, dst_port, flags=0x18, payload=b''):
+    transport = struct.pack('!HHIIBBHHH', src_port, dst_port, 1, 1, 5 << 4, flags, 65535, 0, 0)
+    ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 40 + len(payload), 0, 0, 64, 6, 0,
+                     socket.inet_aton(src), socket.inet_aton(dst))
+    return b'\x02\x00\x00\x00\x00\x01\x02\x00\x00\x00\x00\x02\x08\x00' + ip + transport + payload
+
+
+def pcapng_block(block_type, body):
+    body += b'\x00' * (-len(body) % 4)
+    length = 12 + len(body)
+    return struct.pack('<II', block_type, length) + body + struct.pack('<I', length)
+
+
+class TestPcapReader:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'test.pcap')
+        self.frames = [
+            tcp_frame('10.0.0.1', '10.0.0.2', 1234, 80, 0x02),
+            tcp_frame('10.0.0.2', '10.0.0.1', 80, 1234, 0x12),
+            tcp_frame('10.0.0.1', '10.0.0.2', 1234, 80, 0x18, b'GET / HTTP/1.1\r\n'),
+        ]
+        with PcapWriter(self.path) as writer:
+            for i, frame in enumerate(self.frames):
+                writer.write(frame, 1000.0 + i * 0.5)
+
+    def teardown_method(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_records(self):
+        """Test records come back with timestamps and raw bytes"""
+        with PcapReader(self.path) as reader:
+            assert reader.format == 'pcap'
+            records = [(timestamp, length, bytes(frame)) for timestamp, length, _, frame in reader]
+        assert [record[2] for record in records] == self.frames
+        assert records[1][0] == pytest.approx(1000.5)
+        assert records[2][1] == len(self.frames[2])
+
+    def test_iter_packets(self):
+        """Test packets are decoded into capturer-style dicts"""
+        with PcapReader(self.path) as reader:
+            packets = list(reader.iter_packets())
+        assert [packet['number'] for packet in packets] == [1, 2, 3]
+        assert packets[0]['protocol'] == 'TCP'
+        assert packets[1]['summary'] == 'Ether / IP / TCP 10.0.0.2:80 > 10.0.0.1:1234 SA'
+        assert packets[2]['real_packet'] is True
+
+    def test_read_table(self):
+        """Test the bulk table decode matches packet-by-packet decoding"""
+        with PcapReader(self.path) as reader:
+            table = reader.read_table()
+            assert isinstance(table, PacketTable)
+            assert table == list(reader.iter_packets())
+
+    def test_read_table_in_chunks(self, monkeypatch):
+        """Test record headers gathered over several chunks decode like one pass"""
+        monkeypatch.setattr(pcap_module, 'SCAN_CHUNK', 2)
+        with PcapReader(self.path) as reader:
+            table = reader.read_table()
+            assert table == list(reader.iter_packets())
+        assert [row['timestamp'] for row in table] == [1000.0, 1000.5, 1001.0]
+
+    def test_truncated_file(self):
+        """Test a partially written final record is ignored"""
+        with open(self.path, 'ab') as capture:
+            capture.write(struct.pack('<IIII', 1, 0, 500, 500) + b'\x00' * 10)
+        assert len(read_pcap(self.path)) == 3
+
+    def test_pcapng(self):
+        """Test pcapng files with nanosecond timestamps"""
+        path = os.path.join(self.temp_dir, 'test.pcapng')
+        tsresol = struct.pack('<HHB', 9, 1, 9) + b'\x00' * 3 + b'\x00' * 4
+        timestamp = 1_500_000_000_123_456_789
+        with open(path, 'wb') as capture:
+            capture.write(pcapng_block(0x0A0D0D0A, struct.pack('<IHHq', 0x1A2B3C4D, 1, 0, -1)))
+            capture.write(pcapng_block(1, struct.pack('<HHI', 1, 0, 65535) + tsresol))
+            for frame in self.frames:
+                capture.write(pcapng_block(6, struct.pack('<IIIII', 0, timestamp >> 32, timestamp & 0xFFFFFFFF,
+                                                          len(frame), len(frame)) + frame))
+        with PcapReader(path) as reader:
+            assert reader.format == 'pcapng'
+            packets = list(reader.iter_packets())
+            assert reader.read_table() == packets
+        assert len(packets) == 3
+        assert packets[0]['timestamp'] == pytest.approx(1_500_000_000.123456789)
+
+    def test_not_a_capture(self):
+        """Test other files are rejected"""
+        path = os.path.join(self.temp_dir, 'bad.pcap')
+        with open(path, 'wb') as capture:
+            capture.write(b'{"packets": []}' * 4)
+        with pytest.raises(PcapFormatError):
+            PcapReader(path)
+
+    def test_storage_loads_pcap(self):
+        """Test PacketStorage loads pcap files"""
+        storage = PacketStorage(storage_dir=self.temp_dir)
+        packets = storage.load_capture('test.pcap')
+        assert len(packets) == 3
+        assert len(list(storage.iter_pcap('test.pcap'))) == 3
+        assert any(info['filename'] == 'test.pcap' for info in storage.list_captures())
@@ -0,0 +1,72 @@
+import io
+import pytest
+import socket
+import struct
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.capturer import PacketCapturer
+from src.reporting import ProgressReporter, configure
+
+
+def udp_frame(src_port):
+    transport = struct.pack('!HHHH', src_port, 53, 8, 0)
+    ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 28, 0, 0, 64, 17, 0,
+                     socket.inet_aton('10.0.0.1'), socket.inet_aton('10.0.0.2'))
+    return b'\x02\x00\x00\x00\x00\x01\x02\x00\x00\x00\x00\x02\x08\x00' + ip + transport
+
+
+def replay_output(level, count=20):
+    """Console output of creating a capturer and replaying count frames at a reporting level"""
+    stream = io.StringIO()
+    configure(level, stream)
+    try:
+        capturer = PacketCapturer(backpressure='block')
+        capturer.replay([(1000.0 + i, 42, 1, udp_frame(1000 + i)) for i in range(count)])
+    finally:
+        configure('quiet', io.StringIO())
+    return stream.getvalue().splitlines()
+
+
+class TestReporting:
+    def test_levels(self):
+        """Test packet lines and banners only appear at the verbose level"""
+        quiet = replay_output('quiet')
+        info = replay_output('info')
+        verbose = replay_output('verbose')
+
+        assert quiet == []
+        assert info == []
+        assert "✅ PacketCapturer created!" in verbose
+        assert sum(line.startswith("📦 #") for line in verbose) == 20
+        with pytest.raises(ValueError):
+            configure('loud')
+
+    def test_progress_rate_limited(self):
+        """Test progress lines are emitted at most once per interval, with rates and drops"""
+        lines = []
+        progress = ProgressReporter(interval=3600, emit=lines.append)
+        for _ in range(1000):
+            progress.update(10, 1000, drops=3)
+        progress.finish()
+        assert lines == []
+        assert (progress.packets, progress.bytes, progress.drops) == (10_000, 1_000_000, 3)
+
+        progress = ProgressReporter(interval=0, emit=lines.append)
+        progress.update(5, 500, drops=1)
+        progress.update(5, 500)
+        progress.finish()
+        assert len(lines) == 2
+        assert "10 packets" in lines[-1] and "1 dropped" in lines[-1]
+
+    def test_capturer_progress(self):
+        """Test a capturer hands every delivered batch to its progress reporter"""
+        lines = []
+        capturer = PacketCapturer(backpressure='block')
+        capturer.progress = ProgressReporter(interval=0, emit=lines.append)
+        capturer.replay([(1000.0 + i, 42, 1, udp_frame(1000 + i)) for i in range(50)])
+
+        assert capturer.progress.packets == 50
+        assert capturer.progress.bytes == 50 * 42
+        assert lines and lines[-1].startswith("⏱️")
@@ -0,0 +1,84 @@
+import pytest
+import sys
+import os
+import threading
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.ring import FrameRing
+
+
+def frame(number, size=60):
+    return bytes([number % 256]) * size
+
+
+class TestFrameRing:
+    def setup_method(self):
+        self.ring = FrameRing(slots=4, snaplen=100)
+
+    def test_push_and_pop_in_order(self):
+        """Test frames come out oldest first with their metadata"""
+        for number in range(3):
+            assert self.ring.push(frame(number), 1000.0 + number, linktype=101)
+        frames = self.ring.pop_batch(10)
+        assert [data for _, _, _, data in frames] == [frame(0), frame(1), frame(2)]
+        assert frames[1][:3] == (1001.0, 60, 101)
+        assert len(self.ring) == 0
+        assert self.ring.stats()['high_water'] == 3
+
+    def test_drop_newest(self):
+        """Test a full ring drops incoming frames by default"""
+        results = [self.ring.push(frame(number), number) for number in range(6)]
+        assert results == [True] * 4 + [False] * 2
+        assert [data[0] for _, _, _, data in self.ring.pop_batch(10)] == [0, 1, 2, 3]
+        assert self.ring.stats()['dropped'] == 2
+
+    def test_drop_oldest(self):
+        """Test drop-oldest overwrites the frames nobody has read yet"""
+        ring = FrameRing(slots=4, snaplen=100, policy='drop-oldest')
+        for number in range(6):
+            assert ring.push(frame(number), number)
+        assert [data[0] for _, _, _, data in ring.pop_batch(10)] == [2, 3, 4, 5]
+        assert ring.stats()['dropped'] == 2
+        assert ring.stats()['high_water'] == 4
+
+    def test_block_waits_for_consumer(self):
+        """Test the block policy loses nothing and waits for free slots"""
+        ring = FrameRing(slots=2, snaplen=100, policy='block')
+        received = []
+
+        def consume():
+            while True:
+                frames = ring.pop_batch(1, timeout=1)
+                if not frames:
+                    return
+                received.extend(data[0] for _, _, _, data in frames)
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        for number in range(50):
+            assert ring.push(frame(number), number)
+        ring.close()
+        consumer.join()
+        assert received == list(range(50))
+        assert ring.stats()['dropped'] == 0
+        assert ring.stats()['high_water'] <= 2
+
+    def test_truncation_keeps_wire_length(self):
+        """Test frames longer than snaplen are cut but report their real size"""
+        self.ring.push(frame(1, size=150), 1.0)
+        (_, wire_length, _, data), = self.ring.pop_batch()
+        assert len(data) == 100 and wire_length == 150
+        assert self.ring.stats()['truncated'] == 1
+
+    def test_close(self):
+        """Test a closed ring refuses frames and drains to an empty batch"""
+        self.ring.push(frame(1), 1.0)
+        self.ring.close()
+        assert not self.ring.push(frame(2), 2.0)
+        assert len(self.ring.pop_batch()) == 1
+        assert self.ring.pop_batch() == []
+
+    def test_unknown_policy(self):
+        """Test an unknown backpressure policy is rejected"""
+        with pytest.raises(ValueError):
+            FrameRing(policy='drop-random')
@@ -0,0 +1,77 @@
+import pytest
+import sys
+import os
+import shutil
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+np = pytest.importorskip('numpy')
+
+from src.blockstore import BlockReader, BlockWriter
+from src.secondary_index import SecondaryIndex, decode_postings, encode_postings
+from src.table import PacketTable
+
+
+def sample_packets(count):
+    return [{'number': i + 1, 'timestamp': 1000.0 + i, 'length': 60, 'protocol': ['TCP', 'UDP', 'DNS'][i % 3],
+             'src_ip': f'10.0.0.{i % 7}', 'dst_ip': '2001:db8::1' if i % 5 == 0 else '10.0.1.1',
+             'src_port': 40000 + i % 11, 'dst_port': 53 if i % 3 == 2 else 443} for i in range(count)]
+
+
+class TestSecondaryIndex:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'capture.pkb')
+        self.packets = sample_packets(2000)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def expected(self, ip=None, port=None, protocol=None):
+        return [i for i, packet in enumerate(self.packets)
+                if (ip is None or ip in (packet['src_ip'], packet['dst_ip']))
+                and (port is None or port in (packet['src_port'], packet['dst_port']))
+                and (protocol is None or packet['protocol'] == protocol)]
+
+    def build(self, packets, block_size=128):
+        # Opened before the append: the index only matches the capture as it was
+        index = (os.path.exists(self.path) and SecondaryIndex.open(self.path)) or SecondaryIndex(self.path)
+        with BlockWriter(self.path, block_size=block_size) as writer:
+            writer.write_many(packets)
+        index.add(PacketTable(packets), index.count)
+        index.save()
+
+    def test_postings_round_trip(self):
+        """Test posting lists survive delta encoding in every width"""
+        for positions in ([0, 1, 2, 3], [5, 300, 70000], [0, 2**40], []):
+            data, width = encode_postings(np.array(positions, dtype=np.int64))
+            assert decode_postings(data, width).tolist() == positions
+
+    def test_lookup(self):
+        """Test lookups and their intersections match a scan, and read only the matching blocks"""
+        self.build(self.packets)
+        index = SecondaryIndex.open(self.path)
+        assert index.count == 2000
+        assert sorted(index.keys('protocol')) == ['DNS', 'TCP', 'UDP']
+        for query in ({'ip': '10.0.0.3'}, {'ip': '2001:db8::1'}, {'port': 53}, {'protocol': 'dns'},
+                      {'ip': '10.0.0.3', 'port': 40005, 'protocol': 'TCP'}, {'ip': '192.0.2.1'}):
+            assert index.lookup(**query).tolist() == self.expected(**{
+                **query, **({'protocol': query['protocol'].upper()} if 'protocol' in query else {})})
+
+        with BlockReader(self.path) as reader:
+            rows = index.lookup(ip='10.0.0.3', port=40005)
+            table = reader.read_rows(rows)
+            assert [packet['number'] for packet in table] == [row + 1 for row in rows]
+            assert reader.read_rows([]).to_dicts() == []
+
+    def test_append_and_stale(self):
+        """Test an index grows with appends and is ignored once the capture changes without it"""
+        self.build(self.packets[:1500])
+        self.build(self.packets[1500:])
+        index = SecondaryIndex.open(self.path)
+        assert index.count == 2000
+        assert index.lookup(ip='2001:db8::1').tolist() == self.expected(ip='2001:db8::1')
+
+        with BlockWriter(self.path) as writer:
+            writer.write_many(sample_packets(10))
+        assert SecondaryIndex.open(self.path) is None
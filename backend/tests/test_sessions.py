@@ -0,0 +1,75 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.sessions import SessionManager, SessionNotFound
+from src.table import PacketTable
+
+
+def packets(count, start=0):
+    return [{'number': start + i + 1, 'timestamp': 1000.0 + start + i, 'length': 100, 'protocol': 'UDP',
+             'l4_protocol': 'UDP', 'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2', 'src_port': 5000, 'dst_port': 53}
+            for i in range(count)]
+
+
+class TestSessions:
+    def test_results_cached_until_append(self):
+        """Test results are computed once and recomputed after packets are appended"""
+        session = SessionManager().create(packets(10))
+        statistics = session.statistics()
+        assert isinstance(session.packets, PacketTable)
+        assert session.statistics() is statistics
+        assert session.issues() is session.issues()
+        assert statistics['total_packets'] == 10
+
+        assert session.append(packets(5, start=10)) == 5
+        assert session.version == 2
+        assert session.statistics() is not statistics
+        assert session.statistics()['total_packets'] == 15
+        assert [packet['number'] for packet in session.packets] == list(range(1, 16))
+
+    def test_capture_appends(self):
+        """Test captures into a session continue its packet numbering"""
+        session = SessionManager().create()
+        session.capture(5)
+        session.capture(3)
+        assert len(session) == 8
+        assert session.packets[-1]['number'] == 8
+        assert len(session.analyses()) == 8
+
+    def test_append_keeps_numbers(self):
+        """Test appended packets keep their numbers and only unnumbered ones are numbered on"""
+        session = SessionManager().create(PacketTable(packets(3, start=40)))
+        assert [packet['number'] for packet in session.packets] == [41, 42, 43]
+        unnumbered = packets(2)
+        for packet in unnumbered:
+            del packet['number']
+        assert session.append(unnumbered) == 2
+        assert [packet['number'] for packet in session.packets] == [41, 42, 43, 44, 45]
+        assert 'number' not in unnumbered[0]
+        session.capture(2)
+        assert [packet['number'] for packet in session.packets][-2:] == [46, 47]
+
+    def test_lookup_and_eviction(self):
+        """Test unknown, deleted, expired and least recently used sessions are not found"""
+        manager = SessionManager(max_sessions=2, idle_timeout=3600)
+        first = manager.create()
+        second = manager.create()
+        assert manager.get(first.id) is first
+        manager.create()
+        assert len(manager) == 2
+        with pytest.raises(SessionNotFound):
+            manager.get(second.id)
+
+        manager.delete(first.id)
+        with pytest.raises(SessionNotFound):
+            manager.get(first.id)
+        with pytest.raises(SessionNotFound):
+            manager.delete('missing')
+
+        manager.idle_timeout = -1
+        latest = manager.create()
+        assert len(manager) == 1
+        with pytest.raises(SessionNotFound):
+            manager.get(latest.id)
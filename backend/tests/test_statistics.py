@@ -3,7 +3,7 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from src.statistics import TrafficStatistics
+from src.statistics import TrafficStatistics, StreamingStatistics
 
 class TestTrafficStatistics:
     def setup_method(self):
@@ -69,4 +69,104 @@ class TestTrafficStatistics:
         """Test displaying empty statistics"""
         result = self.stats.generate_statistics([])
         # Should not raise an exception
-        self.stats.display_statistics(result)
\ No newline at end of file
+        self.stats.display_statistics(result)
+        
+    def test_vectorized_matches_python(self):
+        """Test the NumPy engine gives the same output as the Python passes"""
+        import src.statistics as statistics_module
+        from src.table import PacketTable
+        if statistics_module.np is None:
+            pytest.skip("NumPy not installed")
+        
+        packets = self.sample_packets + [
+            {'protocol': 'DNS', 'timestamp': 999.5, 'summary': 'IP / UDP 10.0.0.1:53 > 10.0.0.2:5353 / DNS',
+             'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2', 'src_port': 53, 'dst_port': 5353},
+            {'protocol': 'ICMPv6', 'length': 90, 'timestamp': 1003.1, 'src_ip': 'fe80::1', 'dst_ip': 'ff02::1'},
+            {'protocol': 'TCP', 'length': 60, 'timestamp': 1003.1, 'src_ip': 'fe80::1', 'dst_ip': 'fe80::2',
+             'src_port': 0, 'dst_port': 443},
+            {'length': 0, 'timestamp': 1003.2}
+        ]
+        vectorized = self.stats.generate_statistics(PacketTable(packets))
+        
+        numpy_module = statistics_module.np
+        statistics_module.np = None
+        try:
+            expected = self.stats.generate_statistics(packets)
+        finally:
+            statistics_module.np = numpy_module
+        
+        assert vectorized == expected
+        assert list(vectorized['traffic_timeline']) == list(expected['traffic_timeline'])
+
+
+class TestStreamingStatistics:
+    def setup_method(self):
+        self.sample_packets = [
+            {'protocol': 'TCP', 'length': 100, 'timestamp': 1000.0, 'summary': 'IP / TCP 10.0.0.1:80 > 10.0.0.2:5000 S',
+             'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2', 'src_port': 80, 'dst_port': 5000},
+            {'protocol': 'UDP', 'length': 50, 'timestamp': 1001.0, 'summary': 'IP / UDP 10.0.0.3:53 > 10.0.0.2:5353 / DNS',
+             'src_ip': '10.0.0.3', 'dst_ip': '10.0.0.2', 'src_port': 53, 'dst_port': 5353},
+            {'protocol': 'TCP', 'length': 1500, 'timestamp': 1002.5, 'summary': 'IP / TCP 10.0.0.1:80 > 10.0.0.2:5000 A',
+             'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2', 'src_port': 80, 'dst_port': 5000},
+            {'protocol': 'ICMP', 'length': 80, 'timestamp': 1003.0, 'summary': 'ICMP packet'},
+        ]
+    
+    def test_snapshot_matches_generate_statistics(self):
+        """Test per-packet updates give the batch statistics"""
+        stream = StreamingStatistics()
+        for packet in self.sample_packets:
+            stream.update(packet)
+        
+        assert stream.snapshot() == TrafficStatistics().generate_statistics(self.sample_packets)
+        assert stream.snapshot()['top_conversations'][0] == ('10.0.0.1:80 → 10.0.0.2:5000', 2)
+    
+    def test_update_batch(self):
+        """Test batch updates match single updates"""
+        single = StreamingStatistics()
+        for packet in self.sample_packets:
+            single.update(packet)
+        batched = StreamingStatistics()
+        batched.update_batch(self.sample_packets[:2])
+        batched.update_batch(self.sample_packets[2:])
+        
+        assert batched.snapshot() == single.snapshot()
+    
+    def test_empty_snapshot(self):
+        """Test snapshot before any packet"""
+        stream = StreamingStatistics()
+        assert stream.snapshot()['total_packets'] == 0
+        stream.update(self.sample_packets[0])
+        stream.reset()
+        assert stream.snapshot()['total_packets'] == 0
+    
+    def test_timeline_is_bounded(self):
+        """Test the timeline ring buffer only keeps recent seconds"""
+        stream = StreamingStatistics(timeline_seconds=10)
+        for second in range(100):
+            stream.update({'protocol': 'TCP', 'length': 60, 'timestamp': 1000.0 + second})
+        
+        timeline = stream.snapshot()['traffic_timeline']
+        assert list(timeline) == list(range(1090, 1100))
+        assert stream.snapshot()['total_packets'] == 100
+    
+    def test_top_conversations_are_bounded(self):
+        """Test the conversation counter never exceeds its capacity"""
+        stream = StreamingStatistics(conversation_capacity=8)
+        for i in range(100):
+            stream.update({'protocol': 'TCP', 'length': 60, 'src_ip': f'10.0.0.{i % 50}', 'dst_ip': '10.0.1.1'})
+        for _ in range(20):
+            stream.update({'protocol': 'TCP', 'length': 60, 'src_ip': '10.0.0.99', 'dst_ip': '10.0.1.1'})
+        
+        assert len(stream.conversations) == 8
+        assert stream.snapshot()['top_conversations'][0][0] == '10.0.0.99 → 10.0.1.1'
+    
+    def test_merge(self):
+        """Test merging statistics of disjoint parts equals counting everything"""
+        whole = StreamingStatistics()
+        whole.update_batch(self.sample_packets)
+        first, second = StreamingStatistics(), StreamingStatistics()
+        first.update_batch(self.sample_packets[1::2])
+        second.update_batch(self.sample_packets[::2])
+        first.merge(second)
+        
+        assert first.snapshot() == whole.snapshot()
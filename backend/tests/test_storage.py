@@ -87,4 +87,128 @@ class TestPacketStorage:
     def test_delete_nonexistent_capture(self):
         """Test deleting non-existent file"""
         result = self.storage.delete_capture('nonexistent.json')
-        assert result == False
\ No newline at end of file
+        assert result == False
+        
+    def test_load_legacy_capture_fields(self):
+        """Test captures saved without address/port fields get them on load"""
+        legacy = [
+            {'number': 1, 'protocol': 'TCP', 'length': 60, 'summary': 'Ether / IP / TCP 10.0.0.1:https > 10.0.0.2:51000 A'},
+            {'number': 2, 'protocol': 'ICMP', 'length': 60, 'summary': 'Ether / IP / ICMP 10.0.0.1 > 10.0.0.2 echo-request 0'}
+        ]
+        self.storage.save_capture(legacy, 'legacy.json')
+        
+        loaded_packets = self.storage.load_capture('legacy.json')
+        assert loaded_packets[0]['src_ip'] == '10.0.0.1'
+        assert loaded_packets[0]['src_port'] == 443
+        assert loaded_packets[0]['dst_port'] == 51000
+        assert loaded_packets[1]['dst_ip'] == '10.0.0.2'
+        assert 'src_port' not in loaded_packets[1]
+        
+    def test_query_capture(self):
+        """Test saved captures are queried page by page"""
+        packets = [{'number': i + 1, 'protocol': 'TCP', 'length': 60, 'timestamp': 1000.0 + i} for i in range(25)]
+        self.storage.save_capture(packets, 'paged.json')
+        
+        page = self.storage.query_capture('paged.json', limit=10, start_time=1005, fields=['number'])
+        assert page == {'packets': [{'number': n} for n in range(6, 16)], 'total': 20, 'nextCursor': '15'}
+        page = self.storage.query_capture('paged.json', limit=10, start_time=1005, fields=['number'], cursor='15')
+        assert [packet['number'] for packet in page['packets']] == list(range(16, 26))
+        assert page['nextCursor'] is None
+        assert self.storage.query_capture('missing.pcap') is None
+        
+    def test_block_capture(self):
+        """Test .pkb captures save, append, list, page and delete"""
+        packets = [{'number': i + 1, 'protocol': 'UDP', 'length': 80, 'timestamp': 1000.0 + i} for i in range(25)]
+        assert self.storage.save_capture(packets[:20], 'blocks', 'pkb')
+        assert self.storage.append_capture(packets[20:], 'blocks')
+        
+        assert self.storage.load_capture('blocks.pkb').to_dicts() == packets
+        page = self.storage.query_capture('blocks.pkb', limit=10, start_time=1005, fields=['number'])
+        assert page == {'packets': [{'number': n} for n in range(6, 16)], 'total': 20, 'nextCursor': '15'}
+        page = self.storage.query_capture('blocks.pkb', limit=3, fields=['protocol'])
+        assert page == {'packets': [{'protocol': 'UDP'}] * 3, 'total': 25, 'nextCursor': '3'}
+        assert [capture['filename'] for capture in self.storage.list_captures()] == ['blocks.pkb']
+        
+        # Saving again replaces the capture
+        assert self.storage.save_capture(packets[:3], 'blocks.pkb', 'pkb')
+        assert len(self.storage.load_capture('blocks.pkb')) == 3
+        
+    def test_block_capture_integer_times(self):
+        """Test integer timestamps (as JSON clients send them) are indexed and queried as times"""
+        packets = [{'number': i + 1, 'protocol': 'TCP', 'length': 60, 'timestamp': 1000 + i} for i in range(50)]
+        assert self.storage.save_capture(packets, 'integers', 'pkb')
+        assert self.storage.query_capture('integers.pkb', start_time=1010, fields=['number'])['total'] == 40
+        assert self.storage.load_capture('integers.pkb').to_dicts() == packets
+        
+    def test_jsonl_capture(self):
+        """Test JSON Lines captures save, list, load and stream back"""
+        packets = [{'number': i + 1, 'protocol': 'UDP', 'length': 80, 'timestamp': 1000.0 + i} for i in range(25)]
+        assert self.storage.save_capture(packets, 'lines', 'jsonl.gz')
+        with self.storage.open_jsonl('live') as writer:
+            for packet in packets:
+                writer.write(packet)
+        
+        assert self.storage.load_capture('lines.jsonl.gz') == packets
+        assert list(self.storage.iter_jsonl('live.jsonl')) == packets
+        assert sorted(capture['filename'] for capture in self.storage.list_captures()) == ['lines.jsonl.gz', 'live.jsonl']
+        
+    def test_capture_catalog(self):
+        """Test saved, appended, copied-in and deleted captures are kept in the catalog"""
+        packets = [{'number': i + 1, 'protocol': 'UDP', 'length': 80, 'timestamp': 1000.0 + i,
+                    'src_ip': '10.0.0.5', 'dst_ip': f'10.0.1.{i}'} for i in range(25)]
+        assert self.storage.save_capture(packets[:20], 'blocks', 'pkb')
+        assert self.storage.append_capture(packets[20:], 'blocks')
+        assert self.storage.save_capture(packets[:5], 'early', 'json')
+        
+        assert len(self.storage.list_captures()) == 2
+        
+        # A capture the storage did not write is picked up when the listing is refreshed
+        other = PacketStorage(storage_dir=os.path.join(self.temp_dir, 'other'))
+        other.save_capture([{'number': 1, 'protocol': 'ARP', 'length': 42, 'timestamp': 3000.0}], 'copied', 'json')
+        os.rename(os.path.join(other.storage_dir, 'copied.json'), os.path.join(self.temp_dir, 'copied.json'))
+        assert len(self.storage.list_captures()) == 2
+        captures = {capture['filename']: capture for capture in self.storage.list_captures(refresh=True)}
+        assert sorted(captures) == ['blocks.pkb', 'copied.json', 'early.json']
+        assert captures['blocks.pkb']['packets'] == 25
+        assert (captures['blocks.pkb']['first_time'], captures['blocks.pkb']['last_time']) == (1000.0, 1024.0)
+        
+        found = lambda **query: sorted(capture['filename'] for capture in self.storage.find_captures(**query))
+        assert found(host='10.0.0.5') == ['blocks.pkb', 'early.json']
+        assert found(host='10.0.1.22') == ['blocks.pkb']
+        assert found(host='10.0.0.5', start_time=1010) == ['blocks.pkb']
+        assert found(protocol='ARP') == ['copied.json']
+        
+        # A new PacketStorage reuses the catalog; deletions drop out of it
+        assert self.storage.delete_capture('early.json')
+        assert found(host='10.0.0.5') == ['blocks.pkb']
+        os.remove(os.path.join(self.temp_dir, 'copied.json'))
+        assert [capture['filename'] for capture in PacketStorage(storage_dir=self.temp_dir).list_captures()] == ['blocks.pkb']
+        
+    def test_find_packets(self):
+        """Test filtered loads give the same packets with and without a secondary index"""
+        packets = [{'number': i + 1, 'protocol': ['TCP', 'UDP'][i % 2], 'length': 80, 'timestamp': 1000.0 + i,
+                    'src_ip': f'10.0.0.{i % 4}', 'dst_ip': '10.0.1.1', 'src_port': 5000 + i % 3, 'dst_port': 443}
+                   for i in range(50)]
+        assert self.storage.save_capture(packets[:40], 'indexed', 'pkb', index=True)
+        assert self.storage.append_capture(packets[40:], 'indexed')
+        assert self.storage.save_capture(packets, 'plain', 'json')
+        assert os.path.exists(os.path.join(self.temp_dir, 'indexed.pkb.sidx'))
+        
+        for query in ({'ip': '10.0.0.2'}, {'port': 5001, 'protocol': 'udp'}, {'ip': '10.0.0.1', 'port': 5002}):
+            expected = [packet['number'] for packet in self.storage.find_packets('plain.json', **query)]
+            assert [packet['number'] for packet in self.storage.find_packets('indexed.pkb', **query)] == expected
+        assert len(self.storage.find_packets('indexed.pkb', ip='10.0.0.2')) == 12
+        assert self.storage.find_packets('missing.pkb', ip='10.0.0.2') is None
+        
+        assert self.storage.delete_capture('indexed.pkb')
+        assert not os.path.exists(os.path.join(self.temp_dir, 'indexed.pkb.sidx'))
+        
+    def test_rolling_capture(self):
+        """Test a rolling capture directory is written through the storage and loads back whole"""
+        packets = [{'number': i + 1, 'protocol': 'UDP', 'length': 80, 'timestamp': 1000.0 + i * 10} for i in range(30)]
+        with self.storage.open_rolling('live', maintenance_interval=None) as rolling:
+            rolling.write_many(packets)
+        
+        assert len(os.listdir(os.path.join(self.temp_dir, 'live'))) == 6
+        assert self.storage.load_capture('live').to_dicts() == packets
+        assert self.storage.list_captures() == []
@@ -0,0 +1,40 @@
+import json
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.capturer import PacketCapturer
+from src.sessions import SessionManager
+from src.streaming import format_sse, stream_capture
+
+
+class TestStreaming:
+    def test_events_cover_capture(self):
+        """Test a simulated capture streams every packet, its statistics and a final done event"""
+        session = SessionManager().create()
+        events = list(stream_capture(PacketCapturer(), count=300, interval=0.05, session=session))
+        names = [event for event, _ in events]
+        packets = [packet for event, data in events if event == 'packets' for packet in data['packets']]
+        statistics = [data for event, data in events if event == 'statistics']
+
+        assert names[-1] == 'done' and events[-1][1]['total'] == 300
+        assert [packet['number'] for packet in packets] == list(range(1, 301))
+        assert sum(data['statistics']['total_packets'] for data in statistics) == 300
+        assert statistics[-1]['totals']['total_packets'] == 300
+        assert len(session) == 300 and events[-1][1]['sessionId'] == session.id
+
+    def test_throttled(self):
+        """Test packet events are coalesced per interval and capped at max_packets"""
+        events = list(stream_capture(PacketCapturer(), count=None, timeout=1.2, interval=0.3, max_packets=25))
+        packet_events = [data for event, data in events if event == 'packets']
+
+        assert 2 <= len(packet_events) <= 6
+        assert all(len(data['packets']) <= 25 for data in packet_events)
+        sent = sum(len(data['packets']) + data['skipped'] for data in packet_events)
+        assert sent == packet_events[-1]['total'] == events[-1][1]['total'] > 25
+
+    def test_format_sse(self):
+        """Test events are encoded as text/event-stream messages"""
+        message = format_sse('packets', {'total': 2})
+        assert message == 'event: packets\ndata: {"total": 2}\n\n'
+        assert json.loads(message.split('data: ')[1]) == {'total': 2}
@@ -0,0 +1,137 @@
+import pytest
+import sys
+import os
+import pickle
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.table import PacketTable, encode_address, decode_address
+
+class TestPacketTable:
+    def setup_method(self):
+        self.table = PacketTable()
+        self.sample_packets = [
+            {'number': 1, 'timestamp': 1000.5, 'length': 100, 'protocol': 'TCP',
+             'src_ip': '192.168.1.1', 'dst_ip': '10.0.0.2', 'summary': 'TCP packet', 'real_packet': False},
+            {'number': 2, 'timestamp': 1001.0, 'length': 80, 'protocol': 'UDP',
+             'src_ip': 'fe80::1', 'dst_ip': 'ff02::1', 'summary': 'UDP packet', 'real_packet': True},
+        ]
+
+    def test_empty_table(self):
+        """Test an empty table behaves like an empty list"""
+        assert len(self.table) == 0
+        assert self.table == []
+        assert not self.table
+
+    def test_round_trip(self):
+        """Test packets read back exactly as they were appended"""
+        self.table.extend(self.sample_packets)
+        assert len(self.table) == 2
+        assert self.table == self.sample_packets
+        assert self.table[1]['src_ip'] == 'fe80::1'
+        assert self.table[-1]['real_packet'] is True
+
+    def test_missing_fields(self):
+        """Test missing fields are absent from the row view"""
+        self.table.append({'protocol': 'TCP'})
+        row = self.table[0]
+        assert 'length' not in row
+        assert row.get('length', 0) == 0
+        with pytest.raises(KeyError):
+            row['length']
+
+    def test_values_outside_columns(self):
+        """Test odd values and unknown keys are preserved"""
+        raw = object()
+        self.table.append({'length': -1, 'timestamp': 'now', 'src_ip': 'N/A', 'raw_packet': raw})
+        row = self.table[0]
+        assert row['length'] == -1
+        assert row['timestamp'] == 'now'
+        assert row['src_ip'] == 'N/A'
+        assert row['raw_packet'] is raw
+
+    def test_numeric_coercion(self):
+        """Test integer times and integral float counts are stored in their columns"""
+        self.table.append({'timestamp': 1700000000, 'length': 60.0, 'tcp_seq': 1.5, 'dns_response': 1})
+        self.table[0]['number'] = 7.0
+        assert self.table[0]['timestamp'] == 1700000000
+        assert self.table[0]['length'] == 60
+        assert self.table[0]['number'] == 7
+        assert self.table.extras('timestamp') == {} and self.table.extras('length') == {}
+        assert self.table.present('timestamp')[0] and self.table.present('number')[0]
+        # Values the column cannot hold exactly keep their own type outside it
+        assert self.table[0]['tcp_seq'] == 1.5
+        assert self.table[0]['dns_response'] == 1 and not self.table.present('dns_response')[0]
+
+    def test_inexact_numbers_stay_outside_columns(self):
+        """Test ints a float cannot hold exactly keep their value and the table stays aligned"""
+        huge = 10 ** 400
+        self.table.append({'timestamp': 2 ** 53 + 1, 'length': 60})
+        self.table.append({'timestamp': huge, 'length': 70})
+        assert self.table[0]['timestamp'] == 2 ** 53 + 1 and type(self.table[0]['timestamp']) is int
+        assert self.table[1]['timestamp'] == huge
+        assert not any(self.table.present('timestamp'))
+        assert [row['length'] for row in self.table] == [60, 70]
+
+    def test_failed_append_leaves_table_unchanged(self):
+        """Test a packet that fails halfway through append adds nothing"""
+        class Broken(dict):
+            def __iter__(self):
+                raise RuntimeError('broken packet')
+
+        self.table.extend(self.sample_packets)
+        with pytest.raises(RuntimeError):
+            self.table.append(Broken({'length': -1, 'protocol': 'TCP', 'raw_packet': b'x'}))
+        assert len(self.table) == len(self.sample_packets)
+        assert self.table.to_dicts() == self.sample_packets
+        assert self.table.extras('length') == {}
+        self.table.append({'length': 99})
+        assert self.table[len(self.sample_packets)].copy() == {'length': 99}
+
+    def test_row_updates(self):
+        """Test writing through the row view"""
+        self.table.extend(self.sample_packets)
+        row = self.table[0]
+        row['length'] = 1500
+        row['dns_qname'] = 'example.com'
+        del row['summary']
+        assert self.table[0]['length'] == 1500
+        assert self.table[0]['dns_qname'] == 'example.com'
+        assert 'summary' not in self.table[0]
+        assert self.table[1]['summary'] == 'UDP packet'
+
+    def test_copy_and_slice(self):
+        """Test rows copy to dicts and slices return rows"""
+        self.table.extend(self.sample_packets)
+        assert self.table[0].copy() == self.sample_packets[0]
+        assert isinstance(self.table[0].copy(), dict)
+        assert [row['number'] for row in self.table[:2]] == [1, 2]
+
+    def test_columns(self):
+        """Test column access and string interning"""
+        self.table.extend(self.sample_packets * 3)
+        assert list(self.table.column('length')) == [100, 80] * 3
+        assert self.table.strings('protocol') == ['TCP', 'UDP']
+        assert list(self.table.present('summary')) == [True] * 6
+
+    def test_pickle(self):
+        """Test a table survives pickling and keeps accepting packets"""
+        self.table.extend(self.sample_packets)
+        restored = pickle.loads(pickle.dumps(self.table))
+        assert restored == self.table
+        restored.append(self.sample_packets[0])
+        assert restored[2] == self.sample_packets[0]
+
+    def test_extend_table(self):
+        """Test appending another table keeps every value, including those outside the columns"""
+        odd = {'number': 3, 'length': -1, 'protocol': 'ICMP', 'note': 'kept'}
+        self.table.extend(self.sample_packets[:1])
+        self.table.extend_table(PacketTable(self.sample_packets[1:] + [odd]))
+        assert self.table == self.sample_packets + [odd]
+        assert self.table.extras('note') == {2: 'kept'}
+
+    def test_address_encoding(self):
+        """Test IP addresses convert to integers and back"""
+        assert encode_address('10.0.0.1') == (4, 0, 0x0A000001)
+        assert decode_address(*encode_address('2001:db8::1')) == '2001:db8::1'
+        assert encode_address('FE80::1') is None
+        assert encode_address('not-an-ip') is None
@@ -0,0 +1,139 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.tcp_analysis import TcpAnalyzer, MAX_RANGES
+from src.table import PacketTable
+
+SYN, ACK = 0x02, 0x10
+
+
+def segment(timestamp, forward, flags, seq, ack, length=0, window=1000, sack=None, client_port=5000):
+    """One TCP segment of 10.0.0.1:client_port <-> 10.0.0.2:80"""
+    client, server = ('10.0.0.1', client_port), ('10.0.0.2', 80)
+    (src_ip, src_port), (dst_ip, dst_port) = (client, server) if forward else (server, client)
+    packet = {'timestamp': timestamp, 'length': 54 + length, 'protocol': 'TCP', 'l4_protocol': 'TCP',
+              'src_ip': src_ip, 'dst_ip': dst_ip, 'src_port': src_port, 'dst_port': dst_port,
+              'tcp_flags': flags, 'tcp_seq': seq, 'tcp_ack': ack, 'tcp_len': length, 'tcp_window': window}
+    if sack:
+        packet['tcp_sack_left'], packet['tcp_sack_right'] = sack
+    return packet
+
+
+HANDSHAKE = [
+    segment(0.00, True, SYN, 100, 0),
+    segment(0.01, False, SYN | ACK, 500, 101),
+    segment(0.02, True, ACK, 101, 501),
+]
+
+
+class TestTcpAnalyzer:
+    def setup_method(self):
+        self.analyzer = TcpAnalyzer()
+
+    def events(self, packets):
+        return [self.analyzer.update(packet) for packet in packets]
+
+    def test_in_order_transfer(self):
+        """Test a clean transfer reports nothing"""
+        packets = HANDSHAKE + [
+            segment(1.0, True, ACK, 101, 501, 100),
+            segment(1.0, True, ACK, 201, 501, 100),
+            segment(1.1, False, ACK, 501, 301),
+        ]
+        assert self.events(packets) == [()] * 6
+        assert self.analyzer.summary()['segments'] == 6
+
+    def test_fast_retransmit_with_sack(self):
+        """Test dup ACKs, the retransmission they trigger and a resend of SACKed data"""
+        packets = HANDSHAKE + [
+            segment(1.00, True, ACK, 101, 501, 100),
+            segment(1.00, True, ACK, 201, 501, 100),    # lost after the capture point
+            segment(1.00, True, ACK, 301, 501, 100),
+            segment(1.05, False, ACK, 501, 201),
+            segment(1.06, False, ACK, 501, 201, sack=(301, 401)),
+            segment(1.07, False, ACK, 501, 201, sack=(301, 401)),
+            segment(1.10, True, ACK, 201, 501, 100),    # fast retransmit
+            segment(1.20, True, ACK, 301, 501, 100),    # receiver already SACKed it
+            segment(1.30, True, ACK, 101, 501, 100),    # already acknowledged
+        ]
+        assert self.events(packets)[7:] == [
+            ('dup_ack',), ('dup_ack',), ('retransmission',),
+            ('spurious_retransmission',), ('spurious_retransmission',)
+        ]
+
+    def test_out_of_order_and_late_fill(self):
+        """Test a gap filled at once is reordering, filled late it is a retransmission"""
+        packets = HANDSHAKE + [
+            segment(1.000, True, ACK, 201, 501, 100),
+            segment(1.001, True, ACK, 101, 501, 100),
+            segment(2.000, True, ACK, 401, 501, 100),
+            segment(2.500, True, ACK, 301, 501, 100),
+        ]
+        assert self.events(packets)[3:] == [(), ('out_of_order',), (), ('retransmission',)]
+
+    def test_dup_ack_needs_outstanding_data(self):
+        """Test repeated ACKs with nothing in flight, or a window update, are not dup ACKs"""
+        packets = HANDSHAKE + [
+            segment(1.0, True, ACK, 101, 501),
+            segment(1.1, True, ACK, 101, 501),
+            segment(1.2, False, ACK, 501, 101, window=2000),
+            segment(1.3, False, ACK, 501, 101, window=3000),
+        ]
+        assert self.events(packets)[3:] == [()] * 4
+
+    def test_zero_window_and_keepalive(self):
+        """Test zero windows are reported and keep-alives are not retransmissions"""
+        packets = HANDSHAKE + [
+            segment(1.0, False, ACK, 501, 101, window=0),
+            segment(2.0, True, ACK, 100, 501, 1),
+        ]
+        assert self.events(packets)[3:] == [('zero_window',), ()]
+
+    def test_sequence_wraparound(self):
+        """Test sequence numbers wrapping past 2**32 stay in order"""
+        start = 2 ** 32 - 150
+        packets = [
+            segment(0.0, True, SYN, start, 0),
+            segment(0.1, True, ACK, start + 1, 1, 100),
+            segment(0.2, True, ACK, (start + 101) % 2 ** 32, 1, 100),
+        ]
+        assert self.events(packets) == [()] * 3
+
+    def test_bounded_gaps(self):
+        """Test only MAX_RANGES sequence gaps are remembered per direction"""
+        packets = list(HANDSHAKE)
+        for i in range(20):
+            packets.append(segment(1.0 + i, True, ACK, 101 + 200 * i, 501, 100))
+        self.events(packets)
+        assert all(len(gaps) <= MAX_RANGES for gaps in self.analyzer._gaps.values())
+
+    def test_reused_slot_starts_clean(self):
+        """Test a new flow in an expired flow's slot does not inherit its sequence state"""
+        self.events(HANDSHAKE + [segment(1.0, True, ACK, 101, 501, 100)])
+        later = [
+            segment(500.0, True, SYN, 9000, 0, client_port=6000),
+            segment(500.1, True, ACK, 9001, 1, 100, client_port=6000),
+        ]
+        assert self.events(later) == [(), ()]
+
+    def test_analyze_table_matches_update(self):
+        """Test the PacketTable path reports the same events as update()"""
+        pytest.importorskip('numpy')
+        packets = HANDSHAKE + [
+            segment(1.00, True, ACK, 101, 501, 100),
+            segment(1.00, True, ACK, 301, 501, 100),
+            segment(1.05, False, ACK, 501, 201, sack=(301, 401)),
+            segment(1.06, False, ACK, 501, 201, sack=(301, 401)),
+            segment(1.07, False, ACK, 501, 201, window=0),
+            segment(1.10, True, ACK, 201, 501, 100),
+            {'timestamp': 1.2, 'length': 60, 'protocol': 'UDP', 'l4_protocol': 'UDP',
+             'src_ip': '10.0.0.1', 'dst_ip': '8.8.8.8', 'src_port': 5353, 'dst_port': 53},
+        ]
+        one_by_one = TcpAnalyzer()
+        for packet in packets:
+            one_by_one.update(packet)
+        assert self.analyzer.analyze(PacketTable(packets)) == one_by_one.summary()
+        assert self.analyzer.flow_events() == one_by_one.flow_events()
+        assert self.analyzer.summary()['dup_ack'] == 1
@@ -0,0 +1,81 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.windows import WindowedAnalyzer
+
+ACK = 0x10
+
+
+def packet(timestamp, src_port=5000, length=100):
+    return {'timestamp': timestamp, 'length': length, 'protocol': 'UDP', 'l4_protocol': 'UDP',
+            'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2', 'src_port': src_port, 'dst_port': 53}
+
+
+def segment(timestamp, seq, length=100):
+    return {'timestamp': timestamp, 'length': 54 + length, 'protocol': 'TCP', 'l4_protocol': 'TCP',
+            'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2', 'src_port': 5000, 'dst_port': 80,
+            'tcp_flags': ACK, 'tcp_seq': seq, 'tcp_ack': 1, 'tcp_len': length, 'tcp_window': 1000}
+
+
+class TestWindowedAnalyzer:
+    def test_tumbling_windows(self):
+        """Test tumbling windows emit back-to-back counts at their boundaries"""
+        analyzer = WindowedAnalyzer(windows=(1, 5), lateness=0)
+        results = []
+        analyzer.add_listener(results.append)
+        analyzer.update_batch([packet(100 + i * 0.1) for i in range(100)])
+
+        ones = [(result['start'], result['packets']) for result in results if result['window'] == 1]
+        fives = [(result['start'], result['packets']) for result in results if result['window'] == 5]
+        assert ones == [(100 + second, 10) for second in range(9)]
+        assert fives == [(100, 50)]
+        assert results[0]['statistics']['total_packets'] == 10
+
+    def test_sliding_windows(self):
+        """Test sliding windows overlap and are emitted every slide seconds"""
+        analyzer = WindowedAnalyzer(windows=(4,), slide=2, lateness=0)
+        results = analyzer.update_batch([packet(100 + i * 0.5) for i in range(20)] + [packet(111)])
+
+        assert [(result['start'], result['packets']) for result in results] == [
+            (98, 4), (100, 8), (102, 8), (104, 8), (106, 8)]
+
+    def test_packets_released(self):
+        """Test only the panes of the largest window are kept, without their packets"""
+        analyzer = WindowedAnalyzer(windows=(1, 10), lateness=0)
+        for second in range(100):
+            analyzer.update_batch([packet(second + i * 0.01) for i in range(100)])
+
+        assert len(analyzer._closed) == 10
+        assert all(pane.packets is None for pane in analyzer._closed)
+        assert list(analyzer._open) == [99]
+        assert analyzer.windows_emitted == 99 + 9
+
+    def test_late_packets(self):
+        """Test packets for closed panes are counted late, not lost"""
+        analyzer = WindowedAnalyzer(windows=(1,), lateness=0)
+        analyzer.update_batch([packet(100.5), packet(102.5)])
+        analyzer.update_batch([packet(100.7)])
+        results = analyzer.flush()
+
+        assert analyzer.late_packets == 1
+        assert results[-1]['packets'] == 2
+
+    def test_idle_and_invalid(self):
+        """Test advance() closes windows on an idle link and skips long silences; bad sizes are refused"""
+        analyzer = WindowedAnalyzer(windows=(1, 10), lateness=0)
+        analyzer.advance(50)
+        assert [(result['window'], result['packets']) for result in analyzer.advance(53)] == [(1, 0)] * 3
+        assert len(analyzer.advance(86400)) <= 12
+        with pytest.raises(ValueError):
+            WindowedAnalyzer(windows=(10,), slide=3)
+
+    def test_tcp_state_spans_windows(self):
+        """Test a retransmission of a segment from the previous window is still detected"""
+        analyzer = WindowedAnalyzer(windows=(1,), lateness=0)
+        analyzer.update_batch([segment(100.1, 1000), segment(100.2, 1100), segment(100.3, 1200)])
+        results = analyzer.update_batch([segment(101.1, 1100), segment(102.5, 1300)])
+
+        assert [issue['type'] for issue in results[0]['issues']] == []
+        assert 'TCP_RETRANSMISSION' in [issue['type'] for issue in results[1]['issues']]
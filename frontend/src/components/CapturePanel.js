@@ -1,12 +1,61 @@
 // src/components/CapturePanel.js
 import React, { useState } from 'react';
-import { capturePackets, analyzePackets, getStatistics, detectIssues } from '../services/api';
+import { capturePackets, analyzePackets, getStatistics, detectIssues, streamCapture } from '../services/api';
 
 const CapturePanel = ({ onCaptureComplete, loading, setLoading }) => {
   const [packetCount, setPacketCount] = useState(10);
   const [realCapture, setRealCapture] = useState(false);
+  const [liveUpdates, setLiveUpdates] = useState(false);
+  const [liveStatus, setLiveStatus] = useState(null);
+
+  const handleLiveCapture = () => {
+    setLoading(true);
+    const packets = [];
+    const issues = [];
+    let statistics = null;
+    let skipped = 0;
+    const showStatus = () => setLiveStatus(
+      `📦 ${packets.length + skipped} packets${skipped ? ` (${skipped} not shown live)` : ''}, ⚠️ ${issues.length} issues`
+    );
+
+    streamCapture(packetCount, realCapture, {
+      onPackets: (data) => {
+        packets.push(...data.packets);
+        skipped += data.skipped;
+        showStatus();
+      },
+      onStatistics: (data) => {
+        statistics = data.totals;
+      },
+      onIssues: (data) => {
+        issues.push(...data.issues);
+        showStatus();
+      },
+      onDone: async (data) => {
+        const analysisResult = await analyzePackets(null, data.sessionId);
+        setLiveStatus(null);
+        setLoading(false);
+        onCaptureComplete({
+          packets,
+          analyses: analysisResult.success ? analysisResult.data.analyses : [],
+          statistics,
+          issues,
+          mode: realCapture ? 'real' : 'simulation'
+        });
+      },
+      onError: (error) => {
+        setLiveStatus(null);
+        setLoading(false);
+        alert(`Capture failed: ${error}`);
+      }
+    });
+  };
 
   const handleCapture = async () => {
+    if (liveUpdates) {
+      handleLiveCapture();
+      return;
+    }
     setLoading(true);
     
     try {
@@ -15,13 +64,13 @@ const CapturePanel = ({ onCaptureComplete, loading, setLoading }) => {
       
       if (captureResult.success) {
         // Analyze packets
-        const analysisResult = await analyzePackets(captureResult.data.packets);
+        const analysisResult = await analyzePackets(captureResult.data.packets, captureResult.data.sessionId);
         
         // Get statistics
-        const statsResult = await getStatistics(captureResult.data.packets);
+        const statsResult = await getStatistics(captureResult.data.packets, captureResult.data.sessionId);
         
         // Detect issues
-        const issuesResult = await detectIssues(captureResult.data.packets);
+        const issuesResult = await detectIssues(captureResult.data.packets, captureResult.data.sessionId);
 
         onCaptureComplete({
           packets: captureResult.data.packets,
@@ -67,6 +116,17 @@ const CapturePanel = ({ onCaptureComplete, loading, setLoading }) => {
           </label>
         </div>
         
+        <div className="control-group">
+          <label>
+            <input
+              type="checkbox"
+              checked={liveUpdates}
+              onChange={(e) => setLiveUpdates(e.target.checked)}
+            />
+            Live Updates
+          </label>
+        </div>
+        
         <button 
           onClick={handleCapture} 
           disabled={loading}
@@ -76,6 +136,8 @@ const CapturePanel = ({ onCaptureComplete, loading, setLoading }) => {
         </button>
       </div>
       
+      {liveStatus && <div className="live-status">{liveStatus}</div>}
+      
       {realCapture && (
         <div className="warning">
           ⚠️ Real capture requires backend to run with administrator privileges
@@ -131,6 +131,8 @@ const StoragePanel = ({ packets, onLoad }) => {
               >
                 <option value="json">JSON (Human-readable)</option>
                 <option value="pkl">Pickle (Python objects)</option>
+                <option value="pkb">Packet blocks (compressed, indexed)</option>
+                <option value="jsonl.gz">JSON Lines (gzip, streamable)</option>
               </select>
             </div>
             
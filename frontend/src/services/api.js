@@ -22,12 +22,16 @@ export const checkBackendHealth = async () => {
   }
 };
 
-// Capture packets
-export const capturePackets = async (count, realCapture) => {
+// Capture packets: the capture runs as a background job on the server, polled until it ends
+export const capturePackets = async (count, realCapture, pollInterval = 500) => {
   try {
-    const response = await api.post('/capture', { 
-      count, 
-      realCapture 
+    let job = (await api.post('/capture/jobs', { count, realCapture })).data;
+    while (job.state === 'queued' || job.state === 'running') {
+      await new Promise((resolve) => setTimeout(resolve, pollInterval));
+      job = (await api.get(`/capture/jobs/${job.jobId}`)).data;
+    }
+    const response = await api.get(`/capture/jobs/${job.jobId}/result`, {
+      params: { limit: Math.min(Math.max(job.captured, 1), 10000) }
     });
     return { success: true, data: response.data };
   } catch (error) {
@@ -38,10 +42,46 @@ export const capturePackets = async (count, realCapture) => {
   }
 };
 
-// Analyze packets
-export const analyzePackets = async (packets) => {
+// Stop a running capture job; the packets captured so far are kept
+export const stopCaptureJob = async (jobId) => {
   try {
-    const response = await api.post('/analyze', { packets });
+    const response = await api.post(`/capture/jobs/${jobId}/stop`);
+    return { success: true, data: response.data };
+  } catch (error) {
+    return { 
+      success: false, 
+      error: error.response?.data?.error || error.message 
+    };
+  }
+};
+
+// Stream a capture as server-sent events; handlers.onPackets/onStatistics/onIssues/onDone/onError
+// are called as events arrive. Returns a function that stops the stream.
+export const streamCapture = (count, realCapture, handlers = {}) => {
+  const params = new URLSearchParams({ count, realCapture });
+  const source = new EventSource(`${API_BASE}/capture/stream?${params}`);
+  const listen = (event, handler) => {
+    source.addEventListener(event, (message) => handler && handler(JSON.parse(message.data)));
+  };
+  listen('session', handlers.onSession);
+  listen('packets', handlers.onPackets);
+  listen('statistics', handlers.onStatistics);
+  listen('issues', handlers.onIssues);
+  source.addEventListener('done', (message) => {
+    source.close();
+    handlers.onDone && handlers.onDone(JSON.parse(message.data));
+  });
+  source.onerror = () => {
+    source.close();
+    handlers.onError && handlers.onError('Capture stream interrupted');
+  };
+  return () => source.close();
+};
+
+// Analyze packets (pass the capture's sessionId to avoid re-sending them)
+export const analyzePackets = async (packets, sessionId) => {
+  try {
+    const response = await api.post('/analyze', sessionId ? { sessionId } : { packets });
     return { success: true, data: response.data };
   } catch (error) {
     return { 
@@ -52,9 +92,9 @@ export const analyzePackets = async (packets) => {
 };
 
 // Get statistics
-export const getStatistics = async (packets) => {
+export const getStatistics = async (packets, sessionId) => {
   try {
-    const response = await api.post('/statistics', { packets });
+    const response = await api.post('/statistics', sessionId ? { sessionId } : { packets });
     return { success: true, data: response.data };
   } catch (error) {
     return { 
@@ -65,9 +105,9 @@ export const getStatistics = async (packets) => {
 };
 
 // Detect issues
-export const detectIssues = async (packets) => {
+export const detectIssues = async (packets, sessionId) => {
   try {
-    const response = await api.post('/detect-issues', { packets });
+    const response = await api.post('/detect-issues', sessionId ? { sessionId } : { packets });
     return { success: true, data: response.data };
   } catch (error) {
     return { 